@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+非同期OpenAIクライアントのベンチマーク
+ローカルの疑似OpenAIサーバーに対して❓リアクションを50件同時に発火し、
+on_raw_reaction_add 全体の所要時間を計測する
+（全リアクションが同じ内容なので、LLM応答キャッシュは無効にして計測する）
+
+使い方:
+    python benchmarks/bench_async_openai.py [--reactions 50] [--delay 1.0] [--workers 50]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiohttp import web
+from openai import AsyncOpenAI
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+from utils.job_queue import JobQueue
+from utils.llm_cache import LLMResponseCache
+
+
+async def start_fake_openai_server(delay):
+    """chat.completions を模倣するローカルサーバーを起動"""
+    async def chat_completions(request):
+        await request.json()
+        await asyncio.sleep(delay)  # APIの応答待ちを再現
+        return web.json_response({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4.1-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "ベンチマーク用の解説です。"},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1"
+
+
+def make_payload(index):
+    """❓リアクションのpayloadを作成"""
+    payload = MagicMock()
+    payload.user_id = 10_000 + index
+    payload.guild_id = 1
+    payload.channel_id = 2
+    payload.message_id = 3 + index
+    payload.emoji.name = '❓'
+    payload.member = None
+    return payload
+
+
+def make_bot_mock():
+    """チャンネル・メッセージ・ユーザーを返すBotのモック"""
+    message = MagicMock()
+    message.content = "非同期処理とは何ですか？"
+    message.embeds = []
+    message.attachments = []
+    message.guild.id = 1
+    message.guild.name = "Bench Guild"
+    message.channel.id = 2
+    message.id = 3
+
+    channel = MagicMock()
+    channel.name = "bench"
+    channel.send = AsyncMock()
+    channel.fetch_message = AsyncMock(return_value=message)
+
+    bot = MagicMock()
+    bot.user.id = 0
+    bot.get_channel.return_value = channel
+    bot.get_user.return_value = None
+
+    async def fetch_user(user_id):
+        user = MagicMock()
+        user.id = user_id
+        user.name = f"user{user_id}"
+        user.mention = f"<@{user_id}>"
+        return user
+
+    bot.fetch_user = fetch_user
+    return bot
+
+
+async def run_benchmark(reactions, delay, workers):
+    runner, base_url = await start_fake_openai_server(delay)
+    data_dir = tempfile.TemporaryDirectory()
+    try:
+        client = AsyncOpenAI(api_key="bench", base_url=base_url, max_retries=0)
+        job_queue = JobQueue(worker_count=workers, max_queue_size=reactions)
+        with patch.object(main, "client_openai", client), \
+             patch.object(main, "job_queue", job_queue), \
+             patch.object(main, "bot", make_bot_mock()), \
+             patch.object(main, "is_channel_active", return_value=True), \
+             patch.object(main, "is_premium_user", AsyncMock(return_value=True)), \
+             patch.object(main.stats_manager, "record_user_activity", AsyncMock()), \
+             patch.object(main, "llm_cache", LLMResponseCache(None)), \
+             patch.object(main, "script_dir", Path(data_dir.name)):
+
+            payloads = [make_payload(i) for i in range(reactions)]
+            start = time.perf_counter()
+            await asyncio.gather(*(main.on_raw_reaction_add(p) for p in payloads))
+            await job_queue.join()
+            elapsed = time.perf_counter() - start
+
+        await job_queue.stop()
+        await client.close()
+    finally:
+        await runner.cleanup()
+        data_dir.cleanup()
+
+    print(f"リアクション数        : {reactions}")
+    print(f"ワーカー数            : {workers}")
+    print(f"1件あたりのAPI遅延    : {delay:.2f}秒")
+    print(f"逐次実行時の理論値    : {reactions * delay:.2f}秒")
+    print(f"合計所要時間          : {elapsed:.2f}秒")
+    print(f"スループット          : {reactions / elapsed:.1f} 件/秒")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="非同期OpenAIクライアントのベンチマーク")
+    parser.add_argument("--reactions", type=int, default=50, help="同時に発火するリアクション数")
+    parser.add_argument("--delay", type=float, default=1.0, help="疑似APIの応答遅延（秒）")
+    parser.add_argument("--workers", type=int, default=50, help="ジョブキューのワーカー数")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.reactions, args.delay, args.workers))
+
+
+if __name__ == "__main__":
+    main_cli()
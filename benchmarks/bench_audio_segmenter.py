@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+音声分割のベンチマーク
+1時間のサンプル音声を生成し、ffmpegによるストリーミング分割のピークRSSと所要時間を計測する
+
+--compare-legacy を付けると、従来の pydub と同じく音声全体をPCMとしてメモリに
+展開する方式とも比較する
+
+最後に、2時間分のエネルギー列に対する無音分割点の計画（plan_split_points）の所要時間も計測する
+
+使い方:
+    python benchmarks/bench_audio_segmenter.py [--duration 3600] [--compare-legacy]
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from utils.audio_segmenter import AudioSegmenter, plan_split_points
+
+
+def generate_sample(path, duration_sec):
+    """ステレオ44.1kHzのサンプル動画（音声のみのMP4）を生成"""
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"sine=frequency=220:duration={duration_sec}",
+        "-f", "lavfi", "-i", f"anoisesrc=amplitude=0.05:duration={duration_sec}",
+        "-filter_complex", "amix=inputs=2,aformat=channel_layouts=stereo",
+        "-ar", "44100", "-c:a", "aac", "-b:a", "128k",
+        str(path)
+    ], check=True)
+
+
+def measure_streaming(source_path):
+    """ストリーミング分割（本番の処理）を実行"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        parts = asyncio.run(AudioSegmenter().split(Path(source_path), Path(temp_dir)))
+        return {"parts": len(parts), "total_bytes": sum(p.size_bytes for p in parts)}
+
+
+def measure_legacy(source_path):
+    """従来方式: 音声全体をPCMにデコードしてメモリに保持（pydub.AudioSegment.from_file相当）"""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", str(source_path), "-f", "wav", "-"],
+        stdout=subprocess.PIPE, check=True
+    )
+    return {"decoded_bytes": len(result.stdout)}
+
+
+def run_measurement(mode, source_path):
+    """子プロセス内で計測し、結果をJSONで出力"""
+    start = time.perf_counter()
+    detail = measure_streaming(source_path) if mode == "streaming" else measure_legacy(source_path)
+    elapsed = time.perf_counter() - start
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "elapsed_sec": elapsed,
+        "python_peak_rss_mb": self_rss / 1024,
+        "ffmpeg_peak_rss_mb": child_rss / 1024,
+        **detail
+    }))
+
+
+def spawn_measurement(mode, source_path):
+    """計測ごとに新しいプロセスを起動してピークRSSを独立に取る"""
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", mode, str(source_path)],
+        stdout=subprocess.PIPE, check=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_planner(duration_sec=7200, repeat=20):
+    """分割点の計画だけを計測（ffmpegは使わない）"""
+    segmenter = AudioSegmenter()
+    window_sec = segmenter.analysis_window_sec
+    energy = np.random.default_rng(0).random(int(duration_sec / window_sec), dtype=np.float32)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        points = plan_split_points(energy, window_sec, segmenter.segment_sec - 1, segmenter.search_sec)
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+
+    print("[planner]")
+    print(f"  音声長              : {duration_sec}秒 ({len(energy)}窓)")
+    print(f"  分割点              : {len(points)}個")
+    print(f"  所要時間            : {elapsed_ms:.2f}ms")
+
+
+def print_result(result):
+    print(f"[{result['mode']}]")
+    print(f"  所要時間            : {result['elapsed_sec']:.2f}秒")
+    print(f"  ピークRSS (Python)  : {result['python_peak_rss_mb']:.1f}MB")
+    print(f"  ピークRSS (ffmpeg)  : {result['ffmpeg_peak_rss_mb']:.1f}MB")
+    if "parts" in result:
+        print(f"  分割数              : {result['parts']} (合計 {result['total_bytes'] / (1024 * 1024):.1f}MB)")
+    if "decoded_bytes" in result:
+        print(f"  デコード済みPCM     : {result['decoded_bytes'] / (1024 * 1024):.1f}MB")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="音声分割のベンチマーク")
+    parser.add_argument("--duration", type=int, default=3600, help="サンプル音声の長さ（秒）")
+    parser.add_argument("--compare-legacy", action="store_true", help="従来のメモリ展開方式とも比較する")
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        run_measurement(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sample_path = Path(temp_dir) / "sample.mp4"
+        print(f"サンプル生成中: {args.duration}秒 ...")
+        generate_sample(sample_path, args.duration)
+        print(f"サンプルサイズ: {sample_path.stat().st_size / (1024 * 1024):.1f}MB\n")
+
+        print_result(spawn_measurement("streaming", sample_path))
+        if args.compare_legacy:
+            print_result(spawn_measurement("legacy", sample_path))
+
+    print()
+    measure_planner()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+記事抽出のベンチマーク
+重いHTMLページを同時に解析し、イベントループのスレッドで直接解析する場合と
+プロセスプールで解析する場合の合計所要時間・イベントループの最大遅延を比較する
+
+使い方:
+    python benchmarks/bench_extraction_pool.py [--pages 16] [--workers 4] [--paragraphs 3000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.article_extractor import ArticleExtractor
+from utils.extraction_pool import ExtractionPool
+
+
+def make_page(index, paragraphs):
+    """ナビゲーションや広告の混じった重い記事ページを生成"""
+    noise = "".join(f'<div class="ad"><a href="/ad/{i}">広告{i}</a></div>' for i in range(paragraphs // 10))
+    body = "".join(f"<p>記事{index}の段落{i}です。これは解析のベンチマーク用の本文です。</p>" for i in range(paragraphs))
+    return (
+        f"<html><head><title>記事{index}</title></head><body><nav>{noise}</nav>"
+        f"<article>{body}</article><footer>{noise}</footer></body></html>"
+    )
+
+
+async def measure(name, extractor, pages, interval=0.01):
+    """全ページを同時に解析し、その間 interval 秒ごとのタイマーがどれだけ遅れたかを計測"""
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not done.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            max_lag = max(max_lag, time.perf_counter() - expected)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(interval * 2)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(extractor._extract(page) for page in pages))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(interval * 2)
+    done.set()
+    await ticker_task
+
+    extracted = sum(1 for _, content in results if content)
+    print(f"[{name}]")
+    print(f"  合計所要時間        : {elapsed:.2f}秒")
+    print(f"  ループ遅延 最大     : {max_lag * 1000:.0f}ms")
+    print(f"  抽出成功            : {extracted}/{len(pages)}")
+
+
+async def run_benchmark(page_count, workers, paragraphs):
+    pages = [make_page(i, paragraphs) for i in range(page_count)]
+    print(f"ページ数: {page_count} / 1ページ {len(pages[0]) / 1024:.0f}KB / CPUコア数: {os.cpu_count()}\n")
+
+    await measure("inline (イベントループのスレッドで解析)", ArticleExtractor(), pages)
+
+    pool = ExtractionPool(max_workers=workers, task_timeout_sec=120)
+    extractor = ArticleExtractor()
+    extractor.configure_pool(pool)
+    try:
+        # 子プロセスの起動・モジュール読み込みは計測に含めない
+        await asyncio.gather(*(extractor._extract(make_page(-1, 10)) for _ in range(workers)))
+        await measure(f"process pool ({workers}プロセス)", extractor, pages)
+    finally:
+        pool.shutdown()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="記事抽出のベンチマーク")
+    parser.add_argument("--pages", type=int, default=16, help="同時に解析するページ数")
+    parser.add_argument("--workers", type=int, default=4, help="プロセスプールのプロセス数")
+    parser.add_argument("--paragraphs", type=int, default=3000, help="1ページあたりの段落数")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.pages, args.workers, args.paragraphs))
+
+
+if __name__ == "__main__":
+    main_cli()
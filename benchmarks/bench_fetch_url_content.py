@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+URL取得のベンチマーク
+ローカルの疑似HTTPサーバーが遅いページ（Shift_JIS、少しずつ送信）を返す中で
+fetch_url_content を20件同時に実行し、その間のイベントループの遅延を計測する
+
+--compare-legacy を付けると、従来の curl を subprocess.run で呼ぶ方式（ループを止める）とも比較する
+
+使い方:
+    python benchmarks/bench_fetch_url_content.py [--pages 20] [--delay 1.0] [--compare-legacy]
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+
+PAGE_HTML = (
+    '<html><head><meta charset="Shift_JIS"><title>ベンチマーク</title></head><body>'
+    + "".join(f"<p>これは遅いページの段落{i}です。</p>" for i in range(200))
+    + "</body></html>"
+).encode("cp932")
+CHUNKS = 10
+
+
+def start_slow_server(delay):
+    """
+    delay 秒かけて本文を少しずつ返すサーバーを別スレッドのイベントループで起動
+    （legacy 方式は計測側のループを止めるので、同じループに置くと応答できなくなる）
+    """
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    state = {}
+
+    async def handler(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await response.prepare(request)
+        size = len(PAGE_HTML) // CHUNKS + 1
+        for i in range(CHUNKS):
+            await asyncio.sleep(delay / CHUNKS)
+            await response.write(PAGE_HTML[i * size:(i + 1) * size])
+        await response.write_eof()
+        return response
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/page/{index}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        state["runner"] = runner
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state["runner"].cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return stop, f"http://127.0.0.1:{state['port']}"
+
+
+def legacy_fetch(url):
+    """従来方式: curlを同期実行（イベントループを止める）"""
+    result = subprocess.run(['curl', '-s', url], capture_output=True, timeout=30, encoding='utf-8', errors='replace')
+    return main.extract_text_from_html(result.stdout)
+
+
+async def measure(name, fetch_all, interval=0.01):
+    """fetch_all 実行中に interval 秒ごとのタイマーがどれだけ遅れたかを計測"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    ticker_task = asyncio.create_task(ticker())
+    # タイマーを動かし始めてから計測を開始し、終了後にもう1回分だけ遅延を記録させる
+    await asyncio.sleep(interval * 2)
+    start = time.perf_counter()
+    texts = await fetch_all()
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(interval * 2)
+    done.set()
+    await ticker_task
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    decoded_ok = sum(1 for text in texts if text and "遅いページの段落" in text)
+    print(f"[{name}]")
+    print(f"  合計所要時間        : {elapsed:.2f}秒")
+    print(f"  ループ遅延 中央値   : {statistics.median(lags_ms):.1f}ms")
+    print(f"  ループ遅延 p99      : {lags_ms[int(len(lags_ms) * 0.99) - 1]:.1f}ms")
+    print(f"  ループ遅延 最大     : {lags_ms[-1]:.1f}ms")
+    print(f"  正しくデコード      : {decoded_ok}/{len(texts)}")
+
+
+async def run_benchmark(pages, delay, compare_legacy):
+    stop_server, base_url = start_slow_server(delay)
+    urls = [f"{base_url}/page/{i}" for i in range(pages)]
+    try:
+        print(f"ページ数: {pages} / 1ページあたりの送信時間: {delay:.2f}秒\n")
+
+        async def fetch_async():
+            return await asyncio.gather(*(main.fetch_url_content(url) for url in urls))
+        await measure("async (ストリーミング)", fetch_async)
+
+        if compare_legacy:
+            async def fetch_legacy():
+                return [legacy_fetch(url) for url in urls]
+            await measure("legacy (curl + subprocess.run)", fetch_legacy)
+    finally:
+        await main.http_client.close()
+        stop_server()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="URL取得のベンチマーク")
+    parser.add_argument("--pages", type=int, default=20, help="同時に取得するページ数")
+    parser.add_argument("--delay", type=float, default=1.0, help="1ページの送信にかける秒数")
+    parser.add_argument("--compare-legacy", action="store_true", help="従来のcurl方式とも比較する")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.pages, args.delay, args.compare_legacy))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+HTML→テキスト変換のベンチマーク
+従来の正規表現を何度もかける extract_text_from_html と、HTMLParser で1回だけ走査する html_to_text を
+保存済みページのコーパスで比較する
+
+--corpus を省略すると、典型的なページ（インラインCSS・JSON-LD付きのニュース記事・巨大なページ）と
+波括弧を多く含むページ（従来方式で極端に遅くなるケース）を生成して使う
+
+使い方:
+    python benchmarks/bench_html_text.py [--corpus 保存したHTMLのディレクトリ] [--repeat 3]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.html_text import html_to_text
+
+
+def legacy_extract_text_from_html(html_content):
+    """従来方式（比較用に変更前の main.extract_text_from_html をそのまま残したもの）"""
+    if not html_content:
+        return ""
+    text = re.sub(r'<style[^>]*>.*?</style>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<link[^>]*>', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'[^}]*{[^}]*}', '', text)
+    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'</p>', '\n\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'</h[1-6]>', '\n\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'</div>', '\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    lines = text.split('\n')
+    lines = [line.strip() for line in lines]
+    text = '\n'.join(lines)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+
+def synthetic_corpus():
+    """ベンチマーク用のページを生成"""
+    style = "<style>" + "".join(f".c{i} {{ color: #{i:06x}; margin: {i}px; }}" for i in range(300)) + "</style>"
+    json_ld = '<script type="application/ld+json">{"@type": "NewsArticle", "headline": "見出し", "author": {"name": "記者"}}</script>'
+    script = "<script>" + "".join(f"function f{i}() {{ return {i}; }}" for i in range(300)) + "</script>"
+    paragraphs = "".join(f"<p>ニュース記事の段落{i}です。<a href='/link/{i}'>関連リンク</a>も含みます。</p>" for i in range(200))
+    news = f"<html><head>{style}{json_ld}</head><body><nav><div>メニュー</div></nav><article><h1>見出し</h1>{paragraphs}</article>{script}</body></html>"
+
+    blog = "<html><body>" + "".join(
+        f"<div class='post'><h2>記事{i}</h2><p>本文{i}<br>2行目</p></div>" for i in range(200)
+    ) + "</body></html>"
+
+    # 従来方式は '[^}]*{[^}]*}' が波括弧のない文書でも文書長の2乗で遅くなるため、50KB程度に抑える
+    large = "<html><body>" + "".join(
+        f"<div><p>巨大なページの段落{i}です。" + "テキスト" * 20 + "</p></div>" for i in range(500)
+    ) + "</body></html>"
+
+    # コード解説記事など本文に波括弧が多いページ（閉じ括弧が少ないと従来方式の '[^}]*{[^}]*}' が極端に遅くなる）
+    braces = "<html><body><p>" + "a{b " * 500 + "</p></body></html>"
+
+    return {"news.html": news, "blog.html": blog, "large.html": large, "braces.html": braces}
+
+
+def load_corpus(directory):
+    corpus = {}
+    for path in sorted(Path(directory).glob("*.htm*")):
+        corpus[path.name] = path.read_text(encoding="utf-8", errors="replace")
+    return corpus
+
+
+def time_function(func, html, repeat):
+    """repeat 回実行した最短時間（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="HTML→テキスト変換のベンチマーク")
+    parser.add_argument("--corpus", help="保存したHTMLファイル（*.html）のディレクトリ")
+    parser.add_argument("--repeat", type=int, default=3, help="1ページあたりの繰り返し回数（最短時間を採用）")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        print("HTMLファイルが見つかりません")
+        return
+
+    print(f"{'ページ':<24}{'サイズ':>10}{'従来方式':>12}{'html_to_text':>14}{'倍率':>8}")
+    total_legacy = total_new = 0.0
+    for name, html in corpus.items():
+        legacy_sec = time_function(legacy_extract_text_from_html, html, args.repeat)
+        new_sec = time_function(html_to_text, html, args.repeat)
+        total_legacy += legacy_sec
+        total_new += new_sec
+        print(f"{name:<24}{len(html) / 1024:>8.0f}KB{legacy_sec * 1000:>10.1f}ms{new_sec * 1000:>12.1f}ms{legacy_sec / new_sec:>7.1f}x")
+    print(f"{'合計':<24}{'':>10}{total_legacy * 1000:>10.1f}ms{total_new * 1000:>12.1f}ms{total_legacy / total_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
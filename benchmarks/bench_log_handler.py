@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+ログ出力のベンチマーク
+従来の SyncFriendlyFileHandler（1レコードごとに exists / stat / open / write / flush）と
+QueueHandler + バックグラウンドスレッドでまとめ書きする方式の秒間レコード数を比較する
+
+- 呼び出し側: logger.info() が戻るまでの速さ（イベントループが止まる時間に相当）
+- 書き込み完了まで: 全レコードがファイルに書かれるまでの速さ
+
+使い方:
+    python benchmarks/bench_log_handler.py [--records 20000]
+"""
+
+import argparse
+import logging
+import logging.handlers
+import queue
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.log_handler import BatchingFileHandler, BatchingQueueListener
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class LegacySyncFriendlyFileHandler(logging.Handler):
+    """従来方式（比較用に変更前の main.SyncFriendlyFileHandler の書き込み部分を残したもの）"""
+
+    def __init__(self, filename, encoding='utf-8', max_bytes=10 * 1024 * 1024):
+        super().__init__()
+        self.filename = filename
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+
+    def emit(self, record):
+        try:
+            if Path(self.filename).exists() and Path(self.filename).stat().st_size > self.max_bytes:
+                pass  # ベンチマークではローテーションしない
+            with open(self.filename, 'a', encoding=self.encoding) as f:
+                f.write(self.format(record) + '\n')
+                f.flush()
+        except Exception:
+            self.handleError(record)
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    return logger
+
+
+def report(name, records, call_sec, total_sec, log_file):
+    lines = len(log_file.read_text(encoding="utf-8").splitlines())
+    print(f"[{name}]")
+    print(f"  呼び出し側          : {records / call_sec:>12,.0f} レコード/秒")
+    print(f"  書き込み完了まで    : {records / total_sec:>12,.0f} レコード/秒")
+    print(f"  書き込まれた行数    : {lines:,}")
+
+
+def run_benchmark(records):
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        # 従来方式
+        log_file = temp_dir / "legacy.txt"
+        handler = LegacySyncFriendlyFileHandler(log_file)
+        handler.setFormatter(logging.Formatter(FORMAT))
+        logger = make_logger("bench_legacy", handler)
+        start = time.perf_counter()
+        for i in range(records):
+            logger.info(f"リアクション処理中: message_id={i} user_id=123456789")
+        elapsed = time.perf_counter() - start
+        report("legacy (SyncFriendlyFileHandler)", records, elapsed, elapsed, log_file)
+
+        # キュー + まとめ書き
+        log_file = temp_dir / "queue.txt"
+        handler = BatchingFileHandler(log_file)
+        handler.setFormatter(logging.Formatter(FORMAT))
+        log_queue = queue.SimpleQueue()
+        listener = BatchingQueueListener(log_queue, [handler])
+        listener.start()
+        logger = make_logger("bench_queue", logging.handlers.QueueHandler(log_queue))
+        start = time.perf_counter()
+        for i in range(records):
+            logger.info(f"リアクション処理中: message_id={i} user_id=123456789")
+        call_sec = time.perf_counter() - start
+        listener.stop()
+        total_sec = time.perf_counter() - start
+        report("queue (BatchingFileHandler)", records, call_sec, total_sec, log_file)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="ログ出力のベンチマーク")
+    parser.add_argument("--records", type=int, default=20000, help="出力するレコード数")
+    args = parser.parse_args()
+    run_benchmark(args.records)
+
+
+if __name__ == "__main__":
+    main_cli()
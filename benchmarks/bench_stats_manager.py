@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+アクティビティ統計のベンチマーク
+30日分・1日あたり数千ユーザーのログがある状態で、
+- リアクション1件ごとの記録コスト
+- /stats（DAU・MAU）の計算コスト
+を従来方式（日ごとのJSONを毎回読み書き・30ファイルを毎回読み直し）と
+write-behind + HyperLogLog 方式で比較する
+
+使い方:
+    python benchmarks/bench_stats_manager.py [--daily-users 3000] [--records 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+
+
+def legacy_record(stats_dir, user_id):
+    """従来方式: 1件ごとに今日のJSONを読み込み、リストを線形探索して書き戻す"""
+    log_file = stats_dir / f"{datetime.now().strftime('%Y-%m-%d')}.json"
+    if log_file.exists():
+        with open(log_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    else:
+        data = {"date": "", "active_users": [], "total_actions": 0, "server_count": 0}
+    if user_id not in data["active_users"]:
+        data["active_users"].append(user_id)
+    data["total_actions"] += 1
+    with open(log_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def legacy_mau(stats_dir):
+    """従来方式: 過去30日分のJSONを毎回すべて読み込む"""
+    users = set()
+    for i in range(30):
+        log_file = stats_dir / f"{(datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')}.json"
+        if log_file.exists():
+            with open(log_file, 'r', encoding='utf-8') as f:
+                users.update(json.load(f).get("active_users", []))
+    return len(users)
+
+
+def seed_history(stats_dir, daily_users):
+    """過去29日分のログ（旧形式）を生成（ユーザーの半分は毎日来る常連）"""
+    for days_ago in range(1, 30):
+        date = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+        users = [f"regular{i}" for i in range(daily_users // 2)] + [f"day{days_ago}_{i}" for i in range(daily_users // 2)]
+        data = {"date": date, "active_users": users, "total_actions": daily_users, "server_count": 10}
+        (stats_dir / f"{date}.json").write_text(json.dumps(data), encoding="utf-8")
+
+
+async def run_benchmark(daily_users, records):
+    user_ids = [f"regular{i % (daily_users // 2)}" if i % 2 else f"today{i}" for i in range(records)]
+    for name in ("legacy", "write-behind + HyperLogLog"):
+        temp_dir = Path(tempfile.mkdtemp())
+        stats_dir = temp_dir / "data" / "activity_logs"
+        stats_dir.mkdir(parents=True)
+        seed_history(stats_dir, daily_users)
+        try:
+            with patch.object(main, "script_dir", temp_dir):
+                if name == "legacy":
+                    start = time.perf_counter()
+                    for user_id in user_ids:
+                        legacy_record(stats_dir, user_id)
+                    record_sec = time.perf_counter() - start
+                    start = time.perf_counter()
+                    mau = legacy_mau(stats_dir)
+                    first_stats_sec = time.perf_counter() - start
+                    start = time.perf_counter()
+                    legacy_mau(stats_dir)
+                    stats_sec = time.perf_counter() - start
+                else:
+                    stats = main.StatsManager()
+                    start = time.perf_counter()
+                    for user_id in user_ids:
+                        await stats.record_user_activity(user_id)
+                    stats.flush()
+                    record_sec = time.perf_counter() - start
+                    start = time.perf_counter()
+                    mau = stats.get_stats_summary()["mau"]
+                    first_stats_sec = time.perf_counter() - start
+                    await stats.record_user_activity("one_more")
+                    start = time.perf_counter()
+                    stats.get_stats_summary()
+                    stats_sec = time.perf_counter() - start
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        print(f"[{name}]")
+        print(f"  記録 {records}件        : {record_sec:.2f}秒 ({record_sec / records * 1000:.2f}ms/件)")
+        print(f"  /stats 初回          : {first_stats_sec * 1000:.1f}ms")
+        print(f"  /stats 2回目以降     : {stats_sec * 1000:.1f}ms")
+        print(f"  MAU                  : {mau:,}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="アクティビティ統計のベンチマーク")
+    parser.add_argument("--daily-users", type=int, default=3000, help="過去ログの1日あたりのユーザー数")
+    parser.add_argument("--records", type=int, default=2000, help="今日の記録件数")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.daily_users, args.records))
+
+
+if __name__ == "__main__":
+    main_cli()
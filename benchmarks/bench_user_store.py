@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+ユーザーストアのベンチマーク
+1日の利用回数チェック（読み込み → チェック・加算 → 保存）を1万回実行し、
+従来のユーザーごとのJSONファイル方式とSQLiteストアを比較する
+
+使い方:
+    python benchmarks/bench_user_store.py [--checks 10000] [--users 100]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.user_store import UserStore
+
+TODAY = "2025-01-01"
+LIMIT = 1_000_000  # 上限で止まらないよう十分大きくする
+
+
+def make_user(user_id):
+    return {
+        "user_id": str(user_id),
+        "username": f"user{user_id}",
+        "custom_prompt_x_post": "",
+        "custom_prompt_article": "",
+        "custom_prompt_memo": "",
+        "custom_prompt_summary": "",
+        "status": "free",
+        "last_used_date": "",
+        "daily_usage_count": 0
+    }
+
+
+def bench_json(data_dir, checks, users):
+    """従来方式: 毎回JSONを読み込み、回数を更新して indent=2 で書き戻す"""
+    for user_id in range(users):
+        with open(data_dir / f"{user_id}.json", 'w', encoding='utf-8') as f:
+            json.dump(make_user(user_id), f, ensure_ascii=False, indent=2)
+
+    start = time.perf_counter()
+    for i in range(checks):
+        file_path = data_dir / f"{i % users}.json"
+        with open(file_path, 'r', encoding='utf-8') as f:
+            user_data = json.load(f)
+        if user_data["last_used_date"] != TODAY:
+            user_data["last_used_date"] = TODAY
+            user_data["daily_usage_count"] = 1
+        elif user_data["daily_usage_count"] < LIMIT:
+            user_data["daily_usage_count"] += 1
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(user_data, f, ensure_ascii=False, indent=2)
+    return time.perf_counter() - start
+
+
+def bench_sqlite(db_path, checks, users):
+    """SQLiteストア: consume_quota 1回でチェックと加算を行う"""
+    store = UserStore(db_path)
+    for user_id in range(users):
+        store.put(user_id, make_user(user_id))
+
+    start = time.perf_counter()
+    for i in range(checks):
+        store.consume_quota(i % users, TODAY, LIMIT)
+    elapsed = time.perf_counter() - start
+    store.close()
+    return elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="ユーザーストアのベンチマーク")
+    parser.add_argument("--checks", type=int, default=10000, help="利用回数チェックの回数")
+    parser.add_argument("--users", type=int, default=100, help="ユーザー数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_dir = Path(temp_dir) / "user_data"
+        json_dir.mkdir()
+        json_sec = bench_json(json_dir, args.checks, args.users)
+        sqlite_sec = bench_sqlite(Path(temp_dir) / "users.sqlite3", args.checks, args.users)
+
+    print(f"利用回数チェック {args.checks}回 / {args.users}ユーザー")
+    print(f"  JSONファイル : {json_sec:.3f}秒 ({json_sec / args.checks * 1e6:.1f}µs/回)")
+    print(f"  SQLite (WAL) : {sqlite_sec:.3f}秒 ({sqlite_sec / args.checks * 1e6:.1f}µs/回)")
+    print(f"  速度比       : {json_sec / sqlite_sec:.1f}倍")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -5,20 +5,40 @@ import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
-import requests
+from openai import AsyncOpenAI
 from datetime import datetime, timezone, timedelta
 import logging
 import asyncio
 import tempfile
-from pydub import AudioSegment
+import shutil
 import re
-import aiohttp
 import time
-import subprocess
 import io
+import urllib.parse
+import sqlite3
 from utils.article_extractor import article_extractor
-from deep_translator import GoogleTranslator
+from utils.audio_segmenter import AudioSegmenterError, audio_segmenter
+from utils.channel_index import ActiveChannelIndex
+from utils.user_store import UserStore
+from utils.whisper_transcriber import WhisperTranscriber, format_timestamp
+from utils.disk_cache import DiskCache
+from utils.extraction_pool import ExtractionPool
+from utils.html_text import html_to_text
+from utils.hyperloglog import HyperLogLog
+from utils.http_client import http_client
+from utils.log_handler import BatchingFileHandler, setup_queue_logging
+from utils.job_queue import Job, JobQueue, JobType, QueueFullError
+from utils.llm_cache import LLMResponseCache
+from utils.outbound import OutboundScheduler, RateLimitTracker, split_text
+from utils.progress_status import ProgressStatus
+from utils.prompt_registry import PromptRegistry
+from utils.transcript_cache import TranscriptCache
+from utils.transcription_journal import TranscriptionJournal
+from utils.translation_service import TranslationService
+from utils.url_shortener import IsGdBackend, UrlShortener
+from utils.reaction_filter import DuplicateEventFilter, ReactionPreFilter
+from utils.stream_preview import StreamingPreview, partial_json_string
+from utils.ttl_cache import TTLCache
 from typing import Optional
 
 # URL検出関数
@@ -60,94 +80,27 @@ def is_english_title(title):
     return english_ratio >= 0.7
 
 def extract_text_from_html(html_content):
-    """HTMLから本文テキストを抽出"""
-    if not html_content:
-        return ""
-    
-    # CSS styleタグを除去
-    text = re.sub(r'<style[^>]*>.*?</style>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
-    
-    # CSS linkタグを除去
-    text = re.sub(r'<link[^>]*>', '', text, flags=re.IGNORECASE)
-    
-    # JavaScript scriptタグを除去
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    
-    # JSON-LD scriptタグを除去
-    text = re.sub(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    
-    # CSS内のクラス名やスタイル定義を除去
-    text = re.sub(r'[^}]*{[^}]*}', '', text)
-    
-    # BRタグを改行に変換
-    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
-    
-    # Pタグの終了を改行に変換
-    text = re.sub(r'</p>', '\n\n', text, flags=re.IGNORECASE)
-    
-    # 見出しタグの終了を改行に変換
-    text = re.sub(r'</h[1-6]>', '\n\n', text, flags=re.IGNORECASE)
-    
-    # divタグの終了を改行に変換
-    text = re.sub(r'</div>', '\n', text, flags=re.IGNORECASE)
-    
-    # その他のHTMLタグを除去
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # 3つ以上の連続改行を2つに制限
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    
-    # 各行の前後の空白を削除
-    lines = text.split('\n')
-    lines = [line.strip() for line in lines]
-    text = '\n'.join(lines)
-    
-    # 空行を削除してから結合
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    text = text.strip()
-    
-    return text
+    """HTMLから本文テキストを抽出（script・style・JSON-LDを除き、段落を保って1回の走査で変換）"""
+    return html_to_text(html_content)
 
-async def fetch_url_content(url):
-    """URLからコンテンツを取得してテキストを抽出"""
+async def fetch_url_content(url, max_bytes=2 * 1024 * 1024):
+    """URLからコンテンツを取得してテキストを抽出（イベントループを止めずにストリーミングで取得）"""
     try:
-        # curlコマンドを使用してHTTPSサイトから取得（30秒タイムアウト）
-        # Windows環境での文字化け対策: UTF-8エンコーディングを明示
-        result = subprocess.run(['curl', '-s', url], capture_output=True, timeout=30, encoding='utf-8', errors='replace')
+        # 本文は max_bytes までしか読み込まず、文字コードはヘッダー・metaタグ・BOMから1回だけ判定する
+        status, html_content = await http_client.fetch_text(url, max_bytes=max_bytes, timeout_sec=30)
         
-        if result.returncode != 0:
-            logger.error(f"Curl Error: {result.stderr}")
+        if status >= 400:
+            logger.error(f"URL取得エラー: HTTP {status} ({url})")
             return None
         
-        html_content = result.stdout
-        
         # 本文を抽出
         text_content = extract_text_from_html(html_content)
         
         return text_content
         
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         logger.error(f"URL取得タイムアウト (30秒): {url}")
         return None
-    except UnicodeDecodeError as e:
-        logger.error(f"文字コードエラー: {e}")
-        # フォールバック: バイナリで取得してデコード試行
-        try:
-            result = subprocess.run(['curl', '-s', url], capture_output=True, timeout=30)
-            # UTF-8で試行、ダメならcp932、それでもダメなら無視
-            try:
-                html_content = result.stdout.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    html_content = result.stdout.decode('cp932')
-                except UnicodeDecodeError:
-                    html_content = result.stdout.decode('utf-8', errors='ignore')
-            
-            text_content = extract_text_from_html(html_content)
-            return text_content
-        except Exception as fallback_error:
-            logger.error(f"フォールバック処理エラー: {fallback_error}")
-            return None
     except Exception as e:
         logger.error(f"URL取得エラー: {e}")
         return None
@@ -205,8 +158,19 @@ if settings_path.exists():
         settings = json.load(f)
         FREE_USER_DAILY_LIMIT = settings.get("free_user_daily_limit", 5)
 else:
+    settings = {}
     FREE_USER_DAILY_LIMIT = 5  # デフォルト値
 
+# リアクションのたびに参照する設定は起動時のスナップショットを使う
+OWNER_USER_ID = str(settings.get("owner_user_id") or "")
+COMMUNITY_SERVER_ID = int(settings["community_server_id"]) if settings.get("community_server_id") else None
+PREMIUM_ROLE_ID = int(settings["premium_role_id"]) if settings.get("premium_role_id") else None
+PREMIUM_CACHE_TTL_SEC = settings.get("premium_cache_ttl_sec", 600)
+
+def is_owner(user_id):
+    """settings.json の owner_user_id と一致するか"""
+    return bool(OWNER_USER_ID) and str(user_id) == OWNER_USER_ID
+
 def is_english_content(text):
     """コンテンツが英語かどうかを判定"""
     try:
@@ -223,71 +187,9 @@ def is_english_content(text):
         return False
 
 async def translate_text_to_japanese(text):
-    """テキストを日本語に翻訳（非同期対応）"""
+    """テキストを日本語に翻訳（翻訳はスレッドで並行実行し、段落ごとのキャッシュと段落構成を保つ）"""
     try:
-        # 長いテキストは文単位で分割して翻訳
-        max_length = 2000  # より安全な制限値
-        
-        if len(text) <= max_length:
-            # 短いテキストはそのまま翻訳
-            translator = GoogleTranslator(source='en', target='ja')
-            translated = translator.translate(text)
-            return translated
-        else:
-            # 長いテキストは文単位で分割
-            sentences = []
-            # 段落単位で分割し、さらに文単位に分割
-            paragraphs = text.split('\n\n')
-            
-            for paragraph in paragraphs:
-                # 文単位で分割（.や!、?で区切る）
-                import re
-                paragraph_sentences = re.split(r'(?<=[.!?])\s+', paragraph)
-                sentences.extend(paragraph_sentences)
-            
-            translated_sentences = []
-            current_batch = ""
-            translator = GoogleTranslator(source='en', target='ja')
-            
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if not sentence:
-                    continue
-                
-                # バッチサイズを確認
-                if len(current_batch + ' ' + sentence) <= max_length:
-                    current_batch = (current_batch + ' ' + sentence).strip()
-                else:
-                    # 現在のバッチを翻訳
-                    if current_batch:
-                        try:
-                            translated = translator.translate(current_batch)
-                            translated_sentences.append(translated)
-                        except Exception as batch_error:
-                            logger.warning(f"バッチ翻訳エラー: {batch_error}")
-                            # 個別の文を翻訳試行
-                            batch_sentences = current_batch.split('. ')
-                            for individual_sentence in batch_sentences:
-                                try:
-                                    if individual_sentence.strip():
-                                        individual_translated = translator.translate(individual_sentence.strip())
-                                        translated_sentences.append(individual_translated)
-                                except Exception:
-                                    translated_sentences.append(individual_sentence)  # 翻訳失敗時は原文
-                    
-                    current_batch = sentence
-            
-            # 最後のバッチを処理
-            if current_batch:
-                try:
-                    translated = translator.translate(current_batch)
-                    translated_sentences.append(translated)
-                except Exception as final_error:
-                    logger.warning(f"最終バッチ翻訳エラー: {final_error}")
-                    translated_sentences.append(current_batch)  # 翻訳失敗時は原文
-            
-            return ' '.join(translated_sentences)
-            
+        return await translation_service.translate(text)
     except Exception as e:
         logger.error(f"翻訳エラー: {e}")
         return text  # 翻訳失敗時は元のテキストを返す
@@ -296,7 +198,7 @@ async def generate_thread_image(first_tweet_content: str) -> Optional[str]:
     """1ツイート目の内容から粘土フィギュア質感の画像を生成"""
     try:
         # 1ツイート目から視覚的要素を抽出
-        response = client_openai.chat.completions.create(
+        response = await client_openai.chat.completions.create(
             model="gpt-4.1-mini",
             messages=[
                 {
@@ -344,7 +246,7 @@ Visual elements:"""
         logger.info(f"画像生成開始: {enhanced_prompt}")
         
         # OpenAI Imagen API呼び出し（低品質・低コスト設定・横長）
-        response = client_openai.images.generate(
+        response = await client_openai.images.generate(
             model="gpt-image-1", 
             prompt=enhanced_prompt,
             size="1536x1024",
@@ -405,185 +307,414 @@ Visual elements:"""
             logger.warning(f"OpenAI安全システムによる画像生成拒否: {enhanced_prompt}")
         return None
 
-# カスタムログハンドラー（書き込み時のみファイルを開く）
-class SyncFriendlyFileHandler(logging.Handler):
-    def __init__(self, filename, encoding='utf-8', max_bytes=10*1024*1024):
-        super().__init__()
-        self.filename = filename
-        self.encoding = encoding
-        self.max_bytes = max_bytes
-        
-    def emit(self, record):
-        try:
-            # ファイルサイズチェック（ローテーション）
-            if Path(self.filename).exists() and Path(self.filename).stat().st_size > self.max_bytes:
-                self._rotate_logs()
-            
-            # 書き込み時のみファイルを開く
-            with open(self.filename, 'a', encoding=self.encoding) as f:
-                f.write(self.format(record) + '\n')
-                f.flush()  # 即座に書き込み
-        except Exception:
-            self.handleError(record)
-    
-    def _rotate_logs(self):
-        """ログファイルをローテーション"""
-        try:
-            base_path = Path(self.filename)
-            # 古いバックアップを削除・移動
-            for i in range(4, 0, -1):  # log.txt.4 → log.txt.5
-                old_file = base_path.with_suffix(f'.txt.{i}')
-                new_file = base_path.with_suffix(f'.txt.{i+1}')
-                if old_file.exists():
-                    if new_file.exists():
-                        new_file.unlink()
-                    old_file.rename(new_file)
-            
-            # 現在のログファイルをlog.txt.1に移動
-            if base_path.exists():
-                backup_file = base_path.with_suffix('.txt.1')
-                if backup_file.exists():
-                    backup_file.unlink()
-                base_path.rename(backup_file)
-        except Exception as e:
-            print(f"ログローテーションエラー: {e}")
-
-# ログ設定（同期フレンドリー）
+# ログ設定（出力側はキューに積むだけにし、バックグラウンドスレッドがまとめて書き込む。ファイルは書き込み時のみ開く）
 log_file = script_dir / "log.txt"
-sync_handler = SyncFriendlyFileHandler(log_file)
-sync_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[
-        sync_handler,
-        logging.StreamHandler()  # コンソールにも出力
-    ]
-)
+file_handler = BatchingFileHandler(log_file)
+file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+console_handler = logging.StreamHandler()  # コンソールにも出力
+console_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+log_listener = setup_queue_logging([file_handler, console_handler], level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 統計管理クラス
 class StatsManager:
-    def __init__(self):
+    """
+    アクティビティ統計（DAU / MAU）
+    今日のアクティブユーザーはメモリの集合で持ち、定期的に追記専用ログ（{日付}.log）へ書き出す（write-behind）
+    日ごとのロールアップ（{日付}.json: DAU・アクション数・HyperLogLogスケッチ）を保存し、
+    MAU は日ごとのスケッチのマージで求めるので、/stats のたびに30日分のログを読み直さない
+    """
+    
+    def __init__(self, flush_interval_sec=30):
         self.stats_dir = script_dir / "data" / "activity_logs"
         self.stats_dir.mkdir(exist_ok=True)
+        self.flush_interval_sec = flush_interval_sec
+        self._date = None
+        self._active_users = set()
+        self._sketch = HyperLogLog()
+        self._total_actions = 0
+        self._server_count = 0
+        self._pending = []  # まだ追記ログに書き出していないアクティビティ
+        self._dirty = False
+        self._day_sketches = {}  # 確定した過去日のスケッチ（日付 → HyperLogLog）
+        self._past_mau_sketch = None  # (基準日, 基準日より前の29日分をマージしたスケッチ)
+        self._flush_task = None
+        self._replay_unrolled_logs()
         logger.info("統計管理システムを初期化しました")
     
+    def start(self):
+        """定期書き出しタスクを開始（Bot起動時に呼ぶ）"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """定期書き出しを止め、残りを書き出す（Bot終了時に呼ぶ）"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self.flush()
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_sec)
+            self.flush()
+    
     async def record_user_activity(self, user_id, bot_instance=None):
-        """ユーザーアクティビティをリアルタイム記録"""
+        """ユーザーアクティビティを記録（メモリ上で集計し、ファイルへは定期的にまとめて書き出す）"""
         try:
             today = datetime.now().strftime("%Y-%m-%d")
-            log_file = self.stats_dir / f"{today}.json"
-            
-            # 今日のログを読み込み
-            if log_file.exists():
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            else:
-                # 新しい日の最初の記録時にサーバー数を記録
-                server_count = len(bot_instance.guilds) if bot_instance else 0
-                data = {
-                    "date": today,
-                    "active_users": [],
-                    "total_actions": 0,
-                    "server_count": server_count
-                }
-                logger.info(f"新しい日の統計開始: サーバー数 {server_count}")
+            self._ensure_day(today, bot_instance)
+            if not self._server_count and bot_instance:
+                self._server_count = len(bot_instance.guilds)
             
             # ユーザーを追加（重複なし）
-            if user_id not in data["active_users"]:
-                data["active_users"].append(user_id)
+            if user_id not in self._active_users:
+                self._active_users.add(user_id)
+                self._sketch.add(user_id)
                 logger.debug(f"新規アクティブユーザー記録: {user_id}")
             
-            data["total_actions"] += 1
+            self._total_actions += 1
+            self._pending.append({"t": int(time.time()), "u": user_id})
+            self._dirty = True
             
-            # ログファイルに保存
-            with open(log_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-                
         except Exception as e:
             logger.error(f"アクティビティ記録エラー: {e}")
     
+    def flush(self):
+        """溜まったアクティビティを追記ログへ書き出し、今日のロールアップを更新"""
+        if self._date is None or not self._dirty:
+            return
+        try:
+            if self._pending:
+                with open(self.stats_dir / f"{self._date}.log", 'a', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(event, ensure_ascii=False) + "\n" for event in self._pending))
+                self._pending = []
+            self._write_rollup()
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"アクティビティ書き出しエラー: {e}")
+    
+    def _write_rollup(self):
+        self._save_rollup(self._date, self._active_users, self._total_actions, self._server_count, self._sketch)
+    
+    def _save_rollup(self, date, active_users, total_actions, server_count, sketch):
+        rollup = {
+            "date": date,
+            "dau": len(active_users),
+            "total_actions": total_actions,
+            "server_count": server_count,
+            "hll": sketch.to_base64()
+        }
+        rollup_file = self.stats_dir / f"{date}.json"
+        temp_file = rollup_file.with_suffix(".json.tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(rollup, f, ensure_ascii=False)
+        os.replace(temp_file, rollup_file)
+    
+    def _ensure_day(self, today, bot_instance=None):
+        """日付が変わったら前日分を確定し、今日の集計を（再起動時はログから）復元する"""
+        if self._date == today:
+            return
+        if self._date is not None:
+            self.flush()
+            self._day_sketches[self._date] = self._sketch
+        
+        self._date = today
+        self._active_users = set()
+        self._sketch = HyperLogLog()
+        self._pending = []
+        self._dirty = False
+        
+        rollup = self._read_rollup(today)
+        if rollup is None:
+            # 新しい日の最初の記録時にサーバー数を記録
+            self._total_actions = 0
+            self._server_count = len(bot_instance.guilds) if bot_instance else 0
+            logger.info(f"新しい日の統計開始: サーバー数 {self._server_count}")
+            return
+        
+        self._total_actions = rollup.get("total_actions", 0)
+        self._server_count = rollup.get("server_count", 0)
+        log_file = self.stats_dir / f"{today}.log"
+        legacy_users = rollup.get("active_users")
+        if legacy_users is not None:
+            # 旧形式（ユーザー一覧を持つJSON）は一度だけ追記ログへ移す
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps({"t": None, "u": user_id}, ensure_ascii=False) + "\n" for user_id in legacy_users))
+        self._active_users, _ = self._read_log(log_file)
+        self._sketch.update(self._active_users)
+        if legacy_users is not None:
+            self._write_rollup()
+    
+    def _read_log(self, log_file):
+        """追記ログからユーザーの集合とアクション数を読む（書き込み途中で止まった最後の行は無視する）"""
+        users = set()
+        actions = 0
+        if not log_file.exists():
+            return users, actions
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    users.add(json.loads(line)["u"])
+                except (json.JSONDecodeError, KeyError):
+                    continue
+                actions += 1
+        return users, actions
+    
+    def _replay_unrolled_logs(self):
+        """ロールアップを書く前に止まった日（クラッシュなど）の追記ログから、ロールアップを作り直す"""
+        for log_file in sorted(self.stats_dir.glob("*.log")):
+            date = log_file.stem
+            if (self.stats_dir / f"{date}.json").exists():
+                continue
+            try:
+                users, actions = self._read_log(log_file)
+                sketch = HyperLogLog()
+                sketch.update(users)
+                # サーバー数はログに残っていないため 0 とする
+                self._save_rollup(date, users, actions, 0, sketch)
+                logger.info(f"ロールアップのない追記ログを集計し直しました: {date} (DAU {len(users)}, アクション {actions})")
+            except Exception as e:
+                logger.error(f"追記ログの集計エラー: {date}, {e}")
+    
+    def _read_rollup(self, date):
+        log_file = self.stats_dir / f"{date}.json"
+        if not log_file.exists():
+            return None
+        with open(log_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _day_sketch(self, date):
+        """指定日のスケッチ（過去日は確定済みなので一度読んだらメモリに残す）"""
+        if date == self._date:
+            return self._sketch
+        if date not in self._day_sketches:
+            rollup = self._read_rollup(date)
+            sketch = None
+            if rollup is not None:
+                if rollup.get("hll"):
+                    sketch = HyperLogLog.from_base64(rollup["hll"])
+                else:
+                    sketch = HyperLogLog()
+                    sketch.update(rollup.get("active_users", []))
+            self._day_sketches[date] = sketch
+        return self._day_sketches[date]
+    
     def calculate_dau(self, target_date=None):
         """指定日のDAU計算（デフォルトは今日）"""
         try:
             if target_date is None:
                 target_date = datetime.now().strftime("%Y-%m-%d")
             
-            log_file = self.stats_dir / f"{target_date}.json"
+            if target_date == datetime.now().strftime("%Y-%m-%d"):
+                self._ensure_day(target_date)
+            if target_date == self._date:
+                return len(self._active_users)
             
-            if log_file.exists():
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return len(data.get("active_users", []))
-            return 0
+            rollup = self._read_rollup(target_date)
+            if rollup is None:
+                return 0
+            return rollup.get("dau", len(rollup.get("active_users", [])))
             
         except Exception as e:
             logger.error(f"DAU計算エラー: {e}")
             return 0
     
     def calculate_mau(self, target_date=None):
-        """指定日から過去30日間のMAU計算"""
+        """指定日から過去30日間のMAU計算（日ごとのスケッチをマージした概算値）"""
         try:
+            today = datetime.now().strftime("%Y-%m-%d")
             if target_date is None:
-                base_date = datetime.now()
-            else:
-                base_date = datetime.strptime(target_date, "%Y-%m-%d")
-            
-            mau_users = set()
-            
-            for i in range(30):
-                date = (base_date - timedelta(days=i)).strftime("%Y-%m-%d")
-                log_file = self.stats_dir / f"{date}.json"
-                
-                if log_file.exists():
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        mau_users.update(data.get("active_users", []))
-            
-            return len(mau_users)
+                target_date = today
+            if target_date == today:
+                self._ensure_day(today)
+            base_date = datetime.strptime(target_date, "%Y-%m-%d")
+            
+            # 基準日より前の29日分は確定しているので、マージ結果を基準日ごとに使い回す
+            if self._past_mau_sketch is None or self._past_mau_sketch[0] != target_date:
+                merged = HyperLogLog()
+                for i in range(1, 30):
+                    sketch = self._day_sketch((base_date - timedelta(days=i)).strftime("%Y-%m-%d"))
+                    if sketch is not None:
+                        merged.merge(sketch)
+                self._past_mau_sketch = (target_date, merged)
+                self._prune_day_sketches(base_date)
+            
+            mau_sketch = self._past_mau_sketch[1].copy()
+            base_sketch = self._day_sketch(target_date)
+            if base_sketch is not None:
+                mau_sketch.merge(base_sketch)
+            return mau_sketch.count()
             
         except Exception as e:
             logger.error(f"MAU計算エラー: {e}")
             return 0
     
+    def _prune_day_sketches(self, base_date):
+        """MAUの計算範囲より古いスケッチはメモリから外す"""
+        oldest = (base_date - timedelta(days=30)).strftime("%Y-%m-%d")
+        for date in [date for date in self._day_sketches if date < oldest]:
+            del self._day_sketches[date]
+    
     def get_stats_summary(self):
         """統計サマリーを取得"""
         try:
             today = datetime.now().strftime("%Y-%m-%d")
-            dau = self.calculate_dau()
-            mau = self.calculate_mau()
-            
-            # 総アクション数・サーバー数（今日）
-            today_log = self.stats_dir / f"{today}.json"
-            total_actions_today = 0
-            server_count_today = 0
-            if today_log.exists():
-                with open(today_log, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    total_actions_today = data.get("total_actions", 0)
-                    server_count_today = data.get("server_count", 0)
+            self._ensure_day(today)
             
             return {
                 "date": today,
-                "dau": dau,
-                "mau": mau,
-                "total_actions_today": total_actions_today,
-                "server_count": server_count_today
+                "dau": self.calculate_dau(),
+                "mau": self.calculate_mau(),
+                "total_actions_today": self._total_actions,
+                "server_count": self._server_count
             }
             
         except Exception as e:
             logger.error(f"統計サマリー取得エラー: {e}")
             return {"date": "", "dau": 0, "mau": 0, "total_actions_today": 0, "server_count": 0}
 
-# OpenAIクライアントの初期化（60秒タイムアウト設定）
+# OpenAIクライアントの初期化（非同期クライアントを全機能で共有）
+# 同期クライアントだとAPI待ちの間イベントループが止まり、他のリアクションや
+# ハートビートが処理できなくなるため、AsyncOpenAIで待ち時間を重ねて処理する
 client_openai = None
 if OPENAI_API_KEY:
-    client_openai = OpenAI(
+    client_openai = AsyncOpenAI(
         api_key=OPENAI_API_KEY,
         timeout=180.0  # 180秒タイムアウト（長い音声ファイル対応）
     )
 
+# Whisper文字起こし（settings.jsonの transcription で並列数・リトライ回数を調整可能）
+transcription_settings = settings.get("transcription", {})
+whisper_transcriber = WhisperTranscriber(
+    client_openai,
+    max_concurrency=transcription_settings.get("max_parallel_parts", 4),
+    max_retries=transcription_settings.get("max_retries", 3)
+)
+
+# 文字起こし結果プレビューの1ページあたりの文字数（見出しと合わせて2000文字以内）
+TRANSCRIPT_PREVIEW_PAGE_CHARS = 1800
+
+# 文字起こしジョブのジャーナル（分割計画と完了したパートを保存し、再起動後に続きから再開する）
+transcription_journal = TranscriptionJournal(
+    script_dir / "data" / "jobs" / "transcription",
+    max_resumes=transcription_settings.get("max_resumes", 3)
+)
+
+# 文字起こし結果のキャッシュ（ファイル内容のハッシュ＋モデル・言語がキー。サイズ上限を超えたら古いものから削除）
+transcript_cache = TranscriptCache(
+    DiskCache(script_dir / "data" / "cache" / "transcripts", max_bytes=transcription_settings.get("cache_max_disk_mb", 100) * 1024 * 1024),
+    model=whisper_transcriber.model,
+    language=whisper_transcriber.language
+)
+
+# LLM応答キャッシュ（settings.jsonの llm_cache.features に書いた機能だけ有効。温度の高いX投稿は既定で無効）
+llm_cache_settings = settings.get("llm_cache", {})
+llm_cache = LLMResponseCache(
+    DiskCache(script_dir / "data" / "cache" / "llm", max_bytes=llm_cache_settings.get("max_disk_mb", 200) * 1024 * 1024),
+    enabled_features=llm_cache_settings.get("features", ["explain", "memo", "article", "summary"]),
+    memory_entries=llm_cache_settings.get("memory_entries", 256)
+)
+
+# プロンプトテンプレート（起動時に読み込み、ファイルの更新時刻が変わったときだけ読み直す）
+THREAD_PROMPT_PLACEHOLDER = "[ここに解説したいニュース記事のURLや文章を入力してください]"
+THREAD_PROMPT_FALLBACK = """
+以下の内容を、読者が最後まで読みたくなるXツリー投稿（3-7ツイート）に変換してください。
+各ツイートは140字以内で、エンゲージメントを重視した構成にしてください。
+
+【ツイート 1/n】
+【ツイート 2/n】
+【ツイート 3/n】
+
+対象コンテンツ:
+[ここに解説したいニュース記事のURLや文章を入力してください]
+"""
+prompt_registry = PromptRegistry(script_dir / "prompt")
+prompt_registry.register(
+    "x_post", "x_post.txt",
+    fallback="あなたはDiscordの投稿をX（旧Twitter）用に要約するアシスタントです。140文字以内で簡潔に要約してください。",
+    suffix="\n\n出力は以下のJSON形式で返してください：\n{\"content\": \"X投稿用のテキスト\"}\n\n重要な文字数制限：\n- プロンプトで300文字以下の文字数指定がある場合はその文字数に従ってください\n- プロンプトで300文字を超える文字数指定がある場合や指定がない場合は、必ず300文字以内で出力してください\n- 絶対に300文字を超えないでください"
+)
+prompt_registry.register(
+    "explain", "question_explain.txt",
+    fallback="あなたはDiscordメッセージの内容について詳しく解説するアシスタントです。投稿内容をわかりやすく、丁寧に解説してください。専門用語があれば説明し、背景情報も補足してください。"
+)
+prompt_registry.register(
+    "memo", "pencil_memo.txt",
+    fallback="あなたはDiscordメッセージの内容をObsidianメモとして整理するアシスタントです。内容に忠実にメモ化してください。追加情報は加えず、原文を尊重してください。客観的にみて不要と思われる情報は削除して構いません。",
+    suffix='\n\n出力はJSON形式で、以下のフォーマットに従ってください：\n{"english_title": "english_title_for_filename", "content": "メモの内容"}'
+)
+prompt_registry.register(
+    "article", "article.txt",
+    fallback="あなたは優秀なライターです。与えられた内容を元に、構造化された記事を作成してください。",
+    suffix='\n\n出力はJSON形式で、以下のフォーマットに従ってください：\n{"content": "マークダウン形式の記事全文"}',
+    skip_suffix_marker='{"content":'
+)
+prompt_registry.register(
+    "summary", "summary.txt",
+    fallback="以下の記事を3行で要約し、キーフレーズを5個抽出してください。"
+)
+prompt_registry.register(
+    "thread", "thread.txt",
+    fallback=THREAD_PROMPT_FALLBACK,
+    placeholder=THREAD_PROMPT_PLACEHOLDER
+)
+
+# 生成途中のプレビュー（settings.jsonの streaming.features に書いた機能は、生成しながらメッセージを編集して表示する）
+streaming_settings = settings.get("streaming", {})
+streaming_features = set(streaming_settings.get("features", ["explain", "article"]))
+streaming_interval_sec = streaming_settings.get("edit_interval_sec", 1.5)
+
+# 記事抽出結果のキャッシュ（🌐・🙌で同じURLを何度も取得・解析しない）
+article_cache_settings = settings.get("article_cache", {})
+article_extractor.configure_cache(
+    DiskCache(script_dir / "data" / "cache" / "articles", max_bytes=article_cache_settings.get("max_disk_mb", 50) * 1024 * 1024),
+    ttl_sec=article_cache_settings.get("ttl_sec", 3600)
+)
+
+# 記事本文の抽出（readability / BeautifulSoup）はCPUを使うので別プロセスで実行する（workers を 0 にするとその場で実行）
+html_extraction_settings = settings.get("html_extraction", {})
+extraction_pool = None
+if html_extraction_settings.get("workers", 2) > 0:
+    extraction_pool = ExtractionPool(
+        max_workers=html_extraction_settings.get("workers", 2),
+        task_timeout_sec=html_extraction_settings.get("task_timeout_sec", 20)
+    )
+article_extractor.configure_pool(
+    extraction_pool,
+    max_html_chars=html_extraction_settings.get("max_html_chars", 1_500_000)
+)
+
+# 🌐の英語記事の翻訳（段落ごとにキャッシュし、同じ段落は翻訳し直さない）
+translation_settings = settings.get("translation", {})
+translation_service = TranslationService(
+    source="en",
+    target="ja",
+    max_concurrency=translation_settings.get("max_concurrency", 4),
+    max_batch_chars=translation_settings.get("max_batch_chars", 2000),
+    cache=DiskCache(script_dir / "data" / "cache" / "translations", max_bytes=translation_settings.get("max_disk_mb", 50) * 1024 * 1024)
+)
+
+# URL短縮（is.gd。元のURL → 短縮URLをディスクに保存し、遅いときは deadline_sec で元のURLを使う）
+url_shortener_settings = settings.get("url_shortener", {})
+url_shortener = UrlShortener(
+    IsGdBackend(http_client),
+    cache=DiskCache(script_dir / "data" / "cache" / "short_urls", max_bytes=url_shortener_settings.get("max_disk_mb", 5) * 1024 * 1024),
+    deadline_sec=url_shortener_settings.get("deadline_sec", 2.0)
+)
+
+# Embedのフィールドの値の上限（短縮できなかった投稿リンクは本文を含むので超えやすい）
+EMBED_FIELD_VALUE_LIMIT = 1024
+# 期限後に短縮URLが届いたらリンクを差し込むタスク（完了まで参照を持っておく）
+x_link_update_tasks = set()
+
 
 # Intentsの設定（Discord Developer Portalで有効化が必要）
 intents = discord.Intents.default()
@@ -592,11 +723,51 @@ intents.message_content = True  # MESSAGE CONTENT INTENT
 intents.reactions = True
 intents.members = True  # SERVER MEMBERS INTENT
 
+# リアクション処理用ジョブキュー（settings.jsonの job_queue で調整可能）
+job_queue_settings = settings.get("job_queue", {})
+job_queue = JobQueue(
+    worker_count=job_queue_settings.get("worker_count", 8),
+    max_queue_size=job_queue_settings.get("max_queue_size", 100),
+    feature_limits=job_queue_settings.get("feature_concurrency", {})
+)
+
+class DarariBot(commands.Bot):
+    """起動・終了時にバックグラウンド処理を開始・停止するBot"""
+    
+    resume_task = None
+    
+    async def setup_hook(self):
+        """ログイン直後（Gateway接続前）に一度だけ呼ばれる"""
+        # ユーザーストアを開き、旧形式のJSONが残っていれば取り込む
+        store = get_user_store()
+        logger.info(f"ユーザーストア: {store.db_path} ({store.count()}ユーザー)")
+        active_channel_index.load_all(script_dir / "data" / "server_data")
+        await http_client.start()
+        job_queue.start()
+        stats_manager.start()
+        # 再起動前に終わらなかった文字起こしを再開（Gateway接続後に投稿先チャンネルを取得する）
+        self.resume_task = asyncio.create_task(resume_transcription_jobs())
+    
+    async def close(self):
+        """Bot終了時にワーカーを停止してから切断する"""
+        if self.resume_task is not None:
+            self.resume_task.cancel()
+        await job_queue.stop()
+        await stats_manager.stop()
+        await http_client.close()
+        if extraction_pool is not None:
+            await extraction_pool.shutdown()
+        await super().close()
+
+# 送信・リアクション追加のスケジューラー（discord.py のHTTP応答ヘッダーからレート制限の残りを記録する）
+rate_limit_tracker = RateLimitTracker()
+outbound = OutboundScheduler(rate_limit_tracker)
+
 # Botの初期化
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = DarariBot(command_prefix='!', intents=intents, http_trace=rate_limit_tracker.trace_config())
 
 # 統計管理インスタンスを作成
-stats_manager = StatsManager()
+stats_manager = StatsManager(flush_interval_sec=settings.get("stats", {}).get("flush_interval_sec", 30))
 print("DEBUG: StatsManager作成完了", flush=True)
 
 
@@ -616,12 +787,13 @@ def save_server_data(server_id, data):
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+# 有効チャンネルのインデックス（起動時に一括読み込みし、/activate・/deactivate で更新）
+# テストで load_server_data を差し替えられるよう、呼び出し時に名前を解決する
+active_channel_index = ActiveChannelIndex(lambda server_id: load_server_data(server_id))
+
 def is_channel_active(server_id, channel_id):
-    """チャンネルが有効かどうかをチェック"""
-    server_data = load_server_data(server_id)
-    if server_data and 'active_channel_ids' in server_data:
-        return str(channel_id) in server_data['active_channel_ids']
-    return False
+    """チャンネルが有効かどうかをチェック（メモリ上のインデックスを参照するだけでディスクは読まない）"""
+    return active_channel_index.is_active(server_id, channel_id)
 
 def migrate_user_data(user_data, user_id, username):
     """古いユーザーデータを新しいフォーマットにマイグレーション"""
@@ -653,6 +825,25 @@ def migrate_user_data(user_data, user_id, username):
     
     return user_data, updated
 
+async def generate_with_preview(feature, channel, header, transform=None, **request):
+    """
+    LLMで本文を生成（streaming.features の機能は、生成しながらプレビューのメッセージを編集して表示する）
+
+    Returns:
+        (生成した本文, StreamingPreview または None) のタプル。プレビューは呼び出し側で finish / discard する
+    """
+    if feature.value not in streaming_features:
+        return await llm_cache.complete(client_openai, feature, **request), None
+
+    preview = StreamingPreview(outbound, channel, header, interval_sec=streaming_interval_sec, transform=transform)
+    await preview.start()
+    try:
+        content = await llm_cache.stream(client_openai, feature, on_text=preview.update, **request)
+    except Exception:
+        await preview.discard()
+        raise
+    return content, preview
+
 async def check_content_for_urls(content_text, user, channel):
     """コンテンツ内のURLを検出し、必要に応じて警告を表示"""
     import re
@@ -665,127 +856,118 @@ async def check_content_for_urls(content_text, user, channel):
             f"📝 URLの中身は読み取ることができませんが、このまま処理を続行します\n"
             f"🔗 検出されたURL: {len(urls)}個"
         )
-        await channel.send(warning_msg)
+        outbound.post(channel, warning_msg)
     
     return content_text
 
+# データディレクトリごとのユーザーストア（script_dir を差し替えたテストでも本番DBに触れないようにする）
+_user_stores = {}
+
+def get_user_store():
+    """ユーザーストアを取得（初回は旧形式のJSONディレクトリを取り込む）"""
+    data_dir = script_dir / "data"
+    store = _user_stores.get(data_dir)
+    if store is None:
+        store = UserStore(data_dir / "users.sqlite3")
+        store.import_json_dir(data_dir / "user_data")
+        _user_stores[data_dir] = store
+    return store
+
 def load_user_data(user_id):
     """ユーザーデータを読み込む"""
-    file_path = script_dir / "data" / "user_data" / f"{user_id}.json"
-    if file_path.exists():
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return data
-        except (json.JSONDecodeError, KeyError) as e:
-            logger.error(f"ユーザーデータ読み込みエラー {user_id}: {e}")
-            return None
-    return None
+    try:
+        return get_user_store().get(user_id)
+    except sqlite3.Error as e:
+        logger.error(f"ユーザーデータ読み込みエラー {user_id}: {e}")
+        return None
 
 def save_user_data(user_id, data):
-    """ユーザーデータを保存する"""
-    data_dir = script_dir / "data" / "user_data"
-    data_dir.mkdir(parents=True, exist_ok=True)
-    file_path = data_dir / f"{user_id}.json"
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """ユーザーデータを保存する（利用回数は can_use_feature でのみ更新）"""
+    get_user_store().put(user_id, data)
+
+# プレミアム判定のキャッシュ（ロールの変更・脱退はメンバーイベントで即時反映し、TTLは取りこぼし対策）
+premium_cache = TTLCache(ttl_sec=PREMIUM_CACHE_TTL_SEC)
+
+def member_has_premium_role(member):
+    """メンバーがプレミアムロールを持っているか"""
+    return PREMIUM_ROLE_ID is not None and any(role.id == PREMIUM_ROLE_ID for role in member.roles)
 
 async def is_premium_user(user_id):
-    """ユーザーがプレミアムかどうかを判定"""
+    """ユーザーがプレミアムかどうかを判定（キャッシュにあればネットワークに触れない）"""
+    # オーナーチェック（設定ファイルベース）- 最優先
+    if is_owner(user_id):
+        return True
+    
+    cached = premium_cache.get(str(user_id))
+    if cached is not None:
+        return cached
+    
+    is_premium = await resolve_premium_status(user_id)
+    if is_premium is None:
+        # 一時的なエラーはキャッシュせず、次回また判定する
+        return False
+    premium_cache.set(str(user_id), is_premium)
+    return is_premium
+
+async def resolve_premium_status(user_id):
+    """コミュニティサーバーのロールからプレミアムかどうかを判定（判定できなかった場合は None）"""
     try:
-        # オーナーチェック（設定ファイルベース）- 最優先
-        owner_user_id = settings.get("owner_user_id")
-        if owner_user_id and str(user_id) == str(owner_user_id):
-            logger.info(f"User {user_id} is configured owner - granting premium access")
-            return True
-        
-        # サーバーオーナーの特別判定
-        community_guild = bot.get_guild(int(settings.get("community_server_id")))
+        community_guild = bot.get_guild(COMMUNITY_SERVER_ID) if COMMUNITY_SERVER_ID else None
         if not community_guild:
-            logger.warning(f"Community server not found: {settings.get('community_server_id')}")
-            # コミュニティサーバーが見つからなくても、設定ファイルベースのオーナー判定は上で実行済み
-            return False
+            logger.warning(f"Community server not found: {COMMUNITY_SERVER_ID}")
+            # コミュニティサーバーが見つからなくても、設定ファイルベースのオーナー判定は実行済み
+            return None
         
         # オーナーチェック（Discord APIベース）
         if int(user_id) == community_guild.owner_id:
             logger.info(f"User {user_id} is server owner - granting premium access")
             return True
         
-        logger.info(f"Debug: Checking user {user_id} in guild {community_guild.name}")
-        
         member = community_guild.get_member(int(user_id))
         if not member:
-            logger.info(f"User {user_id} not found in cache, trying to fetch from API...")
+            logger.debug(f"User {user_id} not found in cache, trying to fetch from API...")
             try:
                 # キャッシュにない場合はAPIから直接取得を試す
                 member = await community_guild.fetch_member(int(user_id))
-                logger.info(f"Successfully fetched user {user_id} from API")
             except discord.NotFound:
-                logger.warning(f"User {user_id} not found in community server {community_guild.name}")
-                logger.info(f"Debug: Guild has {community_guild.member_count} members")
+                logger.info(f"User {user_id} not found in community server {community_guild.name}")
                 return False
             except discord.Forbidden:
                 logger.warning(f"Permission denied when fetching user {user_id} from community server")
-                logger.info(f"Debug: This may be due to insufficient bot permissions")
-                return False
+                return None
             except Exception as e:
                 logger.error(f"Error fetching user {user_id}: {e}")
-                return False
+                return None
         
-        logger.info(f"Debug: Found member {member.name}#{member.discriminator}")
-        logger.info(f"Debug: Member roles: {[f'{role.name}({role.id})' for role in member.roles]}")
+        logger.debug(f"Member roles: {[f'{role.name}({role.id})' for role in member.roles]}")
         
         # プレミアムロールの確認
-        premium_role_id = int(settings.get("premium_role_id"))
-        logger.info(f"Debug: Looking for premium role ID: {premium_role_id}")
-        
-        has_premium_role = any(role.id == premium_role_id for role in member.roles)
-        
+        has_premium_role = member_has_premium_role(member)
         logger.info(f"Premium check for user {user_id} ({member.name}): {has_premium_role}")
         return has_premium_role
         
     except Exception as e:
         logger.error(f"Error checking premium status for user {user_id}: {e}")
-        return False
+        return None
 
-def can_use_feature(user_data, is_premium):
-    """機能使用可能かチェックし、使用回数を更新"""
-    # 日本時間（JST）で現在の日付を取得
+def jst_today():
+    """日本時間（JST）で今日の日付を取得"""
     jst = timezone(timedelta(hours=9))
-    today = datetime.now(jst).strftime("%Y-%m-%d")
-    
+    return datetime.now(jst).strftime("%Y-%m-%d")
+
+def daily_limit_message():
+    """無料ユーザーが1日の上限に達した時のメッセージ"""
+    return f"😅 今日の分の利用回数を使い切っちゃいました！\n無料プランでは1日{FREE_USER_DAILY_LIMIT}回まで利用できます。明日また遊びに来てくださいね！✨\n\n💎 **もっと使いたい場合は有料プランがおすすめです！**\n🤖 このBotのプロフィールを見ると、プレミアム会員の詳細と登録方法が載ってるよ〜"
+
+def can_use_feature(user_id, is_premium):
+    """機能使用可能かチェックし、使用回数を更新（チェックと加算は1トランザクションで行う）"""
     # プレミアムユーザーは無制限（ただし使用回数はカウント）
-    if is_premium:
-        last_used_date = user_data.get("last_used_date", "")
-        daily_usage_count = user_data.get("daily_usage_count", 0)
-        
-        # 日付が変わった場合はカウントをリセット
-        if last_used_date != today:
-            user_data["last_used_date"] = today
-            user_data["daily_usage_count"] = 1
-        else:
-            # 同じ日の場合は使用回数を増加
-            user_data["daily_usage_count"] = daily_usage_count + 1
-        
-        return True, None
-    
-    # 無料ユーザーの制限チェック
-    last_used_date = user_data.get("last_used_date", "")
-    daily_usage_count = user_data.get("daily_usage_count", 0)
-    
-    # 日付が変わった場合はカウントをリセット
-    if last_used_date != today:
-        user_data["last_used_date"] = today
-        user_data["daily_usage_count"] = 1
+    limit = None if is_premium else FREE_USER_DAILY_LIMIT
+    allowed, _ = get_user_store().consume_quota(user_id, jst_today(), limit)
+    if allowed:
         return True, None
     
-    # 同じ日の場合は制限チェック
-    if daily_usage_count >= FREE_USER_DAILY_LIMIT:
-        return False, f"😅 今日の分の利用回数を使い切っちゃいました！\n無料プランでは1日{FREE_USER_DAILY_LIMIT}回まで利用できます。明日また遊びに来てくださいね！✨\n\n💎 **もっと使いたい場合は有料プランがおすすめです！**\n🤖 このBotのプロフィールを見ると、プレミアム会員の詳細と登録方法が載ってるよ〜"
-    
-    # 使用回数を増加
-    user_data["daily_usage_count"] = daily_usage_count + 1
-    return True, None
+    return False, daily_limit_message()
 
 # 褒めメッセージ画像生成機能は archived_features/heart_praise_feature/ に移動しました
 # def make_praise_image(praise_text):
@@ -848,71 +1030,114 @@ async def read_text_attachment(attachment):
             logger.warning(f"ファイルサイズが大きすぎます: {attachment.filename} ({attachment.size} bytes)")
             return None
         
-        # ファイルをダウンロードして内容を読み取り
-        async with aiohttp.ClientSession() as session:
-            async with session.get(attachment.url) as response:
-                if response.status == 200:
-                    content_bytes = await response.read()
-                    # UTF-8で読み取り、失敗したら他のエンコーディングを試す
+        # ファイルをダウンロードして内容を読み取り（共有セッションを使う）
+        async with http_client.session.get(attachment.url) as response:
+            if response.status == 200:
+                content_bytes = await response.read()
+                # UTF-8で読み取り、失敗したら他のエンコーディングを試す
+                try:
+                    content = content_bytes.decode('utf-8')
+                    logger.info(f"テキストファイル読み取り成功: {attachment.filename} ({len(content)}文字)")
+                    return content
+                except UnicodeDecodeError:
                     try:
-                        content = content_bytes.decode('utf-8')
-                        logger.info(f"テキストファイル読み取り成功: {attachment.filename} ({len(content)}文字)")
+                        content = content_bytes.decode('shift_jis')
+                        logger.info(f"テキストファイル読み取り成功(Shift-JIS): {attachment.filename} ({len(content)}文字)")
                         return content
                     except UnicodeDecodeError:
-                        try:
-                            content = content_bytes.decode('shift_jis')
-                            logger.info(f"テキストファイル読み取り成功(Shift-JIS): {attachment.filename} ({len(content)}文字)")
-                            return content
-                        except UnicodeDecodeError:
-                            logger.warning(f"テキストファイルのエンコーディングを判定できませんでした: {attachment.filename}")
-                            return None
-                else:
-                    logger.warning(f"ファイルダウンロードに失敗: {attachment.filename} (status: {response.status})")
-                    return None
-                    
+                        logger.warning(f"テキストファイルのエンコーディングを判定できませんでした: {attachment.filename}")
+                        return None
+            else:
+                logger.warning(f"ファイルダウンロードに失敗: {attachment.filename} (status: {response.status})")
+                return None
+                
     except Exception as e:
         logger.error(f"テキストファイル読み取りエラー: {attachment.filename}, {e}")
         return None
 
-def shorten_url(long_url):
-    """is.gdを使ってURLを短縮する"""
+async def download_attachment(attachment, file_path, chunk_size=1024 * 1024):
+    """
+    添付ファイルをチャンク単位でディスクに保存する（ファイル全体をメモリに載せない）
+
+    Returns:
+        ファイル内容のハッシュ（書き込みながら計算するので読み直さない）
+    """
+    hasher = TranscriptCache.new_hasher()
+    async with http_client.session.get(attachment.url) as response:
+        response.raise_for_status()
+        with open(file_path, 'wb') as f:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                f.write(chunk)
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+async def shorten_url(long_url):
+    """URLを短縮する（キャッシュ済みなら即座に返し、期限内に短縮できなければ元のURLを返す）"""
+    return await url_shortener.shorten(long_url)
+
+def x_post_link_value(url):
+    """X投稿リンクのフィールドの値（Embedの上限を超える場合は None）"""
+    value = f"[クリックして投稿]({url})"
+    return value if len(value) <= EMBED_FIELD_VALUE_LIMIT else None
+
+async def send_x_post(channel, summary):
+    """
+    X投稿用の要約を、投稿リンク付きのEmbedで送る
+
+    期限内に短縮できず元のURLがフィールドの上限を超える場合は、準備中と表示して先に送り、
+    裏で続けている短縮が終わったらリンクを差し込む
+    """
+    x_intent_url = f"https://twitter.com/intent/tweet?text={urllib.parse.quote(summary)}"
+    shortened_url = await shorten_url(x_intent_url)
+    
+    # 結果を送信（Discord制限に合わせて文字数制限）
+    # embed descriptionは4096文字制限、fieldは1024文字制限
+    display_summary = summary[:4000] + "..." if len(summary) > 4000 else summary
+    
+    embed = discord.Embed(
+        title="📝 X投稿用要約",
+        description=display_summary,
+        color=0x1DA1F2
+    )
+    link_value = x_post_link_value(shortened_url)
+    embed.add_field(
+        name="X投稿リンク👇",
+        value=link_value or "⏳ 投稿リンクを準備中です…",
+        inline=False
+    )
+    
+    # 完了メッセージと結果を送信
+    outbound.post(channel, "🎉 できたよ〜！Xに投稿する場合は下のリンクをクリックしてね！")
+    embed_message = await outbound.send(channel, embed=embed)
+    
+    if link_value is None:
+        task = asyncio.create_task(update_x_post_link(embed_message, embed, x_intent_url))
+        x_link_update_tasks.add(task)
+        task.add_done_callback(x_link_update_tasks.discard)
+    return embed_message
+
+async def update_x_post_link(embed_message, embed, x_intent_url):
+    """裏で続けている短縮の結果を待ち、準備中のフィールドを投稿リンク（失敗時は案内）に置き換える"""
     try:
-        logger.info(f"URL短縮開始 - 元のURL長: {len(long_url)}文字")
-        
-        # is.gd APIを使用（POSTでリクエスト）
-        api_url = "https://is.gd/create.php"
-        data = {
-            'format': 'simple',
-            'url': long_url
-        }
-        
-        response = requests.post(api_url, data=data, timeout=10)
-        logger.info(f"is.gd応答ステータス: {response.status_code}")
-        
-        if response.status_code == 200:
-            short_url = response.text.strip()
-            # エラーメッセージの場合は失敗扱い
-            if short_url.startswith('Error:') or not short_url.startswith('http'):
-                logger.warning(f"is.gd短縮失敗 - エラー: {short_url}")
-                return long_url  # 短縮失敗時は元のURLを返す
-            
-            logger.info(f"短縮成功: {short_url}")
-            return short_url
-        else:
-            logger.warning(f"is.gd短縮失敗 - ステータス: {response.status_code}")
-            return long_url  # 短縮失敗時は元のURLを返す
-    except requests.exceptions.Timeout:
-        logger.warning("URL短縮タイムアウト")
-        return long_url
-    except requests.exceptions.RequestException as e:
-        logger.error(f"URL短縮接続エラー: {e}")
-        return long_url
+        short_url = await url_shortener.wait_background(x_intent_url)
+    except Exception as e:
+        logger.warning(f"URL短縮の待機エラー: {e}")
+        short_url = None
+    link_value = x_post_link_value(short_url) if short_url else None
+    embed.set_field_at(
+        0,
+        name="X投稿リンク👇",
+        value=link_value or "⚠️ 投稿リンクを作成できませんでした。上の文章をコピーしてXに投稿してね！",
+        inline=False
+    )
+    try:
+        await outbound.edit(embed_message, embed=embed)
     except Exception as e:
-        logger.error(f"URL短縮予期しないエラー: {e}")
-        return long_url
+        logger.warning(f"X投稿リンクの更新エラー: {e}")
 
 async def transcribe_audio(message, channel, reaction_user):
     """音声ファイルを文字起こしする"""
+    progress = None
     try:
         
         # 音声・動画ファイルを検索
@@ -933,7 +1158,7 @@ async def transcribe_audio(message, channel, reaction_user):
                 break
         
         if not target_attachment:
-            await channel.send("⚠️ 音声・動画ファイルが見つかりません。対応形式: mp3, m4a, ogg, webm, wav, mp4")
+            outbound.post(channel, "⚠️ 音声・動画ファイルが見つかりません。対応形式: mp3, m4a, ogg, webm, wav, mp4")
             return
         
         # ファイルサイズチェック（音声：100MB、動画：500MB制限）
@@ -945,164 +1170,259 @@ async def transcribe_audio(message, channel, reaction_user):
             size_text = "100MB"
         
         if target_attachment.size > max_size:
-            await channel.send(f"❌ ファイルサイズが{size_text}を超えています。")
+            outbound.post(channel, f"❌ ファイルサイズが{size_text}を超えています。")
             return
         
         # メッセージリンクを作成
         message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
         
         if is_video:
-            await channel.send(f"{reaction_user.mention} 🎬 動画から音声を抽出して文字起こしを開始しますね‼️ 少々お待ちください\n📎 元メッセージ: {message_link}")
+            status_header = f"{reaction_user.mention} 🎬 動画から音声を抽出して文字起こしを開始しますね‼️ 少々お待ちください\n📎 元メッセージ: {message_link}"
         else:
-            await channel.send(f"{reaction_user.mention} 🎤 音声の文字起こしを開始しますね‼️ 少々お待ちください\n📎 元メッセージ: {message_link}")
+            status_header = f"{reaction_user.mention} 🎤 音声の文字起こしを開始しますね‼️ 少々お待ちください\n📎 元メッセージ: {message_link}"
+        
+        # 開始メッセージを進捗表示として編集していく
+        progress = ProgressStatus(
+            outbound, channel, status_header,
+            interval_sec=transcription_settings.get("progress_interval_sec", 3.0),
+            refresh_sec=transcription_settings.get("progress_refresh_sec", 10.0)
+        )
+        await progress.start(await outbound.send(channel, status_header))
+        progress.stage("📥 ファイルをダウンロード中")
         
         # 一時ディレクトリ作成
         with tempfile.TemporaryDirectory() as temp_dir:
             temp_path = Path(temp_dir)
             
-            # ファイルをダウンロード
+            # ファイルをダウンロード（メモリに載せずにディスクへ直接書き込む）
             file_extension = target_attachment.filename.split('.')[-1]
             original_file_path = temp_path / f"original.{file_extension}"
-            await target_attachment.save(original_file_path)
+            content_hash = await download_attachment(target_attachment, original_file_path)
             
             logger.info(f"ファイルダウンロード完了: {target_attachment.filename} ({target_attachment.size} bytes)")
             
-            # 動画の場合は音声を抽出
-            if is_video:
-                try:
-                    logger.info("動画から音声を抽出中...")
-                    video = AudioSegment.from_file(original_file_path)
-                    audio_file_path = temp_path / "extracted_audio.mp3"
-                    video.export(audio_file_path, format="mp3")
-                    logger.info("音声抽出完了")
-                except Exception as e:
-                    logger.error(f"音声抽出エラー: {e}")
-                    await channel.send("❌ 動画から音声の抽出に失敗しました。")
-                    return
-            else:
-                audio_file_path = original_file_path
-            
-            logger.info(f"処理対象ファイル: {audio_file_path}")
-            
-            # 音声ファイルを読み込み
-            try:
-                audio = AudioSegment.from_file(audio_file_path)
-            except Exception as e:
-                logger.error(f"音声ファイル読み込みエラー: {e}")
-                await channel.send("❌ 音声ファイルの読み込みに失敗しました。対応形式か確認してください。")
+            # 同じ内容のファイル（再リアクション・再投稿）は音声を変換せずにキャッシュの結果を使う
+            cached_transcript = transcript_cache.get(content_hash)
+            if cached_transcript is not None:
+                logger.info(f"文字起こし完了（キャッシュ）: {len(cached_transcript['text'])}文字")
+                await post_transcription_result(
+                    channel, target_attachment.filename, is_video, cached_transcript["text"],
+                    cached_transcript["audio_length_sec"], cached_transcript["split_count"], 0, progress
+                )
                 return
             
-            # 音声の長さを確認し、分割処理を決定
-            audio_length_ms = len(audio)
-            audio_length_sec = audio_length_ms / 1000
-            logger.info(f"音声長: {audio_length_sec:.2f}秒")
-            
-            # ファイルサイズに基づいて分割数を計算
-            # 25MB制限を考慮して安全に20MBを目標とする
-            target_size_mb = 20
-            
-            # 動画の場合は抽出されたMP3のサイズを使用、音声の場合は元ファイルサイズを使用
-            if is_video:
-                actual_size_mb = audio_file_path.stat().st_size / (1024 * 1024)
-                logger.info(f"動画から抽出されたMP3サイズ: {actual_size_mb:.1f}MB")
-            else:
-                actual_size_mb = target_attachment.size / (1024 * 1024)
-                logger.info(f"音声ファイルサイズ: {actual_size_mb:.1f}MB")
-            
-            time_based_split_count = max(1, int(audio_length_ms // (600 * 1000)))  # 10分基準
-            size_based_split_count = max(1, int(actual_size_mb / target_size_mb))  # 実際のサイズ基準
-            
-            # より大きい分割数を採用（安全のため）
-            split_count = max(time_based_split_count, size_based_split_count)
-            logger.info(f"時間基準: {time_based_split_count}分割, サイズ基準: {size_based_split_count}分割 → {split_count}分割で処理します")
-            
-            # 音声ファイルを分割
-            parts = []
-            part_duration = audio_length_ms // split_count
-            
-            for i in range(split_count):
-                start_time = i * part_duration
-                end_time = min((i + 1) * part_duration, audio_length_ms)
-                part_audio = audio[start_time:end_time]
-                part_file_path = temp_path / f"part_{i}.mp3"
-                part_audio.export(part_file_path, format="mp3")
-                
-                # 分割ファイルのサイズをチェック
-                part_size_mb = part_file_path.stat().st_size / (1024 * 1024)
-                parts.append(part_file_path)
-                logger.info(f"分割ファイル作成: part_{i}.mp3 ({start_time}ms～{end_time}ms, {part_size_mb:.1f}MB)")
-            
-            # Whisperで各分割ファイルを文字起こし
-            logger.info("Whisperによる文字起こし開始")
-            full_transcription = ""
-            
-            for idx, part_file_path in enumerate(parts):
-                logger.info(f"{idx+1}/{split_count}: {part_file_path.name} 文字起こし中...")
-                
-                try:
-                    with open(part_file_path, "rb") as audio_file:
-                        transcription = client_openai.audio.transcriptions.create(
-                            model="whisper-1",
-                            file=audio_file,
-                            language="ja"  # 日本語指定
-                        )
-                        full_transcription += transcription.text + "\n"
-                        logger.info(f"パート {idx+1} の文字起こし完了")
-                except Exception as api_error:
-                    logger.error(f"Whisper API エラー (パート {idx+1}): {api_error}")
-                    # タイムアウトエラーの場合は特別なメッセージ
-                    if "timeout" in str(api_error).lower() or "timed out" in str(api_error).lower():
-                        await channel.send(f"{reaction_user.mention} ⏰ 申し訳ありません！文字起こし処理がタイムアウトしました。\n音声ファイルが大きいか、OpenAI APIが混雑している可能性があります。\n🔄 少し時間をおいてもう一度試してみてください。")
-                    else:
-                        await channel.send(f"{reaction_user.mention} ❌ 文字起こし処理中にエラーが発生しました。\n🔄 もう一度試してみてください。")
-                    return
-            
-            logger.info(f"文字起こし完了: {len(full_transcription)}文字")
-            
-            # 文字起こし結果をテキストファイルとして保存
-            original_name = os.path.splitext(target_attachment.filename)[0]
-            transcript_filename = f"{original_name}_transcript.txt"
-            transcript_path = temp_path / transcript_filename
-            
-            with open(transcript_path, 'w', encoding='utf-8') as f:
-                if is_video:
-                    f.write(f"動画ファイル: {target_attachment.filename}\n")
-                else:
-                    f.write(f"音声ファイル: {target_attachment.filename}\n")
-                f.write(f"音声長: {audio_length_sec:.2f}秒\n")
-                f.write(f"処理日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("-" * 50 + "\n\n")
-                f.write(full_transcription)
-            
-            # 結果をDiscordに分割送信（1000文字ずつ）
-            await channel.send("🎉 文字起こしが完了したよ〜！")
-            await channel.send("-" * 30)
-            
-            if full_transcription.strip():
-                # 1000文字ずつに分割して送信
-                for chunk in [full_transcription[j:j+1000] for j in range(0, len(full_transcription), 1000)]:
-                    await channel.send(chunk)
-                    await asyncio.sleep(1)  # 連続送信を避けるためのウェイト
-            else:
-                await channel.send("⚠️ 文字起こし結果が空でした。")
-            
-            await channel.send("-" * 30)
-            file_message = await channel.send("📄 文字起こし結果のテキストファイルです！", file=discord.File(transcript_path))
-            
-            # 文字起こし結果ファイルに自動でリアクションを追加
-            reactions = ['👍', '❓', '✏️', '📝']  # ❤️褒めメッセージ機能は停止
-            for reaction in reactions:
-                try:
-                    await file_message.add_reaction(reaction)
-                    await asyncio.sleep(0.5)  # Discord API レート制限対策
-                except Exception as e:
-                    logger.warning(f"リアクション追加エラー ({reaction}): {e}")
-            
-            logger.info("文字起こし結果ファイルにリアクションを追加しました")
+            # 再起動しても続きから再開できるよう、元ファイルをジャーナルのジョブディレクトリに移す
+            job = transcription_journal.create(
+                channel_id=channel.id, guild_id=message.guild.id, message_id=message.id,
+                user_id=reaction_user.id, filename=target_attachment.filename,
+                is_video=is_video, content_hash=content_hash
+            )
+            shutil.move(str(original_file_path), str(job.source_path))
+        
+        await run_transcription_job(job, channel, reaction_user.mention, progress)
             
     except Exception as e:
         logger.error(f"音声文字起こしエラー: {e}")
-        await channel.send("❌ 文字起こし処理中にエラーが発生しました。")
+        if progress is not None:
+            await progress.complete("❌ 中断しました")
+        outbound.post(channel, "❌ 文字起こし処理中にエラーが発生しました。")
+
+async def run_transcription_job(job, channel, mention, progress):
+    """
+    ジャーナルのジョブを文字起こしして結果を投稿する（分割前なら分割から、分割済みなら未完了のパートから）
+
+    完了したパートはその都度ジャーナルに記録するので、途中で止まっても次回はそこから再開できる
+    進捗（段階・パート i/N・経過時間・残り時間）は progress のメッセージを編集して表示する
+    """
+    if not job.has_plan:
+        # ffmpegで16kHzモノラルの分割ファイルに変換（動画の場合は音声トラックのみ）
+        progress.stage("🎛️ 音声を変換・分割中")
+        try:
+            audio_parts = await audio_segmenter.split(job.source_path, job.parts_dir)
+        except AudioSegmenterError as e:
+            logger.error(f"音声分割エラー: {e}")
+            if job.is_video:
+                outbound.post(channel, "❌ 動画から音声の抽出に失敗しました。")
+            else:
+                outbound.post(channel, "❌ 音声ファイルの読み込みに失敗しました。対応形式か確認してください。")
+            await progress.complete("❌ 中断しました")
+            transcription_journal.finish(job)
+            return
+        job.set_plan(audio_parts)
+        
+        for part in audio_parts:
+            logger.info(f"分割ファイル作成: {part.path.name} ({part.start_sec:.1f}秒～{part.end_sec:.1f}秒, {part.size_bytes / (1024 * 1024):.1f}MB)")
+    
+    audio_length_sec = job.audio_length_sec
+    split_count = len(job.parts())
+    pending_parts = job.pending_parts()
+    logger.info(f"音声長: {audio_length_sec:.2f}秒 → {split_count}分割で処理します（未完了 {len(pending_parts)}パート）")
+    
+    async def record_part(result):
+        if result.ok:
+            job.record_part(result.index, result.text)
+        progress.part_done()
+    
+    # Whisperで未完了の分割ファイルを並列に文字起こし（結果は元の順番で結合）
+    progress.start_parts(split_count, done=split_count - len(pending_parts))
+    logger.info(f"Whisperによる文字起こし開始 (同時実行数 {whisper_transcriber.max_concurrency})")
+    new_results = await whisper_transcriber.transcribe_parts(pending_parts, on_part_done=record_part)
+    part_results = sorted(job.completed_results() + [r for r in new_results if not r.ok], key=lambda r: r.index)
+    failed_results = [r for r in part_results if not r.ok]
+    
+    if len(failed_results) == len(part_results):
+        # 全パート失敗の場合のみ処理を中断
+        if all(r.is_timeout for r in failed_results):
+            outbound.post(channel, f"{mention} ⏰ 申し訳ありません！文字起こし処理がタイムアウトしました。\n音声ファイルが大きいか、OpenAI APIが混雑している可能性があります。\n🔄 少し時間をおいてもう一度試してみてください。")
+        else:
+            outbound.post(channel, f"{mention} ❌ 文字起こし処理中にエラーが発生しました。\n🔄 もう一度試してみてください。")
+        await progress.complete("❌ 中断しました")
+        transcription_journal.finish(job)
+        return
+    
+    full_transcription = whisper_transcriber.join_results(part_results)
+    if failed_results:
+        logger.warning(f"文字起こし失敗パート: {[r.index + 1 for r in failed_results]}")
+    else:
+        # 全パート成功した結果だけをキャッシュする
+        transcript_cache.set(job.content_hash, full_transcription, audio_length_sec, split_count)
+    
+    logger.info(f"文字起こし完了: {len(full_transcription)}文字")
+    await post_transcription_result(channel, job.filename, job.is_video, full_transcription,
+                                    audio_length_sec, split_count, len(failed_results), progress)
+    transcription_journal.finish(job)
+
+class TranscriptPagerView(discord.ui.View):
+    """文字起こし結果のプレビューをページ送りするボタン"""
+    
+    def __init__(self, pages, timeout=3600):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.page = 0
+        self.message = None
+        self._sync_buttons()
+    
+    def render(self):
+        return f"📄 文字起こしプレビュー（{self.page + 1}/{len(self.pages)}ページ）\n{self.pages[self.page]}"
+    
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+    
+    async def _show(self, interaction: discord.Interaction, page):
+        self.page = max(0, min(page, len(self.pages) - 1))
+        self._sync_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+    
+    @discord.ui.button(label="◀ 前へ", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+    
+    @discord.ui.button(label="次へ ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+    
+    async def on_timeout(self):
+        # 期限切れ後はボタンを外す（押しても反応しないため）
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException as e:
+                logger.warning(f"プレビューのボタン削除エラー: {e}")
+
+async def post_transcription_result(channel, filename, is_video, full_transcription, audio_length_sec, split_count, failed_count, progress):
+    """文字起こし結果を、完了表示・ページ送りできるプレビュー1通・テキストファイルで投稿する"""
+    # 文字起こし結果をテキストファイルとして作成
+    original_name = os.path.splitext(filename)[0]
+    transcript_filename = f"{original_name}_transcript.txt"
+    
+    lines = []
+    if is_video:
+        lines.append(f"動画ファイル: {filename}\n")
+    else:
+        lines.append(f"音声ファイル: {filename}\n")
+    lines.append(f"音声長: {audio_length_sec:.2f}秒\n")
+    lines.append(f"処理日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    if failed_count:
+        lines.append(f"文字起こし失敗パート: {failed_count}/{split_count}\n")
+    lines.append("-" * 50 + "\n\n")
+    lines.append(full_transcription)
+    transcript_data = "".join(lines).encode('utf-8')
+    
+    # 進捗表示を完了表示に置き換える
+    completed_line = f"🎉 文字起こしが完了したよ〜！ 音声長 {format_timestamp(audio_length_sec)} / {split_count}パート"
+    if failed_count:
+        completed_line += f"\n⚠️ {split_count}パート中{failed_count}パートはリトライしても文字起こしできませんでした。該当箇所は本文中に明記しています。"
+    await progress.complete(completed_line)
+    
+    # 本文はページ送りできるプレビュー1通にまとめる（全文はテキストファイル）
+    if full_transcription.strip():
+        pages = split_text(full_transcription.strip(), TRANSCRIPT_PREVIEW_PAGE_CHARS)
+        if len(pages) > 1:
+            view = TranscriptPagerView(pages)
+            view.message = await outbound.send(channel, view.render(), view=view)
+        else:
+            outbound.post(channel, f"📄 文字起こしプレビュー\n{pages[0]}")
+    else:
+        outbound.post(channel, "⚠️ 文字起こし結果が空でした。")
+    
+    file_message = await outbound.send(channel, "📄 文字起こし結果のテキストファイルです！", file=discord.File(io.BytesIO(transcript_data), filename=transcript_filename))
+    
+    # 文字起こし結果ファイルに自動でリアクションを追加
+    reactions = ['👍', '❓', '✏️', '📝']  # ❤️褒めメッセージ機能は停止
+    await outbound.add_reactions(file_message, reactions)
+    
+    logger.info("文字起こし結果ファイルにリアクションを追加しました")
+
+async def resume_transcription_jobs():
+    """再起動前に終わらなかった文字起こしジョブを、元のチャンネルで未完了のパートから再開する"""
+    await bot.wait_until_ready()
+    for job in transcription_journal.unfinished():
+        if job.resume_count >= transcription_journal.max_resumes:
+            logger.warning(f"再開回数の上限に達したため文字起こしジョブを破棄: {job.job_id}")
+            transcription_journal.finish(job)
+            continue
+        
+        channel = bot.get_channel(job.channel_id)
+        if channel is None:
+            try:
+                channel = await bot.fetch_channel(job.channel_id)
+            except discord.HTTPException as e:
+                logger.warning(f"投稿先チャンネルを取得できないため文字起こしジョブを破棄: {job.job_id} ({e})")
+                transcription_journal.finish(job)
+                continue
+        
+        logger.info(f"文字起こしジョブを再開: {job.job_id} ({len(job.completed)}/{len(job.parts())}パート完了済み)")
+        try:
+            await job_queue.submit(Job(
+                JobType.TRANSCRIPTION,
+                lambda job=job, channel=channel: resume_transcription(job, channel),
+                description=f"(resume {job.job_id})"
+            ))
+        except QueueFullError:
+            logger.warning(f"キューが満杯のため文字起こしジョブの再開を次回の起動に回します: {job.job_id}")
+
+async def resume_transcription(job, channel):
+    """再開した文字起こしジョブを実行する"""
+    mention = f"<@{job.user_id}>"
+    job.mark_resumed()
+    progress = None
+    try:
+        total = len(job.parts())
+        done_text = f"（{len(job.completed)}/{total}パート完了済み）" if total else ""
+        status_header = f"{mention} 🔄 再起動前の文字起こし「{job.filename}」を続きから再開します{done_text}"
+        progress = ProgressStatus(
+            outbound, channel, status_header,
+            interval_sec=transcription_settings.get("progress_interval_sec", 3.0),
+            refresh_sec=transcription_settings.get("progress_refresh_sec", 10.0)
+        )
+        await progress.start(await outbound.send(channel, status_header))
+        await run_transcription_job(job, channel, mention, progress)
+    except Exception as e:
+        logger.error(f"文字起こし再開エラー: {e}")
+        if progress is not None:
+            await progress.complete("❌ 中断しました")
+        outbound.post(channel, "❌ 文字起こし処理中にエラーが発生しました。")
 
 @bot.event
 async def on_ready():
@@ -1526,6 +1846,7 @@ async def activate_command(interaction: discord.Interaction):
     if channel_id not in server_data['active_channel_ids']:
         server_data['active_channel_ids'].append(channel_id)
         save_server_data(server_id, server_data)
+        active_channel_index.set_active(server_id, channel_id, True)
         
         # 使い方ガイドメッセージを作成
         guide_message = (
@@ -1546,9 +1867,7 @@ async def activate_command(interaction: discord.Interaction):
         # 送信したメッセージを取得してリアクションを追加
         message = await interaction.original_response()
         reactions = ['👍', '❓', '✏️', '📝']  # ❤️褒めメッセージ機能は停止
-        for emoji in reactions:
-            await message.add_reaction(emoji)
-            await asyncio.sleep(0.5)  # リアクション追加の間隔を空ける
+        await outbound.add_reactions(message, reactions)
         
         # サンプル音声ファイルを送信
         sample_audio_path = script_dir / "audio" / "sample_voice.mp3"
@@ -1589,6 +1908,7 @@ async def deactivate_command(interaction: discord.Interaction):
     if channel_id in server_data['active_channel_ids']:
         server_data['active_channel_ids'].remove(channel_id)
         save_server_data(server_id, server_data)
+        active_channel_index.set_active(server_id, channel_id, False)
         await interaction.response.send_message(f"✅ このチャンネル（{interaction.channel.name}）でBotを無効化しました。")
     else:
         await interaction.response.send_message(f"ℹ️ このチャンネル（{interaction.channel.name}）は既に無効です。")
@@ -1631,20 +1951,9 @@ async def status_command(interaction: discord.Interaction):
 @bot.tree.command(name="stats", description="Bot統計情報を表示します")
 async def stats_command(interaction: discord.Interaction):
     """統計コマンド（オーナー専用）"""
-    # オーナー権限チェック
+    # オーナー権限チェック（起動時に読み込んだ owner_user_id と比較）
     user_id = str(interaction.user.id)
-    
-    # settings.jsonからowner_user_idを取得
-    settings_path = script_dir / "settings.json"
-    if settings_path.exists():
-        with open(settings_path, 'r', encoding='utf-8') as f:
-            settings = json.load(f)
-            owner_user_id = settings.get("owner_user_id")
-    else:
-        owner_user_id = None
-    
-    # オーナーかどうかチェック
-    if not owner_user_id or user_id != str(owner_user_id):
+    if not is_owner(user_id):
         await interaction.response.send_message("❌ このコマンドはオーナーのみ使用できます。", ephemeral=True)
         return
     
@@ -1666,29 +1975,64 @@ async def stats_command(interaction: discord.Interaction):
         embed.add_field(name="⚡ 今日のアクション数", value=f"{stats['total_actions_today']:,}", inline=True)
         embed.add_field(name="🕐 更新時刻", value=datetime.now().strftime("%H:%M:%S"), inline=True)
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        # リアクション事前フィルタの段階ごとの件数（起動後の累計）
+        filter_counts = reaction_prefilter.snapshot()
+        filter_text = "\n".join(
+            f"{REACTION_FILTER_LABELS.get(stage, stage)}: {count:,}" for stage, count in filter_counts.items()
+        )
+        embed.add_field(name="🚦 リアクション事前フィルタ（起動後）", value=filter_text, inline=False)
         
-    except Exception as e:
-        logger.error(f"統計コマンドエラー: {e}")
-        await interaction.response.send_message("❌ 統計取得中にエラーが発生しました。", ephemeral=True)
-
-@bot.tree.command(name="restart", description="Botを再起動します（オーナー専用）")
-async def restart_command(interaction: discord.Interaction):
+        # LLM応答キャッシュ（起動後の累計）
+        cache_stats = llm_cache.stats()
+        cache_text = (
+            f"ヒット率: {cache_stats['hit_rate']:.1%} "
+            f"({cache_stats['hits']:,}ヒット / {cache_stats['misses']:,}ミス)\n"
+            f"節約額（概算）: ${cache_stats['saved_usd']:.4f}\n"
+            f"ディスク使用量: {cache_stats['disk_bytes'] / (1024 * 1024):.1f}MB\n"
+            f"有効な機能: {', '.join(sorted(llm_cache.enabled_features)) or 'なし'}"
+        )
+        embed.add_field(name="🧠 LLMキャッシュ（起動後）", value=cache_text, inline=False)
+        
+        article_stats = article_extractor.cache_stats
+        article_text = (
+            f"ヒット: {article_stats['hits']:,} / 再検証: {article_stats['revalidated']:,} / "
+            f"取得: {article_stats['misses']:,}"
+        )
+        if extraction_pool is not None:
+            article_text += f"\n解析（別プロセス）: {extraction_pool.completed:,}件 / タイムアウト: {extraction_pool.timeouts:,}件"
+        embed.add_field(name="📰 記事キャッシュ（起動後）", value=article_text, inline=False)
+        
+        translation_stats = translation_service.stats
+        translation_text = (
+            f"キャッシュ: {translation_stats['cached_segments']:,}段落 / 翻訳: {translation_stats['translated_segments']:,}段落 / "
+            f"API呼び出し: {translation_stats['api_calls']:,}回"
+        )
+        embed.add_field(name="🌐 翻訳（起動後）", value=translation_text, inline=False)
+        embed.add_field(
+            name="🎤 文字起こしキャッシュ（起動後）",
+            value=f"ヒット: {transcript_cache.hits:,} / ミス: {transcript_cache.misses:,}",
+            inline=False
+        )
+        
+        outbound_stats = outbound.stats
+        outbound_text = (
+            f"送信: {outbound_stats['sent']:,}通（まとめた通知: {outbound_stats['coalesced']:,}件） / "
+            f"編集: {outbound_stats['edits']:,}回 / リアクション: {outbound_stats['reactions']:,}件 / レート制限待ち: {outbound_stats['waited_sec']:.1f}秒"
+        )
+        embed.add_field(name="📤 送信（起動後）", value=outbound_text, inline=False)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+    except Exception as e:
+        logger.error(f"統計コマンドエラー: {e}")
+        await interaction.response.send_message("❌ 統計取得中にエラーが発生しました。", ephemeral=True)
+
+@bot.tree.command(name="restart", description="Botを再起動します（オーナー専用）")
+async def restart_command(interaction: discord.Interaction):
     """Botリスタートコマンド（オーナー専用）"""
-    # オーナー権限チェック
+    # オーナー権限チェック（起動時に読み込んだ owner_user_id と比較）
     user_id = str(interaction.user.id)
-    
-    # settings.jsonからowner_user_idを取得
-    settings_path = script_dir / "settings.json"
-    if settings_path.exists():
-        with open(settings_path, 'r', encoding='utf-8') as f:
-            settings = json.load(f)
-            owner_user_id = settings.get("owner_user_id")
-    else:
-        owner_user_id = None
-    
-    # オーナーかどうかチェック
-    if not owner_user_id or user_id != str(owner_user_id):
+    if not is_owner(user_id):
         await interaction.response.send_message("❌ このコマンドはオーナーのみ使用できます。", ephemeral=True)
         return
     
@@ -1706,1165 +2050,1152 @@ async def restart_command(interaction: discord.Interaction):
         logger.error(f"再起動コマンドエラー: {e}")
         await interaction.followup.send("❌ 再起動中にエラーが発生しました。", ephemeral=True)
 
+# リアクション絵文字とジョブ種別の対応
+REACTION_JOB_TYPES = {
+    '👍': JobType.X_POST,
+    '🎤': JobType.TRANSCRIPTION,
+    '❓': JobType.EXPLAIN,
+    '✏️': JobType.MEMO,
+    '📝': JobType.ARTICLE,
+    '🌐': JobType.URL_FETCH,
+    '🙌': JobType.SUMMARY,
+    '👀': JobType.THREAD,  # 👀ツリー投稿機能追加
+}
+
+# リアクションの事前フィルタ（安い順に並べ、Discord APIやディスクI/Oの前に処理しないイベントを弾く）
+duplicate_reaction_filter = DuplicateEventFilter(ttl_sec=30)
+
+def _is_not_own_reaction(payload):
+    return payload.user_id != bot.user.id
+
+def _is_feature_emoji(payload):
+    return payload.emoji.name in REACTION_JOB_TYPES
+
+def _is_in_active_channel(payload):
+    return is_channel_active(str(payload.guild_id), str(payload.channel_id))
+
+def _reaction_event_key(payload):
+    return (payload.message_id, payload.user_id, payload.emoji.name)
+
+def _is_first_delivery(payload):
+    # Gateway再接続時の再送や連打で同じリアクションを二重に処理しない
+    return duplicate_reaction_filter.check_and_mark(_reaction_event_key(payload))
+
+def _is_within_quota(payload):
+    # キャッシュ済みの利用回数で判定し、無料枠を使い切っている時だけプレミアム判定を行う
+    # プレミアム判定はキャッシュのみを見て、未判定なら通す（REST呼び出しを伴う正式な判定と
+    # 利用回数の消費は process_reaction の is_premium_user / can_use_feature で行う）
+    if get_user_store().peek_quota(payload.user_id, jst_today()) < FREE_USER_DAILY_LIMIT:
+        return True
+    if is_owner(payload.user_id):
+        return True
+    cached = premium_cache.get(str(payload.user_id))
+    return cached is None or cached
+
+reaction_prefilter = ReactionPreFilter()
+reaction_prefilter.add_stage("own_reaction", _is_not_own_reaction)
+reaction_prefilter.add_stage("emoji", _is_feature_emoji)
+reaction_prefilter.add_stage("channel", _is_in_active_channel)
+reaction_prefilter.add_stage("duplicate", _is_first_delivery)
+reaction_prefilter.add_stage("quota", _is_within_quota)
+
+# /stats に表示する段階名
+REACTION_FILTER_LABELS = {
+    "own_reaction": "Bot自身",
+    "emoji": "対象外の絵文字",
+    "channel": "無効チャンネル",
+    "duplicate": "重複イベント",
+    "quota": "利用上限",
+    "accepted": "受付",
+}
+
 @bot.event
 async def on_raw_reaction_add(payload):
-    """リアクション追加時の処理"""
-    # Botのリアクションは無視
-    if payload.user_id == bot.user.id:
+    """リアクション追加時の処理（事前フィルタを通ったものをジョブキューに積むだけで、機能の実行はワーカーが行う）"""
+    rejected_stage = await reaction_prefilter.check(payload)
+    if rejected_stage == "quota":
+        channel = bot.get_channel(payload.channel_id)
+        if channel:
+            outbound.post(channel, f"<@{payload.user_id}> {daily_limit_message()}")
+        return
+    if rejected_stage:
         return
     
-    # リアクションの種類をチェック
-    if payload.emoji.name in ['👍', '🎤', '❓', '✏️', '📝', '🌐', '🙌', '👀']:  # 👀ツリー投稿機能追加
-        server_id = str(payload.guild_id)
-        channel_id = str(payload.channel_id)
-        
-        # チャンネルが有効かチェック
-        if is_channel_active(server_id, channel_id):
-            # チャンネルとメッセージを取得
-            channel = bot.get_channel(payload.channel_id)
-            message = await channel.fetch_message(payload.message_id)
-            user = await bot.fetch_user(payload.user_id)
-            
-            # 統計記録（ユーザーアクティビティ）
-            await stats_manager.record_user_activity(str(payload.user_id), bot)
-            
-            logger.info(f"{payload.emoji.name} リアクションを検知しました！")
-            logger.info(f"サーバー: {message.guild.name}")
-            logger.info(f"チャンネル: {channel.name}")
-            logger.info(f"ユーザー: {user.name if user else '不明'}")
-            logger.info(f"メッセージ: {message.content if message.content else '(空のメッセージ)'}")
-            logger.info("-" * 50)
-            
-            # 共通ユーザーデータ処理
-            user_data = load_user_data(user.id)
-            if user_data is None:
-                # 新規ユーザー
-                user_data = {
-                    "user_id": str(user.id),
-                    "username": user.name,
-                    "custom_prompt_x_post": "",
-                    "custom_prompt_article": "",
-                    "custom_prompt_memo": "",
-                    "custom_prompt_summary": "",
-                    "status": "free",
-                    "last_used_date": "",
-                    "daily_usage_count": 0
-                }
-                save_user_data(user.id, user_data)
-                logger.info(f"新規ユーザー {user.name} ({user.id}) のデータを作成しました")
+    job_type = REACTION_JOB_TYPES[payload.emoji.name]
+    channel = bot.get_channel(payload.channel_id)
+    job = Job(job_type, lambda: process_reaction(payload), description=f"(message {payload.message_id})")
+    try:
+        position = await job_queue.submit(job)
+    except QueueFullError as e:
+        logger.warning(f"ジョブキュー満杯のためリアクションを拒否: {e}")
+        # 受け付けなかったので、やり直しのリアクションを重複として弾かないよう記録を取り消す
+        duplicate_reaction_filter.unmark(_reaction_event_key(payload))
+        if channel:
+            outbound.post(channel, f"<@{payload.user_id}> 🙏 いま処理が混み合っていて受け付けられませんでした…少し時間をおいてもう一度リアクションしてね")
+        return
+    
+    # 混雑時は順番待ちの位置を知らせる
+    if position > 0 and channel:
+        outbound.post(channel, f"<@{payload.user_id}> ⏳ いま混み合っているので順番待ちです（{position}番目）。順番が来たら自動で処理するね！")
+
+async def process_reaction(payload):
+    """リアクションに対応する機能を実行（ジョブキューのワーカーから呼ばれる）"""
+    channel = bot.get_channel(payload.channel_id)
+    # ユーザーはイベントに含まれるメンバー情報かキャッシュから取得し、どちらにもない時だけAPIを呼ぶ
+    user = payload.member or bot.get_user(payload.user_id) or await bot.fetch_user(payload.user_id)
+    
+    # 共通ユーザーデータ処理
+    user_data = load_user_data(user.id)
+    if user_data is None:
+        # 新規ユーザー
+        user_data = {
+            "user_id": str(user.id),
+            "username": user.name,
+            "custom_prompt_x_post": "",
+            "custom_prompt_article": "",
+            "custom_prompt_memo": "",
+            "custom_prompt_summary": "",
+            "status": "free",
+            "last_used_date": "",
+            "daily_usage_count": 0
+        }
+        user_data_changed = True
+        logger.info(f"新規ユーザー {user.name} ({user.id}) のデータを作成しました")
+    else:
+        # 既存ユーザーのマイグレーション
+        user_data, user_data_changed = migrate_user_data(user_data, user.id, user.name)
+        if user_data_changed:
+            logger.info(f"ユーザー {user.name} ({user.id}) のデータをマイグレーションしました")
+    
+    # プレミアム状態確認
+    is_premium = await is_premium_user(user.id)
+    
+    # ユーザー情報とstatusを更新（変更があった時だけ保存する）
+    profile = {
+        "user_id": str(user.id),
+        "username": user.name,
+        "status": "premium" if is_premium else "free"
+    }
+    if any(user_data.get(key) != value for key, value in profile.items()):
+        user_data.update(profile)
+        user_data_changed = True
+    if user_data_changed:
+        save_user_data(user.id, user_data)
+    
+    # 使用制限チェック（使用回数の更新も同時に行う）
+    can_use, limit_message = can_use_feature(user.id, is_premium)
+    if not can_use:
+        outbound.post(channel, f"{user.mention} {limit_message}")
+        return
+    
+    # 機能を実行すると決まってからメッセージを取得する
+    message = await channel.fetch_message(payload.message_id)
+    
+    # 統計記録（ユーザーアクティビティ）
+    await stats_manager.record_user_activity(str(payload.user_id), bot)
+    
+    logger.info(f"{payload.emoji.name} リアクションを検知しました！")
+    logger.info(f"サーバー: {message.guild.name}")
+    logger.info(f"チャンネル: {channel.name}")
+    logger.info(f"ユーザー: {user.name if user else '不明'}")
+    logger.info(f"メッセージ: {message.content if message.content else '(空のメッセージ)'}")
+    logger.info("-" * 50)
+    
+    # 👍 サムズアップ：X投稿要約
+    if payload.emoji.name == '👍':
+        # メッセージ内容または添付ファイル、Embedからテキストを取得
+        input_text = message.content
+        
+        # Embedがある場合は内容を抽出
+        embed_content = extract_embed_content(message)
+        if embed_content:
+            if input_text:
+                input_text += f"\n\n【Embed内容】\n{embed_content}"
             else:
-                # 既存ユーザーのマイグレーション
-                user_data, migration_needed = migrate_user_data(user_data, user.id, user.name)
-                if migration_needed:
-                    save_user_data(user.id, user_data)
-                    logger.info(f"ユーザー {user.name} ({user.id}) のデータをマイグレーションしました")
-            
-            # プレミアム状態確認
-            is_premium = await is_premium_user(user.id)
-            
-            # ユーザー情報とstatusを更新
-            user_data["user_id"] = str(user.id)
-            user_data["username"] = user.name
-            user_data["status"] = "premium" if is_premium else "free"
-            
-            # 使用制限チェック
-            can_use, limit_message = can_use_feature(user_data, is_premium)
-            if not can_use:
-                await channel.send(f"{user.mention} {limit_message}")
-                return
+                input_text = embed_content
+            logger.info("Embed内容を追加")
+        
+        # 添付ファイルがある場合、テキストファイルの内容を読み取り
+        if message.attachments:
+            for attachment in message.attachments:
+                file_content = await read_text_attachment(attachment)
+                if file_content:
+                    if input_text:
+                        input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
+                    else:
+                        input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
+                    logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
+        
+        if input_text:
+            # URL検出・警告
+            await check_content_for_urls(input_text, user, channel)
             
-            # 使用回数更新
-            save_user_data(user.id, user_data)
+            # モデルを選択
+            model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
             
+            # 処理開始メッセージを送信
+            message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
+            outbound.post(channel, f"{user.mention} X用の投稿を作ってあげるね〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
             
-            # 👍 サムズアップ：X投稿要約
-            if payload.emoji.name == '👍':
-                # メッセージ内容または添付ファイル、Embedからテキストを取得
-                input_text = message.content
-                
-                # Embedがある場合は内容を抽出
-                embed_content = extract_embed_content(message)
-                if embed_content:
-                    if input_text:
-                        input_text += f"\n\n【Embed内容】\n{embed_content}"
-                    else:
-                        input_text = embed_content
-                    logger.info("Embed内容を追加")
-                
-                # 添付ファイルがある場合、テキストファイルの内容を読み取り
-                if message.attachments:
-                    for attachment in message.attachments:
-                        file_content = await read_text_attachment(attachment)
-                        if file_content:
-                            if input_text:
-                                input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
-                            else:
-                                input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
-                            logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
-                
-                if input_text:
-                    # URL検出・警告
-                    await check_content_for_urls(input_text, user, channel)
+            # X投稿用プロンプト（カスタムプロンプトを優先。JSON出力指示と文字数制限は付加済み）
+            custom_prompt = user_data.get('custom_prompt_x_post') if user_data else None
+            if custom_prompt:
+                logger.info(f"ユーザー {user.name} のカスタムプロンプトを使用")
+            x_prompt = prompt_registry.get("x_post", custom=custom_prompt)
+            
+            # OpenAI APIで要約を生成
+            if client_openai:
+                try:
+                    response_content = await llm_cache.complete(
+                        client_openai,
+                        JobType.X_POST,
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": x_prompt},
+                            {"role": "user", "content": input_text}
+                        ],
+                        max_tokens=1000,
+                        temperature=0.9,
+                        response_format={"type": "json_object"}
+                    )
                     
-                    # モデルを選択
-                    model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+                    # JSONレスポンスをパース
+                    try:
+                        response_json = json.loads(response_content)
+                        summary = response_json.get("content", response_content)
+                    except json.JSONDecodeError:
+                        logger.warning(f"JSON解析エラー、生のレスポンスを使用: {response_content}")
+                        summary = response_content
                     
-                    # 処理開始メッセージを送信
-                    message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
-                    await channel.send(f"{user.mention} X用の投稿を作ってあげるね〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+                    # X投稿用のリンク付きで結果を送信
+                    await send_x_post(channel, summary)
                     
-                    # X投稿用プロンプトを読み込み（カスタムプロンプトを優先）
-                    x_prompt = None
+                except Exception as e:
+                    logger.error(f"OpenAI API エラー: {e}")
+                    outbound.post(channel, f"{user.mention} ❌ 要約の生成中にエラーが発生しました。")
+            else:
+                logger.error("エラー: OpenAI APIキーが設定されていません")
+                outbound.post(channel, f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ **X投稿を作成するためにはテキストが必要です**\n\n"
+                             f"以下のいずれかを行ってから👍リアクションしてください：\n"
+                             f"• テキストメッセージを投稿する\n"
+                             f"• テキストファイル（.txt）を添付する\n"
+                             f"• 音声ファイルの場合は🎤で文字起こしをしてからそのファイルに👍する\n\n"
+                             f"音声ファイルのみでは直接X投稿は作成できません。")
+    
+    # 🎤 マイク：音声・動画文字起こし
+    elif payload.emoji.name == '🎤':
+        # 音声・動画ファイルがあるかチェック
+        if message.attachments:
+            await transcribe_audio(message, channel, user)
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ **🎤は音声・動画の文字起こし専用です**\n\n"
+                             f"音声ファイル（mp3、wav、m4a等）または動画ファイル（mp4、mov等）が添付されたメッセージにリアクションしてください。\n\n"
+                             f"テキストのみのメッセージには🎤ではなく、以下のリアクションをお使いください：\n"
+                             f"• 👍 X投稿作成\n"
+                             f"• ❓ AI解説\n"
+                             f"• ✏️ 記事作成")
+    
+    # ❤️ ハート機能：削除済み（archived_features/heart_praise_feature/ に移行済み）
+    
+    # ❓ 疑問符：AI説明
+    elif payload.emoji.name == '❓':
+        # メッセージ内容または添付ファイル、Embedからテキストを取得
+        input_text = message.content
+        
+        # Embedがある場合は内容を抽出
+        embed_content = extract_embed_content(message)
+        if embed_content:
+            if input_text:
+                input_text += f"\n\n【Embed内容】\n{embed_content}"
+            else:
+                input_text = embed_content
+            logger.info("Embed内容を追加")
+        
+        # 添付ファイルがある場合、テキストファイルの内容を読み取り
+        if message.attachments:
+            for attachment in message.attachments:
+                file_content = await read_text_attachment(attachment)
+                if file_content:
+                    if input_text:
+                        input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
+                    else:
+                        input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
+                    logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
+        
+        if input_text:
+            # URL検出・警告
+            await check_content_for_urls(input_text, user, channel)
+            
+            # モデルを選択
+            model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+            
+            # 処理開始メッセージを送信
+            message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
+            outbound.post(channel, f"{user.mention} 🤔 投稿内容について詳しく解説するね〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+            
+            # 解説用プロンプト
+            explain_prompt = prompt_registry.get("explain")
+            
+            # OpenAI APIで解説を生成
+            if client_openai:
+                preview = None
+                try:
+                    explanation, preview = await generate_with_preview(
+                        JobType.EXPLAIN,
+                        channel,
+                        "💡 解説を書いているよ〜",
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": explain_prompt},
+                            {"role": "user", "content": input_text}
+                        ],
+                        max_tokens=2000,
+                        temperature=0.7
+                    )
                     
-                    # 1. ユーザーのカスタムプロンプトをチェック
-                    if user_data and user_data.get('custom_prompt_x_post'):
-                        x_prompt = user_data['custom_prompt_x_post']
-                        logger.info(f"ユーザー {user.name} のカスタムプロンプトを使用")
+                    # Discord文字数制限対応（2000文字以内に調整）
+                    if len(explanation) > 1900:
+                        explanation = explanation[:1900] + "..."
                     
-                    # 2. カスタムプロンプトがない場合はデフォルトプロンプトファイルを使用
-                    if not x_prompt:
-                        prompt_path = script_dir / "prompt" / "x_post.txt"
-                        if prompt_path.exists():
-                            with open(prompt_path, 'r', encoding='utf-8') as f:
-                                x_prompt = f.read()
-                            logger.info("デフォルトプロンプトファイルを使用")
-                        else:
-                            x_prompt = "あなたはDiscordの投稿をX（旧Twitter）用に要約するアシスタントです。140文字以内で簡潔に要約してください。"
-                            logger.info("フォールバックプロンプトを使用")
+                    # 結果を送信
+                    embed = discord.Embed(
+                        title="🤔 AI解説",
+                        description=explanation,
+                        color=0xFF6B35
+                    )
                     
-                    # プロンプトにJSON出力指示と文字数制限を追加
-                    x_prompt += "\n\n出力は以下のJSON形式で返してください：\n{\"content\": \"X投稿用のテキスト\"}\n\n重要な文字数制限：\n- プロンプトで300文字以下の文字数指定がある場合はその文字数に従ってください\n- プロンプトで300文字を超える文字数指定がある場合や指定がない場合は、必ず300文字以内で出力してください\n- 絶対に300文字を超えないでください"
+                    # 元の投稿内容も表示（短縮版）
+                    original_content = message.content[:200] + "..." if len(message.content) > 200 else message.content
+                    embed.add_field(
+                        name="📝 元の投稿",
+                        value=original_content,
+                        inline=False
+                    )
                     
-                    # OpenAI APIで要約を生成
-                    if client_openai:
-                        try:
-                            response = client_openai.chat.completions.create(
-                                model=model,
-                                messages=[
-                                    {"role": "system", "content": x_prompt},
-                                    {"role": "user", "content": input_text}
-                                ],
-                                max_tokens=1000,
-                                temperature=0.9,
-                                response_format={"type": "json_object"}
-                            )
-                            
-                            # JSONレスポンスをパース
-                            response_content = response.choices[0].message.content
-                            try:
-                                response_json = json.loads(response_content)
-                                summary = response_json.get("content", response_content)
-                            except json.JSONDecodeError:
-                                logger.warning(f"JSON解析エラー、生のレスポンスを使用: {response_content}")
-                                summary = response_content
-                            
-                            # X投稿用のURLを生成
-                            import urllib.parse
-                            x_intent_url = f"https://twitter.com/intent/tweet?text={urllib.parse.quote(summary)}"
-                            
-                            # URLを短縮
-                            shortened_url = shorten_url(x_intent_url)
-                            
-                            # 結果を送信（Discord制限に合わせて文字数制限）
-                            # embed descriptionは4096文字制限、fieldは1024文字制限
-                            display_summary = summary[:4000] + "..." if len(summary) > 4000 else summary
-                            
-                            embed = discord.Embed(
-                                title="📝 X投稿用要約",
-                                description=display_summary,
-                                color=0x1DA1F2
-                            )
-                            
-                            embed.add_field(
-                                name="X投稿リンク👇",
-                                value=f"[クリックして投稿]({shortened_url})",
-                                inline=False
-                            )
-                            
-                            # 完了メッセージと結果を送信
-                            await channel.send("🎉 できたよ〜！Xに投稿する場合は下のリンクをクリックしてね！")
-                            await channel.send(embed=embed)
-                            
-                        except Exception as e:
-                            logger.error(f"OpenAI API エラー: {e}")
-                            await channel.send(f"{user.mention} ❌ 要約の生成中にエラーが発生しました。")
+                    if preview:
+                        # 生成中のプレビューを完成した解説に置き換える
+                        await preview.finish(content="💡 解説が完了したよ〜！", embed=embed)
                     else:
-                        logger.error("エラー: OpenAI APIキーが設定されていません")
-                        await channel.send(f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
-                else:
-                    await channel.send(f"{user.mention} ⚠️ **X投稿を作成するためにはテキストが必要です**\n\n"
-                                     f"以下のいずれかを行ってから👍リアクションしてください：\n"
-                                     f"• テキストメッセージを投稿する\n"
-                                     f"• テキストファイル（.txt）を添付する\n"
-                                     f"• 音声ファイルの場合は🎤で文字起こしをしてからそのファイルに👍する\n\n"
-                                     f"音声ファイルのみでは直接X投稿は作成できません。")
-            
-            # 🎤 マイク：音声・動画文字起こし
-            elif payload.emoji.name == '🎤':
-                # 音声・動画ファイルがあるかチェック
-                if message.attachments:
-                    await transcribe_audio(message, channel, user)
-                else:
-                    await channel.send(f"{user.mention} ⚠️ **🎤は音声・動画の文字起こし専用です**\n\n"
-                                     f"音声ファイル（mp3、wav、m4a等）または動画ファイル（mp4、mov等）が添付されたメッセージにリアクションしてください。\n\n"
-                                     f"テキストのみのメッセージには🎤ではなく、以下のリアクションをお使いください：\n"
-                                     f"• 👍 X投稿作成\n"
-                                     f"• ❓ AI解説\n"
-                                     f"• ✏️ 記事作成")
-            
-            # ❤️ ハート機能：削除済み（archived_features/heart_praise_feature/ に移行済み）
-            
-            # ❓ 疑問符：AI説明
-            elif payload.emoji.name == '❓':
-                # メッセージ内容または添付ファイル、Embedからテキストを取得
-                input_text = message.content
-                
-                # Embedがある場合は内容を抽出
-                embed_content = extract_embed_content(message)
-                if embed_content:
+                        outbound.post(channel, "💡 解説が完了したよ〜！")
+                        await outbound.send(channel, embed=embed)
+                    
+                except Exception as e:
+                    if preview:
+                        await preview.discard()
+                    logger.error(f"OpenAI API エラー (解説機能): {e}")
+                    outbound.post(channel, f"{user.mention} ❌ 解説の生成中にエラーが発生しました。")
+            else:
+                logger.error("エラー: OpenAI APIキーが設定されていません")
+                outbound.post(channel, f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ メッセージに内容がありません。")
+    
+    # ✏️ 鉛筆：Obsidianメモ作成
+    elif payload.emoji.name == '✏️':
+        # メッセージ内容または添付ファイル、Embedからテキストを取得
+        input_text = message.content
+        
+        # Embedがある場合は内容を抽出
+        embed_content = extract_embed_content(message)
+        if embed_content:
+            if input_text:
+                input_text += f"\n\n【Embed内容】\n{embed_content}"
+            else:
+                input_text = embed_content
+            logger.info("Embed内容を追加")
+        
+        # 添付ファイルがある場合、テキストファイルの内容を読み取り
+        if message.attachments:
+            for attachment in message.attachments:
+                file_content = await read_text_attachment(attachment)
+                if file_content:
                     if input_text:
-                        input_text += f"\n\n【Embed内容】\n{embed_content}"
+                        input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
                     else:
-                        input_text = embed_content
-                    logger.info("Embed内容を追加")
-                
-                # 添付ファイルがある場合、テキストファイルの内容を読み取り
-                if message.attachments:
-                    for attachment in message.attachments:
-                        file_content = await read_text_attachment(attachment)
-                        if file_content:
-                            if input_text:
-                                input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
-                            else:
-                                input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
-                            logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
-                
-                if input_text:
-                    # URL検出・警告
-                    await check_content_for_urls(input_text, user, channel)
+                        input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
+                    logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
+        
+        if input_text:
+            # URL検出・警告
+            await check_content_for_urls(input_text, user, channel)
+            
+            # 処理開始メッセージ
+            message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
+            outbound.post(channel, f"{user.mention} 📝 メモを作るよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+            
+            # モデルを選択
+            model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+            
+            # メモ用プロンプト（カスタムプロンプトを優先。JSON出力指示はカスタムプロンプトにも付加）
+            custom_prompt = user_data.get('custom_prompt_memo') if user_data else None
+            if custom_prompt:
+                logger.info(f"ユーザー {user.name} のメモ用カスタムプロンプトを使用")
+            memo_prompt = prompt_registry.get("memo", custom=custom_prompt)
+            
+            # OpenAI APIでメモを生成（JSONモード）
+            if client_openai:
+                try:
+                    response_content = await llm_cache.complete(
+                        client_openai,
+                        JobType.MEMO,
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": memo_prompt},
+                            {"role": "user", "content": input_text}
+                        ],
+                        max_tokens=2000,
+                        temperature=0.3,
+                        response_format={"type": "json_object"}
+                    )
                     
-                    # モデルを選択
-                    model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+                    # JSONレスポンスをパース
+                    try:
+                        memo_json = json.loads(response_content)
+                        english_title = memo_json.get("english_title", "untitled_memo")
+                        content = memo_json.get("content", input_text)
+                    except json.JSONDecodeError:
+                        logger.warning(f"JSON解析エラー、フォールバックを使用: {response_content}")
+                        english_title = "untitled_memo"
+                        content = input_text
                     
-                    # 処理開始メッセージを送信
-                    message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
-                    await channel.send(f"{user.mention} 🤔 投稿内容について詳しく解説するね〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+                    # ファイル名を生成（YYYYMMDD_HHMMSS_english_title.md）
+                    now = datetime.now()
+                    timestamp = now.strftime("%Y%m%d_%H%M%S")
+                    # 英語タイトルを安全なファイル名に変換
+                    safe_english_title = re.sub(r'[^A-Za-z0-9\-_]', '', english_title)
+                    if not safe_english_title:
+                        safe_english_title = "memo"
+                    filename = f"{timestamp}_{safe_english_title}.md"
                     
-                    # 解説用プロンプトを読み込み
-                    explain_prompt = None
-                    prompt_path = script_dir / "prompt" / "question_explain.txt"
-                    if prompt_path.exists():
-                        with open(prompt_path, 'r', encoding='utf-8') as f:
-                            explain_prompt = f.read()
-                        logger.info("解説プロンプトファイルを使用")
-                    else:
-                        explain_prompt = "あなたはDiscordメッセージの内容について詳しく解説するアシスタントです。投稿内容をわかりやすく、丁寧に解説してください。専門用語があれば説明し、背景情報も補足してください。"
-                        logger.info("フォールバック解説プロンプトを使用")
+                    # attachmentsフォルダにファイルを保存
+                    attachments_dir = script_dir / "attachments"
+                    attachments_dir.mkdir(exist_ok=True)
+                    file_path = attachments_dir / filename
                     
-                    # OpenAI APIで解説を生成
-                    if client_openai:
+                    # ファイル内容：コンテンツをそのまま保存
+                    file_content = content
+                    
+                    # UTF-8でファイル保存
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        f.write(file_content)
+                    
+                    logger.info(f"メモファイル作成: {file_path}")
+                    
+                    try:
+                        # 結果を送信
+                        embed = discord.Embed(
+                            title="📝 Obsidianメモを作成しました",
+                            description=f"**ファイル名**: `{filename}`",
+                            color=0x7C3AED
+                        )
+                        
+                        # 内容のプレビュー（最初の200文字）
+                        preview = content[:200] + "..." if len(content) > 200 else content
+                        embed.add_field(
+                            name="📄 内容プレビュー",
+                            value=preview,
+                            inline=False
+                        )
+                        
+                        await outbound.send(channel, embed=embed)
+                        
+                        # ファイルをアップロード
+                        with open(file_path, 'rb') as f:
+                            file_data = f.read()
+                        
+                        file_obj = io.BytesIO(file_data)
+                        file_message = await outbound.send(channel, "📝 メモファイルを作成しました！", file=discord.File(file_obj, filename=filename))
+                        
+                        # メモファイルに自動でリアクションを追加
+                        reactions = ['👍', '❓', '✏️', '📝']  # ❤️褒めメッセージ機能は停止
+                        await outbound.add_reactions(file_message, reactions)
+                        
+                        logger.info("メモファイルにリアクションを追加しました")
+                        
+                        # Discord投稿後、attachmentsフォルダの中身を削除
+                        for attachment_file in attachments_dir.iterdir():
+                            if attachment_file.is_file():
+                                attachment_file.unlink()
+                                logger.info(f"添付ファイル削除: {attachment_file}")
+                        
+                    except Exception as upload_error:
+                        logger.error(f"ファイル投稿エラー: {upload_error}")
+                        # エラーが発生してもファイルは削除する
                         try:
-                            response = client_openai.chat.completions.create(
-                                model=model,
-                                messages=[
-                                    {"role": "system", "content": explain_prompt},
-                                    {"role": "user", "content": input_text}
-                                ],
-                                max_tokens=2000,
-                                temperature=0.7
-                            )
-                            
-                            explanation = response.choices[0].message.content
-                            
-                            # Discord文字数制限対応（2000文字以内に調整）
-                            if len(explanation) > 1900:
-                                explanation = explanation[:1900] + "..."
-                            
-                            # 結果を送信
-                            embed = discord.Embed(
-                                title="🤔 AI解説",
-                                description=explanation,
-                                color=0xFF6B35
-                            )
-                            
-                            # 元の投稿内容も表示（短縮版）
-                            original_content = message.content[:200] + "..." if len(message.content) > 200 else message.content
-                            embed.add_field(
-                                name="📝 元の投稿",
-                                value=original_content,
-                                inline=False
-                            )
-                            
-                            await channel.send("💡 解説が完了したよ〜！")
-                            await channel.send(embed=embed)
-                            
-                        except Exception as e:
-                            logger.error(f"OpenAI API エラー (解説機能): {e}")
-                            await channel.send(f"{user.mention} ❌ 解説の生成中にエラーが発生しました。")
-                    else:
-                        logger.error("エラー: OpenAI APIキーが設定されていません")
-                        await channel.send(f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
-                else:
-                    await channel.send(f"{user.mention} ⚠️ メッセージに内容がありません。")
-            
-            # ✏️ 鉛筆：Obsidianメモ作成
-            elif payload.emoji.name == '✏️':
-                # メッセージ内容または添付ファイル、Embedからテキストを取得
-                input_text = message.content
-                
-                # Embedがある場合は内容を抽出
-                embed_content = extract_embed_content(message)
-                if embed_content:
+                            file_path.unlink()
+                            logger.info(f"エラー後のファイル削除: {file_path}")
+                        except Exception as cleanup_error:
+                            logger.warning(f"ファイル削除エラー: {cleanup_error}")
+                        raise upload_error
+                    
+                except Exception as e:
+                    logger.error(f"OpenAI API エラー (メモ機能): {e}")
+                    outbound.post(channel, f"{user.mention} ❌ メモの生成中にエラーが発生しました。")
+            else:
+                logger.error("エラー: OpenAI APIキーが設定されていません")
+                outbound.post(channel, f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ メッセージに内容がありません。")
+    
+    # 📝 メモ：記事作成
+    elif payload.emoji.name == '📝':
+        # メッセージ内容または添付ファイル、Embedからテキストを取得
+        input_text = message.content
+        
+        # Embedがある場合は内容を抽出
+        embed_content = extract_embed_content(message)
+        if embed_content:
+            if input_text:
+                input_text += f"\n\n【Embed内容】\n{embed_content}"
+            else:
+                input_text = embed_content
+            logger.info("Embed内容を追加")
+        
+        # 添付ファイルがある場合、テキストファイルの内容を読み取り
+        if message.attachments:
+            for attachment in message.attachments:
+                file_content = await read_text_attachment(attachment)
+                if file_content:
                     if input_text:
-                        input_text += f"\n\n【Embed内容】\n{embed_content}"
+                        input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
                     else:
-                        input_text = embed_content
-                    logger.info("Embed内容を追加")
-                
-                # 添付ファイルがある場合、テキストファイルの内容を読み取り
-                if message.attachments:
-                    for attachment in message.attachments:
-                        file_content = await read_text_attachment(attachment)
-                        if file_content:
-                            if input_text:
-                                input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
-                            else:
-                                input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
-                            logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
-                
-                if input_text:
-                    # URL検出・警告
-                    await check_content_for_urls(input_text, user, channel)
+                        input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
+                    logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
+        
+        if input_text:
+            # URL検出・警告
+            await check_content_for_urls(input_text, user, channel)
+            
+            # 処理開始メッセージ
+            message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
+            outbound.post(channel, f"{user.mention} 📝 記事を作成するよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+            
+            # モデルを選択
+            model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+            
+            # 記事用プロンプト（カスタムプロンプトを優先。JSON出力指示は含まれていない場合だけ付加）
+            custom_prompt = user_data.get('custom_prompt_article') if user_data else None
+            if custom_prompt:
+                logger.info(f"ユーザー {user.name} のカスタムプロンプトを使用")
+            article_prompt = prompt_registry.get("article", custom=custom_prompt)
+            
+            # OpenAI APIで記事を生成（JSONモード）
+            if client_openai:
+                preview = None
+                try:
+                    response_content, preview = await generate_with_preview(
+                        JobType.ARTICLE,
+                        channel,
+                        "📝 記事を書いているよ〜",
+                        transform=partial_json_string,
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": article_prompt},
+                            {"role": "user", "content": input_text}
+                        ],
+                        max_tokens=3000,
+                        temperature=0.7,
+                        response_format={"type": "json_object"}
+                    )
+                    
+                    # JSONレスポンスをパース
+                    try:
+                        article_json = json.loads(response_content)
+                        content = article_json.get("content", response_content)
+                    except json.JSONDecodeError:
+                        logger.warning(f"JSON解析エラー、フォールバックを使用: {response_content}")
+                        content = response_content
                     
-                    # 処理開始メッセージ
-                    message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
-                    await channel.send(f"{user.mention} 📝 メモを作るよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+                    # ファイル名を生成（YYYYMMDD_HHMMSS_article.md）
+                    now = datetime.now()
+                    timestamp = now.strftime("%Y%m%d_%H%M%S")
+                    filename = f"{timestamp}_article.md"
                     
-                    # モデルを選択
-                    model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+                    # attachmentsフォルダにファイルを保存
+                    attachments_dir = script_dir / "attachments"
+                    attachments_dir.mkdir(exist_ok=True)
+                    file_path = attachments_dir / filename
                     
-                    # メモ用プロンプトを読み込み
-                    memo_prompt = None
+                    # UTF-8でファイル保存
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        f.write(content)
                     
-                    # 1. ユーザーのカスタムプロンプトをチェック
-                    if user_data and user_data.get('custom_prompt_memo'):
-                        memo_prompt = user_data['custom_prompt_memo']
-                        logger.info(f"ユーザー {user.name} のメモ用カスタムプロンプトを使用")
+                    logger.info(f"記事ファイル作成: {file_path}")
                     
-                    # 2. カスタムプロンプトがない場合はデフォルトプロンプトファイルを使用
-                    if not memo_prompt:
-                        prompt_path = script_dir / "prompt" / "pencil_memo.txt"
-                        if prompt_path.exists():
-                            with open(prompt_path, 'r', encoding='utf-8') as f:
-                                memo_prompt = f.read()
-                            logger.info("デフォルトメモプロンプトファイルを使用")
+                    try:
+                        # 記事のタイトルを抽出（最初の#行）
+                        lines = content.split('\n')
+                        title = "記事"
+                        for line in lines:
+                            if line.strip().startswith('# '):
+                                title = line.strip()[2:].strip()
+                                break
+                        
+                        # 結果を送信
+                        embed = discord.Embed(
+                            title="📝 記事を作成しました",
+                            description=f"**タイトル**: {title}\n**ファイル名**: `{filename}`",
+                            color=0x00bfa5
+                        )
+                        
+                        # 内容のプレビュー（最初の300文字）
+                        preview_text = content[:300] + "..." if len(content) > 300 else content
+                        embed.add_field(
+                            name="📄 内容プレビュー",
+                            value=f"```markdown\n{preview_text}\n```",
+                            inline=False
+                        )
+                        
+                        if preview:
+                            # 生成中のプレビューを記事の概要に置き換える
+                            await preview.finish(embed=embed)
                         else:
-                            memo_prompt = "あなたはDiscordメッセージの内容をObsidianメモとして整理するアシスタントです。内容に忠実にメモ化してください。追加情報は加えず、原文を尊重してください。客観的にみて不要と思われる情報は削除して構いません。"
-                            logger.info("フォールバックメモプロンプトを使用")
+                            await outbound.send(channel, embed=embed)
+                        
+                        # ファイルをアップロード
+                        with open(file_path, 'rb') as f:
+                            file_data = f.read()
+                        
+                        file_obj = io.BytesIO(file_data)
+                        file_message = await outbound.send(channel, "📝 記事ファイルです！", file=discord.File(file_obj, filename=filename))
+                        
+                        # 記事ファイルに自動でリアクションを追加
+                        reactions = ['👍', '❓', '✏️', '📝']  # ❤️褒めメッセージ機能は停止
+                        await outbound.add_reactions(file_message, reactions)
+                        
+                        logger.info("記事ファイルにリアクションを追加しました")
+                        
+                        # Discord投稿後、attachmentsフォルダの中身を削除
+                        for attachment_file in attachments_dir.iterdir():
+                            if attachment_file.is_file():
+                                attachment_file.unlink()
+                                logger.info(f"添付ファイル削除: {attachment_file}")
+                        
+                    except Exception as upload_error:
+                        logger.error(f"ファイル投稿エラー: {upload_error}")
+                        # エラーが発生してもファイルは削除する
+                        try:
+                            file_path.unlink()
+                            logger.info(f"エラー後のファイル削除: {file_path}")
+                        except Exception as cleanup_error:
+                            logger.warning(f"ファイル削除エラー: {cleanup_error}")
+                        raise upload_error
                     
-                    # プロンプトにJSON出力指示を追加（カスタムプロンプトでも対応）
-                    json_instruction = '\n\n出力はJSON形式で、以下のフォーマットに従ってください：\n{"english_title": "english_title_for_filename", "content": "メモの内容"}'
-                    memo_prompt += json_instruction
+                except Exception as e:
+                    if preview:
+                        await preview.discard()
+                    logger.error(f"OpenAI API エラー (記事機能): {e}")
+                    outbound.post(channel, f"{user.mention} ❌ 記事の生成中にエラーが発生しました。")
+            else:
+                logger.error("エラー: OpenAI APIキーが設定されていません")
+                outbound.post(channel, f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ メッセージに内容がありません。")
+    
+    # 🌐 URL取得：URLからコンテンツを取得してテキストファイルとして保存
+    elif payload.emoji.name == '🌐':
+        # メッセージからURLを抽出
+        urls = []
+        if message.content:
+            urls = article_extractor.extract_urls_from_text(message.content)
+        
+        # EmbedからもURLを抽出
+        if message.embeds:
+            for embed in message.embeds:
+                if embed.url:
+                    urls.append(embed.url)
+                if embed.description:
+                    embed_urls = article_extractor.extract_urls_from_text(embed.description)
+                    urls.extend(embed_urls)
+        
+        if urls:
+            # 処理開始メッセージ
+            message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
+            outbound.post(channel, f"{user.mention} 🌐 URLの内容を取得するよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+            
+            # 最初のURLのみ処理
+            url = urls[0]
+            
+            # ArticleExtractorを使用してコンテンツを取得
+            title, content, error = await article_extractor.fetch_article_content(url)
+            
+            if content and content.strip():
+                try:
+                    # 英語コンテンツの判定と翻訳
+                    is_english = is_english_content(content)
+                    translated_content = None
+                    translated_title = None
                     
-                    # OpenAI APIでメモを生成（JSONモード）
-                    if client_openai:
-                        try:
-                            response = client_openai.chat.completions.create(
-                                model=model,
-                                messages=[
-                                    {"role": "system", "content": memo_prompt},
-                                    {"role": "user", "content": input_text}
-                                ],
-                                max_tokens=2000,
-                                temperature=0.3,
-                                response_format={"type": "json_object"}
+                    if is_english:
+                        logger.info("英語コンテンツを検出、翻訳を開始")
+                        # 本文とタイトルは同時に翻訳する
+                        if title:
+                            translated_content, translated_title = await asyncio.gather(
+                                translate_text_to_japanese(content),
+                                translate_text_to_japanese(title)
                             )
-                            
-                            # JSONレスポンスをパース
-                            response_content = response.choices[0].message.content
-                            try:
-                                memo_json = json.loads(response_content)
-                                english_title = memo_json.get("english_title", "untitled_memo")
-                                content = memo_json.get("content", input_text)
-                            except json.JSONDecodeError:
-                                logger.warning(f"JSON解析エラー、フォールバックを使用: {response_content}")
-                                english_title = "untitled_memo"
-                                content = input_text
-                            
-                            # ファイル名を生成（YYYYMMDD_HHMMSS_english_title.md）
-                            now = datetime.now()
-                            timestamp = now.strftime("%Y%m%d_%H%M%S")
-                            # 英語タイトルを安全なファイル名に変換
-                            safe_english_title = re.sub(r'[^A-Za-z0-9\-_]', '', english_title)
-                            if not safe_english_title:
-                                safe_english_title = "memo"
-                            filename = f"{timestamp}_{safe_english_title}.md"
-                            
-                            # attachmentsフォルダにファイルを保存
-                            attachments_dir = script_dir / "attachments"
-                            attachments_dir.mkdir(exist_ok=True)
-                            file_path = attachments_dir / filename
-                            
-                            # ファイル内容：コンテンツをそのまま保存
-                            file_content = content
-                            
-                            # UTF-8でファイル保存
-                            with open(file_path, 'w', encoding='utf-8') as f:
-                                f.write(file_content)
-                            
-                            logger.info(f"メモファイル作成: {file_path}")
-                            
-                            try:
-                                # 結果を送信
-                                embed = discord.Embed(
-                                    title="📝 Obsidianメモを作成しました",
-                                    description=f"**ファイル名**: `{filename}`",
-                                    color=0x7C3AED
-                                )
-                                
-                                # 内容のプレビュー（最初の200文字）
-                                preview = content[:200] + "..." if len(content) > 200 else content
-                                embed.add_field(
-                                    name="📄 内容プレビュー",
-                                    value=preview,
-                                    inline=False
-                                )
-                                
-                                await channel.send(embed=embed)
-                                
-                                # ファイルをアップロード
-                                with open(file_path, 'rb') as f:
-                                    file_data = f.read()
-                                
-                                file_obj = io.BytesIO(file_data)
-                                file_message = await channel.send("📝 メモファイルを作成しました！", file=discord.File(file_obj, filename=filename))
-                                
-                                # メモファイルに自動でリアクションを追加
-                                reactions = ['👍', '❓', '✏️', '📝']  # ❤️褒めメッセージ機能は停止
-                                for reaction in reactions:
-                                    try:
-                                        await file_message.add_reaction(reaction)
-                                        await asyncio.sleep(0.5)  # Discord API レート制限対策
-                                    except Exception as e:
-                                        logger.warning(f"リアクション追加エラー ({reaction}): {e}")
-                                
-                                logger.info("メモファイルにリアクションを追加しました")
-                                
-                                # Discord投稿後、attachmentsフォルダの中身を削除
-                                for attachment_file in attachments_dir.iterdir():
-                                    if attachment_file.is_file():
-                                        attachment_file.unlink()
-                                        logger.info(f"添付ファイル削除: {attachment_file}")
-                                
-                            except Exception as upload_error:
-                                logger.error(f"ファイル投稿エラー: {upload_error}")
-                                # エラーが発生してもファイルは削除する
-                                try:
-                                    file_path.unlink()
-                                    logger.info(f"エラー後のファイル削除: {file_path}")
-                                except Exception as cleanup_error:
-                                    logger.warning(f"ファイル削除エラー: {cleanup_error}")
-                                raise upload_error
-                            
-                        except Exception as e:
-                            logger.error(f"OpenAI API エラー (メモ機能): {e}")
-                            await channel.send(f"{user.mention} ❌ メモの生成中にエラーが発生しました。")
-                    else:
-                        logger.error("エラー: OpenAI APIキーが設定されていません")
-                        await channel.send(f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
-                else:
-                    await channel.send(f"{user.mention} ⚠️ メッセージに内容がありません。")
-            
-            # 📝 メモ：記事作成
-            elif payload.emoji.name == '📝':
-                # メッセージ内容または添付ファイル、Embedからテキストを取得
-                input_text = message.content
-                
-                # Embedがある場合は内容を抽出
-                embed_content = extract_embed_content(message)
-                if embed_content:
-                    if input_text:
-                        input_text += f"\n\n【Embed内容】\n{embed_content}"
-                    else:
-                        input_text = embed_content
-                    logger.info("Embed内容を追加")
-                
-                # 添付ファイルがある場合、テキストファイルの内容を読み取り
-                if message.attachments:
-                    for attachment in message.attachments:
-                        file_content = await read_text_attachment(attachment)
-                        if file_content:
-                            if input_text:
-                                input_text += f"\n\n【ファイル: {attachment.filename}】\n{file_content}"
-                            else:
-                                input_text = f"【ファイル: {attachment.filename}】\n{file_content}"
-                            logger.info(f"添付ファイルの内容を追加: {attachment.filename}")
-                
-                if input_text:
-                    # URL検出・警告
-                    await check_content_for_urls(input_text, user, channel)
+                        else:
+                            translated_content = await translate_text_to_japanese(content)
                     
-                    # 処理開始メッセージ
-                    message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
-                    await channel.send(f"{user.mention} 📝 記事を作成するよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+                    # ファイル名を生成（タイトルがある場合は使用）
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    display_title = translated_title if translated_title else title
+                    safe_title = display_title[:30].replace("/", "_").replace("\\", "_").replace(":", "_") if display_title else "url_content"
+                    filename = f"{timestamp}_{safe_title}.txt"
+                    file_path = script_dir / "attachments" / filename
                     
-                    # モデルを選択
-                    model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+                    # ファイルに保存
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        f.write(f"取得元URL: {url}\n")
+                        f.write(f"記事タイトル: {title or 'タイトル取得失敗'}\n")
+                        if translated_title:
+                            f.write(f"翻訳タイトル: {translated_title}\n")
+                        f.write(f"取得日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                        if is_english:
+                            f.write(f"言語: 英語 → 日本語翻訳済み\n")
+                        f.write("=" * 50 + "\n\n")
+                        
+                        if translated_content:
+                            f.write("【日本語翻訳】\n")
+                            f.write(translated_content)
+                            f.write("\n\n" + "=" * 30 + "\n\n")
+                            f.write("【原文（英語）】\n")
+                        
+                        f.write(content)
                     
-                    # 記事用プロンプトを読み込み
-                    article_prompt = None
+                    logger.info(f"URLコンテンツファイル作成: {file_path}")
                     
-                    # 1. ユーザーのカスタムプロンプトをチェック
-                    if user_data and user_data.get('custom_prompt_article'):
-                        article_prompt = user_data['custom_prompt_article']
-                        logger.info(f"ユーザー {user.name} のカスタムプロンプトを使用")
+                    # プレビューは翻訳版を優先
+                    preview_content = translated_content if translated_content else content
+                    preview = preview_content[:150] + "..." if len(preview_content) > 150 else preview_content
                     
-                    # 2. カスタムプロンプトがない場合はデフォルトプロンプトファイルを使用
-                    if not article_prompt:
-                        prompt_path = script_dir / "prompt" / "article.txt"
-                        if prompt_path.exists():
-                            with open(prompt_path, 'r', encoding='utf-8') as f:
-                                article_prompt = f.read()
-                            logger.info("デフォルトプロンプトファイルを使用")
-                        else:
-                            article_prompt = "あなたは優秀なライターです。与えられた内容を元に、構造化された記事を作成してください。"
-                            logger.info("フォールバックプロンプトを使用")
+                    # 結果を送信
+                    embed_title = "🌐 URLの内容を取得しました"
+                    if is_english:
+                        embed_title += " (日本語翻訳済み)"
                     
-                    # プロンプトにJSON出力指示を追加（既に含まれていない場合）
-                    if '{"content":' not in article_prompt:
-                        article_prompt += '\n\n出力はJSON形式で、以下のフォーマットに従ってください：\n{"content": "マークダウン形式の記事全文"}'
+                    display_title_text = translated_title if translated_title else (title or 'タイトル取得失敗')
                     
-                    # OpenAI APIで記事を生成（JSONモード）
-                    if client_openai:
-                        try:
-                            response = client_openai.chat.completions.create(
-                                model=model,
-                                messages=[
-                                    {"role": "system", "content": article_prompt},
-                                    {"role": "user", "content": input_text}
-                                ],
-                                max_tokens=3000,
-                                temperature=0.7,
-                                response_format={"type": "json_object"}
-                            )
-                            
-                            # JSONレスポンスをパース
-                            response_content = response.choices[0].message.content
-                            try:
-                                article_json = json.loads(response_content)
-                                content = article_json.get("content", response_content)
-                            except json.JSONDecodeError:
-                                logger.warning(f"JSON解析エラー、フォールバックを使用: {response_content}")
-                                content = response_content
-                            
-                            # ファイル名を生成（YYYYMMDD_HHMMSS_article.md）
-                            now = datetime.now()
-                            timestamp = now.strftime("%Y%m%d_%H%M%S")
-                            filename = f"{timestamp}_article.md"
-                            
-                            # attachmentsフォルダにファイルを保存
-                            attachments_dir = script_dir / "attachments"
-                            attachments_dir.mkdir(exist_ok=True)
-                            file_path = attachments_dir / filename
-                            
-                            # UTF-8でファイル保存
-                            with open(file_path, 'w', encoding='utf-8') as f:
-                                f.write(content)
-                            
-                            logger.info(f"記事ファイル作成: {file_path}")
-                            
-                            try:
-                                # 記事のタイトルを抽出（最初の#行）
-                                lines = content.split('\n')
-                                title = "記事"
-                                for line in lines:
-                                    if line.strip().startswith('# '):
-                                        title = line.strip()[2:].strip()
-                                        break
-                                
-                                # 結果を送信
-                                embed = discord.Embed(
-                                    title="📝 記事を作成しました",
-                                    description=f"**タイトル**: {title}\n**ファイル名**: `{filename}`",
-                                    color=0x00bfa5
-                                )
-                                
-                                # 内容のプレビュー（最初の300文字）
-                                preview = content[:300] + "..." if len(content) > 300 else content
-                                embed.add_field(
-                                    name="📄 内容プレビュー",
-                                    value=f"```markdown\n{preview}\n```",
-                                    inline=False
-                                )
-                                
-                                await channel.send(embed=embed)
-                                
-                                # ファイルをアップロード
-                                with open(file_path, 'rb') as f:
-                                    file_data = f.read()
-                                
-                                file_obj = io.BytesIO(file_data)
-                                file_message = await channel.send("📝 記事ファイルです！", file=discord.File(file_obj, filename=filename))
-                                
-                                # 記事ファイルに自動でリアクションを追加
-                                reactions = ['👍', '❓', '✏️', '📝']  # ❤️褒めメッセージ機能は停止
-                                for reaction in reactions:
-                                    try:
-                                        await file_message.add_reaction(reaction)
-                                        await asyncio.sleep(0.5)  # Discord API レート制限対策
-                                    except Exception as e:
-                                        logger.warning(f"リアクション追加エラー ({reaction}): {e}")
-                                
-                                logger.info("記事ファイルにリアクションを追加しました")
-                                
-                                # Discord投稿後、attachmentsフォルダの中身を削除
-                                for attachment_file in attachments_dir.iterdir():
-                                    if attachment_file.is_file():
-                                        attachment_file.unlink()
-                                        logger.info(f"添付ファイル削除: {attachment_file}")
-                                
-                            except Exception as upload_error:
-                                logger.error(f"ファイル投稿エラー: {upload_error}")
-                                # エラーが発生してもファイルは削除する
-                                try:
-                                    file_path.unlink()
-                                    logger.info(f"エラー後のファイル削除: {file_path}")
-                                except Exception as cleanup_error:
-                                    logger.warning(f"ファイル削除エラー: {cleanup_error}")
-                                raise upload_error
-                            
-                        except Exception as e:
-                            logger.error(f"OpenAI API エラー (記事機能): {e}")
-                            await channel.send(f"{user.mention} ❌ 記事の生成中にエラーが発生しました。")
-                    else:
-                        logger.error("エラー: OpenAI APIキーが設定されていません")
-                        await channel.send(f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
-                else:
-                    await channel.send(f"{user.mention} ⚠️ メッセージに内容がありません。")
-            
-            # 🌐 URL取得：URLからコンテンツを取得してテキストファイルとして保存
-            elif payload.emoji.name == '🌐':
-                # メッセージからURLを抽出
-                urls = []
-                if message.content:
-                    urls = article_extractor.extract_urls_from_text(message.content)
-                
-                # EmbedからもURLを抽出
-                if message.embeds:
-                    for embed in message.embeds:
-                        if embed.url:
-                            urls.append(embed.url)
-                        if embed.description:
-                            embed_urls = article_extractor.extract_urls_from_text(embed.description)
-                            urls.extend(embed_urls)
-                
-                if urls:
-                    # 処理開始メッセージ
-                    message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
-                    await channel.send(f"{user.mention} 🌐 URLの内容を取得するよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+                    embed = discord.Embed(
+                        title=embed_title,
+                        description=f"**URL**: {url}\n**タイトル**: {display_title_text}\n**ファイル名**: `{filename}`",
+                        color=0x4285f4 if not is_english else 0x00ff00
+                    )
                     
-                    # 最初のURLのみ処理
-                    url = urls[0]
+                    preview_name = "📄 記事内容プレビュー (最初の150文字)"
+                    if is_english:
+                        preview_name += " - 翻訳版"
                     
-                    # ArticleExtractorを使用してコンテンツを取得
-                    title, content, error = await article_extractor.fetch_article_content(url)
+                    embed.add_field(
+                        name=preview_name,
+                        value=f"```\n{preview}\n```",
+                        inline=False
+                    )
                     
-                    if content and content.strip():
-                        try:
-                            # 英語コンテンツの判定と翻訳
-                            is_english = is_english_content(content)
-                            translated_content = None
-                            translated_title = None
-                            
-                            if is_english:
-                                logger.info("英語コンテンツを検出、翻訳を開始")
-                                translated_content = await translate_text_to_japanese(content)
-                                if title:
-                                    translated_title = await translate_text_to_japanese(title)
-                            
-                            # ファイル名を生成（タイトルがある場合は使用）
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            display_title = translated_title if translated_title else title
-                            safe_title = display_title[:30].replace("/", "_").replace("\\", "_").replace(":", "_") if display_title else "url_content"
-                            filename = f"{timestamp}_{safe_title}.txt"
-                            file_path = script_dir / "attachments" / filename
-                            
-                            # ファイルに保存
-                            with open(file_path, 'w', encoding='utf-8') as f:
-                                f.write(f"取得元URL: {url}\n")
-                                f.write(f"記事タイトル: {title or 'タイトル取得失敗'}\n")
-                                if translated_title:
-                                    f.write(f"翻訳タイトル: {translated_title}\n")
-                                f.write(f"取得日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                                if is_english:
-                                    f.write(f"言語: 英語 → 日本語翻訳済み\n")
-                                f.write("=" * 50 + "\n\n")
-                                
-                                if translated_content:
-                                    f.write("【日本語翻訳】\n")
-                                    f.write(translated_content)
-                                    f.write("\n\n" + "=" * 30 + "\n\n")
-                                    f.write("【原文（英語）】\n")
-                                
-                                f.write(content)
-                            
-                            logger.info(f"URLコンテンツファイル作成: {file_path}")
-                            
-                            # プレビューは翻訳版を優先
-                            preview_content = translated_content if translated_content else content
-                            preview = preview_content[:150] + "..." if len(preview_content) > 150 else preview_content
-                            
-                            # 結果を送信
-                            embed_title = "🌐 URLの内容を取得しました"
-                            if is_english:
-                                embed_title += " (日本語翻訳済み)"
-                            
-                            display_title_text = translated_title if translated_title else (title or 'タイトル取得失敗')
-                            
-                            embed = discord.Embed(
-                                title=embed_title,
-                                description=f"**URL**: {url}\n**タイトル**: {display_title_text}\n**ファイル名**: `{filename}`",
-                                color=0x4285f4 if not is_english else 0x00ff00
-                            )
-                            
-                            preview_name = "📄 記事内容プレビュー (最初の150文字)"
-                            if is_english:
-                                preview_name += " - 翻訳版"
-                            
-                            embed.add_field(
-                                name=preview_name,
-                                value=f"```\n{preview}\n```",
-                                inline=False
-                            )
-                            
-                            # 文字数情報を追加
-                            info_text = f"記事文字数: {len(content):,}文字"
-                            if is_english:
-                                info_text += f"\n翻訳文字数: {len(translated_content):,}文字" if translated_content else ""
-                                info_text += "\n🌍 言語: 英語 → 日本語"
-                            
-                            embed.add_field(
-                                name="📊 情報",
-                                value=info_text,
-                                inline=True
-                            )
-                            
-                            await channel.send(embed=embed)
-                            
-                            # ファイルをアップロード
-                            with open(file_path, 'rb') as f:
-                                file_data = f.read()
-                            
-                            file_obj = io.BytesIO(file_data)
-                            upload_message = "🌐 URLの記事内容をテキストファイルにしました！\n✨ 記事本文のみを抽出しています"
-                            if is_english:
-                                upload_message = "🌐 URLの記事内容をテキストファイルにしました！\n🌍 英語記事を日本語に翻訳しました（原文も含まれています）"
-                            
-                            file_message = await channel.send(upload_message, file=discord.File(file_obj, filename=filename))
-                            
-                            # URLコンテンツファイルに自動でリアクションを追加
-                            reactions = ['👍', '❓', '✏️', '📝', '👀', '🙌']  # ❤️褒めメッセージ機能は停止
-                            for reaction in reactions:
-                                try:
-                                    await file_message.add_reaction(reaction)
-                                    await asyncio.sleep(0.5)  # Discord API レート制限対策
-                                except Exception as e:
-                                    logger.warning(f"リアクション追加エラー ({reaction}): {e}")
-                            
-                            logger.info("URLコンテンツファイルにリアクションを追加しました")
-                            
-                            # ファイル削除
-                            try:
-                                file_path.unlink()
-                                logger.info(f"一時ファイル削除: {file_path}")
-                            except Exception as cleanup_error:
-                                logger.warning(f"ファイル削除エラー: {cleanup_error}")
-                            
-                        except Exception as e:
-                            logger.error(f"URLコンテンツ処理エラー: {e}")
-                            await channel.send(f"{user.mention} ❌ ファイルの作成中にエラーが発生しました。")
-                    else:
-                        # エラーメッセージを詳細化
-                        if error:
-                            await channel.send(f"{user.mention} ❌ URLから記事を取得できませんでした。\n💡 **原因**: {error}")
-                        else:
-                            await channel.send(f"{user.mention} ❌ URLから記事を取得できませんでした。\n💡 記事が短すぎるか、アクセス制限が原因の可能性があります。")
+                    # 文字数情報を追加
+                    info_text = f"記事文字数: {len(content):,}文字"
+                    if is_english:
+                        info_text += f"\n翻訳文字数: {len(translated_content):,}文字" if translated_content else ""
+                        info_text += "\n🌍 言語: 英語 → 日本語"
+                    
+                    embed.add_field(
+                        name="📊 情報",
+                        value=info_text,
+                        inline=True
+                    )
+                    
+                    await outbound.send(channel, embed=embed)
+                    
+                    # ファイルをアップロード
+                    with open(file_path, 'rb') as f:
+                        file_data = f.read()
+                    
+                    file_obj = io.BytesIO(file_data)
+                    upload_message = "🌐 URLの記事内容をテキストファイルにしました！\n✨ 記事本文のみを抽出しています"
+                    if is_english:
+                        upload_message = "🌐 URLの記事内容をテキストファイルにしました！\n🌍 英語記事を日本語に翻訳しました（原文も含まれています）"
+                    
+                    file_message = await outbound.send(channel, upload_message, file=discord.File(file_obj, filename=filename))
+                    
+                    # URLコンテンツファイルに自動でリアクションを追加
+                    reactions = ['👍', '❓', '✏️', '📝', '👀', '🙌']  # ❤️褒めメッセージ機能は停止
+                    await outbound.add_reactions(file_message, reactions)
+                    
+                    logger.info("URLコンテンツファイルにリアクションを追加しました")
+                    
+                    # ファイル削除
+                    try:
+                        file_path.unlink()
+                        logger.info(f"一時ファイル削除: {file_path}")
+                    except Exception as cleanup_error:
+                        logger.warning(f"ファイル削除エラー: {cleanup_error}")
+                    
+                except Exception as e:
+                    logger.error(f"URLコンテンツ処理エラー: {e}")
+                    outbound.post(channel, f"{user.mention} ❌ ファイルの作成中にエラーが発生しました。")
+            else:
+                # エラーメッセージを詳細化
+                if error:
+                    outbound.post(channel, f"{user.mention} ❌ URLから記事を取得できませんでした。\n💡 **原因**: {error}")
                 else:
-                    await channel.send(f"{user.mention} ⚠️ メッセージにURLが見つかりません。")
-            
-            # 🙌 要約：URLから記事を取得して要約
-            elif payload.emoji.name == '🙌':
-                # メッセージからURLを抽出
-                urls = []
-                if message.content:
-                    urls = article_extractor.extract_urls_from_text(message.content)
+                    outbound.post(channel, f"{user.mention} ❌ URLから記事を取得できませんでした。\n💡 記事が短すぎるか、アクセス制限が原因の可能性があります。")
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ メッセージにURLが見つかりません。")
+    
+    # 🙌 要約：URLから記事を取得して要約
+    elif payload.emoji.name == '🙌':
+        # メッセージからURLを抽出
+        urls = []
+        if message.content:
+            urls = article_extractor.extract_urls_from_text(message.content)
+        
+        # EmbedからもURLを抽出
+        if message.embeds:
+            for embed in message.embeds:
+                if embed.url:
+                    urls.append(embed.url)
+                if embed.description:
+                    embed_urls = article_extractor.extract_urls_from_text(embed.description)
+                    urls.extend(embed_urls)
+        
+        if urls:
+            # 処理開始メッセージ
+            message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
+            outbound.post(channel, f"{user.mention} 🙌 記事を要約するよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
+            
+            # 最初のURLのみ処理
+            target_url = urls[0]
+            
+            try:
+                # 記事コンテンツを取得
+                title, content, error = await article_extractor.fetch_article_content(target_url)
                 
-                # EmbedからもURLを抽出
-                if message.embeds:
-                    for embed in message.embeds:
-                        if embed.url:
-                            urls.append(embed.url)
-                        if embed.description:
-                            embed_urls = article_extractor.extract_urls_from_text(embed.description)
-                            urls.extend(embed_urls)
+                if error:
+                    outbound.post(channel, f"{user.mention} ❌ 記事の取得に失敗しました: {error}")
+                    return
                 
-                if urls:
-                    # 処理開始メッセージ
-                    message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
-                    await channel.send(f"{user.mention} 🙌 記事を要約するよ〜！ちょっと待っててね\n📎 元メッセージ: {message_link}")
-                    
-                    # 最初のURLのみ処理
-                    target_url = urls[0]
-                    
+                if not content:
+                    outbound.post(channel, f"{user.mention} ❌ 記事の本文を取得できませんでした。")
+                    return
+                
+                # 要約プロンプト（カスタムプロンプトを優先）
+                custom_prompt = user_data.get('custom_prompt_summary') if user_data else None
+                if custom_prompt:
+                    logger.info(f"ユーザー {user.name} のカスタム要約プロンプトを使用")
+                summary_prompt = prompt_registry.get("summary", custom=custom_prompt)
+                
+                # モデルを選択
+                model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+                
+                # OpenAI APIで要約を生成
+                if client_openai:
                     try:
-                        # 記事コンテンツを取得
-                        title, content, error = await article_extractor.fetch_article_content(target_url)
-                        
-                        if error:
-                            await channel.send(f"{user.mention} ❌ 記事の取得に失敗しました: {error}")
-                            return
-                        
-                        if not content:
-                            await channel.send(f"{user.mention} ❌ 記事の本文を取得できませんでした。")
-                            return
-                        
-                        # 要約プロンプトを読み込み
-                        summary_prompt = None
-                        
-                        # 1. ユーザーのカスタムプロンプトをチェック
-                        if user_data and user_data.get('custom_prompt_summary'):
-                            summary_prompt = user_data['custom_prompt_summary']
-                            logger.info(f"ユーザー {user.name} のカスタム要約プロンプトを使用")
-                        
-                        # 2. カスタムプロンプトがない場合はデフォルトプロンプトファイルを使用
-                        if not summary_prompt:
-                            prompt_path = script_dir / "prompt" / "summary.txt"
-                            if prompt_path.exists():
-                                with open(prompt_path, 'r', encoding='utf-8') as f:
-                                    summary_prompt = f.read()
-                                logger.info("デフォルト要約プロンプトファイルを使用")
-                            else:
-                                summary_prompt = "以下の記事を3行で要約し、キーフレーズを5個抽出してください。"
-                                logger.info("フォールバック要約プロンプトを使用")
+                        # 記事データを構築
+                        article_data = f"タイトル: {title}\n\n記事内容:\n{content}"
                         
-                        # モデルを選択
-                        model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
+                        summary_result = await llm_cache.complete(
+                            client_openai,
+                            JobType.SUMMARY,
+                            model=model,
+                            messages=[
+                                {"role": "system", "content": summary_prompt},
+                                {"role": "user", "content": article_data}
+                            ],
+                            max_tokens=1500,
+                            temperature=0.7
+                        )
+                        summary_result = summary_result.strip()
                         
-                        # OpenAI APIで要約を生成
-                        if client_openai:
+                        # タイトルが英語の場合は日本語に翻訳
+                        display_title = title
+                        if title and is_english_title(title):
                             try:
-                                # 記事データを構築
-                                article_data = f"タイトル: {title}\n\n記事内容:\n{content}"
-                                
-                                response = client_openai.chat.completions.create(
-                                    model=model,
+                                translate_response = await client_openai.chat.completions.create(
+                                    model="gpt-4.1-mini",  # 翻訳は軽量モデルで十分
                                     messages=[
-                                        {"role": "system", "content": summary_prompt},
-                                        {"role": "user", "content": article_data}
+                                        {"role": "system", "content": "以下の英語タイトルを自然な日本語に翻訳してください。技術記事のタイトルとして適切な日本語に翻訳し、元のニュアンスを保ってください。"},
+                                        {"role": "user", "content": title}
                                     ],
-                                    max_tokens=1500,
-                                    temperature=0.7
-                                )
-                                
-                                summary_result = response.choices[0].message.content.strip()
-                                
-                                # タイトルが英語の場合は日本語に翻訳
-                                display_title = title
-                                if title and is_english_title(title):
-                                    try:
-                                        translate_response = client_openai.chat.completions.create(
-                                            model="gpt-4.1-mini",  # 翻訳は軽量モデルで十分
-                                            messages=[
-                                                {"role": "system", "content": "以下の英語タイトルを自然な日本語に翻訳してください。技術記事のタイトルとして適切な日本語に翻訳し、元のニュアンスを保ってください。"},
-                                                {"role": "user", "content": title}
-                                            ],
-                                            max_tokens=200,
-                                            temperature=0.3
-                                        )
-                                        translated_title = translate_response.choices[0].message.content.strip()
-                                        display_title = f"{translated_title}\n*原題: {title}*"
-                                        logger.info(f"タイトル翻訳完了: {title} → {translated_title}")
-                                    except Exception as e:
-                                        logger.warning(f"タイトル翻訳エラー: {e}")
-                                        display_title = title  # 翻訳失敗時は元のタイトルを使用
-                                
-                                # 結果をEmbedで送信
-                                embed = discord.Embed(
-                                    title="🙌 記事要約完了",
-                                    color=0xffd700
-                                )
-                                
-                                embed.add_field(
-                                    name="📄 記事タイトル",
-                                    value=display_title[:400] + "..." if display_title and len(display_title) > 400 else display_title or "（タイトル取得失敗）",
-                                    inline=False
-                                )
-                                
-                                embed.add_field(
-                                    name="🔗 記事URL",
-                                    value=target_url,
-                                    inline=False
+                                    max_tokens=200,
+                                    temperature=0.3
                                 )
-                                
-                                embed.add_field(
-                                    name="📝 要約結果",
-                                    value=summary_result[:1000] + "..." if len(summary_result) > 1000 else summary_result,
-                                    inline=False
-                                )
-                                
-                                embed.set_footer(text=f"記事文字数: {len(content):,}文字 | モデル: {model}")
-                                
-                                await channel.send(embed=embed)
-                                
-                                logger.info(f"記事要約完了: {target_url}")
-                                
+                                translated_title = translate_response.choices[0].message.content.strip()
+                                display_title = f"{translated_title}\n*原題: {title}*"
+                                logger.info(f"タイトル翻訳完了: {title} → {translated_title}")
                             except Exception as e:
-                                logger.error(f"OpenAI API エラー (要約機能): {e}")
-                                await channel.send(f"{user.mention} ❌ 要約の生成中にエラーが発生しました。")
+                                logger.warning(f"タイトル翻訳エラー: {e}")
+                                display_title = title  # 翻訳失敗時は元のタイトルを使用
                         
-                        else:
-                            logger.error("エラー: OpenAI APIキーが設定されていません")
-                            await channel.send(f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
+                        # 結果をEmbedで送信
+                        embed = discord.Embed(
+                            title="🙌 記事要約完了",
+                            color=0xffd700
+                        )
+                        
+                        embed.add_field(
+                            name="📄 記事タイトル",
+                            value=display_title[:400] + "..." if display_title and len(display_title) > 400 else display_title or "（タイトル取得失敗）",
+                            inline=False
+                        )
+                        
+                        embed.add_field(
+                            name="🔗 記事URL",
+                            value=target_url,
+                            inline=False
+                        )
+                        
+                        embed.add_field(
+                            name="📝 要約結果",
+                            value=summary_result[:1000] + "..." if len(summary_result) > 1000 else summary_result,
+                            inline=False
+                        )
+                        
+                        embed.set_footer(text=f"記事文字数: {len(content):,}文字 | モデル: {model}")
+                        
+                        await outbound.send(channel, embed=embed)
+                        
+                        logger.info(f"記事要約完了: {target_url}")
                         
                     except Exception as e:
-                        logger.error(f"記事要約処理エラー: {e}")
-                        await channel.send(f"{user.mention} ❌ 記事の要約中にエラーが発生しました。")
+                        logger.error(f"OpenAI API エラー (要約機能): {e}")
+                        outbound.post(channel, f"{user.mention} ❌ 要約の生成中にエラーが発生しました。")
                 
                 else:
-                    await channel.send(f"{user.mention} ⚠️ メッセージにURLが見つかりません。記事のURLを含むメッセージに🙌リアクションしてください。")
-            
-            # 👀 Xツリー投稿生成：メッセージ内容からエンゲージメント重視のツリー投稿を生成
-            elif payload.emoji.name == '👀':
-                # プレミアムユーザーチェック
-                if not await is_premium_user(str(user.id)):
-                    user_data = load_user_data(str(user.id))
-                    if user_data["daily_usage"] >= FREE_USER_DAILY_LIMIT:
-                        await channel.send(f"{user.mention} ⚠️ 1日の利用制限（{FREE_USER_DAILY_LIMIT}回）に達しました。")
-                        return
-                    else:
-                        user_data["daily_usage"] += 1
-                        save_user_data(str(user.id), user_data)
-                
-                # メッセージ内容を取得
-                content_to_process = ""
+                    logger.error("エラー: OpenAI APIキーが設定されていません")
+                    outbound.post(channel, f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
                 
-                # メッセージ本文
-                if message.content:
-                    content_to_process += message.content + "\n\n"
-                
-                # 添付ファイルの内容を読み込み
-                if message.attachments:
-                    for attachment in message.attachments:
-                        if attachment.filename.endswith(('.txt', '.md')):
-                            try:
-                                attachment_content = await read_text_attachment(attachment)
-                                if attachment_content:
-                                    content_to_process += f"【ファイル: {attachment.filename}】\n{attachment_content}\n\n"
-                            except Exception as e:
-                                logger.warning(f"添付ファイル読み込みエラー: {e}")
-                
-                # Embedの内容を抽出
-                if message.embeds:
-                    embed_content = extract_embed_content(message)
-                    if embed_content:
-                        content_to_process += f"【Embed情報】\n{embed_content}\n\n"
+            except Exception as e:
+                logger.error(f"記事要約処理エラー: {e}")
+                outbound.post(channel, f"{user.mention} ❌ 記事の要約中にエラーが発生しました。")
+        
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ メッセージにURLが見つかりません。記事のURLを含むメッセージに🙌リアクションしてください。")
+    
+    # 👀 Xツリー投稿生成：メッセージ内容からエンゲージメント重視のツリー投稿を生成
+    elif payload.emoji.name == '👀':
+        # 利用制限は共通処理の can_use_feature でチェック済み
+        
+        # メッセージ内容を取得
+        content_to_process = ""
+        
+        # メッセージ本文
+        if message.content:
+            content_to_process += message.content + "\n\n"
+        
+        # 添付ファイルの内容を読み込み
+        if message.attachments:
+            for attachment in message.attachments:
+                if attachment.filename.endswith(('.txt', '.md')):
+                    try:
+                        attachment_content = await read_text_attachment(attachment)
+                        if attachment_content:
+                            content_to_process += f"【ファイル: {attachment.filename}】\n{attachment_content}\n\n"
+                    except Exception as e:
+                        logger.warning(f"添付ファイル読み込みエラー: {e}")
+        
+        # Embedの内容を抽出
+        if message.embeds:
+            embed_content = extract_embed_content(message)
+            if embed_content:
+                content_to_process += f"【Embed情報】\n{embed_content}\n\n"
+        
+        if content_to_process.strip():
+            # 処理開始メッセージ
+            message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
+            outbound.post(channel, f"{user.mention} 👀 注目を集めるツリー投稿を作成します！少々お待ちください\n📎 元メッセージ: {message_link}")
+            
+            try:
+                # プロンプトテンプレート（[ここに…] の箇所を内容に置き換える）
+                thread_prompt = prompt_registry.render("thread", content_to_process.strip())
                 
-                if content_to_process.strip():
-                    # 処理開始メッセージ
-                    message_link = f"https://discord.com/channels/{message.guild.id}/{message.channel.id}/{message.id}"
-                    await channel.send(f"{user.mention} 👀 注目を集めるツリー投稿を作成します！少々お待ちください\n📎 元メッセージ: {message_link}")
+                if OPENAI_API_KEY:
+                    # OpenAI APIを使用してツリー投稿生成
+                    model = PREMIUM_USER_MODEL if is_premium else FREE_USER_MODEL
                     
-                    try:
-                        # プロンプトファイルを読み込み
-                        thread_prompt_path = script_dir / "prompt" / "thread.txt"
-                        if thread_prompt_path.exists():
-                            with open(thread_prompt_path, 'r', encoding='utf-8') as f:
-                                thread_prompt = f.read()
-                            
-                            # {content}を実際の内容に置換
-                            thread_prompt = thread_prompt.replace("[ここに解説したいニュース記事のURLや文章を入力してください]", content_to_process.strip())
-                        else:
-                            # フォールバック用のシンプルなプロンプト
-                            thread_prompt = f"""
-以下の内容を、読者が最後まで読みたくなるXツリー投稿（3-7ツイート）に変換してください。
-各ツイートは140字以内で、エンゲージメントを重視した構成にしてください。
-
-【ツイート 1/n】
-【ツイート 2/n】
-【ツイート 3/n】
-
-対象コンテンツ:
-{content_to_process.strip()}
-"""
+                    thread_result = await llm_cache.complete(
+                        client_openai,
+                        JobType.THREAD,
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": "あなたは読者の心を掴むXツリー投稿の専門家です。"},
+                            {"role": "user", "content": thread_prompt}
+                        ],
+                        max_tokens=1500,
+                        temperature=0.7
+                    )
+                    thread_result = thread_result.strip()
+                    
+                    # ツイートを解析して分割
+                    import re
+                    tweet_pattern = r'【ツイート\s*(\d+)/(\d+)】([^【]*?)(?=【ツイート|\Z)'
+                    tweets = re.findall(tweet_pattern, thread_result, re.DOTALL)
+                    
+                    if not tweets:
+                        # パターンマッチしない場合は改行で分割
+                        lines = thread_result.split('\n')
+                        tweets = []
+                        current_tweet = ""
+                        tweet_num = 1
                         
-                        if OPENAI_API_KEY:
-                            # OpenAI APIを使用してツリー投稿生成
-                            model = PREMIUM_USER_MODEL if await is_premium_user(str(user.id)) else FREE_USER_MODEL
-                            
-                            response = client_openai.chat.completions.create(
-                                model=model,
-                                messages=[
-                                    {"role": "system", "content": "あなたは読者の心を掴むXツリー投稿の専門家です。"},
-                                    {"role": "user", "content": thread_prompt}
-                                ],
-                                max_tokens=1500,
-                                temperature=0.7
-                            )
+                        for line in lines:
+                            line = line.strip()
+                            if line and not line.startswith('【'):
+                                if len(current_tweet + line) <= 140:
+                                    current_tweet += line + " "
+                                else:
+                                    if current_tweet:
+                                        tweets.append((str(tweet_num), str(len(tweets)+1), current_tweet.strip()))
+                                        tweet_num += 1
+                                    current_tweet = line + " "
+                        
+                        if current_tweet:
+                            tweets.append((str(tweet_num), str(len(tweets)+1), current_tweet.strip()))
+                    
+                    if tweets:
+                        # 1ツイート目から画像生成
+                        first_tweet_content = tweets[0][2] if tweets else ""
+                        image_url = await generate_thread_image(first_tweet_content)
+                        
+                        # ヘッダーEmbedを作成
+                        header_embed = discord.Embed(
+                            title=f"👀 Xツリー投稿（{len(tweets)}ツイート）",
+                            description="エンゲージメント重視のツリー投稿を生成しました",
+                            color=0xff6b6b
+                        )
+                        
+                        # 画像を設定
+                        image_file = None
+                        if image_url:
+                            if image_url.startswith('http'):
+                                # URL形式の場合
+                                header_embed.set_image(url=image_url)
+                                header_embed.add_field(name="🎨", value="AI生成画像付き", inline=True)
+                            else:
+                                # ファイルパス形式の場合（base64から生成された一時ファイル）
+                                import pathlib
+                                temp_path = pathlib.Path(image_url)
+                                if temp_path.exists():
+                                    image_file = discord.File(str(temp_path), filename="ai_generated_image.png")
+                                    header_embed.set_image(url="attachment://ai_generated_image.png")
+                                    header_embed.add_field(name="🎨", value="AI生成画像付き", inline=True)
+                        
+                        # 1ツイート目のX投稿リンク
+                        if tweets:
+                            first_tweet = tweets[0][2].strip()
+                            import urllib.parse
+                            # 140文字制限内で適切に切り取り（日本語考慮）
+                            max_chars = 135  # URL短縮やハッシュタグのためのマージン
+                            if len(first_tweet) > max_chars:
+                                # 文末が不自然にならないよう調整
+                                short_tweet = first_tweet[:max_chars].rstrip('。、！？')
+                                # 文の途中で切れる場合は前の文で終了
+                                last_period = max(short_tweet.rfind('。'), short_tweet.rfind('！'), short_tweet.rfind('？'))
+                                if last_period > max_chars * 0.5:  # 半分以上の文字があれば採用
+                                    short_tweet = short_tweet[:last_period + 1]
+                                # 空文字になった場合は元の短縮版を使用
+                                if not short_tweet.strip():
+                                    short_tweet = first_tweet[:max_chars]
+                            else:
+                                short_tweet = first_tweet
                             
-                            thread_result = response.choices[0].message.content.strip()
+                            # 最終的に空文字の場合は代替テキストを使用
+                            if not short_tweet.strip():
+                                short_tweet = "興味深い内容をシェアします"
                             
-                            # ツイートを解析して分割
-                            import re
-                            tweet_pattern = r'【ツイート\s*(\d+)/(\d+)】([^【]*?)(?=【ツイート|\Z)'
-                            tweets = re.findall(tweet_pattern, thread_result, re.DOTALL)
+                            # 日本語対応URLエンコード
+                            encoded_tweet = urllib.parse.quote(short_tweet, safe='')
+                            x_post_url = f"https://x.com/intent/post?text={encoded_tweet}"
                             
-                            if not tweets:
-                                # パターンマッチしない場合は改行で分割
-                                lines = thread_result.split('\n')
-                                tweets = []
-                                current_tweet = ""
-                                tweet_num = 1
-                                
-                                for line in lines:
-                                    line = line.strip()
-                                    if line and not line.startswith('【'):
-                                        if len(current_tweet + line) <= 140:
-                                            current_tweet += line + " "
-                                        else:
-                                            if current_tweet:
-                                                tweets.append((str(tweet_num), str(len(tweets)+1), current_tweet.strip()))
-                                                tweet_num += 1
-                                            current_tweet = line + " "
-                                
-                                if current_tweet:
-                                    tweets.append((str(tweet_num), str(len(tweets)+1), current_tweet.strip()))
+                            # デバッグ：URL生成をログ出力
+                            logger.info(f"X投稿URL生成: 元テキスト={first_tweet[:50]}...")
+                            logger.info(f"X投稿URL生成: 短縮テキスト={short_tweet[:50]}...")
+                            logger.info(f"X投稿URL生成: URL長={len(x_post_url)}")
                             
-                            if tweets:
-                                # 1ツイート目から画像生成
-                                first_tweet_content = tweets[0][2] if tweets else ""
-                                image_url = await generate_thread_image(first_tweet_content)
-                                
-                                # ヘッダーEmbedを作成
-                                header_embed = discord.Embed(
-                                    title=f"👀 Xツリー投稿（{len(tweets)}ツイート）",
-                                    description="エンゲージメント重視のツリー投稿を生成しました",
-                                    color=0xff6b6b
-                                )
-                                
-                                # 画像を設定
-                                image_file = None
-                                if image_url:
-                                    if image_url.startswith('http'):
-                                        # URL形式の場合
-                                        header_embed.set_image(url=image_url)
-                                        header_embed.add_field(name="🎨", value="AI生成画像付き", inline=True)
-                                    else:
-                                        # ファイルパス形式の場合（base64から生成された一時ファイル）
-                                        import pathlib
-                                        temp_path = pathlib.Path(image_url)
-                                        if temp_path.exists():
-                                            image_file = discord.File(str(temp_path), filename="ai_generated_image.png")
-                                            header_embed.set_image(url="attachment://ai_generated_image.png")
-                                            header_embed.add_field(name="🎨", value="AI生成画像付き", inline=True)
-                                
-                                # 1ツイート目のX投稿リンク
-                                if tweets:
-                                    first_tweet = tweets[0][2].strip()
-                                    import urllib.parse
-                                    # 140文字制限内で適切に切り取り（日本語考慮）
-                                    max_chars = 135  # URL短縮やハッシュタグのためのマージン
-                                    if len(first_tweet) > max_chars:
-                                        # 文末が不自然にならないよう調整
-                                        short_tweet = first_tweet[:max_chars].rstrip('。、！？')
-                                        # 文の途中で切れる場合は前の文で終了
-                                        last_period = max(short_tweet.rfind('。'), short_tweet.rfind('！'), short_tweet.rfind('？'))
-                                        if last_period > max_chars * 0.5:  # 半分以上の文字があれば採用
-                                            short_tweet = short_tweet[:last_period + 1]
-                                        # 空文字になった場合は元の短縮版を使用
-                                        if not short_tweet.strip():
-                                            short_tweet = first_tweet[:max_chars]
-                                    else:
-                                        short_tweet = first_tweet
-                                    
-                                    # 最終的に空文字の場合は代替テキストを使用
-                                    if not short_tweet.strip():
-                                        short_tweet = "興味深い内容をシェアします"
-                                    
-                                    # 日本語対応URLエンコード
-                                    encoded_tweet = urllib.parse.quote(short_tweet, safe='')
-                                    x_post_url = f"https://x.com/intent/post?text={encoded_tweet}"
-                                    
-                                    # デバッグ：URL生成をログ出力
-                                    logger.info(f"X投稿URL生成: 元テキスト={first_tweet[:50]}...")
-                                    logger.info(f"X投稿URL生成: 短縮テキスト={short_tweet[:50]}...")
-                                    logger.info(f"X投稿URL生成: URL長={len(x_post_url)}")
-                                    
-                                    # URL全体が長すぎる場合はシンプルなリンクにする
-                                    if len(x_post_url) > 900:  # 安全マージン
-                                        header_embed.add_field(
-                                            name="🔗 X投稿リンク",
-                                            value="[X で投稿する](https://x.com/intent/post)",
-                                            inline=False
-                                        )
-                                    else:
-                                        header_embed.add_field(
-                                            name="🔗 X投稿リンク",
-                                            value=f"[1ツイート目をXで投稿]({x_post_url})",
-                                            inline=False
-                                        )
-                                
+                            # URL全体が長すぎる場合はシンプルなリンクにする
+                            if len(x_post_url) > 900:  # 安全マージン
                                 header_embed.add_field(
-                                    name="💡 使い方",
-                                    value="各ツイートをコピーして順番にX(旧Twitter)に投稿してください",
+                                    name="🔗 X投稿リンク",
+                                    value="[X で投稿する](https://x.com/intent/post)",
                                     inline=False
                                 )
-                                
-                                # ヘッダーEmbedを送信（画像ファイルがある場合は添付）
-                                if image_file:
-                                    await channel.send(embed=header_embed, file=image_file)
-                                else:
-                                    await channel.send(embed=header_embed)
-                                
-                                # 各ツイートを個別のEmbedとして送信
-                                for i, (tweet_num, total, content) in enumerate(tweets):
-                                    tweet_text = content.strip()
-                                    # Discord Embedのdescription制限は4096文字だが、コードブロック考慮で安全に制限
-                                    if len(tweet_text) > 4000:
-                                        tweet_text = tweet_text[:4000] + "..."
-                                    
-                                    tweet_embed = discord.Embed(
-                                        title=f"📱 ツイート {tweet_num}/{len(tweets)}",
-                                        description=f"```\n{tweet_text}\n```",
-                                        color=0x1da1f2  # Twitter blue
-                                    )
-                                    
-                                    await channel.send(embed=tweet_embed)
-                                logger.info(f"👀ツリー投稿生成完了: {len(tweets)}ツイート")
-                                
-                                # 一時画像ファイルのクリーンアップ
-                                if image_url and not image_url.startswith('http'):
-                                    try:
-                                        import pathlib
-                                        temp_path = pathlib.Path(image_url)
-                                        if temp_path.exists():
-                                            temp_path.unlink()  # ファイル削除
-                                            logger.info(f"一時画像ファイルを削除: {temp_path}")
-                                    except Exception as cleanup_error:
-                                        logger.warning(f"一時ファイル削除エラー: {cleanup_error}")
-                            
                             else:
-                                await channel.send(f"{user.mention} ❌ ツリー投稿の生成に失敗しました。")
+                                header_embed.add_field(
+                                    name="🔗 X投稿リンク",
+                                    value=f"[1ツイート目をXで投稿]({x_post_url})",
+                                    inline=False
+                                )
+                        
+                        header_embed.add_field(
+                            name="💡 使い方",
+                            value="各ツイートをコピーして順番にX(旧Twitter)に投稿してください",
+                            inline=False
+                        )
                         
+                        # ヘッダーEmbedを送信（画像ファイルがある場合は添付）
+                        if image_file:
+                            await outbound.send(channel, embed=header_embed, file=image_file)
                         else:
-                            logger.error("エラー: OpenAI APIキーが設定されていません")
-                            await channel.send(f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
+                            await outbound.send(channel, embed=header_embed)
+                        
+                        # 各ツイートを個別のEmbedとして送信
+                        for i, (tweet_num, total, content) in enumerate(tweets):
+                            tweet_text = content.strip()
+                            # Discord Embedのdescription制限は4096文字だが、コードブロック考慮で安全に制限
+                            if len(tweet_text) > 4000:
+                                tweet_text = tweet_text[:4000] + "..."
+                            
+                            tweet_embed = discord.Embed(
+                                title=f"📱 ツイート {tweet_num}/{len(tweets)}",
+                                description=f"```\n{tweet_text}\n```",
+                                color=0x1da1f2  # Twitter blue
+                            )
+                            
+                            await outbound.send(channel, embed=tweet_embed)
+                        logger.info(f"👀ツリー投稿生成完了: {len(tweets)}ツイート")
+                        
+                        # 一時画像ファイルのクリーンアップ
+                        if image_url and not image_url.startswith('http'):
+                            try:
+                                import pathlib
+                                temp_path = pathlib.Path(image_url)
+                                if temp_path.exists():
+                                    temp_path.unlink()  # ファイル削除
+                                    logger.info(f"一時画像ファイルを削除: {temp_path}")
+                            except Exception as cleanup_error:
+                                logger.warning(f"一時ファイル削除エラー: {cleanup_error}")
                     
-                    except Exception as e:
-                        logger.error(f"👀ツリー投稿生成エラー: {e}")
-                        await channel.send(f"{user.mention} ❌ ツリー投稿の生成中にエラーが発生しました。")
+                    else:
+                        outbound.post(channel, f"{user.mention} ❌ ツリー投稿の生成に失敗しました。")
                 
                 else:
-                    await channel.send(f"{user.mention} ⚠️ メッセージに内容がありません。テキストや添付ファイルがあるメッセージに👀リアクションしてください。")
+                    logger.error("エラー: OpenAI APIキーが設定されていません")
+                    outbound.post(channel, f"{user.mention} ❌ エラーが発生しました。管理者にお問い合わせください。")
+            
+            except Exception as e:
+                logger.error(f"👀ツリー投稿生成エラー: {e}")
+                outbound.post(channel, f"{user.mention} ❌ ツリー投稿の生成中にエラーが発生しました。")
+        
+        else:
+            outbound.post(channel, f"{user.mention} ⚠️ メッセージに内容がありません。テキストや添付ファイルがあるメッセージに👀リアクションしてください。")
+
+@bot.event
+async def on_member_update(before, after):
+    """コミュニティサーバーのロール変更をプレミアム判定のキャッシュに反映"""
+    if after.guild.id != COMMUNITY_SERVER_ID or before.roles == after.roles:
+        return
+    is_premium = member_has_premium_role(after)
+    premium_cache.set(str(after.id), is_premium)
+    logger.info(f"ロール変更を検知: {after.name} ({after.id}) プレミアム={is_premium}")
+
+@bot.event
+async def on_member_remove(member):
+    """コミュニティサーバーから抜けたユーザーのプレミアム判定を取り消す"""
+    if member.guild.id != COMMUNITY_SERVER_ID:
+        return
+    premium_cache.invalidate(str(member.id))
+    logger.info(f"コミュニティサーバーからの退出を検知: {member.name} ({member.id})")
 
 @bot.event
 async def on_message(message):
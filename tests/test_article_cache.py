@@ -0,0 +1,109 @@
+"""
+記事抽出キャッシュのテスト
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+from aiohttp import web
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.article_extractor import ArticleExtractor, normalize_url
+from utils.disk_cache import DiskCache
+from utils.http_client import http_client
+
+ARTICLE_HTML = (
+    "<html><head><title>テスト記事</title></head><body><article>"
+    + "".join(f"<p>これはキャッシュのテスト用の段落です。段落番号は{i}です。</p>" for i in range(40))
+    + "</article></body></html>"
+)
+ETAG = '"v1"'
+
+
+class TestNormalizeUrl(unittest.TestCase):
+    """URL正規化のテストクラス"""
+
+    def test_tracking_params_and_fragment_are_removed(self):
+        """トラッキング用パラメータ・フラグメント・既定ポートが除去され、順序が揃うことを確認"""
+        self.assertEqual(
+            normalize_url("HTTPS://Example.com:443/news?b=2&utm_source=x&a=1&fbclid=abc#top"),
+            "https://example.com/news?a=1&b=2"
+        )
+
+
+class TestArticleCache(unittest.IsolatedAsyncioTestCase):
+    """記事抽出キャッシュのテストクラス"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.requests = []
+        self.peers = set()
+
+        async def handler(request):
+            self.requests.append(request.headers.get("If-None-Match"))
+            self.peers.add(request.transport.get_extra_info("peername"))
+            if request.headers.get("If-None-Match") == ETAG:
+                return web.Response(status=304)
+            return web.Response(text=ARTICLE_HTML, content_type="text/html", headers={"ETag": ETAG})
+
+        app = web.Application()
+        app.router.add_get("/article", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/article"
+
+        # ローカルのテストサーバーに接続するためURL検証は通す
+        self.valid_patch = patch.object(ArticleExtractor, "_is_valid_url", return_value=True)
+        self.valid_patch.start()
+
+    async def asyncTearDown(self):
+        self.valid_patch.stop()
+        await http_client.close()
+        await self.runner.cleanup()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_extractor(self, ttl_sec):
+        extractor = ArticleExtractor()
+        extractor.configure_cache(DiskCache(self.temp_dir), ttl_sec=ttl_sec)
+        return extractor
+
+    async def test_fresh_entry_skips_network_and_parse(self):
+        """TTL内の2回目はリクエストも記事解析も行わないことを確認"""
+        extractor = self.make_extractor(ttl_sec=3600)
+        first = await extractor.fetch_article_content(self.url)
+
+        with patch.object(extractor, "_extract_article_from_html") as mock_extract:
+            second = await extractor.fetch_article_content(self.url + "?utm_source=discord")
+            mock_extract.assert_not_called()
+
+        self.assertIsNone(first[2])
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(extractor.cache_stats["hits"], 1)
+
+    async def test_stale_entry_is_revalidated_with_etag(self):
+        """期限切れ後は If-None-Match で再検証し、304なら解析せずに返すことを確認"""
+        extractor = self.make_extractor(ttl_sec=0)
+        first = await extractor.fetch_article_content(self.url)
+
+        with patch.object(extractor, "_extract_article_from_html") as mock_extract:
+            second = await extractor.fetch_article_content(self.url)
+            mock_extract.assert_not_called()
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.requests, [None, ETAG])
+        # 2回とも共有セッションの同じ接続（keep-alive）が使われる
+        self.assertEqual(len(self.peers), 1)
+        self.assertEqual(extractor.cache_stats["revalidated"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
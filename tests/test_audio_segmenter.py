@@ -0,0 +1,100 @@
+"""
+音声分割（無音位置での分割）のテスト
+"""
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+import numpy as np
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.audio_segmenter import AudioSegmenter, EnergyEnvelope, plan_split_points
+
+
+class TestPlanSplitPoints(unittest.TestCase):
+    """分割点の計画のテストクラス"""
+
+    def test_short_audio_is_not_split(self):
+        """上限以下の長さなら分割しないことを確認"""
+        energy = np.ones(int(500 / 0.05), dtype=np.float32)
+        self.assertEqual(plan_split_points(energy, 0.05, 600), [])
+
+    def test_split_at_quiet_window_before_limit(self):
+        """上限の手前にある無音区間で分割されることを確認"""
+        window_sec = 0.05
+        energy = np.ones(int(1500 / window_sec), dtype=np.float32)
+        # 580〜581秒と1160〜1161秒を無音にする
+        for silence_sec in (580, 1160):
+            energy[int(silence_sec / window_sec):int((silence_sec + 1) / window_sec)] = 0
+
+        points = plan_split_points(energy, window_sec, 600, search_sec=30)
+
+        self.assertEqual(len(points), 2)
+        self.assertTrue(580 <= points[0] <= 581)
+        self.assertTrue(1160 <= points[1] <= 1161)
+
+    def test_every_part_stays_within_limit(self):
+        """無音がどこにあっても全パートが上限以下になることを確認"""
+        window_sec = 0.05
+        energy = np.random.default_rng(0).random(int(7200 / window_sec), dtype=np.float32)
+
+        points = plan_split_points(energy, window_sec, 599, search_sec=30)
+        boundaries = [0.0] + points + [len(energy) * window_sec]
+
+        self.assertEqual(boundaries, sorted(boundaries))
+        self.assertLessEqual(max(np.diff(boundaries)), 599)
+
+    def test_energy_envelope_handles_split_chunks(self):
+        """チャンクの境界が窓の途中でも同じエネルギーになることを確認"""
+        samples = (np.arange(4000) % 200 - 100).astype("<i2").tobytes()
+
+        whole = EnergyEnvelope(400)
+        whole.feed(samples)
+        pieces = EnergyEnvelope(400)
+        for i in range(0, len(samples), 333):
+            pieces.feed(samples[i:i + 333])
+
+        np.testing.assert_allclose(whole.finish(), pieces.finish())
+
+
+@unittest.skipUnless(shutil.which("ffmpeg"), "ffmpegがインストールされていません")
+class TestAudioSegmenterSplit(unittest.IsolatedAsyncioTestCase):
+    """ffmpegを使った分割のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.source_path = self.temp_dir / "source.m4a"
+        # 7秒ごとに1秒の無音が入る300秒の音声
+        subprocess.run([
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "sine=frequency=300:duration=300",
+            "-af", "volume='if(between(mod(t,7),5.5,6.5),0,1)':eval=frame",
+            str(self.source_path)
+        ], check=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_split_lands_in_silence(self):
+        """分割点が無音区間に入り、各パートが上限以下であることを確認"""
+        segmenter = AudioSegmenter(max_segment_sec=120, search_sec=10)
+
+        parts = await segmenter.split(self.source_path, self.temp_dir / "parts")
+
+        self.assertEqual(len(parts), 3)
+        for part in parts:
+            self.assertTrue(part.path.exists())
+            self.assertLessEqual(part.duration_sec, 120)
+        for part in parts[1:]:
+            offset = part.start_sec % 7
+            self.assertTrue(5.4 <= offset <= 6.6, f"無音区間外で分割: {part.start_sec}")
+        self.assertAlmostEqual(parts[-1].end_sec, 300, delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
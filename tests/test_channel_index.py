@@ -0,0 +1,68 @@
+"""
+有効チャンネルインデックスのテスト
+"""
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.channel_index import ActiveChannelIndex
+
+
+class TestActiveChannelIndex(unittest.TestCase):
+    """有効チャンネルインデックスのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.loader_calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def loader(self, server_id):
+        self.loader_calls.append(server_id)
+        if server_id == "200":
+            return {"server_id": "200", "active_channel_ids": ["20"]}
+        return None
+
+    def test_load_all_then_no_disk_reads(self):
+        """起動時に読み込んだサーバーは判定時に読み込み直さないことを確認"""
+        with open(self.temp_dir / "100.json", 'w', encoding='utf-8') as f:
+            json.dump({"server_id": "100", "active_channel_ids": ["10", "11"]}, f)
+        index = ActiveChannelIndex(self.loader)
+
+        self.assertEqual(index.load_all(self.temp_dir), 1)
+
+        self.assertTrue(index.is_active("100", "10"))
+        self.assertTrue(index.is_active(100, 11))
+        self.assertFalse(index.is_active("100", "99"))
+        self.assertEqual(self.loader_calls, [])
+
+    def test_unknown_server_is_loaded_once(self):
+        """未登録のサーバーは1回だけ読み込み、有効チャンネルがなくても記憶することを確認"""
+        index = ActiveChannelIndex(self.loader)
+
+        self.assertTrue(index.is_active("200", "20"))
+        self.assertFalse(index.is_active("300", "30"))
+        self.assertFalse(index.is_active("300", "31"))
+
+        self.assertEqual(self.loader_calls, ["200", "300"])
+
+    def test_set_active_updates_index(self):
+        """/activate・/deactivate の反映を確認"""
+        index = ActiveChannelIndex(self.loader)
+
+        index.set_active("300", "30", True)
+        self.assertTrue(index.is_active("300", "30"))
+
+        index.set_active("300", "30", False)
+        self.assertFalse(index.is_active("300", "30"))
+
+
+if __name__ == '__main__':
+    unittest.main()
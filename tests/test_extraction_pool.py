@@ -0,0 +1,109 @@
+"""
+HTML解析用プロセスプールのテスト
+"""
+import asyncio
+import subprocess
+import tempfile
+import textwrap
+import time
+import unittest
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.article_extractor import ArticleExtractor, extract_article_from_html, truncate_html
+from utils.extraction_pool import ExtractionPool
+
+ARTICLE_HTML = (
+    "<html><head><title>プロセスプールのテスト</title></head><body><article>"
+    + "".join(f"<p>これは別プロセスで解析される段落です。段落番号は{i}です。</p>" for i in range(40))
+    + "</article></body></html>"
+)
+
+
+class TestTruncateHtml(unittest.TestCase):
+    """解析前の切り詰めのテストクラス"""
+
+    def test_cut_before_partial_tag(self):
+        """上限を超えるHTMLはタグの途中ではなく直前の '<' で切られることを確認"""
+        html = "<p>あいう</p><p>えお</p>"
+        self.assertEqual(truncate_html(html, 12), "<p>あいう</p>")
+        self.assertEqual(truncate_html(html, 1000), html)
+
+
+class TestExtractionPool(unittest.IsolatedAsyncioTestCase):
+    """プロセスプールのテストクラス"""
+
+    async def asyncSetUp(self):
+        self.pool = ExtractionPool(max_workers=1, task_timeout_sec=5)
+
+    async def asyncTearDown(self):
+        await self.pool.shutdown()
+
+    async def test_extraction_runs_in_worker_process(self):
+        """別プロセスで抽出した結果がその場で抽出した結果と同じになることを確認"""
+        result = await self.pool.run(extract_article_from_html, ARTICLE_HTML)
+        self.assertEqual(result, extract_article_from_html(ARTICLE_HTML))
+        self.assertEqual(self.pool.completed, 1)
+
+    async def test_timeout_recreates_pool(self):
+        """タイムアウトしたタスクの子プロセスを止め、次のタスクは新しいプールで動くことを確認"""
+        self.pool.task_timeout_sec = 0.5
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.pool.run(time.sleep, 30)
+
+        self.pool.task_timeout_sec = 5
+        title, content = await self.pool.run(extract_article_from_html, ARTICLE_HTML)
+        self.assertEqual(self.pool.timeouts, 1)
+        self.assertIn("段落番号は39", content)
+
+    async def test_article_extractor_uses_pool(self):
+        """プールを設定した ArticleExtractor が別プロセスで抽出することを確認"""
+        extractor = ArticleExtractor()
+        extractor.configure_pool(self.pool)
+        title, content = await extractor._extract(ARTICLE_HTML)
+        self.assertIn("段落番号は0", content)
+        self.assertEqual(self.pool.completed, 1)
+
+
+class TestWorkerStartup(unittest.TestCase):
+    """子プロセスの起動時に起動スクリプトを読み込み直さないことのテスト"""
+
+    def test_workers_do_not_rerun_main_script(self):
+        """タイムアウトでプールを作り直しても、起動スクリプトのトップレベルは親プロセスで1回しか実行されないことを確認"""
+        script = textwrap.dedent(f"""
+            import asyncio, sys, time
+            sys.path.insert(0, {str(Path(__file__).parent.parent)!r})
+            print("SCRIPT_BODY", __name__, flush=True)
+            from utils.article_extractor import extract_article_from_html
+            from utils.extraction_pool import ExtractionPool
+
+            async def run():
+                pool = ExtractionPool(max_workers=2, task_timeout_sec=0.5)
+                try:
+                    await pool.run(time.sleep, 30)
+                except asyncio.TimeoutError:
+                    pass
+                pool.task_timeout_sec = 10
+                results = await asyncio.gather(*(pool.run(extract_article_from_html, {ARTICLE_HTML!r}) for _ in range(3)))
+                print("TITLE", results[0][0], flush=True)
+                await pool.shutdown()
+
+            if __name__ == "__main__":
+                asyncio.run(run())
+        """)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            script_path = Path(temp_dir) / "bot_main.py"
+            script_path.write_text(script, encoding="utf-8")
+            completed = subprocess.run([sys.executable, str(script_path)], capture_output=True,
+                                       text=True, timeout=60, cwd=temp_dir)
+
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(completed.stdout.count("SCRIPT_BODY"), 1, completed.stdout)
+        self.assertIn("TITLE プロセスプールのテスト", completed.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
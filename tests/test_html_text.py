@@ -0,0 +1,55 @@
+"""
+HTML→テキスト変換のテスト
+"""
+import time
+import unittest
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.html_text import HTMLTextExtractor, html_to_text
+
+
+class TestHtmlToText(unittest.TestCase):
+    """html_to_text のテストクラス"""
+
+    def test_script_style_and_json_ld_are_dropped(self):
+        """script・style・JSON-LD の中身が本文に混ざらないことを確認"""
+        html = (
+            '<html><head><style>.a { color: red; }</style>'
+            '<script type="application/ld+json">{"headline": "隠す"}</script></head>'
+            '<body><p>本文</p><script>if (a < b) { alert("x"); }</script></body></html>'
+        )
+        self.assertEqual(html_to_text(html), "本文")
+
+    def test_paragraph_and_line_breaks(self):
+        """段落は空行、div・br は改行で区切られることを確認"""
+        html = "<h1>見出し</h1><p>1行目<br>2行目</p><div>A</div><div>B</div><ul><li>項目1</li><li>項目2</li></ul>"
+        self.assertEqual(html_to_text(html), "見出し\n\n1行目\n2行目\n\nA\nB\n\n項目1\n項目2")
+
+    def test_braces_and_entities_in_text_are_kept(self):
+        """本文中の波括弧は消さず、文字参照は展開されることを確認"""
+        html = "<p>関数 f(x) { return x; } &amp; &lt;tag&gt;</p>"
+        self.assertEqual(html_to_text(html), "関数 f(x) { return x; } & <tag>")
+
+    def test_streaming_feed_matches_single_feed(self):
+        """小分けに feed しても一度に渡した場合と同じ結果になることを確認"""
+        html = "<html><body>" + "".join(f"<p>段落{i}</p><script>var x = {i};</script>" for i in range(50)) + "</body></html>"
+        extractor = HTMLTextExtractor()
+        for i in range(0, len(html), 7):
+            extractor.feed(html[i:i + 7])
+        self.assertEqual(extractor.text(), html_to_text(html))
+
+    def test_unbalanced_braces_are_linear(self):
+        """閉じ括弧のない波括弧が大量にあっても短時間で終わることを確認"""
+        html = "<p>" + "a{b " * 50000 + "</p>"
+        start = time.perf_counter()
+        text = html_to_text(html)
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertTrue(text.startswith("a{b a{b"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+HTTPクライアント（文字コード判定・サイズ上限付き取得）のテスト
+"""
+import codecs
+import unittest
+from pathlib import Path
+import sys
+
+from aiohttp import web
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.http_client import HttpClient, detect_charset
+
+
+class TestDetectCharset(unittest.TestCase):
+    """文字コード判定のテストクラス"""
+
+    def test_header_takes_priority_over_meta(self):
+        """Content-Type ヘッダーの charset が meta タグより優先されることを確認"""
+        head = b'<html><head><meta charset="EUC-JP"></head>'
+        self.assertEqual(detect_charset("text/html; charset=UTF-8", head), "utf-8")
+
+    def test_meta_charset_and_shift_jis_alias(self):
+        """ヘッダーに charset がなければ meta タグを使い、Shift_JIS は cp932 で読むことを確認"""
+        head = b'<html><head><meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">'
+        self.assertEqual(detect_charset("text/html", head), "cp932")
+
+    def test_bom_and_default(self):
+        """BOM があれば最優先し、手がかりがなければ既定値になることを確認"""
+        self.assertEqual(detect_charset("text/html; charset=cp932", codecs.BOM_UTF8 + b"<html>"), "utf-8-sig")
+        self.assertEqual(detect_charset(None, b"<html>"), "utf-8")
+        self.assertEqual(detect_charset("text/html; charset=unknown-xyz", b"<html>"), "utf-8")
+
+
+class TestFetchText(unittest.IsolatedAsyncioTestCase):
+    """ストリーミング取得のテストクラス"""
+
+    async def asyncSetUp(self):
+        async def sjis_page(request):
+            body = '<html><head><meta charset="Shift_JIS"></head><body>日本語のページ</body></html>'
+            return web.Response(body=body.encode("cp932"), content_type="text/html")
+
+        async def huge_page(request):
+            return web.Response(body=b"a" * (1024 * 1024), content_type="text/plain")
+
+        app = web.Application()
+        app.router.add_get("/sjis", sjis_page)
+        app.router.add_get("/huge", huge_page)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        self.client = HttpClient()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_decodes_with_meta_charset(self):
+        """meta タグの文字コードで1回だけデコードされることを確認"""
+        status, text = await self.client.fetch_text(f"{self.base_url}/sjis")
+        self.assertEqual(status, 200)
+        self.assertIn("日本語のページ", text)
+
+    async def test_body_is_capped_at_max_bytes(self):
+        """max_bytes を超える本文は上限で打ち切られることを確認"""
+        status, text = await self.client.fetch_text(f"{self.base_url}/huge", max_bytes=100 * 1024)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(text), 100 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
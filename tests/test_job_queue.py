@@ -0,0 +1,101 @@
+"""
+ジョブキューのテスト
+"""
+import asyncio
+import unittest
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.job_queue import Job, JobQueue, JobType, QueueFullError
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    """ジョブキューのテストクラス"""
+
+    async def asyncTearDown(self):
+        """テスト後にワーカーを停止"""
+        await self.queue.stop()
+
+    async def test_jobs_run_concurrently_up_to_worker_count(self):
+        """ワーカー数までジョブが並行実行されることを確認"""
+        self.queue = JobQueue(worker_count=3, max_queue_size=10)
+        running = 0
+        peak = 0
+
+        async def handler():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+        for _ in range(6):
+            await self.queue.submit(Job(JobType.EXPLAIN, handler))
+        await self.queue.join()
+
+        self.assertEqual(peak, 3)
+
+    async def test_feature_limit_does_not_block_other_features(self):
+        """機能ごとの上限に達しても他の機能のジョブは実行されることを確認"""
+        self.queue = JobQueue(worker_count=2, max_queue_size=10, feature_limits={"transcription": 1})
+        release = asyncio.Event()
+        order = []
+
+        async def slow_transcription():
+            order.append("transcription")
+            await release.wait()
+
+        async def explain():
+            order.append("explain")
+            release.set()
+
+        await self.queue.submit(Job(JobType.TRANSCRIPTION, slow_transcription))
+        await self.queue.submit(Job(JobType.TRANSCRIPTION, slow_transcription))
+        await self.queue.submit(Job(JobType.EXPLAIN, explain))
+        await asyncio.wait_for(self.queue.join(), timeout=1)
+
+        # 2件目の文字起こしより先に解説が実行される
+        self.assertEqual(order, ["transcription", "explain", "transcription"])
+
+    async def test_queue_position_and_full_error(self):
+        """混雑時の順番待ち位置と上限超過時の例外を確認"""
+        self.queue = JobQueue(worker_count=1, max_queue_size=2)
+        release = asyncio.Event()
+
+        async def blocking():
+            await release.wait()
+
+        self.assertEqual(await self.queue.submit(Job(JobType.MEMO, blocking)), 0)
+        await asyncio.sleep(0)  # ワーカーにジョブを取らせる
+        self.assertEqual(await self.queue.submit(Job(JobType.MEMO, blocking)), 1)
+        self.assertEqual(await self.queue.submit(Job(JobType.MEMO, blocking)), 2)
+
+        with self.assertRaises(QueueFullError):
+            await self.queue.submit(Job(JobType.MEMO, blocking))
+
+        release.set()
+        await asyncio.wait_for(self.queue.join(), timeout=1)
+
+    async def test_failing_job_does_not_stop_worker(self):
+        """ジョブが例外を出してもワーカーが処理を続けることを確認"""
+        self.queue = JobQueue(worker_count=1, max_queue_size=10)
+        done = []
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        async def succeeding():
+            done.append(True)
+
+        await self.queue.submit(Job(JobType.X_POST, failing))
+        await self.queue.submit(Job(JobType.X_POST, succeeding))
+        await asyncio.wait_for(self.queue.join(), timeout=1)
+
+        self.assertEqual(done, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+"""
+LLM応答キャッシュ・ディスクキャッシュのテスト
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.disk_cache import DiskCache, hash_key
+from utils.llm_cache import LLMResponseCache
+
+
+class FakeChatClient:
+    """chat.completions.create を模倣し、呼び出し回数を数えるクライアント"""
+
+    def __init__(self, finish_reason="stop"):
+        self.calls = 0
+        self.finish_reason = finish_reason
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, temperature, **options):
+        self.calls += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(content=f"応答{self.calls}"),
+                finish_reason=self.finish_reason
+            )],
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=500)
+        )
+
+
+class FakeStreamingClient:
+    """stream=True の chat.completions.create を模倣し、応答を断片に分けて返すクライアント"""
+
+    def __init__(self, pieces, finish_reason="stop"):
+        self.calls = 0
+        self.pieces = pieces
+        self.finish_reason = finish_reason
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, temperature, stream=False, **options):
+        self.calls += 1
+        assert stream
+
+        async def chunks():
+            for index, piece in enumerate(self.pieces):
+                last = index == len(self.pieces) - 1
+                yield SimpleNamespace(
+                    choices=[SimpleNamespace(
+                        delta=SimpleNamespace(content=piece),
+                        finish_reason=self.finish_reason if last else None
+                    )],
+                    usage=None
+                )
+            # include_usage 指定時の最後のチャンク（choices が空）
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=500))
+
+        return chunks()
+
+
+MESSAGES = [
+    {"role": "system", "content": "解説してください"},
+    {"role": "user", "content": "非同期処理とは？"}
+]
+
+
+class TestLLMResponseCache(unittest.IsolatedAsyncioTestCase):
+    """LLM応答キャッシュのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_cache(self, features=("explain",)):
+        return LLMResponseCache(DiskCache(self.temp_dir), enabled_features=features, memory_entries=2)
+
+    async def test_same_request_is_served_from_cache(self):
+        """同じ機能・モデル・入力の2回目はAPIを呼ばないことを確認"""
+        client = FakeChatClient()
+        cache = self.make_cache()
+
+        first = await cache.complete(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7, max_tokens=2000)
+        second = await cache.complete(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7, max_tokens=2000)
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.calls, 1)
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertAlmostEqual(stats["saved_usd"], (1000 * 2.00 + 500 * 8.00) / 1_000_000)
+
+    async def test_key_includes_model_and_input(self):
+        """モデルや入力が違えば別の応答になることを確認"""
+        client = FakeChatClient()
+        cache = self.make_cache()
+
+        await cache.complete(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+        await cache.complete(client, "explain", model="gpt-4.1-mini", messages=MESSAGES, temperature=0.7)
+        other_input = MESSAGES[:1] + [{"role": "user", "content": "並列処理とは？"}]
+        await cache.complete(client, "explain", model="gpt-4.1", messages=other_input, temperature=0.7)
+
+        self.assertEqual(client.calls, 3)
+
+    async def test_disabled_feature_always_calls_api(self):
+        """キャッシュを有効にしていない機能は毎回APIを呼ぶことを確認"""
+        client = FakeChatClient()
+        cache = self.make_cache()
+
+        await cache.complete(client, "x_post", model="gpt-4.1", messages=MESSAGES, temperature=0.9)
+        await cache.complete(client, "x_post", model="gpt-4.1", messages=MESSAGES, temperature=0.9)
+
+        self.assertEqual(client.calls, 2)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    async def test_disk_tier_survives_restart(self):
+        """再起動（新しいインスタンス）後もディスクから応答を返すことを確認"""
+        client = FakeChatClient()
+        await self.make_cache().complete(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+
+        cache = self.make_cache()
+        await cache.complete(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    async def test_truncated_response_is_not_cached(self):
+        """max_tokensで打ち切られた応答はキャッシュしないことを確認"""
+        client = FakeChatClient(finish_reason="length")
+        cache = self.make_cache()
+
+        await cache.complete(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+        await cache.complete(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+
+        self.assertEqual(client.calls, 2)
+
+
+class TestLLMResponseCacheStream(unittest.IsolatedAsyncioTestCase):
+    """ストリーミング生成のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_cache(self, features=("explain",)):
+        return LLMResponseCache(DiskCache(self.temp_dir), enabled_features=features, memory_entries=2)
+
+    async def test_stream_reports_progress_and_returns_full_text(self):
+        """届いた分の全文を順に渡し、最後に全文を返すことを確認"""
+        client = FakeStreamingClient(["非同期", "処理は", "待ち時間を重ねる"])
+        cache = self.make_cache()
+        progress = []
+
+        content = await cache.stream(client, "explain", model="gpt-4.1", messages=MESSAGES,
+                                     on_text=progress.append, temperature=0.7)
+
+        self.assertEqual(content, "非同期処理は待ち時間を重ねる")
+        self.assertEqual(progress, ["非同期", "非同期処理は", "非同期処理は待ち時間を重ねる"])
+
+    async def test_stream_shares_cache_with_complete(self):
+        """ストリーミングで生成した応答を complete でも使い回すことを確認"""
+        client = FakeStreamingClient(["応答", "本文"])
+        cache = self.make_cache()
+
+        await cache.stream(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7, max_tokens=2000)
+        content = await cache.complete(FakeChatClient(), "explain", model="gpt-4.1", messages=MESSAGES,
+                                       temperature=0.7, max_tokens=2000)
+
+        self.assertEqual(content, "応答本文")
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertAlmostEqual(cache.stats()["saved_usd"], (1000 * 2.00 + 500 * 8.00) / 1_000_000)
+
+    async def test_stream_cache_hit_reports_once(self):
+        """キャッシュにあればAPIを呼ばず、全文を1回だけ渡すことを確認"""
+        client = FakeStreamingClient(["応答"])
+        cache = self.make_cache()
+        await cache.stream(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+
+        progress = []
+        await cache.stream(client, "explain", model="gpt-4.1", messages=MESSAGES, on_text=progress.append, temperature=0.7)
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(progress, ["応答"])
+
+    async def test_truncated_stream_is_not_cached(self):
+        """打ち切られたストリーミング応答はキャッシュしないことを確認"""
+        client = FakeStreamingClient(["途中"], finish_reason="length")
+        cache = self.make_cache()
+
+        await cache.stream(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+        await cache.stream(client, "explain", model="gpt-4.1", messages=MESSAGES, temperature=0.7)
+
+        self.assertEqual(client.calls, 2)
+
+
+class TestDiskCache(unittest.TestCase):
+    """ディスクキャッシュのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_eviction_removes_least_recently_used(self):
+        """サイズ上限を超えたら最後に使われたのが古いものから削除されることを確認"""
+        cache = DiskCache(self.temp_dir, max_bytes=3000)
+        keys = [hash_key("entry", i) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.set(key, {"body": "x" * 900})
+            path = cache._path(key)
+            os.utime(path, (1000 + i, 1000 + i))
+
+        # 一番古いエントリを使うと、次に古いものが削除対象になる
+        self.assertIsNotNone(cache.get(keys[0]))
+        cache.set(hash_key("entry", 3), {"body": "x" * 900})
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertLessEqual(cache.total_bytes, 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+キュー経由のログ出力（まとめ書き・ローテーション）のテスト
+"""
+import io
+import logging
+import logging.handlers
+import queue
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.log_handler import BatchingFileHandler, BatchingQueueListener, setup_queue_logging
+
+
+class TestBatchingLog(unittest.TestCase):
+    """まとめ書きログのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.log_file = self.temp_dir / "log.txt"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_logger(self, handler, name):
+        log_queue = queue.SimpleQueue()
+        listener = BatchingQueueListener(log_queue, [handler])
+        logger = logging.getLogger(name)
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        logger.addHandler(queue_handler)
+        self.addCleanup(logger.removeHandler, queue_handler)
+        return logger, listener
+
+    def test_records_are_written_in_batches(self):
+        """キューにたまったレコードが少ない回数の書き込みでまとめて出力されることを確認"""
+        handler = BatchingFileHandler(self.log_file)
+        handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+        logger, listener = self.make_logger(handler, "test_batching_log")
+
+        # スレッド開始前に積んでおき、まとめて処理されるようにする
+        for i in range(1000):
+            logger.info(f"メッセージ{i}")
+        with patch("builtins.open", wraps=open) as mock_open:
+            listener.start()
+            listener.stop()
+
+        lines = self.log_file.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 1000)
+        self.assertEqual(lines[-1], "INFO - メッセージ999")
+        self.assertLessEqual(mock_open.call_count, 2)  # batch_size=500 ごとに1回
+
+    def test_rotation_by_size(self):
+        """サイズ超過でローテーションし、backup_count を超える古いファイルは残らないことを確認"""
+        self.log_file.write_text("x" * 200, encoding="utf-8")
+        handler = BatchingFileHandler(self.log_file, max_bytes=100, backup_count=2)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        for i in range(3):
+            handler.handle(logging.makeLogRecord({"msg": "y" * 150, "levelno": logging.INFO}))
+            handler.flush()
+
+        self.assertTrue((self.temp_dir / "log.txt.1").exists())
+        self.assertTrue((self.temp_dir / "log.txt.2").exists())
+        self.assertFalse((self.temp_dir / "log.txt.3").exists())
+
+    def test_no_stat_per_record(self):
+        """サイズはメモリ上で数え、ファイルの stat は最初の書き込み時だけであることを確認"""
+        handler = BatchingFileHandler(self.log_file)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        with patch.object(Path, "stat", autospec=True, side_effect=Path.stat) as mock_stat:
+            for i in range(50):
+                handler.handle(logging.makeLogRecord({"msg": f"行{i}", "levelno": logging.INFO}))
+                handler.flush()
+            # exists() の内部の stat と、サイズ取得の stat の2回まで
+            self.assertLessEqual(mock_stat.call_count, 2)
+
+        self.assertEqual(len(self.log_file.read_text(encoding="utf-8").splitlines()), 50)
+
+    def test_exception_text_is_kept(self):
+        """例外付きのログもトレースバックごとファイルに書かれることを確認"""
+        handler = BatchingFileHandler(self.log_file)
+        logger, listener = self.make_logger(handler, "test_batching_log_exc")
+        listener.start()
+        try:
+            raise ValueError("テスト例外")
+        except ValueError:
+            logger.exception("失敗しました")
+        listener.stop()
+
+        content = self.log_file.read_text(encoding="utf-8")
+        self.assertIn("失敗しました", content)
+        self.assertIn("ValueError: テスト例外", content)
+
+
+class TestSetupQueueLogging(unittest.TestCase):
+    """setup_queue_logging のテストクラス"""
+
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.saved_handlers = list(self.root.handlers)
+        self.saved_level = self.root.level
+        # 既に設定済みの QueueHandler（main の読み込みなど）を外して試す
+        for handler in self.saved_handlers:
+            self.root.removeHandler(handler)
+
+    def tearDown(self):
+        for handler in list(self.root.handlers):
+            self.root.removeHandler(handler)
+        for handler in self.saved_handlers:
+            self.root.addHandler(handler)
+        self.root.setLevel(self.saved_level)
+
+    def test_second_call_reuses_listener(self):
+        """2回呼んでも QueueHandler は1つだけで、レコードが二重に書き込まれないことを確認"""
+        stream = io.StringIO()
+        first_handler = logging.StreamHandler(stream)
+        first = setup_queue_logging([first_handler])
+        second = setup_queue_logging([logging.StreamHandler(stream)])
+        self.addCleanup(first.stop)
+
+        self.assertIs(first, second)
+        self.assertEqual(sum(isinstance(h, logging.handlers.QueueHandler) for h in self.root.handlers), 1)
+
+        logging.getLogger("test_setup_queue_logging").info("一度だけ")
+        first.stop()
+        self.assertEqual(stream.getvalue().count("一度だけ"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+送信スケジューラーのテスト
+"""
+import asyncio
+import time
+import unittest
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.outbound import OutboundScheduler, RateLimitTracker, split_text
+
+
+class FakeMessage:
+    """add_reaction を記録するメッセージ"""
+
+    def __init__(self, channel, fail_on=None):
+        self.channel = channel
+        self.fail_on = fail_on
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(0)
+        if emoji == self.fail_on:
+            raise RuntimeError("Unknown Emoji")
+        self.reactions.append(emoji)
+        self.channel.log.append(("reaction", emoji))
+
+
+class FakeChannel:
+    """send の呼び出しを記録するチャンネル"""
+
+    def __init__(self, channel_id=1, delay=0.0):
+        self.id = channel_id
+        self.delay = delay
+        self.log = []
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        self.sent.append(content)
+        self.log.append(("send", content))
+        return FakeMessage(self)
+
+
+class TestSplitText(unittest.TestCase):
+    """分割のテスト"""
+
+    def test_split_prefers_newlines(self):
+        """上限以内では改行の位置で切る"""
+        text = "a" * 10 + "\n" + "b" * 10
+        self.assertEqual(split_text(text, 15), ["a" * 10, "b" * 10])
+
+    def test_split_without_newlines(self):
+        """改行がなければ上限ちょうどで切る"""
+        chunks = split_text("x" * 25, 10)
+        self.assertEqual(chunks, ["x" * 10, "x" * 10, "x" * 5])
+
+
+class TestRateLimitTracker(unittest.TestCase):
+    """レート制限の記録のテスト"""
+
+    def test_delay_only_when_exhausted(self):
+        """残り回数がある間は待たず、0になったらリセットまで待つ"""
+        tracker = RateLimitTracker()
+        path = "/api/v10/channels/42/messages"
+        tracker.observe("POST", path, 200, {"X-RateLimit-Remaining": "3", "X-RateLimit-Reset-After": "2.0"})
+        self.assertEqual(tracker.delay(42, "send"), 0.0)
+
+        tracker.observe("POST", path, 200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "2.0"})
+        self.assertGreater(tracker.delay(42, "send"), 1.5)
+        # 別の操作・別のチャンネルには影響しない
+        self.assertEqual(tracker.delay(42, "reaction"), 0.0)
+        self.assertEqual(tracker.delay(43, "send"), 0.0)
+
+    def test_reaction_path_and_429(self):
+        """リアクション追加の429は Retry-After まで待つ"""
+        tracker = RateLimitTracker()
+        tracker.observe("PUT", "/api/v10/channels/7/messages/9/reactions/%F0%9F%91%8D/@me", 429,
+                        {"Retry-After": "1.0"})
+        self.assertGreater(tracker.delay(7, "reaction"), 0.5)
+
+    def test_ignores_other_routes(self):
+        """送信・リアクション以外の応答は記録しない"""
+        tracker = RateLimitTracker()
+        tracker.observe("GET", "/api/v10/channels/42/messages", 200,
+                        {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "5"})
+        self.assertEqual(tracker.delay(42, "send"), 0.0)
+
+
+class TestOutboundScheduler(unittest.IsolatedAsyncioTestCase):
+    """スケジューラーのテスト"""
+
+    async def _drain(self, scheduler):
+        while scheduler._workers:
+            await asyncio.gather(*scheduler._workers.values())
+
+    async def test_posts_are_coalesced(self):
+        """続けて積んだ通知は2000文字以内で1通にまとまる"""
+        scheduler = OutboundScheduler()
+        channel = FakeChannel()
+        scheduler.post(channel, "🎉 完了")
+        scheduler.post(channel, "-" * 30)
+        scheduler.post(channel, "本文")
+        await self._drain(scheduler)
+
+        self.assertEqual(channel.sent, ["🎉 完了\n" + "-" * 30 + "\n本文"])
+        self.assertEqual(scheduler.stats["coalesced"], 2)
+
+    async def test_long_post_is_split_within_limit(self):
+        """長いテキストは上限以内のメッセージに分けて送る"""
+        scheduler = OutboundScheduler()
+        channel = FakeChannel()
+        text = "\n".join("行" * 90 for _ in range(60))  # 約5400文字
+        scheduler.post(channel, text)
+        await self._drain(scheduler)
+
+        self.assertGreater(len(channel.sent), 1)
+        self.assertTrue(all(len(content) <= 2000 for content in channel.sent))
+        self.assertEqual("\n".join(channel.sent), text)
+
+    async def test_operations_keep_order_per_channel(self):
+        """同じチャンネルの送信・リアクションは積んだ順に実行される"""
+        scheduler = OutboundScheduler()
+        channel = FakeChannel(delay=0.01)
+        scheduler.post(channel, "最初")
+        message = await scheduler.send(channel, "ファイル")
+        await scheduler.add_reactions(message, ["👍", "❓"])
+
+        self.assertEqual(channel.log, [("send", "最初"), ("send", "ファイル"), ("reaction", "👍"), ("reaction", "❓")])
+
+    async def test_channels_run_independently(self):
+        """別チャンネルの送信は並行して進む"""
+        scheduler = OutboundScheduler()
+        channels = [FakeChannel(channel_id=i, delay=0.1) for i in range(5)]
+        start = time.perf_counter()
+        await asyncio.gather(*(scheduler.send(channel, "hi") for channel in channels))
+        self.assertLess(time.perf_counter() - start, 0.4)
+
+    async def test_waits_when_rate_limit_exhausted(self):
+        """残り回数が0のときだけリセットまで待ってから送る"""
+        tracker = RateLimitTracker()
+        tracker.observe("POST", "/api/v10/channels/1/messages", 200,
+                        {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.2"})
+        scheduler = OutboundScheduler(tracker)
+        channel = FakeChannel()
+        start = time.perf_counter()
+        await scheduler.send(channel, "hi")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.15)
+        self.assertGreater(scheduler.stats["waited_sec"], 0)
+
+    async def test_add_reactions_tolerates_failures(self):
+        """失敗したリアクションがあっても残りは追加される"""
+        scheduler = OutboundScheduler()
+        channel = FakeChannel()
+        message = FakeMessage(channel, fail_on="❓")
+        with self.assertLogs("utils.outbound", level="WARNING"):
+            added = await scheduler.add_reactions(message, ["👍", "❓", "✏️", "📝"])
+
+        self.assertEqual(added, 3)
+        self.assertEqual(message.reactions, ["👍", "✏️", "📝"])
+
+    async def test_send_error_propagates(self):
+        """send の例外は呼び出し元に伝わり、後続の送信は続く"""
+        scheduler = OutboundScheduler()
+        channel = FakeChannel()
+
+        async def broken_send(content=None, **kwargs):
+            raise RuntimeError("Forbidden")
+
+        original = channel.send
+        channel.send = broken_send
+        with self.assertRaises(RuntimeError):
+            await scheduler.send(channel, "x")
+        channel.send = original
+        await scheduler.send(channel, "y")
+        self.assertEqual(channel.sent, ["y"])
+
+
+if __name__ == '__main__':
+    unittest.main()
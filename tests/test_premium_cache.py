@@ -0,0 +1,120 @@
+"""
+プレミアム判定キャッシュのテスト
+"""
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pathlib import Path
+import sys
+
+# テスト対象のmain.pyをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import discord
+
+from utils.ttl_cache import TTLCache
+
+PREMIUM_ROLE_ID = 111
+COMMUNITY_SERVER_ID = 222
+
+
+def make_member(user_id, role_ids):
+    member = MagicMock()
+    member.id = user_id
+    member.name = f"user{user_id}"
+    member.guild.id = COMMUNITY_SERVER_ID
+    member.roles = [MagicMock(id=role_id) for role_id in role_ids]
+    return member
+
+
+class TestTTLCache(unittest.TestCase):
+    """TTLキャッシュのテストクラス"""
+
+    def test_expiry_and_size_limit(self):
+        """TTL経過で消え、件数上限で古いものから捨てられることを確認"""
+        cache = TTLCache(ttl_sec=10, max_entries=2)
+        with patch('utils.ttl_cache.time.monotonic', return_value=0.0):
+            cache.set("a", True)
+            cache.set("b", False)
+            cache.set("c", True)
+            self.assertIsNone(cache.get("a"))
+            self.assertFalse(cache.get("b"))
+        with patch('utils.ttl_cache.time.monotonic', return_value=10.0):
+            self.assertIsNone(cache.get("c"))
+
+
+class TestPremiumCache(unittest.IsolatedAsyncioTestCase):
+    """is_premium_user のキャッシュのテストクラス"""
+
+    def setUp(self):
+        import main
+        self.main = main
+        self.guild = MagicMock()
+        self.guild.owner_id = 1
+        self.guild.name = "Community"
+        self.guild.get_member.return_value = None
+        self.guild.fetch_member = AsyncMock(return_value=make_member(67890, [PREMIUM_ROLE_ID]))
+        self.bot = MagicMock()
+        self.bot.get_guild.return_value = self.guild
+
+        self.patches = [
+            patch.object(main, "bot", self.bot),
+            patch.object(main, "premium_cache", TTLCache(ttl_sec=600)),
+            patch.object(main, "COMMUNITY_SERVER_ID", COMMUNITY_SERVER_ID),
+            patch.object(main, "PREMIUM_ROLE_ID", PREMIUM_ROLE_ID),
+            patch.object(main, "OWNER_USER_ID", "999"),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    async def test_second_check_does_not_touch_network(self):
+        """2回目以降の判定はAPIを呼ばないことを確認"""
+        self.assertTrue(await self.main.is_premium_user(67890))
+        self.assertTrue(await self.main.is_premium_user("67890"))
+        self.assertEqual(self.guild.fetch_member.await_count, 1)
+
+    async def test_owner_skips_guild_lookup(self):
+        """設定ファイルのオーナーはサーバーを参照せずにプレミアム扱いになることを確認"""
+        self.assertTrue(await self.main.is_premium_user("999"))
+        self.bot.get_guild.assert_not_called()
+
+    async def test_member_update_refreshes_cache(self):
+        """ロールが外れたイベントでキャッシュが更新されることを確認"""
+        self.assertTrue(await self.main.is_premium_user(67890))
+
+        before = make_member(67890, [PREMIUM_ROLE_ID])
+        after = make_member(67890, [])
+        await self.main.on_member_update(before, after)
+
+        self.assertFalse(await self.main.is_premium_user(67890))
+        self.assertEqual(self.guild.fetch_member.await_count, 1)
+
+    async def test_transient_error_is_not_cached(self):
+        """一時的なエラーはキャッシュせず次回また判定することを確認"""
+        self.guild.fetch_member = AsyncMock(side_effect=discord.Forbidden(MagicMock(status=403), "forbidden"))
+
+        self.assertFalse(await self.main.is_premium_user(67890))
+        self.assertFalse(await self.main.is_premium_user(67890))
+        self.assertEqual(self.guild.fetch_member.await_count, 2)
+
+    async def test_quota_prefilter_uses_cache_only(self):
+        """利用上限の事前フィルタはプレミアム判定のキャッシュだけを見て、APIを呼ばないことを確認"""
+        store = MagicMock()
+        store.peek_quota.return_value = self.main.FREE_USER_DAILY_LIMIT
+        payload = MagicMock(user_id=67890)
+        with patch.object(self.main, "get_user_store", return_value=store):
+            # 未判定なら通し、正式な判定は処理側に任せる
+            self.assertTrue(self.main._is_within_quota(payload))
+            self.main.premium_cache.set("67890", False)
+            self.assertFalse(self.main._is_within_quota(payload))
+            self.main.premium_cache.set("67890", True)
+            self.assertTrue(self.main._is_within_quota(payload))
+        self.guild.fetch_member.assert_not_awaited()
+        self.bot.get_guild.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+進捗表示・文字起こしプレビューのテスト
+"""
+import asyncio
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.outbound import OutboundScheduler
+from utils.progress_status import ProgressStatus
+
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        self.edits = []
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        self.content = content
+        self.edits.append(content)
+        return self
+
+
+class FakeChannel:
+    def __init__(self):
+        self.id = 1
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(self, content)
+        self.messages.append(message)
+        return message
+
+
+class TestProgressStatus(unittest.IsolatedAsyncioTestCase):
+    """ProgressStatus のテストクラス"""
+
+    async def test_eta_from_measured_throughput(self):
+        """この実行で完了したパートのペースから残り時間を計算することを確認"""
+        progress = ProgressStatus(OutboundScheduler(), FakeChannel(), "見出し")
+        with patch("utils.progress_status.time.monotonic", return_value=100.0):
+            progress.start_parts(10, done=2)
+        self.assertIsNone(progress.eta_sec())
+        self.assertIn("残り時間を計測中", progress.render())
+
+        with patch("utils.progress_status.time.monotonic", return_value=160.0):
+            progress.done_parts = 5  # この実行で3パート（1パート20秒）
+            self.assertAlmostEqual(progress.eta_sec(), 100.0)
+            self.assertIn("5/10パート (50%)", progress.render())
+            self.assertIn("残り約 1:40", progress.render())
+
+    async def test_single_message_is_edited(self):
+        """進捗は送信済みのメッセージ1通を編集して表示し、最後に完了表示へ置き換えることを確認"""
+        channel = FakeChannel()
+        scheduler = OutboundScheduler()
+        progress = ProgressStatus(scheduler, channel, "🎤 開始", interval_sec=0)
+        await progress.start(await scheduler.send(channel, "🎤 開始"))
+
+        progress.stage("🎛️ 変換中")
+        await asyncio.sleep(0.01)
+        progress.start_parts(3)
+        for _ in range(3):
+            progress.part_done()
+            await asyncio.sleep(0.01)
+        await progress.complete("🎉 完了")
+
+        self.assertEqual(len(channel.messages), 1)
+        message = channel.messages[0]
+        self.assertTrue(any("3/3パート" in edit for edit in message.edits if edit))
+        self.assertTrue(message.content.startswith("🎤 開始\n🎉 完了（経過"))
+
+    async def test_status_refreshes_while_part_is_running(self):
+        """パートが終わらなくても、一定間隔で経過時間を表示し直し、完了後は止まることを確認"""
+        channel = FakeChannel()
+        scheduler = OutboundScheduler()
+        progress = ProgressStatus(scheduler, channel, "🎤 開始", interval_sec=0, refresh_sec=0.05)
+        await progress.start(await scheduler.send(channel, "🎤 開始"))
+        message = channel.messages[0]
+
+        progress.start_parts(2)
+        await asyncio.sleep(0.02)
+        shown_before = message.content
+        # 65秒経過したことにする（イベントループの時計は進めない）
+        progress.started_at -= 65
+        await asyncio.sleep(0.12)
+        self.assertNotEqual(message.content, shown_before)
+        self.assertIn("0/2パート", message.content)
+        self.assertIn("経過 1:05", message.content)
+
+        await progress.complete("🎉 完了")
+        edits_after_complete = len(message.edits)
+        await asyncio.sleep(0.12)
+        self.assertEqual(len(message.edits), edits_after_complete)
+
+    async def test_complete_tolerates_edit_errors(self):
+        """完了表示の更新に失敗しても例外を出さないことを確認"""
+        scheduler = MagicMock()
+        scheduler.edit = AsyncMock(side_effect=RuntimeError("Unknown Message"))
+        progress = ProgressStatus(scheduler, FakeChannel(), "見出し")
+        await progress.start(FakeMessage(None, "見出し"))
+        with self.assertLogs("utils.progress_status", level="WARNING"):
+            await progress.complete("🎉 完了")
+
+
+class TestTranscriptPagerView(unittest.IsolatedAsyncioTestCase):
+    """文字起こしプレビューのページ送りのテスト"""
+
+    async def test_buttons_follow_page(self):
+        """先頭・末尾のページでは前へ・次へを押せないことを確認"""
+        import main
+        view = main.TranscriptPagerView(["1ページ目", "2ページ目", "3ページ目"])
+        self.assertTrue(view.previous_page.disabled)
+        self.assertFalse(view.next_page.disabled)
+        self.assertIn("（1/3ページ）", view.render())
+
+        interaction = MagicMock()
+        interaction.response.edit_message = AsyncMock()
+        await view._show(interaction, 5)
+
+        self.assertEqual(view.page, 2)
+        self.assertTrue(view.next_page.disabled)
+        self.assertIn("3ページ目", interaction.response.edit_message.call_args.kwargs["content"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+プロンプトテンプレートのレジストリのテスト
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.prompt_registry import PromptRegistry
+
+JSON_SUFFIX = '\n\n出力はJSON形式で：\n{"content": "本文"}'
+
+
+class TestPromptRegistry(unittest.TestCase):
+    """PromptRegistry のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, name, text, mtime=None):
+        path = self.temp_dir / name
+        path.write_text(text, encoding='utf-8')
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_file_template_with_suffix(self):
+        """ファイルの本文に出力形式の指示を付けた完成形を返す"""
+        self.write("article.txt", "記事を書いてください", mtime=1000)
+        registry = PromptRegistry(self.temp_dir)
+        registry.register("article", "article.txt", fallback="フォールバック", suffix=JSON_SUFFIX)
+
+        self.assertEqual(registry.get("article"), "記事を書いてください" + JSON_SUFFIX)
+        self.assertTrue(registry.is_from_file("article"))
+
+    def test_fallback_when_file_missing(self):
+        """ファイルがなければフォールバックを使う"""
+        registry = PromptRegistry(self.temp_dir)
+        registry.register("explain", "question_explain.txt", fallback="フォールバック")
+
+        self.assertEqual(registry.get("explain"), "フォールバック")
+        self.assertFalse(registry.is_from_file("explain"))
+
+    def test_skip_suffix_marker(self):
+        """出力形式をすでに指定しているプロンプトには指示を付けない"""
+        self.write("article.txt", '本文は {"content": "..."} で返す')
+        registry = PromptRegistry(self.temp_dir)
+        registry.register("article", "article.txt", fallback="", suffix=JSON_SUFFIX, skip_suffix_marker='{"content":')
+
+        self.assertNotIn(JSON_SUFFIX, registry.get("article"))
+        self.assertEqual(registry.get("article", custom="カスタム"), "カスタム" + JSON_SUFFIX)
+
+    def test_reads_file_only_when_mtime_changes(self):
+        """mtime が変わらない間はファイルを読み直さず、変わったら読み直す"""
+        path = self.write("memo.txt", "版1", mtime=1000)
+        registry = PromptRegistry(self.temp_dir, check_interval_sec=0)
+        registry.register("memo", "memo.txt", fallback="")
+
+        with patch("builtins.open", side_effect=AssertionError("読み直してはいけない")):
+            for _ in range(5):
+                self.assertEqual(registry.get("memo"), "版1")
+
+        path.write_text("版2", encoding='utf-8')
+        os.utime(path, (2000, 2000))
+        self.assertEqual(registry.get("memo"), "版2")
+        self.assertEqual(registry.reloads, 1)
+
+    def test_mtime_check_is_throttled(self):
+        """check_interval_sec の間は stat もしない"""
+        self.write("memo.txt", "版1")
+        registry = PromptRegistry(self.temp_dir, check_interval_sec=60)
+        registry.register("memo", "memo.txt", fallback="")
+
+        with patch.object(Path, "stat", side_effect=AssertionError("stat してはいけない")):
+            self.assertEqual(registry.get("memo"), "版1")
+
+    def test_deleted_file_falls_back(self):
+        """ファイルが削除されたらフォールバックに切り替わる"""
+        path = self.write("summary.txt", "要約して")
+        registry = PromptRegistry(self.temp_dir, check_interval_sec=0)
+        registry.register("summary", "summary.txt", fallback="フォールバック")
+        path.unlink()
+
+        self.assertEqual(registry.get("summary"), "フォールバック")
+
+    def test_custom_prompt_is_compiled_once(self):
+        """カスタムプロンプトにも指示を付け、同じ内容は使い回す"""
+        registry = PromptRegistry(self.temp_dir, custom_entries=2)
+        registry.register("x_post", "x_post.txt", fallback="", suffix=JSON_SUFFIX)
+
+        first = registry.get("x_post", custom="ユーザー1のプロンプト")
+        second = registry.get("x_post", custom="ユーザー1のプロンプト")
+        self.assertEqual(first, "ユーザー1のプロンプト" + JSON_SUFFIX)
+        self.assertIs(first, second)
+
+        registry.get("x_post", custom="ユーザー2")
+        registry.get("x_post", custom="ユーザー3")
+        self.assertEqual(len(registry._custom), 2)
+
+    def test_render_replaces_placeholder(self):
+        """render は placeholder を入力内容に置き換える"""
+        self.write("thread.txt", "説明\n[入力]\n以上")
+        registry = PromptRegistry(self.temp_dir)
+        registry.register("thread", "thread.txt", fallback="", placeholder="[入力]")
+
+        self.assertEqual(registry.render("thread", "ニュース本文"), "説明\nニュース本文\n以上")
+
+
+if __name__ == '__main__':
+    unittest.main()
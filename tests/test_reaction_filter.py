@@ -0,0 +1,108 @@
+"""
+リアクション事前フィルタのテスト
+"""
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.reaction_filter import DuplicateEventFilter, ReactionPreFilter
+
+
+class TestDuplicateEventFilter(unittest.TestCase):
+    """重複イベントフィルタのテストクラス"""
+
+    def test_same_event_within_ttl_is_rejected(self):
+        """TTL内の同じイベントは弾き、TTL経過後は通すことを確認"""
+        event_filter = DuplicateEventFilter(ttl_sec=30)
+
+        with patch('utils.reaction_filter.time.monotonic', return_value=100.0):
+            self.assertTrue(event_filter.check_and_mark((1, 2, '👍')))
+            self.assertFalse(event_filter.check_and_mark((1, 2, '👍')))
+            self.assertTrue(event_filter.check_and_mark((1, 2, '❓')))
+
+        with patch('utils.reaction_filter.time.monotonic', return_value=131.0):
+            self.assertTrue(event_filter.check_and_mark((1, 2, '👍')))
+
+    def test_unmark_allows_retry(self):
+        """記録を取り消したイベントはTTL内でも通すことを確認"""
+        event_filter = DuplicateEventFilter(ttl_sec=30)
+        self.assertTrue(event_filter.check_and_mark((1, 2, '👍')))
+        event_filter.unmark((1, 2, '👍'))
+        self.assertTrue(event_filter.check_and_mark((1, 2, '👍')))
+
+    def test_max_entries_is_bounded(self):
+        """記録数が上限を超えないことを確認"""
+        event_filter = DuplicateEventFilter(ttl_sec=3600, max_entries=10)
+        for i in range(100):
+            event_filter.check_and_mark((i,))
+        self.assertLessEqual(len(event_filter._seen), 10)
+
+
+class TestReactionPreFilter(unittest.IsolatedAsyncioTestCase):
+    """段階フィルタのテストクラス"""
+
+    async def test_stages_run_in_order_and_are_counted(self):
+        """最初に弾いた段階で止まり、段階ごとに件数が記録されることを確認"""
+        calls = []
+
+        def emoji_stage(payload):
+            calls.append("emoji")
+            return payload["emoji"] == '👍'
+
+        async def quota_stage(payload):
+            calls.append("quota")
+            return payload["count"] < 5
+
+        prefilter = ReactionPreFilter()
+        prefilter.add_stage("emoji", emoji_stage)
+        prefilter.add_stage("quota", quota_stage)
+
+        self.assertEqual(await prefilter.check({"emoji": '😀', "count": 0}), "emoji")
+        self.assertEqual(calls, ["emoji"])
+
+        self.assertEqual(await prefilter.check({"emoji": '👍', "count": 5}), "quota")
+        self.assertIsNone(await prefilter.check({"emoji": '👍', "count": 0}))
+
+        self.assertEqual(prefilter.snapshot(), {"emoji": 1, "quota": 1, "accepted": 1})
+
+
+class TestReactionRetryAfterQueueFull(unittest.IsolatedAsyncioTestCase):
+    """キュー満杯で断ったリアクションのやり直しのテスト"""
+
+    async def test_retry_is_not_dropped_as_duplicate(self):
+        """キュー満杯で受け付けなかったリアクションは、やり直した時に重複扱いされず受け付けられることを確認"""
+        import main
+        from utils.job_queue import QueueFullError
+
+        bot = MagicMock()
+        bot.user.id = 1
+        store = MagicMock()
+        store.peek_quota.return_value = 0
+        submit = AsyncMock(side_effect=[QueueFullError("満杯"), 0, 0])
+        payload = SimpleNamespace(user_id=2, guild_id=3, channel_id=4, message_id=5,
+                                  emoji=SimpleNamespace(name='👍'), member=None)
+
+        with patch.object(main, "bot", bot), \
+                patch.object(main, "duplicate_reaction_filter", DuplicateEventFilter(ttl_sec=30)), \
+                patch.object(main, "is_channel_active", return_value=True), \
+                patch.object(main, "get_user_store", return_value=store), \
+                patch.object(main.job_queue, "submit", submit), \
+                patch.object(main.outbound, "post") as post:
+            await main.on_raw_reaction_add(payload)
+            self.assertIn("混み合っていて受け付けられませんでした", post.call_args.args[1])
+
+            await main.on_raw_reaction_add(payload)
+            self.assertEqual(submit.await_count, 2)
+
+            # 受け付けた後の同じイベントは重複として弾く
+            await main.on_raw_reaction_add(payload)
+            self.assertEqual(submit.await_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
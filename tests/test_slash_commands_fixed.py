@@ -156,6 +156,9 @@ class TestSlashCommandsFixed(unittest.IsolatedAsyncioTestCase):
             # ユーザーアクティビティ記録テスト
             await stats_manager.record_user_activity("12345")
             
+            # 記録はメモリに溜めてまとめて書き出すので、書き出しを実行
+            stats_manager.flush()
+            
             # ファイルが書き込まれることを確認
             mock_file.assert_called()
 
@@ -0,0 +1,112 @@
+"""
+アクティビティ統計（write-behind ログ・HyperLogLog による MAU）のテスト
+"""
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from pathlib import Path
+import sys
+
+# テスト対象のmain.pyをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.hyperloglog import HyperLogLog
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """HyperLogLog のテストクラス"""
+
+    def test_count_is_close_to_true_cardinality(self):
+        """重複を含む追加でもユニーク数を誤差5%以内で概算できることを確認"""
+        sketch = HyperLogLog()
+        for i in range(20000):
+            sketch.add(str(i % 10000))
+        self.assertAlmostEqual(sketch.count(), 10000, delta=500)
+
+    def test_merge_is_union_and_survives_serialization(self):
+        """マージが和集合になり、文字列化して戻しても同じ結果になることを確認"""
+        first, second = HyperLogLog(), HyperLogLog()
+        first.update(str(i) for i in range(0, 600))
+        second.update(str(i) for i in range(300, 900))
+        restored = HyperLogLog.from_base64(first.to_base64())
+        restored.merge(second)
+        self.assertAlmostEqual(restored.count(), 900, delta=30)
+
+
+class TestStatsManager(unittest.IsolatedAsyncioTestCase):
+    """StatsManager のテストクラス"""
+
+    def setUp(self):
+        import main
+        self.main = main
+        self.temp_dir = Path(tempfile.mkdtemp())
+        (self.temp_dir / "data" / "activity_logs").mkdir(parents=True)
+        self.script_dir_patch = patch.object(main, "script_dir", self.temp_dir)
+        self.script_dir_patch.start()
+        self.stats_dir = self.temp_dir / "data" / "activity_logs"
+        self.today = datetime.now().strftime("%Y-%m-%d")
+
+    def tearDown(self):
+        self.script_dir_patch.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_activity_is_written_behind_and_restored(self):
+        """記録時にはファイルに触れず、書き出し後は再起動しても今日の集計が復元されることを確認"""
+        stats = self.main.StatsManager()
+        for user_id in ["1", "2", "1", "3"]:
+            await stats.record_user_activity(user_id)
+        self.assertFalse((self.stats_dir / f"{self.today}.log").exists())
+        self.assertEqual(stats.calculate_dau(), 3)
+
+        stats.flush()
+        log_lines = (self.stats_dir / f"{self.today}.log").read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(log_lines), 4)
+
+        restarted = self.main.StatsManager()
+        summary = restarted.get_stats_summary()
+        self.assertEqual(summary["dau"], 3)
+        self.assertEqual(summary["total_actions_today"], 4)
+
+    async def test_mau_merges_daily_rollups(self):
+        """過去日のロールアップ（旧形式を含む）と今日の記録を合わせて MAU を求めることを確認"""
+        base = datetime.now()
+        for days_ago, users in [(1, ["a", "b"]), (10, ["b", "c"]), (40, ["old"])]:
+            date = (base - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+            rollup = {"date": date, "active_users": users, "total_actions": len(users), "server_count": 1}
+            (self.stats_dir / f"{date}.json").write_text(json.dumps(rollup), encoding="utf-8")
+
+        stats = self.main.StatsManager()
+        await stats.record_user_activity("c")
+        await stats.record_user_activity("d")
+
+        self.assertEqual(stats.calculate_mau(), 4)
+        # 2回目以降は過去29日分のマージ結果を使い回し、ロールアップを読み直さない
+        with patch.object(stats, "_read_rollup", side_effect=AssertionError("再読み込みされました")):
+            await stats.record_user_activity("e")
+            self.assertEqual(stats.calculate_mau(), 5)
+
+    async def test_logs_without_rollup_are_replayed_on_startup(self):
+        """ロールアップを書く前に止まった日の追記ログを、起動時に集計し直して DAU・MAU に含めることを確認"""
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        events = [{"t": 0, "u": user_id} for user_id in ["a", "b", "a"]]
+        (self.stats_dir / f"{yesterday}.log").write_text(
+            "".join(json.dumps(event) + "\n" for event in events) + '{"t": 0, "u": "c', encoding="utf-8"
+        )
+        (self.stats_dir / f"{self.today}.log").write_text(json.dumps({"t": 0, "u": "d"}) + "\n", encoding="utf-8")
+
+        stats = self.main.StatsManager()
+
+        self.assertEqual(stats.calculate_dau(yesterday), 2)
+        summary = stats.get_stats_summary()
+        self.assertEqual(summary["dau"], 1)
+        self.assertEqual(summary["total_actions_today"], 1)
+        self.assertEqual(summary["mau"], 3)
+        rollup = json.loads((self.stats_dir / f"{yesterday}.json").read_text(encoding="utf-8"))
+        self.assertEqual(rollup["total_actions"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+生成途中のプレビューのテスト
+"""
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.outbound import OutboundScheduler
+from utils.stream_preview import StreamingPreview, partial_json_string
+
+
+class FakeMessage:
+    """edit・delete を記録するメッセージ"""
+
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        self.embed = None
+        self.edits = []
+        self.deleted = False
+
+    async def edit(self, content=None, embed=None):
+        self.content = content
+        self.embed = embed
+        self.edits.append(content)
+        return self
+
+    async def delete(self):
+        self.deleted = True
+
+
+class FakeChannel:
+    """send を記録するチャンネル"""
+
+    def __init__(self):
+        self.id = 1
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(self, content)
+        self.messages.append(message)
+        return message
+
+
+class TestPartialJsonString(unittest.TestCase):
+    """生成途中のJSONから本文を取り出すテスト"""
+
+    def test_before_value_starts(self):
+        """値が始まる前は空文字"""
+        self.assertEqual(partial_json_string('{"con'), "")
+        self.assertEqual(partial_json_string('{"content": '), "")
+
+    def test_partial_value_is_unescaped(self):
+        """届いている所までをエスケープを戻して返す"""
+        self.assertEqual(partial_json_string('{"content": "# 見出し\\n\\n本文'), "# 見出し\n\n本文")
+
+    def test_incomplete_escape_is_dropped(self):
+        """書きかけのエスケープは次の断片まで表示しない"""
+        self.assertEqual(partial_json_string('{"content": "行1\\'), "行1")
+        self.assertEqual(partial_json_string('{"content": "あ\\u30'), "あ")
+
+    def test_complete_value(self):
+        """閉じた値はJSONとして解釈した結果と一致する"""
+        self.assertEqual(partial_json_string('{"content": "a\\"b\\u3042"}'), 'a"bあ')
+
+
+class TestStreamingPreview(unittest.IsolatedAsyncioTestCase):
+    """プレビュー編集のテスト"""
+
+    async def test_updates_are_throttled_and_finalized(self):
+        """短い間隔で届いた更新はまとめて編集し、最後に最終表示へ置き換える"""
+        channel = FakeChannel()
+        preview = StreamingPreview(OutboundScheduler(), channel, "💡 生成中", interval_sec=0.05)
+        await preview.start()
+
+        text = ""
+        for i in range(50):
+            text += f"{i} "
+            preview.update(text)
+            await asyncio.sleep(0.002)
+        await asyncio.sleep(0.12)
+
+        message = channel.messages[0]
+        self.assertGreaterEqual(len(message.edits), 1)
+        self.assertLess(len(message.edits), 10)
+        self.assertIn(text.strip(), message.edits[-1])
+
+        await preview.finish(content="完了", embed="embed")
+        self.assertEqual(len(channel.messages), 1)
+        self.assertEqual(message.content, "完了")
+        self.assertEqual(message.embed, "embed")
+
+    async def test_long_text_shows_tail_within_limit(self):
+        """長いテキストは末尾を上限文字数以内で表示する"""
+        channel = FakeChannel()
+        preview = StreamingPreview(OutboundScheduler(), channel, "生成中", interval_sec=0, max_chars=100)
+        await preview.start()
+        preview.update("x" * 500 + "END")
+        await asyncio.sleep(0.02)
+
+        shown = channel.messages[0].edits[-1]
+        self.assertLessEqual(len(shown), 2000)
+        self.assertIn("END", shown)
+        self.assertLess(len(shown), 120)
+        await preview.finish(content="完了")
+
+    async def test_transform_is_applied(self):
+        """transform（JSONの本文抽出など）を通した結果を表示する"""
+        channel = FakeChannel()
+        preview = StreamingPreview(OutboundScheduler(), channel, "📝", interval_sec=0, transform=partial_json_string)
+        await preview.start()
+        preview.update('{"content": "# タイトル')
+        await asyncio.sleep(0.02)
+
+        self.assertIn("# タイトル", channel.messages[0].edits[-1])
+        self.assertNotIn('"content"', channel.messages[0].edits[-1])
+        await preview.finish(content="完了")
+
+    async def test_discard_deletes_unfinished_preview_only(self):
+        """discard は未完了のプレビューだけを削除する"""
+        channel = FakeChannel()
+        preview = StreamingPreview(OutboundScheduler(), channel, "生成中", interval_sec=0)
+        await preview.start()
+        await preview.discard()
+        self.assertTrue(channel.messages[0].deleted)
+
+        finished = StreamingPreview(OutboundScheduler(), channel, "生成中", interval_sec=0)
+        await finished.start()
+        await finished.finish(content="完了")
+        await finished.discard()
+        self.assertFalse(channel.messages[1].deleted)
+
+
+class TestArticleReactionPreview(unittest.IsolatedAsyncioTestCase):
+    """📝 リアクションで記事を生成した時のプレビューのテスト"""
+
+    async def test_preview_is_finished_with_article_embed(self):
+        """生成中のプレビューが記事の概要の埋め込みに置き換わり、エラー扱いにならないことを確認"""
+        import main
+
+        channel = FakeChannel()
+        channel.name = "テスト"
+        source = SimpleNamespace(id=10, content="記事にしたい内容", attachments=[], embeds=[],
+                                 guild=SimpleNamespace(id=20, name="サーバー"), channel=SimpleNamespace(id=1))
+        channel.fetch_message = AsyncMock(return_value=source)
+        user = SimpleNamespace(id=2, name="user", mention="@user")
+        bot = MagicMock()
+        bot.get_channel.return_value = channel
+        payload = SimpleNamespace(user_id=2, channel_id=1, message_id=10, emoji=SimpleNamespace(name='📝'), member=user)
+        article = json.dumps({"content": "# タイトル\n本文"}, ensure_ascii=False)
+
+        async def stream(client, feature, on_text, **request):
+            on_text(article[:20])
+            return article
+
+        finish = AsyncMock(wraps=StreamingPreview.finish)
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch.object(main, "bot", bot), \
+                patch.object(main, "client_openai", MagicMock()), \
+                patch.object(main, "script_dir", Path(temp_dir)), \
+                patch.object(main, "streaming_features", {"article"}), \
+                patch.object(main, "load_user_data", return_value=None), \
+                patch.object(main, "save_user_data"), \
+                patch.object(main, "is_premium_user", AsyncMock(return_value=False)), \
+                patch.object(main, "can_use_feature", return_value=(True, "")), \
+                patch.object(main.stats_manager, "record_user_activity", AsyncMock()), \
+                patch.object(main.llm_cache, "stream", side_effect=stream), \
+                patch.object(main.outbound, "add_reactions", AsyncMock()), \
+                patch.object(main.outbound, "post") as post, \
+                patch.object(StreamingPreview, "finish", lambda self, **kwargs: finish(self, **kwargs)):
+            await main.process_reaction(payload)
+
+        finish.assert_awaited_once()
+        preview_message = channel.messages[0]
+        self.assertEqual(preview_message.embed.title, "📝 記事を作成しました")
+        self.assertFalse(preview_message.deleted)
+        self.assertFalse(any("エラー" in call.args[1] for call in post.call_args_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+文字起こし結果キャッシュのテスト
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.disk_cache import DiskCache
+from utils.transcript_cache import TranscriptCache
+
+
+class TestTranscriptCache(unittest.TestCase):
+    """TranscriptCache のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def content_hash(self, data: bytes) -> str:
+        hasher = TranscriptCache.new_hasher()
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    def test_round_trip(self):
+        """保存した結果を同じ内容ハッシュで取り出せることを確認"""
+        cache = TranscriptCache(DiskCache(self.temp_dir))
+        content_hash = self.content_hash(b"voice memo")
+        cache.set(content_hash, "こんにちは", 12.5, 1)
+
+        entry = TranscriptCache(DiskCache(self.temp_dir)).get(content_hash)
+        self.assertEqual(entry, {"text": "こんにちは", "audio_length_sec": 12.5, "split_count": 1})
+
+    def test_key_includes_language_and_model(self):
+        """言語・モデルが違えば別の結果として扱うことを確認"""
+        content_hash = self.content_hash(b"voice memo")
+        TranscriptCache(DiskCache(self.temp_dir), language="ja").set(content_hash, "こんにちは", 1.0, 1)
+
+        self.assertIsNone(TranscriptCache(DiskCache(self.temp_dir), language="en").get(content_hash))
+        self.assertIsNone(TranscriptCache(DiskCache(self.temp_dir), model="other").get(content_hash))
+
+    def test_size_bound_evicts_old_entries(self):
+        """サイズ上限を超えたら古い結果から削除されることを確認"""
+        cache = TranscriptCache(DiskCache(self.temp_dir, max_bytes=3000))
+        hashes = [self.content_hash(bytes([i])) for i in range(5)]
+        for content_hash in hashes:
+            cache.set(content_hash, "あ" * 300, 1.0, 1)
+
+        self.assertLessEqual(cache.disk_cache.total_bytes, 3000)
+        self.assertIsNotNone(cache.get(hashes[-1]))
+
+
+class TestTranscribeAudioCacheHit(unittest.IsolatedAsyncioTestCase):
+    """transcribe_audio がキャッシュヒット時に音声を変換しないことのテスト"""
+
+    async def asyncSetUp(self):
+        import main
+        self.main = main
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache = TranscriptCache(DiskCache(self.temp_dir))
+        self.audio = b"same voice memo bytes"
+        hasher = TranscriptCache.new_hasher()
+        hasher.update(self.audio)
+        self.cache.set(hasher.hexdigest(), "キャッシュ済みの文字起こし", 30.0, 1)
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_cache_hit_skips_segmenter_and_whisper(self):
+        """同じ内容のファイルは分割・Whisperを呼ばずに結果を送ることを確認"""
+        main = self.main
+        audio = self.audio
+
+        async def fake_download(attachment, file_path, chunk_size=1024 * 1024):
+            Path(file_path).write_bytes(audio)
+            hasher = TranscriptCache.new_hasher()
+            hasher.update(audio)
+            return hasher.hexdigest()
+
+        channel = SimpleNamespace(id=1)
+        message = SimpleNamespace(
+            attachments=[SimpleNamespace(filename="memo.m4a", size=len(audio), url="http://example.invalid/memo.m4a")],
+            guild=SimpleNamespace(id=1), channel=channel, id=3
+        )
+        sent = []
+
+        async def fake_send(target, content=None, **kwargs):
+            sent.append(content)
+            return SimpleNamespace(channel=channel)
+
+        def fake_post(target, text):
+            sent.append(text)
+
+        with patch.object(main, "transcript_cache", self.cache), \
+                patch.object(main, "download_attachment", fake_download), \
+                patch.object(main.audio_segmenter, "split", AsyncMock(side_effect=AssertionError("分割してはいけない"))), \
+                patch.object(main.whisper_transcriber, "transcribe_parts", AsyncMock(side_effect=AssertionError("Whisperを呼んではいけない"))), \
+                patch.object(main.outbound, "send", fake_send), \
+                patch.object(main.outbound, "post", fake_post), \
+                patch.object(main.outbound, "edit", AsyncMock()), \
+                patch.object(main.outbound, "add_reactions", AsyncMock(return_value=4)):
+            await main.transcribe_audio(message, channel, SimpleNamespace(mention="@user"))
+
+        self.assertTrue(any("キャッシュ済みの文字起こし" in content for content in sent))
+        self.assertEqual(self.cache.hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
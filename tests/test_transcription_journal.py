@@ -0,0 +1,138 @@
+"""
+文字起こしジョブのジャーナルのテスト
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.audio_segmenter import AudioPart
+from utils.transcription_journal import TranscriptionJournal
+from utils.whisper_transcriber import PartResult
+
+
+def make_parts(job, count=3):
+    """分割ファイルを作ったことにする"""
+    job.parts_dir.mkdir(parents=True, exist_ok=True)
+    parts = []
+    for index in range(count):
+        path = job.parts_dir / f"part_{index:03d}.mp3"
+        path.write_bytes(b"mp3")
+        parts.append(AudioPart(index, path, index * 600.0, (index + 1) * 600.0))
+    return parts
+
+
+class TestTranscriptionJournal(unittest.TestCase):
+    """TranscriptionJournal のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.journal = TranscriptionJournal(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def create_job(self):
+        return self.journal.create(channel_id=10, guild_id=20, message_id=30, user_id=40,
+                                   filename="meeting.m4a", is_video=False, content_hash="ab" * 32)
+
+    def test_plan_and_completed_parts_survive_reload(self):
+        """分割計画と完了したパートが、読み込み直しても残っていることを確認"""
+        job = self.create_job()
+        job.source_path.write_bytes(b"source")
+        job.set_plan(make_parts(job))
+        job.record_part(0, "一つ目")
+        job.record_part(2, "三つ目")
+
+        [loaded] = self.journal.unfinished()
+        self.assertEqual(loaded.channel_id, 10)
+        self.assertEqual(loaded.filename, "meeting.m4a")
+        self.assertEqual(loaded.audio_length_sec, 1800.0)
+        self.assertEqual([part.index for part in loaded.pending_parts()], [1])
+        self.assertEqual([r.text for r in loaded.completed_results()], ["一つ目", "三つ目"])
+        # 分割計画を保存したら元ファイルは不要
+        self.assertFalse(job.source_path.exists())
+
+    def test_torn_last_line_is_ignored(self):
+        """書き込み途中で止まった最後の行は無視することを確認"""
+        job = self.create_job()
+        job.set_plan(make_parts(job))
+        job.record_part(0, "一つ目")
+        with open(job.dir / "parts.jsonl", 'a', encoding='utf-8') as f:
+            f.write('{"index": 1, "text": "途')
+
+        [loaded] = self.journal.unfinished()
+        self.assertEqual(set(loaded.completed), {0})
+
+    def test_finish_removes_job(self):
+        """完了したジョブは残らないことを確認"""
+        job = self.create_job()
+        self.journal.finish(job)
+        self.assertEqual(self.journal.unfinished(), [])
+
+    def test_resume_count_is_persisted(self):
+        """再開回数が保存されることを確認"""
+        job = self.create_job()
+        job.mark_resumed()
+        [loaded] = self.journal.unfinished()
+        self.assertEqual(loaded.resume_count, 1)
+
+
+class TestRunTranscriptionJob(unittest.IsolatedAsyncioTestCase):
+    """run_transcription_job が未完了のパートだけを文字起こしすることのテスト"""
+
+    async def asyncSetUp(self):
+        import main
+        self.main = main
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.journal = TranscriptionJournal(self.temp_dir)
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_resume_transcribes_only_missing_parts(self):
+        """再開時は完了済みのパートを送らず、結果を結合して投稿・ジョブを削除することを確認"""
+        main = self.main
+        job = self.journal.create(channel_id=10, guild_id=20, message_id=30, user_id=40,
+                                  filename="meeting.m4a", is_video=False, content_hash="cd" * 32)
+        job.set_plan(make_parts(job))
+        job.record_part(0, "一つ目")
+        job = self.journal.unfinished()[0]
+
+        transcribed = []
+
+        async def fake_transcribe_parts(parts, on_part_done=None):
+            results = []
+            for part in parts:
+                transcribed.append(part.index)
+                result = PartResult(part.index, part.start_sec, part.end_sec, text=f"パート{part.index}")
+                await on_part_done(result)
+                results.append(result)
+            return results
+
+        posted = AsyncMock()
+        progress = MagicMock()
+        with patch.object(main, "transcription_journal", self.journal), \
+                patch.object(main.whisper_transcriber, "transcribe_parts", fake_transcribe_parts), \
+                patch.object(main.audio_segmenter, "split", AsyncMock(side_effect=AssertionError("分割し直してはいけない"))), \
+                patch.object(main.transcript_cache, "set"), \
+                patch.object(main, "post_transcription_result", posted):
+            await main.run_transcription_job(job, SimpleNamespace(id=10), "<@40>", progress)
+
+        self.assertEqual(transcribed, [1, 2])
+        full_transcription = posted.call_args.args[3]
+        self.assertEqual(full_transcription, "一つ目\nパート1\nパート2\n")
+        self.assertEqual(self.journal.unfinished(), [])
+        # 完了済みのパートを除いて残り時間を計算する
+        progress.start_parts.assert_called_once_with(3, done=1)
+        self.assertEqual(progress.part_done.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+翻訳サービスのテスト
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.disk_cache import DiskCache
+from utils.translation_service import TranslationService
+
+
+class FakeTranslator:
+    """各行の先頭に「訳:」を付ける翻訳器（呼び出し回数と同時実行数を記録）"""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def translate(self, text):
+        with self.lock:
+            self.calls.append(text)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if self.fail_on and self.fail_on in text:
+                raise RuntimeError("翻訳APIエラー")
+            return "\n".join(f"訳:{line}" for line in text.split("\n"))
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class TestTranslationService(unittest.IsolatedAsyncioTestCase):
+    """翻訳サービスのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_service(self, translator, **kwargs):
+        return TranslationService(translator_factory=lambda: translator, **kwargs)
+
+    async def test_paragraph_structure_is_preserved(self):
+        """改行・空行の構成がそのまま保たれることを確認"""
+        service = self.make_service(FakeTranslator())
+        result = await service.translate("First line.\nSecond line.\n\nNew paragraph.")
+        self.assertEqual(result, "訳:First line.\n訳:Second line.\n\n訳:New paragraph.")
+
+    async def test_shared_paragraphs_are_translated_once(self):
+        """同じ段落は2回目以降（再起動後も）キャッシュから返すことを確認"""
+        translator = FakeTranslator()
+        service = self.make_service(translator, cache=DiskCache(self.temp_dir))
+        await service.translate("Shared intro.\nArticle one.")
+        await service.translate("Shared intro.\nArticle two.")
+        self.assertEqual(translator.calls, ["[[0]]\nShared intro.\n[[1]]\nArticle one.", "Article two."])
+
+        restarted = self.make_service(translator, cache=DiskCache(self.temp_dir))
+        self.assertEqual(await restarted.translate("Article one."), "訳:Article one.")
+        self.assertEqual(len(translator.calls), 2)
+
+    async def test_batches_run_concurrently_with_cap(self):
+        """複数のバッチが上限まで同時に翻訳されることを確認"""
+        translator = FakeTranslator(delay=0.1)
+        service = self.make_service(translator, max_concurrency=3, max_batch_chars=20)
+        text = "\n".join(f"Paragraph number {i}." for i in range(9))
+
+        start = time.perf_counter()
+        result = await service.translate(text)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(translator.calls), 9)
+        self.assertEqual(translator.max_running, 3)
+        self.assertLess(elapsed, 0.9 * 0.8)
+        self.assertEqual(result.split("\n")[8], "訳:Paragraph number 8.")
+
+    async def test_failed_batch_falls_back_to_single_paragraphs(self):
+        """バッチが失敗したら段落ごとに翻訳し、失敗した段落だけ原文のまま残ることを確認"""
+        translator = FakeTranslator(fail_on="Broken")
+        service = self.make_service(translator)
+        result = await service.translate("Good one.\nBroken one.\nGood two.")
+        self.assertEqual(result, "訳:Good one.\nBroken one.\n訳:Good two.")
+        self.assertEqual(service.stats["failed_segments"], 1)
+
+    async def test_unverified_segments_are_retranslated_and_not_cached(self):
+        """目印が欠けた段落の訳は使わずキャッシュもせず、その段落だけ個別に翻訳し直すことを確認"""
+        class MarkerDroppingTranslator(FakeTranslator):
+            def translate(self, text):
+                if "[[" not in text:
+                    return super().translate(text)
+                with self.lock:
+                    self.calls.append(text)
+                # 3番目の目印を落とし、2・3段落目を1つにまとめて返す
+                return "[[0]]\n訳:One.\n[[1]]\n訳:Two. Three.\n[[3]]\n訳:Four."
+
+        translator = MarkerDroppingTranslator()
+        service = self.make_service(translator, cache=DiskCache(self.temp_dir))
+        result = await service.translate("One.\nTwo.\nThree.\nFour.")
+
+        self.assertEqual(result, "訳:One.\n訳:Two.\n訳:Three.\n訳:Four.")
+        self.assertEqual(sorted(translator.calls[1:]), ["Four.", "Three.", "Two."])
+
+        # 前後の目印で確かめられた1段落目の訳だけが、バッチの結果としてキャッシュされる
+        restarted = self.make_service(FakeTranslator(), cache=DiskCache(self.temp_dir))
+        self.assertEqual(restarted._get_cached("One."), "訳:One.")
+        self.assertNotEqual(restarted._get_cached("Two."), "訳:Two. Three.")
+
+    def test_match_segments(self):
+        """目印の前後がそろった段落だけ対応付けることを確認"""
+        match = TranslationService._match_segments
+        self.assertEqual(match("[[0]]\nA\n[[1]]\nB", 2), {0: "A", 1: "B"})
+        self.assertEqual(match("[[0]] A [[ 1 ]] B", 2), {0: "A", 1: "B"})
+        self.assertEqual(match("[[0]]\nA\n[[1]]\nB", 3), {0: "A"})
+        self.assertEqual(match("[[1]]\nB\n[[0]]\nA", 2), {})
+        self.assertEqual(match("A\nB", 2), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,217 @@
+"""
+URL短縮のテスト
+"""
+import asyncio
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+import sys
+
+from aiohttp import web
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.disk_cache import DiskCache
+from utils.http_client import http_client
+from utils.url_shortener import IsGdBackend, UrlShortener
+
+LONG_URL = "https://twitter.com/intent/tweet?text=" + "%E3%81%82" * 200
+
+
+class TestUrlShortener(unittest.IsolatedAsyncioTestCase):
+    """ローカルの短縮サービス（is.gd 互換）を使ったテストクラス"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.calls = []
+        self.delay = 0.0
+        self.reply = None
+
+        async def handler(request):
+            form = await request.post()
+            self.calls.append(form["url"])
+            await asyncio.sleep(self.delay)
+            if self.reply is not None:
+                return web.Response(text=self.reply)
+            return web.Response(text=f"https://is.gd/s{len(self.calls)}")
+
+        app = web.Application()
+        app.router.add_post("/create.php", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.backend = IsGdBackend(http_client, api_url=f"http://127.0.0.1:{port}/create.php")
+
+    async def asyncTearDown(self):
+        await http_client.close()
+        await self.runner.cleanup()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_shortener(self, deadline_sec=2.0):
+        return UrlShortener(self.backend, cache=DiskCache(self.temp_dir), deadline_sec=deadline_sec)
+
+    async def test_shortens_and_caches(self):
+        """2回目は短縮サービスを呼ばずにキャッシュから返すことを確認"""
+        shortener = self.make_shortener()
+
+        first = await shortener.shorten(LONG_URL)
+        second = await shortener.shorten(LONG_URL)
+
+        self.assertEqual(first, "https://is.gd/s1")
+        self.assertEqual(second, first)
+        self.assertEqual(self.calls, [LONG_URL])
+        self.assertEqual(shortener.stats["hits"], 1)
+
+    async def test_cache_survives_restart(self):
+        """再起動（新しいインスタンス）後もディスクの対応表を使うことを確認"""
+        await self.make_shortener().shorten(LONG_URL)
+        result = await self.make_shortener().shorten(LONG_URL)
+
+        self.assertEqual(result, "https://is.gd/s1")
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_deadline_falls_back_and_finishes_in_background(self):
+        """期限を過ぎたら元のURLを返し、裏で終わった短縮結果は次回使われることを確認"""
+        self.delay = 0.3
+        shortener = self.make_shortener(deadline_sec=0.05)
+
+        start = time.perf_counter()
+        result = await shortener.shorten(LONG_URL)
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(result, LONG_URL)
+        self.assertEqual(shortener.stats["fallbacks"], 1)
+
+        await asyncio.sleep(0.4)
+        self.assertEqual(await shortener.shorten(LONG_URL), "https://is.gd/s1")
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_wait_background_returns_late_result(self):
+        """期限切れの後も、裏で続けている短縮の結果を待って受け取れることを確認"""
+        self.delay = 0.2
+        shortener = self.make_shortener(deadline_sec=0.05)
+
+        self.assertEqual(await shortener.shorten(LONG_URL), LONG_URL)
+        self.assertEqual(await shortener.wait_background(LONG_URL), "https://is.gd/s1")
+        # 完了後はキャッシュから返す
+        self.assertEqual(await shortener.wait_background(LONG_URL), "https://is.gd/s1")
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_concurrent_requests_share_one_call(self):
+        """同じURLの同時リクエストは短縮サービスを1回だけ呼ぶことを確認"""
+        self.delay = 0.05
+        shortener = self.make_shortener()
+
+        results = await asyncio.gather(*(shortener.shorten(LONG_URL) for _ in range(5)))
+
+        self.assertEqual(set(results), {"https://is.gd/s1"})
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_error_reply_is_not_cached(self):
+        """エラー応答の時は元のURLを返し、キャッシュしないことを確認"""
+        self.reply = "Error: Please enter a valid URL to shorten"
+        shortener = self.make_shortener()
+
+        self.assertEqual(await shortener.shorten(LONG_URL), LONG_URL)
+        self.reply = None
+        self.assertEqual(await shortener.shorten(LONG_URL), "https://is.gd/s2")
+
+    async def test_pluggable_backend(self):
+        """shorten を持つ任意のバックエンドに差し替えられることを確認"""
+        class FailingBackend:
+            name = "failing"
+
+            async def shorten(self, long_url):
+                raise ConnectionError("接続できません")
+
+        shortener = UrlShortener(FailingBackend(), cache=None)
+        self.assertEqual(await shortener.shorten(LONG_URL), LONG_URL)
+
+
+class TestXPostLinkFallback(unittest.IsolatedAsyncioTestCase):
+    """短縮が期限に間に合わなかった時のX投稿リンクのテスト"""
+
+    async def asyncSetUp(self):
+        import main
+        self.main = main
+        self.release = asyncio.Event()
+        self.short_url = "https://is.gd/late"
+        release = self.release
+        test = self
+
+        class SlowBackend:
+            name = "slow"
+
+            async def shorten(self, long_url):
+                await release.wait()
+                return test.short_url
+
+        self.shortener = UrlShortener(SlowBackend(), cache=None, deadline_sec=0.01)
+        self.sent = []
+        self.edited = []
+
+        async def fake_send(channel, content=None, embed=None, **kwargs):
+            self.sent.append((content, embed))
+            return "embed-message"
+
+        async def fake_edit(message, embed=None, **kwargs):
+            self.edited.append((message, embed.fields[0].value))
+
+        def fake_post(channel, text):
+            self.sent.append((text, None))
+
+        self.patches = [
+            patch.object(main, "url_shortener", self.shortener),
+            patch.object(main.outbound, "send", fake_send),
+            patch.object(main.outbound, "post", fake_post),
+            patch.object(main.outbound, "edit", fake_edit),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    async def test_long_url_is_not_put_in_field_and_is_edited_in_later(self):
+        """元のURLがフィールドの上限を超える時は準備中と表示して送り、短縮できたらリンクを差し込むことを確認"""
+        summary = "長い投稿の本文です。" * 60
+        await self.main.send_x_post(MagicMock(), summary)
+
+        embed = self.sent[-1][1]
+        field_value = embed.fields[0].value
+        self.assertLessEqual(len(field_value), self.main.EMBED_FIELD_VALUE_LIMIT)
+        self.assertIn("準備中", field_value)
+        self.assertEqual(self.edited, [])
+
+        self.release.set()
+        await asyncio.gather(*self.main.x_link_update_tasks)
+        self.assertEqual(self.edited, [("embed-message", "[クリックして投稿](https://is.gd/late)")])
+
+    async def test_failed_shortening_replaces_placeholder_with_notice(self):
+        """裏の短縮も失敗した時は、準備中の表示を案内に置き換えることを確認"""
+        self.short_url = None
+        await self.main.send_x_post(MagicMock(), "長い投稿の本文です。" * 60)
+
+        self.release.set()
+        await asyncio.gather(*self.main.x_link_update_tasks)
+        [(_, value)] = self.edited
+        self.assertIn("投稿リンクを作成できませんでした", value)
+
+    async def test_short_enough_url_is_sent_directly(self):
+        """短い投稿なら、短縮が間に合わなくても元のURLをそのままリンクにすることを確認"""
+        await self.main.send_x_post(MagicMock(), "短い投稿")
+
+        field_value = self.sent[-1][1].fields[0].value
+        self.assertTrue(field_value.startswith("[クリックして投稿](https://twitter.com/intent/tweet?text="))
+        self.assertEqual(self.main.x_link_update_tasks, set())
+        self.release.set()
+
+
+if __name__ == '__main__':
+    unittest.main()
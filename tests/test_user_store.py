@@ -0,0 +1,112 @@
+"""
+SQLiteユーザーストアのテスト
+"""
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.user_store import UserStore
+
+
+class TestUserStore(unittest.TestCase):
+    """ユーザーストアのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = UserStore(self.temp_dir / "users.sqlite3")
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_put_and_get(self):
+        """保存したデータがそのまま読み込めることを確認"""
+        self.store.put("123", {"user_id": "123", "username": "テスト", "custom_prompt_x_post": "プロンプト"})
+
+        data = self.store.get("123")
+
+        self.assertEqual(data["username"], "テスト")
+        self.assertEqual(data["custom_prompt_x_post"], "プロンプト")
+        self.assertEqual(data["daily_usage_count"], 0)
+        self.assertIsNone(self.store.get("999"))
+
+    def test_quota_limit_and_daily_reset(self):
+        """上限まで消費でき、日付が変わるとリセットされることを確認"""
+        results = [self.store.consume_quota("123", "2025-01-01", 3)[0] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+        allowed, count = self.store.consume_quota("123", "2025-01-02", 3)
+        self.assertTrue(allowed)
+        self.assertEqual(count, 1)
+
+    def test_unlimited_quota_still_counts(self):
+        """上限なし（プレミアム）でも回数がカウントされることを確認"""
+        for _ in range(10):
+            self.assertTrue(self.store.consume_quota("123", "2025-01-01", None)[0])
+        self.assertEqual(self.store.get("123")["daily_usage_count"], 10)
+
+    def test_peek_quota_follows_consume(self):
+        """peek_quota は消費せず、消費後の回数と日付の変化を反映することを確認"""
+        self.assertEqual(self.store.peek_quota("123", "2025-01-01"), 0)
+        self.store.consume_quota("123", "2025-01-01", 5)
+        self.store.consume_quota("123", "2025-01-01", 5)
+
+        self.assertEqual(self.store.peek_quota("123", "2025-01-01"), 2)
+        self.assertEqual(self.store.peek_quota("123", "2025-01-01"), 2)
+        self.assertEqual(self.store.peek_quota("123", "2025-01-02"), 0)
+
+    def test_put_does_not_overwrite_quota(self):
+        """古いデータで保存しても消費済みの回数が巻き戻らないことを確認"""
+        self.store.put("123", {"username": "テスト", "daily_usage_count": 0})
+        stale = self.store.get("123")
+        self.store.consume_quota("123", "2025-01-01", 5)
+
+        stale["custom_prompt_memo"] = "更新"
+        self.store.put("123", stale)
+
+        data = self.store.get("123")
+        self.assertEqual(data["daily_usage_count"], 1)
+        self.assertEqual(data["custom_prompt_memo"], "更新")
+
+    def test_concurrent_quota_is_not_lost(self):
+        """同時に消費しても上限を超えず、加算も取りこぼさないことを確認"""
+        allowed = []
+
+        def worker():
+            for _ in range(10):
+                allowed.append(self.store.consume_quota("123", "2025-01-01", 25)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(allowed.count(True), 25)
+        self.assertEqual(self.store.get("123")["daily_usage_count"], 25)
+
+    def test_import_json_dir_runs_once(self):
+        """旧形式のJSONを取り込み、2回目以降は何もしないことを確認"""
+        json_dir = self.temp_dir / "user_data"
+        json_dir.mkdir()
+        with open(json_dir / "111.json", 'w', encoding='utf-8') as f:
+            json.dump({"user_id": "111", "username": "旧ユーザー", "last_used_date": "2025-01-01", "daily_usage_count": 4}, f)
+        (json_dir / "broken.json").write_text("{", encoding='utf-8')
+
+        self.assertEqual(self.store.import_json_dir(json_dir), 1)
+        self.assertEqual(self.store.import_json_dir(json_dir), 0)
+
+        data = self.store.get("111")
+        self.assertEqual(data["username"], "旧ユーザー")
+        self.assertEqual(data["daily_usage_count"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Whisper並列文字起こしのテスト
+"""
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import sys
+
+# テスト対象のモジュールをインポートするためのパス設定
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.whisper_transcriber import WhisperTranscriber
+
+
+class FakeWhisperClient:
+    """audio.transcriptions.create を模倣するクライアント"""
+
+    def __init__(self, delays=None, failures=None):
+        self.delays = delays or {}
+        self.failures = dict(failures or {})  # ファイル名 → 失敗させる回数
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def create(self, model, file, language):
+        name = Path(file.name).name
+        self.calls.append(name)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(name, 0.01))
+            if self.failures.get(name, 0) > 0:
+                self.failures[name] -= 1
+                raise TimeoutError("Request timed out")
+            return SimpleNamespace(text=f"text-{name}")
+        finally:
+            self.active -= 1
+
+
+class TestWhisperTranscriber(unittest.IsolatedAsyncioTestCase):
+    """Whisper並列文字起こしのテストクラス"""
+
+    def setUp(self):
+        """ダミーの分割ファイルを作成"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.parts = []
+        for i in range(5):
+            path = Path(self.temp_dir) / f"part_{i:03d}.mp3"
+            path.write_bytes(b"dummy")
+            self.parts.append(SimpleNamespace(index=i, path=path, start_sec=i * 600.0, end_sec=(i + 1) * 600.0))
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_results_are_ordered_and_concurrency_capped(self):
+        """完了順に関係なく元の順番で結合され、同時実行数が上限以下であることを確認"""
+        # 先頭のパートほど遅く終わるようにする
+        delays = {f"part_{i:03d}.mp3": 0.05 * (5 - i) for i in range(5)}
+        client = FakeWhisperClient(delays=delays)
+        transcriber = WhisperTranscriber(client, max_concurrency=2, base_delay=0)
+
+        results = await transcriber.transcribe_parts(self.parts)
+
+        self.assertEqual([r.index for r in results], [0, 1, 2, 3, 4])
+        self.assertLessEqual(client.peak, 2)
+        self.assertEqual(
+            WhisperTranscriber.join_results(results),
+            "".join(f"text-part_{i:03d}.mp3\n" for i in range(5))
+        )
+
+    async def test_transient_failure_is_retried(self):
+        """一時的なエラーはリトライで回復することを確認"""
+        client = FakeWhisperClient(failures={"part_002.mp3": 2})
+        transcriber = WhisperTranscriber(client, max_retries=3, base_delay=0)
+
+        results = await transcriber.transcribe_parts(self.parts)
+
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(results[2].attempts, 3)
+
+    async def test_failed_part_is_flagged_without_aborting(self):
+        """リトライ上限を超えたパートは本文中に明記され、他のパートは残ることを確認"""
+        client = FakeWhisperClient(failures={"part_001.mp3": 10})
+        transcriber = WhisperTranscriber(client, max_retries=1, base_delay=0)
+
+        results = await transcriber.transcribe_parts(self.parts)
+        text = WhisperTranscriber.join_results(results)
+
+        self.assertFalse(results[1].ok)
+        self.assertTrue(results[1].is_timeout)
+        self.assertEqual(client.calls.count("part_001.mp3"), 2)
+        self.assertIn("パート2 (10:00〜20:00) の文字起こしに失敗しました", text)
+        self.assertIn("text-part_004.mp3", text)
+
+    async def test_programming_error_is_raised_without_retry(self):
+        """クライアント未設定などの一時的でないエラーはリトライせずにすぐ送出することを確認"""
+        transcriber = WhisperTranscriber(None, max_retries=3, base_delay=0)
+
+        with self.assertRaises(AttributeError):
+            await transcriber.transcribe_parts(self.parts[:1])
+
+    async def test_other_parts_stop_after_hard_failure(self):
+        """リトライしないエラーが起きたら、実行中・未実行の他のパートはAPIを呼ばずに中止することを確認"""
+        client = FakeWhisperClient(delays={f"part_{i:03d}.mp3": 0.5 for i in range(1, 5)})
+
+        async def create(model, file, language):
+            if Path(file.name).name == "part_000.mp3":
+                raise TypeError("unexpected keyword argument")
+            return await FakeWhisperClient.create(client, model, file, language)
+
+        client.audio.transcriptions.create = create
+        transcriber = WhisperTranscriber(client, max_concurrency=2, base_delay=0)
+
+        with self.assertRaises(TypeError):
+            await transcriber.transcribe_parts(self.parts)
+
+        # 実行中だったパートは中止され、その後は新しい呼び出しも起きない
+        self.assertEqual(client.active, 0)
+        calls = list(client.calls)
+        await asyncio.sleep(0.6)
+        self.assertEqual(client.calls, calls)
+        self.assertNotIn("part_004.mp3", calls)
+
+    def test_retryable_classification(self):
+        """接続・タイムアウト・429・5xxのみリトライ対象であることを確認"""
+        import openai
+        request = MagicMock()
+
+        def status_error(code):
+            return openai.APIStatusError("error", response=MagicMock(status_code=code, request=request), body=None)
+
+        self.assertTrue(WhisperTranscriber._is_retryable(openai.APIConnectionError(request=request)))
+        self.assertTrue(WhisperTranscriber._is_retryable(openai.APITimeoutError(request=request)))
+        self.assertTrue(WhisperTranscriber._is_retryable(status_error(429)))
+        self.assertTrue(WhisperTranscriber._is_retryable(status_error(503)))
+        self.assertFalse(WhisperTranscriber._is_retryable(status_error(400)))
+        self.assertFalse(WhisperTranscriber._is_retryable(AttributeError("'NoneType' object has no attribute 'audio'")))
+        self.assertFalse(WhisperTranscriber._is_retryable(TypeError("unexpected keyword argument")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,24 +1,123 @@
 """
 記事抽出ユーティリティ
 URL から記事本文を抽出する機能を提供
+抽出結果は正規化したURLごとにキャッシュし、期限切れ後は ETag / Last-Modified で再検証する
 """
 
 import re
+import time
 import aiohttp
 import asyncio
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from bs4 import BeautifulSoup
 from readability import Document
 import logging
 
+from utils.disk_cache import DiskCache, hash_key
+from utils.extraction_pool import ExtractionPool
+from utils.http_client import http_client
+
 logger = logging.getLogger(__name__)
 
+# キャッシュキーから除外するトラッキング用パラメータ
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "igshid", "mc_cid", "mc_eid", "ref_src"}
+
+
+def normalize_url(url: str) -> str:
+    """キャッシュキー用にURLを正規化（フラグメント・トラッキング用パラメータ・既定ポートを除去）"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def truncate_html(html: str, max_chars: int) -> str:
+    """解析前に巨大なHTMLを切り詰める（タグの途中で切らないよう直前の '<' で切る）"""
+    if not html or max_chars <= 0 or len(html) <= max_chars:
+        return html
+    cut = html.rfind("<", 0, max_chars)
+    return html[:cut if cut > 0 else max_chars]
+
+
+def extract_article_from_html(html: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    HTMLから記事本文を抽出（CPU負荷が高いのでプロセスプールの子プロセスで実行される）
+
+    Returns:
+        Tuple[title, content]
+    """
+    try:
+        # readabilityで記事コンテンツを抽出
+        doc = Document(html)
+        title = doc.title()
+        content_html = doc.summary()
+        
+        # BeautifulSoupでHTMLタグを除去
+        soup = BeautifulSoup(content_html, 'html.parser')
+        
+        # スクリプトやスタイルタグを除去
+        for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
+            script.decompose()
+        
+        # テキスト抽出
+        content = soup.get_text()
+        
+        # テキスト整形
+        content = clean_text(content)
+        
+        return title, content
+        
+    except Exception as e:
+        logger.error(f"HTML解析エラー: {str(e)}")
+        return None, None
+
+
+def clean_text(text: str) -> str:
+    """テキストの整形"""
+    if not text:
+        return ""
+    
+    # 複数の改行を単一の改行に
+    text = re.sub(r'\n\s*\n', '\n', text)
+    
+    # 連続する空白を単一の空白に
+    text = re.sub(r'[ \t]+', ' ', text)
+    
+    # 行頭行末の空白を除去
+    lines = [line.strip() for line in text.split('\n')]
+    text = '\n'.join(line for line in lines if line)
+    
+    return text.strip()
+
+
 class ArticleExtractor:
     """WEBページから記事本文を抽出するクラス"""
     
     def __init__(self):
         self.max_content_length = 12000  # 12k字上限
         self.timeout = 30  # 30秒タイムアウト
+        self.cache: Optional[DiskCache] = None
+        self.cache_ttl_sec = 3600
+        self.cache_stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self.extraction_pool: Optional[ExtractionPool] = None
+        self.max_html_chars = 1_500_000  # これより大きいHTMLは解析前に切り詰める
+    
+    def configure_cache(self, cache: Optional[DiskCache], ttl_sec: int = 3600):
+        """抽出結果のキャッシュを設定（TTL内は再取得せず、期限切れ後は条件付きリクエストで再検証）"""
+        self.cache = cache
+        self.cache_ttl_sec = ttl_sec
+    
+    def configure_pool(self, pool: Optional[ExtractionPool], max_html_chars: int = 1_500_000):
+        """記事本文の抽出を実行するプロセスプールを設定（None ならイベントループのスレッドで抽出）"""
+        self.extraction_pool = pool
+        self.max_html_chars = max_html_chars
         
     def extract_urls_from_text(self, text: str) -> list[str]:
         """テキストからURLを抽出"""
@@ -38,62 +137,60 @@ class ArticleExtractor:
             if not self._is_valid_url(url):
                 return None, None, "無効なURLです"
             
-            # HTTPリクエスト実行
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                }
+            # キャッシュ確認（TTL内ならネットワークにも記事解析にも触れない）
+            cache_key = hash_key("article", normalize_url(url)) if self.cache else None
+            cached = self.cache.get(cache_key) if self.cache else None
+            if cached and time.time() - cached["fetched_at"] < self.cache_ttl_sec:
+                self.cache_stats["hits"] += 1
+                logger.info(f"記事キャッシュヒット: {url}")
+                return cached["title"], cached["content"], None
+            
+            # HTTPリクエスト実行（共有セッションの接続プールを使う）
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+            }
+            # 期限切れのキャッシュがあれば条件付きリクエストで再検証
+            if cached:
+                if cached.get("etag"):
+                    headers['If-None-Match'] = cached["etag"]
+                if cached.get("last_modified"):
+                    headers['If-Modified-Since'] = cached["last_modified"]
+            
+            async with http_client.session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                if response.status == 304 and cached:
+                    # 変更なし: 抽出済みの本文をそのまま使い、期限だけ延ばす
+                    self.cache_stats["revalidated"] += 1
+                    logger.info(f"記事キャッシュ再検証（変更なし）: {url}")
+                    cached["fetched_at"] = time.time()
+                    self._store(cache_key, cached)
+                    return cached["title"], cached["content"], None
                 
-                async with session.get(url, headers=headers) as response:
-                    if response.status != 200:
-                        return None, None, f"HTTPエラー: {response.status}"
-                    
-                    # コンテンツタイプチェック
-                    content_type = response.headers.get('content-type', '')
-                    if 'text/html' not in content_type:
-                        return None, None, "HTMLコンテンツではありません"
-                    
-                    # 文字エンコーディングを自動検出して読み込み
-                    try:
-                        html = await response.text()
-                    except UnicodeDecodeError:
-                        # UTF-8で読めない場合は、バイト読み込み→文字エンコーディング検出
-                        html_bytes = await response.read()
-                        try:
-                            # chardetがインストールされている場合は使用
-                            import chardet
-                            detected = chardet.detect(html_bytes)
-                            encoding = detected.get('encoding', 'utf-8')
-                            logger.info(f"文字エンコーディング検出: {encoding}")
-                            html = html_bytes.decode(encoding, errors='ignore')
-                        except ImportError:
-                            # chardetがない場合は一般的なエンコーディングを試行
-                            logger.warning("chardetがインストールされていません。フォールバック処理を実行")
-                            encodings = ['shift-jis', 'euc-jp', 'iso-2022-jp', 'utf-8']
-                            html = None
-                            for enc in encodings:
-                                try:
-                                    html = html_bytes.decode(enc, errors='ignore')
-                                    logger.info(f"エンコーディング {enc} で読み込み成功")
-                                    break
-                                except Exception:
-                                    continue
-                            if html is None:
-                                html = html_bytes.decode('utf-8', errors='ignore')
-                        except Exception as e:
-                            logger.warning(f"文字エンコーディング検出エラー: {e}")
-                            # 最終的にはShift-JISを試行
-                            try:
-                                html = html_bytes.decode('shift-jis', errors='ignore')
-                            except Exception:
-                                html = html_bytes.decode('utf-8', errors='ignore')
-                    
-            # 記事本文を抽出
-            title, content = self._extract_article_from_html(html)
+                if response.status != 200:
+                    return None, None, f"HTTPエラー: {response.status}"
+                
+                # コンテンツタイプチェック
+                content_type = response.headers.get('content-type', '')
+                if 'text/html' not in content_type:
+                    return None, None, "HTMLコンテンツではありません"
+                
+                validators = {
+                    "etag": response.headers.get('ETag'),
+                    "last_modified": response.headers.get('Last-Modified'),
+                }
+                html = await self._read_html(response)
+            
+            if self.cache:
+                self.cache_stats["misses"] += 1
+            
+            # 記事本文を抽出（プロセスプールで実行し、巨大なページは解析前に切り詰める）
+            try:
+                title, content = await self._extract(html)
+            except asyncio.TimeoutError:
+                return None, None, "記事の解析がタイムアウトしました"
             
             if not content:
                 return None, None, "記事本文を抽出できませんでした"
@@ -105,6 +202,13 @@ class ArticleExtractor:
             if len(content) > self.max_content_length:
                 content = content[:self.max_content_length] + "..."
             
+            self._store(cache_key, {
+                "url": url,
+                "title": title,
+                "content": content,
+                "fetched_at": time.time(),
+                **validators
+            })
             return title, content, None
             
         except asyncio.TimeoutError:
@@ -115,6 +219,49 @@ class ArticleExtractor:
             logger.error(f"記事取得エラー: {str(e)}")
             return None, None, f"予期しないエラーが発生しました: {str(e)}"
     
+    async def _read_html(self, response) -> str:
+        """文字エンコーディングを自動検出してHTMLを読み込む"""
+        try:
+            return await response.text()
+        except UnicodeDecodeError:
+            # UTF-8で読めない場合は、バイト読み込み→文字エンコーディング検出
+            html_bytes = await response.read()
+            try:
+                # chardetがインストールされている場合は使用
+                import chardet
+                detected = chardet.detect(html_bytes)
+                encoding = detected.get('encoding', 'utf-8')
+                logger.info(f"文字エンコーディング検出: {encoding}")
+                return html_bytes.decode(encoding, errors='ignore')
+            except ImportError:
+                # chardetがない場合は一般的なエンコーディングを試行
+                logger.warning("chardetがインストールされていません。フォールバック処理を実行")
+                encodings = ['shift-jis', 'euc-jp', 'iso-2022-jp', 'utf-8']
+                for enc in encodings:
+                    try:
+                        html = html_bytes.decode(enc, errors='ignore')
+                        logger.info(f"エンコーディング {enc} で読み込み成功")
+                        return html
+                    except Exception:
+                        continue
+                return html_bytes.decode('utf-8', errors='ignore')
+            except Exception as e:
+                logger.warning(f"文字エンコーディング検出エラー: {e}")
+                # 最終的にはShift-JISを試行
+                try:
+                    return html_bytes.decode('shift-jis', errors='ignore')
+                except Exception:
+                    return html_bytes.decode('utf-8', errors='ignore')
+    
+    def _store(self, cache_key: Optional[str], entry: Dict):
+        """抽出結果をキャッシュに保存（失敗しても記事取得自体は成功扱い）"""
+        if not self.cache or not cache_key:
+            return
+        try:
+            self.cache.set(cache_key, entry)
+        except OSError as e:
+            logger.warning(f"記事キャッシュ保存エラー: {e}")
+    
     def _is_valid_url(self, url: str) -> bool:
         """URLの基本的な検証"""
         if not url or len(url) > 2000:
@@ -146,48 +293,21 @@ class ArticleExtractor:
         return True
     
     def _extract_article_from_html(self, html: str) -> Tuple[Optional[str], Optional[str]]:
-        """HTMLから記事本文を抽出"""
-        try:
-            # readabilityで記事コンテンツを抽出
-            doc = Document(html)
-            title = doc.title()
-            content_html = doc.summary()
-            
-            # BeautifulSoupでHTMLタグを除去
-            soup = BeautifulSoup(content_html, 'html.parser')
-            
-            # スクリプトやスタイルタグを除去
-            for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
-                script.decompose()
-            
-            # テキスト抽出
-            content = soup.get_text()
-            
-            # テキスト整形
-            content = self._clean_text(content)
-            
-            return title, content
-            
-        except Exception as e:
-            logger.error(f"HTML解析エラー: {str(e)}")
-            return None, None
+        """HTMLから記事本文を抽出（イベントループのスレッドで直接実行）"""
+        return extract_article_from_html(html)
     
     def _clean_text(self, text: str) -> str:
         """テキストの整形"""
-        if not text:
-            return ""
-        
-        # 複数の改行を単一の改行に
-        text = re.sub(r'\n\s*\n', '\n', text)
-        
-        # 連続する空白を単一の空白に
-        text = re.sub(r'[ \t]+', ' ', text)
-        
-        # 行頭行末の空白を除去
-        lines = [line.strip() for line in text.split('\n')]
-        text = '\n'.join(line for line in lines if line)
-        
-        return text.strip()
+        return clean_text(text)
+    
+    async def _extract(self, html: str) -> Tuple[Optional[str], Optional[str]]:
+        """プロセスプールが設定されていれば別プロセスで、なければその場で記事本文を抽出"""
+        if len(html) > self.max_html_chars:
+            logger.info(f"HTMLが大きいため解析前に切り詰め: {len(html)}文字 → {self.max_html_chars}文字")
+            html = truncate_html(html, self.max_html_chars)
+        if self.extraction_pool is None:
+            return self._extract_article_from_html(html)
+        return await self.extraction_pool.run(extract_article_from_html, html)
 
 # グローバルインスタンス
-article_extractor = ArticleExtractor()
\ No newline at end of file
+article_extractor = ArticleExtractor()
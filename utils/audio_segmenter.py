@@ -0,0 +1,269 @@
+"""
+音声分割ユーティリティ
+ffmpegを2回実行して、Whisper向けの16kHzモノラル・低ビットレートの分割ファイルを
+ディスクに書き出す（音声全体をメモリに展開しない）
+  1回目: 元ファイルのデコード（1回だけ）から、圧縮MP3と分割点の解析用PCMを同時に出力する
+  2回目: 圧縮MP3を再エンコードなし（-c copy）で分割点ごとに切り出す
+分割点は固定間隔ではなく、目標位置の手前で最も音量の小さい箇所を選ぶ（単語の途中で切らない）
+分割点は全体を解析するまで決まらないため、変換と切り出しを1回のffmpegにまとめることはできない
+"""
+
+import asyncio
+import csv
+import logging
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AudioSegmenterError(Exception):
+    """ffmpegによる音声の変換・分割に失敗した"""
+
+
+class AudioPart:
+    """分割された音声ファイル1つ分の情報"""
+
+    def __init__(self, index: int, path: Path, start_sec: float, end_sec: float):
+        self.index = index
+        self.path = path
+        self.start_sec = start_sec
+        self.end_sec = end_sec
+
+    @property
+    def duration_sec(self) -> float:
+        return self.end_sec - self.start_sec
+
+    @property
+    def size_bytes(self) -> int:
+        return self.path.stat().st_size
+
+
+class EnergyEnvelope:
+    """PCM（s16le）をチャンク単位で受け取り、窓ごとの平均パワーを計算する"""
+
+    def __init__(self, window_samples: int):
+        self.window_bytes = max(1, window_samples) * 2
+        self._pending = b""
+        self._windows: List[np.ndarray] = []
+
+    def feed(self, chunk: bytes):
+        data = self._pending + chunk
+        usable = len(data) - len(data) % self.window_bytes
+        self._pending = data[usable:]
+        if usable:
+            samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32)
+            frames = samples.reshape(-1, self.window_bytes // 2)
+            self._windows.append(np.mean(frames * frames, axis=1))
+
+    def finish(self) -> np.ndarray:
+        if len(self._pending) >= 2:
+            samples = np.frombuffer(self._pending[:len(self._pending) - len(self._pending) % 2], dtype="<i2").astype(np.float32)
+            self._windows.append(np.array([np.mean(samples * samples)], dtype=np.float32))
+        self._pending = b""
+        if not self._windows:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self._windows)
+
+
+def plan_split_points(energy: np.ndarray, window_sec: float, max_segment_sec: float,
+                      search_sec: float = 30.0, smooth_sec: float = 0.3) -> List[float]:
+    """
+    窓ごとのエネルギーから分割点（秒）を決める
+
+    各分割点は「前の分割点 + max_segment_sec」を上限とし、その手前 search_sec 秒の範囲で
+    平滑化したエネルギーが最小になる窓の中央を選ぶ。全パートが max_segment_sec 以下になる
+
+    Args:
+        energy: 窓ごとの平均パワー
+        window_sec: 1窓の長さ（秒）
+        max_segment_sec: 1パートの最大長（秒）
+        search_sec: 無音を探す範囲（秒）
+        smooth_sec: 一瞬の小さな音に引っ張られないための移動平均の幅（秒）
+
+    Returns:
+        昇順の分割点のリスト（分割不要なら空）
+    """
+    count = len(energy)
+    total_sec = count * window_sec
+    if count == 0 or total_sec <= max_segment_sec:
+        return []
+
+    kernel_size = max(1, int(round(smooth_sec / window_sec)))
+    smoothed = np.convolve(energy, np.ones(kernel_size, dtype=np.float32) / kernel_size, mode="same")
+
+    search_windows = max(1, int(search_sec / window_sec))
+
+    points = []
+    previous_sec = 0.0
+    while total_sec - previous_sec > max_segment_sec:
+        # 窓の中央で切るので、中央が上限を超えない最後の窓までを探索範囲とする
+        hi = min(count, int(np.floor((previous_sec + max_segment_sec) / window_sec - 0.5)) + 1)
+        lo = max(int(np.ceil(previous_sec / window_sec)), hi - search_windows)
+        if hi <= lo:
+            break
+        cut = lo + int(np.argmin(smoothed[lo:hi]))
+        previous_sec = (cut + 0.5) * window_sec
+        points.append(previous_sec)
+    return points
+
+
+class AudioSegmenter:
+    """ffmpegで音声・動画を16kHzモノラルMP3の分割ファイルに変換するクラス"""
+
+    def __init__(self, sample_rate: int = 16000, bitrate_kbps: int = 32,
+                 max_segment_sec: int = 600, max_segment_bytes: int = 20 * 1024 * 1024,
+                 ffmpeg_path: Optional[str] = None, analysis_rate: int = 8000,
+                 analysis_window_sec: float = 0.05, search_sec: float = 30.0):
+        self.sample_rate = sample_rate
+        self.bitrate_kbps = bitrate_kbps
+        self.max_segment_sec = max_segment_sec  # Whisperへの1リクエストあたり10分まで
+        self.max_segment_bytes = max_segment_bytes  # 25MB制限に対して20MBを目標とする
+        self.ffmpeg_path = ffmpeg_path or shutil.which("ffmpeg") or "ffmpeg"
+        self.analysis_rate = analysis_rate  # 分割点の解析は音量だけ分かればよいので低レートで十分
+        self.analysis_window_sec = analysis_window_sec
+        self.search_sec = search_sec  # 各分割点の手前何秒から無音を探すか
+
+    @property
+    def segment_sec(self) -> int:
+        """時間上限とサイズ上限の両方を満たす分割長（秒）"""
+        # ビットレートから見積もったサイズに1割の余裕を持たせる
+        size_limited_sec = int(self.max_segment_bytes * 8 / (self.bitrate_kbps * 1000) * 0.9)
+        return max(1, min(self.max_segment_sec, size_limited_sec))
+
+    async def split(self, source_path: Path, output_dir: Path) -> List[AudioPart]:
+        """
+        音声・動画ファイルを分割ファイルに変換
+
+        1回目のffmpegでデコードしながら「Whisper向けの圧縮MP3」と「解析用の低レートPCM」を
+        同時に出力し、PCMから無音に近い分割点を決めてから、2回目のffmpegで圧縮MP3を
+        再エンコードなし（-c copy）で分割する
+
+        Returns:
+            開始時刻順に並んだ分割ファイルのリスト
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        compact_path = output_dir / "compact.mp3"
+
+        logger.info(f"ffmpegで音声を変換中: {source_path.name}")
+        energy = await self._encode_and_analyze(source_path, compact_path)
+        total_sec = len(energy) * self.analysis_window_sec
+        if total_sec <= 0:
+            raise AudioSegmenterError("音声トラックが見つかりませんでした")
+
+        # MP3のフレーム境界（16kHzで約72ms）で切られるため、上限より少し手前で分割する
+        split_points = plan_split_points(
+            energy, self.analysis_window_sec,
+            max_segment_sec=self.segment_sec - 1,
+            search_sec=self.search_sec
+        )
+
+        if not split_points:
+            part_path = output_dir / "part_000.mp3"
+            compact_path.replace(part_path)
+            parts = [AudioPart(0, part_path, 0.0, total_sec)]
+        else:
+            logger.info(f"分割点: {', '.join(f'{t:.1f}' for t in split_points)}秒")
+            parts = await self._cut(compact_path, output_dir, split_points)
+            compact_path.unlink(missing_ok=True)
+
+        if not parts:
+            raise AudioSegmenterError("音声トラックが見つかりませんでした")
+
+        logger.info(f"音声分割完了: {len(parts)}個 (合計 {parts[-1].end_sec:.1f}秒)")
+        return parts
+
+    async def _encode_and_analyze(self, source_path: Path, compact_path: Path) -> np.ndarray:
+        """圧縮MP3を書き出しつつ、標準出力のPCMから窓ごとのエネルギーを計算"""
+        command = [
+            self.ffmpeg_path, "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+            "-i", str(source_path),
+            # 出力1: Whisperに送る圧縮MP3
+            "-vn",  # 動画トラックはデコードしない
+            "-ac", "1",
+            "-ar", str(self.sample_rate),
+            "-c:a", "libmp3lame",
+            "-b:a", f"{self.bitrate_kbps}k",
+            str(compact_path),
+            # 出力2: 分割点解析用の低レートPCM
+            "-vn",
+            "-ac", "1",
+            "-ar", str(self.analysis_rate),
+            "-f", "s16le",
+            "-c:a", "pcm_s16le",
+            "pipe:1",
+        ]
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise AudioSegmenterError("ffmpegが見つかりません。FFmpegをインストールしてください")
+
+        envelope = EnergyEnvelope(int(self.analysis_rate * self.analysis_window_sec))
+        # stderrを並行して読まないと、バッファが詰まった時にffmpegが止まる
+        stderr_task = asyncio.create_task(process.stderr.read())
+        while True:
+            chunk = await process.stdout.read(1024 * 1024)
+            if not chunk:
+                break
+            envelope.feed(chunk)
+        stderr = await stderr_task
+        await process.wait()
+
+        if process.returncode != 0:
+            message = stderr.decode("utf-8", errors="replace").strip()[-500:]
+            raise AudioSegmenterError(f"ffmpegエラー (終了コード {process.returncode}): {message}")
+
+        return envelope.finish()
+
+    async def _cut(self, compact_path: Path, output_dir: Path, split_points: List[float]) -> List[AudioPart]:
+        """圧縮MP3を指定時刻で再エンコードせずに分割"""
+        segment_list_path = output_dir / "segments.csv"
+        command = [
+            self.ffmpeg_path, "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+            "-i", str(compact_path),
+            "-c", "copy",
+            "-f", "segment",
+            "-segment_times", ",".join(f"{t:.3f}" for t in split_points),
+            "-reset_timestamps", "1",
+            "-segment_list", str(segment_list_path),
+            "-segment_list_type", "csv",
+            str(output_dir / "part_%03d.mp3"),
+        ]
+
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            message = stderr.decode("utf-8", errors="replace").strip()[-500:]
+            raise AudioSegmenterError(f"ffmpegエラー (終了コード {process.returncode}): {message}")
+
+        return self._read_segment_list(segment_list_path, output_dir)
+
+    def _read_segment_list(self, segment_list_path: Path, output_dir: Path) -> List[AudioPart]:
+        """ffmpegが出力したCSV（ファイル名,開始秒,終了秒）を読み込む"""
+        if not segment_list_path.exists():
+            return []
+
+        parts = []
+        with open(segment_list_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if len(row) < 3:
+                    continue
+                filename, start_sec, end_sec = row[0], float(row[1]), float(row[2])
+                parts.append(AudioPart(len(parts), output_dir / filename, start_sec, end_sec))
+        return parts
+
+
+# グローバルインスタンス
+audio_segmenter = AudioSegmenter()
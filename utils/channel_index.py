@@ -0,0 +1,80 @@
+"""
+有効チャンネルのインデックス
+サーバーごとの有効チャンネルIDをメモリに保持し、リアクションのたびにサーバーデータの
+JSONを読み込まずに O(1) で有効判定できるようにする
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ActiveChannelIndex:
+    """サーバーID → 有効チャンネルIDの集合"""
+
+    def __init__(self, loader: Callable[[str], Optional[Dict]]):
+        # インデックスにないサーバーを読み込む関数（サーバーデータのdictまたはNoneを返す）
+        self._loader = loader
+        self._channels: Dict[str, Set[str]] = {}
+
+    def load_all(self, server_data_dir: Path) -> int:
+        """
+        サーバーデータのディレクトリを一括で読み込む（起動時に1回）
+
+        Returns:
+            読み込んだサーバー数
+        """
+        server_data_dir = Path(server_data_dir)
+        if not server_data_dir.exists():
+            return 0
+
+        loaded = 0
+        for file_path in server_data_dir.glob("*.json"):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    server_data = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f"サーバーデータ読み込みスキップ {file_path.name}: {e}")
+                continue
+            self._channels[file_path.stem] = self._extract(server_data)
+            loaded += 1
+
+        logger.info(f"有効チャンネルインデックス: {loaded}サーバー / {sum(len(c) for c in self._channels.values())}チャンネル")
+        return loaded
+
+    def is_active(self, server_id, channel_id) -> bool:
+        """チャンネルが有効か判定（未登録のサーバーは1回だけ読み込み、無効も含めて記憶する）"""
+        return str(channel_id) in self.channels(server_id)
+
+    def channels(self, server_id) -> Set[str]:
+        """サーバーの有効チャンネルIDの集合"""
+        server_id = str(server_id)
+        channels = self._channels.get(server_id)
+        if channels is None:
+            channels = self._extract(self._loader(server_id))
+            self._channels[server_id] = channels
+        return channels
+
+    def set_active(self, server_id, channel_id, active: bool):
+        """/activate・/deactivate の結果をインデックスに反映"""
+        channels = self.channels(server_id)
+        if active:
+            channels.add(str(channel_id))
+        else:
+            channels.discard(str(channel_id))
+
+    def invalidate(self, server_id=None):
+        """インデックスを破棄（次回アクセス時に読み込み直す）"""
+        if server_id is None:
+            self._channels.clear()
+        else:
+            self._channels.pop(str(server_id), None)
+
+    @staticmethod
+    def _extract(server_data: Optional[Dict]) -> Set[str]:
+        if server_data and 'active_channel_ids' in server_data:
+            return {str(channel_id) for channel_id in server_data['active_channel_ids']}
+        return set()
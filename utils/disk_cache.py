@@ -0,0 +1,117 @@
+"""
+ディスクキャッシュユーティリティ
+キー（ハッシュ）ごとにJSONファイルとして保存し、合計サイズが上限を超えたら
+最後に使われたのが古いものから削除する
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def hash_key(*parts: Any) -> str:
+    """任意の値の組からキャッシュキー（SHA-256）を作成"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """サイズ上限付きのディスクキャッシュ"""
+
+    def __init__(self, directory: Path, max_bytes: int = 100 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._total_bytes = sum(path.stat().st_size for path in self._entry_paths())
+
+    def get(self, key: str) -> Optional[Any]:
+        """値を取得（存在しない・壊れている場合は None）"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"キャッシュ読み込みエラー {path.name}: {e}")
+            self.delete(key)
+            return None
+
+        # 最終利用時刻として更新時刻を更新（削除順の判定に使う）
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: Any):
+        """値を保存（一時ファイルに書いてから置き換えるので、読み込み途中で壊れない）"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+        with self._lock:
+            old_size = path.stat().st_size if path.exists() else 0
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except Exception:
+                Path(temp_path).unlink(missing_ok=True)
+                raise
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _evict(self):
+        """上限の9割まで、最後に使われたのが古いものから削除"""
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        target = int(self.max_bytes * 0.9)
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        logger.info(f"キャッシュ削除: {removed}件 ({self.directory.name}, 残り {total / (1024 * 1024):.1f}MB)")
+
+    def _entry_paths(self):
+        return self.directory.glob("*/*.json")
+
+    def _path(self, key: str) -> Path:
+        # 1ディレクトリのファイル数が増えすぎないよう先頭2文字で分ける
+        return self.directory / key[:2] / f"{key}.json"
@@ -0,0 +1,169 @@
+"""
+HTML解析用プロセスプール
+readability / BeautifulSoup による記事抽出は1ページで数百ミリ秒CPUを使うことがあるため、
+イベントループのスレッドではなく別プロセスで実行し、複数コアに分散する
+
+ワーカーは `python -m utils.extraction_pool` として起動する（起動スクリプトの main.py を読み込まない）
+親子間は標準入出力で「4バイトの長さ + pickle」の形式でタスクと結果をやり取りし、
+関数は参照（モジュール名と名前）で渡すので、子プロセスは関数のモジュールだけを読み込む
+"""
+
+import asyncio
+import logging
+import pickle
+import struct
+import sys
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, List, Set
+
+logger = logging.getLogger(__name__)
+
+# `-m utils.extraction_pool` で起動するため、utils の親ディレクトリを作業ディレクトリにする
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+
+_HEADER = struct.Struct(">I")
+
+
+class _Worker:
+    """1つのワーカープロセス（1度に1タスクを実行する）"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    @classmethod
+    async def spawn(cls) -> "_Worker":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "utils.extraction_pool",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=str(PACKAGE_ROOT)
+        )
+        return cls(process)
+
+    async def call(self, func: Callable, args: tuple):
+        """
+        func(*args) を子プロセスで実行し、(成功したか, 結果または例外) を返す
+
+        Raises:
+            BrokenProcessPool: 子プロセスが応答の途中で終了した場合
+        """
+        data = pickle.dumps((func, args))
+        try:
+            self.process.stdin.write(_HEADER.pack(len(data)) + data)
+            await self.process.stdin.drain()
+            header = await self.process.stdout.readexactly(_HEADER.size)
+            reply = await self.process.stdout.readexactly(_HEADER.unpack(header)[0])
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            raise BrokenProcessPool(f"HTML解析プロセスが終了しました (終了コード {self.process.returncode})") from e
+        return pickle.loads(reply)
+
+    def kill(self):
+        if self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def stop(self):
+        """終了させ、終了を待つ（プロセスの後片付けをイベントループが閉じる前に済ませる）"""
+        self.kill()
+        await self.process.wait()
+
+
+class ExtractionPool:
+    """タスクごとのタイムアウト付きプロセスプール"""
+
+    def __init__(self, max_workers: int = 2, task_timeout_sec: float = 20):
+        self.max_workers = max(1, max_workers)
+        self.task_timeout_sec = task_timeout_sec
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._idle: List[_Worker] = []
+        self._workers: Set[_Worker] = set()
+        self._stopping: Set[_Worker] = set()  # 終了させたが終了を待っていないプロセス
+        self.completed = 0
+        self.timeouts = 0
+
+    async def run(self, func: Callable, *args):
+        """
+        func(*args) を別プロセスで実行する
+
+        func はモジュールのトップレベルに定義された関数であること（子プロセスへ参照で渡すため）
+
+        Raises:
+            asyncio.TimeoutError: task_timeout_sec 以内に終わらなかった場合
+            BrokenProcessPool: 子プロセスが異常終了した場合
+            func が送出した例外
+        """
+        async with self._slots:
+            worker = self._idle.pop() if self._idle else await self._spawn()
+            try:
+                ok, value = await asyncio.wait_for(worker.call(func, args), timeout=self.task_timeout_sec)
+            except asyncio.TimeoutError:
+                # 止まった子プロセスがワーカーを占有し続けないよう終了させ、次のタスクは新しいプロセスで動かす
+                self.timeouts += 1
+                logger.warning(f"HTML解析タイムアウト ({self.task_timeout_sec}秒)。ワーカープロセスを再作成します")
+                await self._discard(worker)
+                raise
+            except BrokenProcessPool:
+                logger.error("HTML解析プロセスが異常終了しました。ワーカープロセスを再作成します")
+                await self._discard(worker)
+                raise
+            except BaseException:
+                # 呼び出し元のキャンセルなどで応答を読み切れなかったプロセスは再利用しない
+                # （キャンセル中は待てないので、終了の待機は shutdown に回す）
+                self._workers.discard(worker)
+                self._stopping.add(worker)
+                worker.kill()
+                raise
+            self._idle.append(worker)
+        if not ok:
+            raise value
+        self.completed += 1
+        return value
+
+    async def shutdown(self):
+        """ワーカープロセスを停止（Bot終了時に呼ぶ）"""
+        workers = list(self._workers | self._stopping)
+        self._workers.clear()
+        self._stopping.clear()
+        self._idle.clear()
+        await asyncio.gather(*(worker.stop() for worker in workers))
+
+    async def _spawn(self) -> _Worker:
+        worker = await _Worker.spawn()
+        self._workers.add(worker)
+        logger.info(f"HTML解析プロセス起動: {len(self._workers)}/{self.max_workers}プロセス, タイムアウト {self.task_timeout_sec}秒")
+        return worker
+
+    async def _discard(self, worker: _Worker):
+        """ワーカーを終了させてプールから外す"""
+        self._workers.discard(worker)
+        await worker.stop()
+
+
+def _worker_main():
+    """ワーカープロセスの本体（標準入力からタスクを読み、結果を標準出力へ書く）"""
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # 応答以外の出力（print など）が標準出力に混ざらないようにする
+    sys.stdout = sys.stderr
+    while True:
+        header = stdin.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return  # 親プロセスが終了した
+        func, args = pickle.loads(stdin.read(_HEADER.unpack(header)[0]))
+        try:
+            reply = (True, func(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            data = pickle.dumps(reply)
+        except Exception as e:
+            data = pickle.dumps((False, RuntimeError(f"結果を親プロセスへ送れません: {e!r}")))
+        stdout.write(_HEADER.pack(len(data)) + data)
+        stdout.flush()
+
+
+if __name__ == "__main__":
+    _worker_main()
@@ -0,0 +1,111 @@
+"""
+HTML→テキスト変換ユーティリティ
+正規表現を何度も文書全体にかける代わりに、HTMLParser のトークナイザーで1回だけ走査して
+script / style（JSON-LD を含む）を捨て、段落・改行を保ったまま本文テキストを取り出す
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import List
+
+# 中身ごと捨てる要素
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+# 前後に空行を入れる要素（段落）
+PARAGRAPH_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "table", "ul", "ol"}
+
+# 前後で改行する要素（ブロック）
+LINE_TAGS = {
+    "div", "li", "tr", "section", "article", "header", "footer", "nav", "aside", "main",
+    "dt", "dd", "figure", "figcaption", "form", "hr",
+}
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class HTMLTextExtractor(HTMLParser):
+    """
+    HTMLを少しずつ feed して本文テキストを組み立てるパーサー
+
+    使い方:
+        extractor = HTMLTextExtractor()
+        extractor.feed(chunk)  # 何回でも
+        text = extractor.text()
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: List[str] = []
+        self._skip_depth = 0
+        self._pre_depth = 0
+        self._pending_break = 0  # 次のテキストの前に入れる改行数（1: 改行, 2: 空行）
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag == "br":
+            # <br><br> は空行（段落の区切り）として扱う
+            self._pending_break = min(2, self._pending_break + 1)
+        else:
+            self._block_break(tag)
+        if tag == "pre":
+            self._pre_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        if self._skip_depth:
+            return
+        self._block_break(tag)
+        if tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth or not data:
+            return
+        if not self._pre_depth:
+            # ブラウザの表示と同じく、ソース上の改行・連続空白は1つの空白として扱う
+            data = WHITESPACE_PATTERN.sub(" ", data)
+            if self._pending_break and data == " ":
+                return
+        if self._pending_break:
+            self._parts.append("\n" * self._pending_break)
+            self._pending_break = 0
+        self._parts.append(data)
+
+    def _block_break(self, tag):
+        """ブロック要素の境界では、連続していても改行は1回（段落なら空行1つ）だけ入れる"""
+        if tag in PARAGRAPH_TAGS:
+            self._pending_break = 2
+        elif tag in LINE_TAGS:
+            self._pending_break = max(self._pending_break, 1)
+
+    def text(self) -> str:
+        """組み立てたテキスト（各行の前後の空白を除き、空行は段落の区切りとして1行だけ残す）"""
+        self.close()
+        lines = []
+        blank = False
+        for line in "".join(self._parts).split("\n"):
+            line = line.strip()
+            if line:
+                if blank and lines:
+                    lines.append("")
+                lines.append(line)
+                blank = False
+            else:
+                blank = True
+        return "\n".join(lines)
+
+
+def html_to_text(html: str) -> str:
+    """HTMLから本文テキストを抽出（文書を1回だけ走査する）"""
+    if not html:
+        return ""
+    extractor = HTMLTextExtractor()
+    extractor.feed(html)
+    return extractor.text()
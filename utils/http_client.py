@@ -0,0 +1,148 @@
+"""
+HTTPクライアントユーティリティ
+アプリ全体で1つの aiohttp.ClientSession を共有し、接続プール・ホストごとの同時接続数上限・
+DNSキャッシュ・keep-alive を使い回す（リクエストごとにTLSハンドシェイクしない）
+"""
+
+import asyncio
+import codecs
+import logging
+import re
+from typing import Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# BOM → 文字コード
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# 日本語サイトでよく使われるラベルは上位互換の文字コードで読む
+CHARSET_ALIASES = {
+    "shift_jis": "cp932",
+    "shift-jis": "cp932",
+    "sjis": "cp932",
+    "x-sjis": "cp932",
+    "windows-31j": "cp932",
+    "ms_kanji": "cp932",
+}
+
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+HEADER_CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+
+
+def _normalize_charset(label: Optional[str]) -> Optional[str]:
+    """文字コード名を正規化（Pythonで扱えない名前は None）"""
+    if not label:
+        return None
+    label = label.strip().lower()
+    label = CHARSET_ALIASES.get(label, label)
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def detect_charset(content_type: Optional[str], head: bytes, default: str = "utf-8") -> str:
+    """
+    文字コードを1回だけ判定する（BOM → Content-Type ヘッダー → metaタグ → 既定値の順）
+
+    Args:
+        content_type: Content-Type ヘッダーの値
+        head: 本文の先頭部分（metaタグは先頭数KBにある前提）
+    """
+    for bom, charset in BOMS:
+        if head.startswith(bom):
+            return charset
+
+    if content_type:
+        match = HEADER_CHARSET_PATTERN.search(content_type)
+        charset = _normalize_charset(match.group(1)) if match else None
+        if charset:
+            return charset
+
+    match = META_CHARSET_PATTERN.search(head[:4096])
+    charset = _normalize_charset(match.group(1).decode("ascii", errors="ignore")) if match else None
+    return charset or default
+
+
+class HttpClient:
+    """共有HTTPセッションを管理するクラス"""
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 8, dns_cache_ttl_sec: int = 300,
+                 keepalive_timeout_sec: float = 30, total_timeout_sec: float = 300,
+                 connect_timeout_sec: float = 30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl_sec = dns_cache_ttl_sec
+        self.keepalive_timeout_sec = keepalive_timeout_sec
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout_sec, connect=connect_timeout_sec)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """セッションを作成（Bot起動時に呼ぶ。呼ばなくても最初の利用時に作成される）"""
+        self._ensure_session()
+        logger.info(
+            f"HTTPクライアント開始: 同時接続 {self.limit} (ホストごと {self.limit_per_host}), "
+            f"DNSキャッシュ {self.dns_cache_ttl_sec}秒"
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """共有セッション（実行中のイベントループ内で参照すること）"""
+        return self._ensure_session()
+
+    async def fetch_text(self, url: str, max_bytes: int = 2 * 1024 * 1024,
+                         timeout_sec: float = 30, headers: Optional[dict] = None) -> Tuple[int, str]:
+        """
+        本文をストリーミングで読み込み、1回だけ判定した文字コードでデコードする
+
+        max_bytes を超えた分は読み込まない（巨大なページでメモリを使い切らない）
+
+        Returns:
+            (ステータスコード, 本文)
+        """
+        timeout = aiohttp.ClientTimeout(total=timeout_sec)
+        async with self.session.get(url, headers=headers, timeout=timeout) as response:
+            chunks = []
+            received = 0
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= max_bytes:
+                    logger.info(f"本文が上限 {max_bytes}バイトに達したため打ち切り: {url}")
+                    break
+            body = b"".join(chunks)[:max_bytes]
+            charset = detect_charset(response.headers.get("Content-Type"), body)
+            # 打ち切りでマルチバイト文字が途中で切れることがあるので errors="replace" で1回だけデコード
+            return response.status, body.decode(charset, errors="replace")
+
+    async def close(self):
+        """セッションを閉じる（Bot終了時に呼ぶ）"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        # イベントループが変わった場合（テストなど）は古いループのセッションを使えないので作り直す
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl_sec,
+                keepalive_timeout=self.keepalive_timeout_sec,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._loop = loop
+        return self._session
+
+
+# グローバルインスタンス
+http_client = HttpClient()
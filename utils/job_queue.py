@@ -0,0 +1,165 @@
+"""
+ジョブキューユーティリティ
+リアクションで発生した処理をキューに積み、ワーカープールで順番に実行する
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobType(str, Enum):
+    """ジョブの種類（機能ごと）"""
+    X_POST = "x_post"
+    TRANSCRIPTION = "transcription"
+    EXPLAIN = "explain"
+    MEMO = "memo"
+    ARTICLE = "article"
+    URL_FETCH = "url_fetch"
+    SUMMARY = "summary"
+    THREAD = "thread"
+
+
+class QueueFullError(Exception):
+    """キューが上限に達していて新しいジョブを受け付けられない"""
+
+
+class Job:
+    """キューに積まれる1件の処理"""
+
+    def __init__(self, job_type: JobType, handler: Callable[[], Awaitable[None]], description: str = ""):
+        self.job_type = job_type
+        self.handler = handler  # 引数なしで呼び出すコルーチン関数
+        self.description = description
+        self.enqueued_at = time.monotonic()
+        self.seq = 0  # キュー投入順（submit時に採番）
+
+
+class JobQueue:
+    """機能ごとの同時実行数制限付きワーカープール"""
+
+    def __init__(self, worker_count: int = 8, max_queue_size: int = 100,
+                 feature_limits: Optional[Dict[str, int]] = None):
+        self.worker_count = max(1, worker_count)
+        self.max_queue_size = max_queue_size
+        self.feature_limits = {
+            job_type: max(1, int((feature_limits or {}).get(job_type.value, self.worker_count)))
+            for job_type in JobType
+        }
+        self._pending: Dict[JobType, deque] = {job_type: deque() for job_type in JobType}
+        self._running: Dict[JobType, int] = {job_type: 0 for job_type in JobType}
+        self._busy_workers = 0
+        self._seq = itertools.count(1)
+        self._cond: Optional[asyncio.Condition] = None
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def pending_count(self) -> int:
+        """待機中のジョブ数"""
+        return sum(len(q) for q in self._pending.values())
+
+    @property
+    def running_count(self) -> int:
+        """実行中のジョブ数"""
+        return self._busy_workers
+
+    def start(self):
+        """ワーカーを起動（起動済みなら何もしない）"""
+        if self._workers:
+            return
+        self._cond = asyncio.Condition()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"ジョブキュー起動: ワーカー {self.worker_count}個, 最大待機数 {self.max_queue_size}")
+
+    async def stop(self):
+        """ワーカーを停止（待機中のジョブは破棄）"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        dropped = self.pending_count
+        for q in self._pending.values():
+            q.clear()
+        if dropped:
+            logger.warning(f"ジョブキュー停止: 未実行のジョブ {dropped}件を破棄しました")
+
+    async def submit(self, job: Job) -> int:
+        """
+        ジョブをキューに追加
+
+        Returns:
+            順番待ちの位置（すぐに実行される場合は0）
+        """
+        if self._cond is None:
+            self.start()
+
+        async with self._cond:
+            ahead = self.pending_count
+            if ahead >= self.max_queue_size:
+                raise QueueFullError(f"待機中のジョブが上限（{self.max_queue_size}件）に達しています")
+
+            job_type = job.job_type
+            saturated = (
+                self._busy_workers + ahead >= self.worker_count
+                or self._running[job_type] + len(self._pending[job_type]) >= self.feature_limits[job_type]
+            )
+
+            job.seq = next(self._seq)
+            self._pending[job_type].append(job)
+            self._cond.notify_all()
+
+        position = ahead + 1 if saturated else 0
+        logger.info(f"ジョブ追加: {job_type.value} {job.description} (待機 {ahead + 1}件, 実行中 {self._busy_workers}件)")
+        return position
+
+    async def join(self):
+        """待機中・実行中のジョブがすべて終わるまで待つ"""
+        if self._cond is None:
+            return
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.pending_count == 0 and self._busy_workers == 0)
+
+    def _next_runnable_job(self) -> Optional[Job]:
+        """同時実行数に空きがある機能のうち、最も古いジョブを取り出す"""
+        candidate = None
+        for job_type, q in self._pending.items():
+            if q and self._running[job_type] < self.feature_limits[job_type]:
+                if candidate is None or q[0].seq < candidate.seq:
+                    candidate = q[0]
+        if candidate is not None:
+            self._pending[candidate.job_type].popleft()
+        return candidate
+
+    async def _worker(self, worker_id: int):
+        """キューからジョブを取り出して実行し続ける"""
+        while True:
+            async with self._cond:
+                job = self._next_runnable_job()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._next_runnable_job()
+                self._running[job.job_type] += 1
+                self._busy_workers += 1
+
+            waited = time.monotonic() - job.enqueued_at
+            logger.info(f"ジョブ開始: {job.job_type.value} {job.description} (待ち時間 {waited:.1f}秒, worker {worker_id})")
+            try:
+                await job.handler()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"ジョブ実行エラー ({job.job_type.value}): {e}")
+            finally:
+                async with self._cond:
+                    self._running[job.job_type] -= 1
+                    self._busy_workers -= 1
+                    self._cond.notify_all()
@@ -0,0 +1,193 @@
+"""
+LLM応答キャッシュ
+同じメッセージに複数人が同じリアクションをした時に、同じプロンプト・入力で
+chat.completions.create を呼び直さないよう応答を再利用する
+stream はストリーミングで生成しながら途中経過を渡す（キャッシュは complete と共通）
+メモリ（LRU）→ ディスクの2段構成で、機能ごとに有効・無効を切り替えられる
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from utils.disk_cache import DiskCache, hash_key
+
+logger = logging.getLogger(__name__)
+
+# 節約額の概算に使う料金（USD / 100万トークン、入力・出力）
+MODEL_PRICES_USD_PER_1M = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+}
+
+
+def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """トークン数から料金を概算（料金表にないモデルは0）"""
+    input_price, output_price = MODEL_PRICES_USD_PER_1M.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def temperature_bucket(temperature: float) -> float:
+    """温度を0.1刻みに丸める（キーの一部。近い温度は同じ応答を使い回してよい）"""
+    return round(float(temperature), 1)
+
+
+class LLMResponseCache:
+    """機能ごとにオプトインできるLLM応答キャッシュ"""
+
+    def __init__(self, disk_cache: Optional[DiskCache], enabled_features: Iterable[str] = (),
+                 memory_entries: int = 256):
+        self.disk_cache = disk_cache
+        self.enabled_features = {str(feature) for feature in enabled_features}
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_usd = 0.0
+
+    def is_enabled(self, feature) -> bool:
+        return self._feature_name(feature) in self.enabled_features
+
+    @staticmethod
+    def make_key(feature, model: str, messages: List[Dict], temperature: float, **options) -> str:
+        """キャッシュキー: hash(機能, モデル, メッセージ（システムプロンプト＋入力）, 温度, その他のオプション)"""
+        return hash_key(LLMResponseCache._feature_name(feature), model, messages, temperature_bucket(temperature), options)
+
+    async def complete(self, client, feature, model: str, messages: List[Dict],
+                       temperature: float = 1.0, **options) -> str:
+        """
+        chat.completions.create を呼び、応答本文を返す（キャッシュが有効な機能はキャッシュを優先）
+
+        Args:
+            client: AsyncOpenAI クライアント
+            feature: 機能名（JobType または文字列）
+            model, messages, temperature, **options: chat.completions.create にそのまま渡す
+        """
+        if not self.is_enabled(feature):
+            response = await client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **options
+            )
+            return response.choices[0].message.content
+
+        key = self.make_key(feature, model, messages, temperature, **options)
+        entry = self._get(key)
+        if entry is not None:
+            self.saved_usd += estimate_cost_usd(model, entry["prompt_tokens"], entry["completion_tokens"])
+            logger.info(f"LLMキャッシュヒット: {self._feature_name(feature)} ({key[:12]})")
+            return entry["content"]
+
+        self.misses += 1
+        response = await client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, **options
+        )
+        content = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+        entry = {
+            "content": content,
+            "model": model,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+        # 途中で打ち切られた応答（finish_reason が length など）は使い回さない
+        if content and response.choices[0].finish_reason in (None, "stop"):
+            self._put(key, entry)
+        return content
+
+    async def stream(self, client, feature, model: str, messages: List[Dict],
+                     on_text: Optional[Callable[[str], None]] = None, temperature: float = 1.0, **options) -> str:
+        """
+        chat.completions.create をストリーミングで呼び、届いた分の本文を on_text に渡しながら全文を返す
+
+        キャッシュにあればストリーミングせずに返す（on_text は全文で1回だけ呼ぶ）
+        キーは complete と同じなので、どちらで生成した応答も使い回せる
+        """
+        enabled = self.is_enabled(feature)
+        key = self.make_key(feature, model, messages, temperature, **options) if enabled else None
+        if enabled:
+            entry = self._get(key)
+            if entry is not None:
+                self.saved_usd += estimate_cost_usd(model, entry["prompt_tokens"], entry["completion_tokens"])
+                logger.info(f"LLMキャッシュヒット: {self._feature_name(feature)} ({key[:12]})")
+                if on_text is not None:
+                    on_text(entry["content"])
+                return entry["content"]
+            self.misses += 1
+
+        response = await client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature,
+            stream=True, stream_options={"include_usage": True}, **options
+        )
+        content = ""
+        finish_reason = None
+        usage = None
+        async for chunk in response:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.finish_reason is not None:
+                finish_reason = choice.finish_reason
+            delta = getattr(choice.delta, "content", None)
+            if delta:
+                content += delta
+                if on_text is not None:
+                    on_text(content)
+
+        # 途中で打ち切られた応答（finish_reason が length など）は使い回さない
+        if enabled and content and finish_reason in (None, "stop"):
+            self._put(key, {
+                "content": content,
+                "model": model,
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            })
+        return content
+
+    def stats(self) -> Dict:
+        """ヒット率と節約額"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "saved_usd": self.saved_usd,
+            "disk_bytes": self.disk_cache.total_bytes if self.disk_cache else 0,
+        }
+
+    def _get(self, key: str) -> Optional[Dict]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return entry
+
+        if self.disk_cache is not None:
+            entry = self.disk_cache.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self.disk_hits += 1
+                return entry
+        return None
+
+    def _put(self, key: str, entry: Dict):
+        self._remember(key, entry)
+        if self.disk_cache is not None:
+            try:
+                self.disk_cache.set(key, entry)
+            except OSError as e:
+                logger.warning(f"LLMキャッシュ保存エラー: {e}")
+
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _feature_name(feature) -> str:
+        return getattr(feature, "value", str(feature))
@@ -0,0 +1,162 @@
+"""
+ログ出力ユーティリティ
+ログ出力側（イベントループ）は QueueHandler でキューに積むだけにし、
+バックグラウンドスレッドがキューにたまった分をまとめてファイルへ書き込む
+ファイルは書き込み時のみ開いてすぐ閉じる（同期ソフトがファイルを掴めるよう開きっぱなしにしない）
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+
+class BatchingFileHandler(logging.Handler):
+    """
+    書式化した行をためておき、flush でまとめて追記するファイルハンドラー
+    BatchingQueueListener のスレッドから使う前提
+    ファイルサイズはメモリ上で数え、ローテーションの判定で毎回 stat しない
+    """
+
+    def __init__(self, filename, encoding: str = 'utf-8', max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        super().__init__()
+        self.filename = Path(filename)
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._buffer: List[str] = []
+        self._size: Optional[int] = None  # 最初の書き込み時に一度だけ stat する
+
+    def emit(self, record):
+        try:
+            self._buffer.append(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """ためた行を1回の open / write で書き込む"""
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer)
+        self._buffer = []
+        if os.linesep != '\n':
+            data = data.replace('\n', os.linesep)
+        encoded = data.encode(self.encoding, errors='replace')
+        try:
+            if self._size is None:
+                self._size = self.filename.stat().st_size if self.filename.exists() else 0
+            if self._size > self.max_bytes:
+                self._rotate_logs()
+                self._size = 0
+            # 書き込み時のみファイルを開く
+            with open(self.filename, 'ab') as f:
+                f.write(encoded)
+            self._size += len(encoded)
+        except Exception as e:
+            print(f"ログ書き込みエラー: {e}")
+
+    def _rotate_logs(self):
+        """ログファイルをローテーション（log.txt → log.txt.1 → … → log.txt.{backup_count}）"""
+        try:
+            for i in range(self.backup_count - 1, 0, -1):
+                old_file = self.filename.with_name(f"{self.filename.name}.{i}")
+                new_file = self.filename.with_name(f"{self.filename.name}.{i + 1}")
+                if old_file.exists():
+                    if new_file.exists():
+                        new_file.unlink()
+                    old_file.rename(new_file)
+
+            # 現在のログファイルを .1 に移動
+            if self.filename.exists():
+                backup_file = self.filename.with_name(f"{self.filename.name}.1")
+                if backup_file.exists():
+                    backup_file.unlink()
+                self.filename.rename(backup_file)
+        except Exception as e:
+            print(f"ログローテーションエラー: {e}")
+
+
+class BatchingQueueListener:
+    """キューからログレコードを取り出し、続けて届いている分をまとめて各ハンドラーへ渡すスレッド"""
+
+    _STOP = object()
+
+    def __init__(self, log_queue, handlers: List[logging.Handler], batch_size: int = 500):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = max(1, batch_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """残りのレコードを書き出してからスレッドを止める"""
+        if self._thread is not None:
+            self.queue.put(self._STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            record = self.queue.get()
+            count = 0
+            while True:
+                if record is self._STOP:
+                    stopping = True
+                    break
+                self._handle(record)
+                count += 1
+                if count >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except (OSError, ValueError):
+                    # 終了処理中に出力先（標準エラーなど）が閉じられている場合は書き出しを諦める
+                    pass
+
+    def _handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def setup_queue_logging(handlers: List[logging.Handler], level: int = logging.INFO,
+                        batch_size: int = 500) -> BatchingQueueListener:
+    """
+    ルートロガーに QueueHandler を設定し、handlers への出力をバックグラウンドスレッドに任せる
+
+    2回目以降の呼び出し（モジュールの読み込み直しなど）では新しい出力先を追加せず、
+    設定済みの listener をそのまま返す（同じレコードが二重に書き込まれないように）
+
+    Returns:
+        開始済みの BatchingQueueListener（プロセス終了時に自動で停止・書き出しされる）
+    """
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in root.handlers:
+        listener = getattr(handler, "batching_listener", None)
+        if isinstance(handler, logging.handlers.QueueHandler) and listener is not None:
+            return listener
+
+    log_queue = queue.SimpleQueue()
+    listener = BatchingQueueListener(log_queue, handlers, batch_size=batch_size)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.batching_listener = listener
+    root.addHandler(queue_handler)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,226 @@
+"""
+送信スケジューラー
+チャンネルごとにメッセージ送信・編集・リアクション追加を1本の列に並べて順番に実行する
+固定の sleep で間隔を空ける代わりに、Discord の応答ヘッダー（X-RateLimit-Remaining / Reset-After）を記録し、
+残り回数が0のときだけリセットまで待つ
+続けて積まれたテキスト（post）は2000文字以内で1通にまとめて送る
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Discordの1メッセージあたりの文字数上限
+MAX_MESSAGE_CHARS = 2000
+
+SEND_PATH_PATTERN = re.compile(r"/channels/(\d+)/messages$")
+EDIT_PATH_PATTERN = re.compile(r"/channels/(\d+)/messages/\d+$")
+REACTION_PATH_PATTERN = re.compile(r"/channels/(\d+)/messages/\d+/reactions/")
+
+
+def split_text(text: str, limit: int = MAX_MESSAGE_CHARS) -> List[str]:
+    """limit 文字以内に分割（できるだけ改行の位置で切る）"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+class RateLimitTracker:
+    """Discord の応答ヘッダーから、チャンネル・操作ごとの残り回数とリセット時刻を記録する"""
+
+    def __init__(self):
+        self._limits: Dict[Tuple[int, str], Tuple[int, float]] = {}
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """discord.py の http_trace に渡す TraceConfig（ライブラリのHTTP応答を観測する）"""
+        config = aiohttp.TraceConfig()
+
+        async def on_request_end(session, context, params):
+            self.observe(params.method, params.url.path, params.response.status, params.response.headers)
+
+        config.on_request_end.append(on_request_end)
+        return config
+
+    def observe(self, method: str, path: str, status: int, headers):
+        """1回分の応答を記録（送信・編集・リアクション追加のみ対象）"""
+        kind, channel_id = self._classify(method, path)
+        if kind is None:
+            return
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if status == 429:
+            remaining = 0
+            reset_after = headers.get("Retry-After", reset_after)
+        if remaining is None or reset_after is None:
+            return
+        try:
+            self._limits[(channel_id, kind)] = (int(float(remaining)), time.monotonic() + float(reset_after))
+        except ValueError:
+            return
+
+    def delay(self, channel_id: int, kind: str) -> float:
+        """次の操作の前に待つべき秒数（残り回数があれば0）"""
+        limit = self._limits.get((channel_id, kind))
+        if limit is None:
+            return 0.0
+        remaining, reset_at = limit
+        wait = reset_at - time.monotonic()
+        if wait <= 0:
+            del self._limits[(channel_id, kind)]
+            return 0.0
+        return wait if remaining <= 0 else 0.0
+
+    @staticmethod
+    def _classify(method: str, path: str) -> Tuple[Optional[str], Optional[int]]:
+        match = SEND_PATH_PATTERN.search(path)
+        if match and method == "POST":
+            return "send", int(match.group(1))
+        match = EDIT_PATH_PATTERN.search(path)
+        if match and method == "PATCH":
+            return "edit", int(match.group(1))
+        match = REACTION_PATH_PATTERN.search(path)
+        if match and method == "PUT":
+            return "reaction", int(match.group(1))
+        return None, None
+
+
+class _Item:
+    """列に並ぶ1件の操作"""
+
+    __slots__ = ("kind", "target", "content", "kwargs", "future")
+
+    def __init__(self, kind: str, target, content=None, kwargs: Optional[dict] = None,
+                 future: Optional[asyncio.Future] = None):
+        self.kind = kind  # "send" / "post" / "edit" / "reaction"
+        self.target = target  # send・post はチャンネル、edit・reaction はメッセージ
+        self.content = content
+        self.kwargs = kwargs or {}
+        self.future = future
+
+
+class OutboundScheduler:
+    """チャンネルごとの送信スケジューラー"""
+
+    def __init__(self, tracker: Optional[RateLimitTracker] = None, max_message_chars: int = MAX_MESSAGE_CHARS):
+        self.tracker = tracker or RateLimitTracker()
+        self.max_message_chars = max_message_chars
+        self._queues: Dict[int, Deque[_Item]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.stats = {"sent": 0, "coalesced": 0, "edits": 0, "reactions": 0, "waited_sec": 0.0}
+
+    async def send(self, channel, content=None, **kwargs):
+        """channel.send と同じ引数で送信し、送信したメッセージを返す（列の順番が来るまで待つ）"""
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(channel.id, _Item("send", channel, content, kwargs, future))
+        return await future
+
+    def post(self, channel, text: str):
+        """
+        テキストを列に積むだけで待たない（結果のメッセージを使わない通知向け）
+
+        続けて積まれたテキストは max_message_chars 以内で1通にまとめ、長いテキストは分割して送る
+        """
+        for chunk in split_text(text, self.max_message_chars):
+            self._enqueue(channel.id, _Item("post", channel, chunk))
+
+    async def edit(self, message, **kwargs):
+        """message.edit と同じ引数で編集し、編集後のメッセージを返す"""
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(message.channel.id, _Item("edit", message, kwargs=kwargs, future=future))
+        return await future
+
+    async def add_reaction(self, message, emoji):
+        """message.add_reaction を列に並べて実行"""
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(message.channel.id, _Item("reaction", message, emoji, future=future))
+        await future
+
+    async def add_reactions(self, message, emojis: Iterable) -> int:
+        """
+        複数のリアクションを順番に追加（失敗したものはログに残して続行）
+
+        Returns:
+            追加できたリアクション数
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for emoji in emojis:
+            future = loop.create_future()
+            self._enqueue(message.channel.id, _Item("reaction", message, emoji, future=future))
+            futures.append((emoji, future))
+        added = 0
+        for emoji, future in futures:
+            try:
+                await future
+                added += 1
+            except Exception as e:
+                logger.warning(f"リアクション追加エラー ({emoji}): {e}")
+        return added
+
+    def _enqueue(self, channel_id: int, item: _Item):
+        queue = self._queues.setdefault(channel_id, deque())
+        queue.append(item)
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._run(channel_id, queue))
+
+    async def _run(self, channel_id: int, queue: Deque[_Item]):
+        """1チャンネル分の列を順番に処理する（列が空になったら終了）"""
+        item = None
+        try:
+            while queue:
+                item = queue.popleft()
+                if item.kind == "post":
+                    text = item.content
+                    while queue and queue[0].kind == "post" and len(text) + 1 + len(queue[0].content) <= self.max_message_chars:
+                        text += "\n" + queue.popleft().content
+                        self.stats["coalesced"] += 1
+                    await self._execute(channel_id, "send", lambda: item.target.send(text), item)
+                elif item.kind == "send":
+                    await self._execute(channel_id, "send", lambda: item.target.send(item.content, **item.kwargs), item)
+                elif item.kind == "edit":
+                    await self._execute(channel_id, "edit", lambda: item.target.edit(**item.kwargs), item)
+                else:
+                    await self._execute(channel_id, "reaction", lambda: item.target.add_reaction(item.content), item)
+        finally:
+            # 停止時に実行中・未実行の操作を待っている呼び出し元を解放する
+            for pending in ([item] if item is not None else []) + list(queue):
+                if pending.future is not None and not pending.future.done():
+                    pending.future.cancel()
+            queue.clear()
+            self._workers.pop(channel_id, None)
+            if self._queues.get(channel_id) is queue:
+                del self._queues[channel_id]
+
+    async def _execute(self, channel_id: int, kind: str, operation, item: _Item):
+        wait = self.tracker.delay(channel_id, kind)
+        if wait > 0:
+            logger.info(f"レート制限の残りが0のため {wait:.2f}秒待機 (channel {channel_id}, {kind})")
+            self.stats["waited_sec"] += wait
+            await asyncio.sleep(wait)
+        try:
+            result = await operation()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if item.future is None:
+                logger.warning(f"送信エラー (channel {channel_id}): {e}")
+            elif not item.future.done():
+                item.future.set_exception(e)
+            return
+        self.stats[{"send": "sent", "edit": "edits", "reaction": "reactions"}[kind]] += 1
+        if item.future is not None and not item.future.done():
+            item.future.set_result(result)
@@ -0,0 +1,101 @@
+"""
+進捗表示
+長い処理の状態（段階・パート i/N・経過時間・残り時間の目安）を1通のメッセージに編集で反映する
+残り時間は、この実行で完了したパートの実測のペース（並列処理を含む）から計算する
+1パートが長くても表示が止まって見えないよう、パートの完了とは別に refresh_sec ごとに表示し直す
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from utils.stream_preview import StreamingPreview
+from utils.whisper_transcriber import format_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressStatus(StreamingPreview):
+    """状態メッセージ（見出し＋進捗1行）"""
+
+    def __init__(self, scheduler, channel, header: str, interval_sec: float = 3.0, refresh_sec: float = 10.0):
+        super().__init__(scheduler, channel, header, interval_sec=interval_sec)
+        self.refresh_sec = refresh_sec
+        self.started_at = time.monotonic()
+        self.stage_label = ""
+        self.total_parts = 0
+        self.done_parts = 0
+        self._initial_done = 0
+        self._parts_started_at: Optional[float] = None
+        self._ticker: Optional[asyncio.Task] = None
+
+    async def start(self, message=None):
+        await super().start(message)
+        if self.refresh_sec > 0 and self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick())
+
+    def stage(self, label: str):
+        """処理の段階（ダウンロード中・変換中など）を表示する"""
+        self.stage_label = label
+        self.update(self.render())
+
+    def start_parts(self, total: int, done: int = 0):
+        """パートの処理を開始（done は再開前に完了済みのパート数。残り時間の計算には含めない）"""
+        self.total_parts = total
+        self.done_parts = done
+        self._initial_done = done
+        self._parts_started_at = time.monotonic()
+        self.stage_label = "📝 文字起こし中"
+        self.update(self.render())
+
+    def part_done(self):
+        self.done_parts += 1
+        self.update(self.render())
+
+    def eta_sec(self) -> Optional[float]:
+        """残り時間の目安（この実行でまだ1パートも終わっていなければ None）"""
+        finished = self.done_parts - self._initial_done
+        if self._parts_started_at is None or finished <= 0:
+            return None
+        sec_per_part = (time.monotonic() - self._parts_started_at) / finished
+        return sec_per_part * max(0, self.total_parts - self.done_parts)
+
+    def render(self) -> str:
+        elapsed = format_timestamp(time.monotonic() - self.started_at)
+        if not self.total_parts:
+            return f"{self.stage_label}… ⏱ 経過 {elapsed}"
+        percent = self.done_parts * 100 // self.total_parts
+        eta = self.eta_sec()
+        eta_text = f"残り約 {format_timestamp(eta)}" if eta is not None else "残り時間を計測中"
+        return (
+            f"{self.stage_label}: {self.done_parts}/{self.total_parts}パート ({percent}%) "
+            f"⏱ 経過 {elapsed} / {eta_text}"
+        )
+
+    async def complete(self, line: str):
+        """最終的な状態（完了・中断など）に置き換える（状態表示の失敗で本処理を止めない）"""
+        elapsed = format_timestamp(time.monotonic() - self.started_at)
+        try:
+            await self.finish(content=f"{self.header}\n{line}（経過 {elapsed}）")
+        except Exception as e:
+            logger.warning(f"進捗メッセージの更新エラー: {e}")
+
+    async def _tick(self):
+        """経過時間・残り時間を定期的に表示し直す（編集は StreamingPreview と同じく interval_sec で間引かれる）"""
+        while not self._closed:
+            await asyncio.sleep(self.refresh_sec)
+            if self.stage_label:
+                self.update(self.render())
+
+    async def _close(self):
+        if self._ticker is not None and not self._ticker.done():
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+        await super()._close()
+
+    def _render(self, text: str) -> Optional[str]:
+        return f"{self.header}\n{text}" if text else None
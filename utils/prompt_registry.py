@@ -0,0 +1,125 @@
+"""
+プロンプトテンプレートのレジストリ
+prompt/ のテンプレートを起動時に読み込み、出力形式の指示（JSONなど）を付けた完成形をメモリに持っておく
+ファイルは更新時刻（mtime）が変わったときだけ読み直すので、リアクションのたびにディスクを読まない
+ユーザーのカスタムプロンプトも、同じ指示を付けた結果を使い回す
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PromptTemplate:
+    """1つのテンプレート（ファイル・フォールバック・付加する指示）"""
+
+    def __init__(self, name: str, path: Path, fallback: str, suffix: str = "",
+                 skip_suffix_marker: Optional[str] = None, placeholder: Optional[str] = None):
+        self.name = name
+        self.path = path
+        self.fallback = fallback
+        self.suffix = suffix
+        # この文字列がすでに含まれていれば suffix を付けない（プロンプト側で出力形式を指定済み）
+        self.skip_suffix_marker = skip_suffix_marker
+        # render で入力内容に置き換える文字列
+        self.placeholder = placeholder
+        self.mtime: Optional[int] = None
+        self.from_file = False
+        self.compiled = ""
+        self.parts: List[str] = []
+        self.checked_at = 0.0
+
+    def compile(self, text: str) -> str:
+        """テンプレート本文に suffix を付けた完成形"""
+        if self.suffix and not (self.skip_suffix_marker and self.skip_suffix_marker in text):
+            return text + self.suffix
+        return text
+
+    def set_text(self, text: str, from_file: bool):
+        self.from_file = from_file
+        self.compiled = self.compile(text)
+        self.parts = self.compiled.split(self.placeholder) if self.placeholder else [self.compiled]
+
+
+class PromptRegistry:
+    """テンプレート名 → 完成済みのプロンプト"""
+
+    def __init__(self, prompt_dir: Path, check_interval_sec: float = 2.0, custom_entries: int = 256):
+        self.prompt_dir = Path(prompt_dir)
+        # mtime の確認（stat）も毎回はしない
+        self.check_interval_sec = check_interval_sec
+        self.custom_entries = custom_entries
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._custom: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.reloads = 0
+
+    def register(self, name: str, filename: str, fallback: str, suffix: str = "",
+                 skip_suffix_marker: Optional[str] = None, placeholder: Optional[str] = None):
+        """テンプレートを登録して読み込む"""
+        template = PromptTemplate(name, self.prompt_dir / filename, fallback, suffix, skip_suffix_marker, placeholder)
+        self._templates[name] = template
+        self._load(template)
+
+    def get(self, name: str, custom: Optional[str] = None) -> str:
+        """
+        完成済みのプロンプトを返す
+
+        Args:
+            name: テンプレート名
+            custom: ユーザーのカスタムプロンプト（空でなければファイルの代わりに使う）
+        """
+        template = self._templates[name]
+        if custom:
+            key = (name, custom)
+            compiled = self._custom.get(key)
+            if compiled is None:
+                compiled = template.compile(custom)
+                self._custom[key] = compiled
+                while len(self._custom) > self.custom_entries:
+                    self._custom.popitem(last=False)
+            else:
+                self._custom.move_to_end(key)
+            return compiled
+
+        self._refresh(template)
+        return template.compiled
+
+    def render(self, name: str, value: str) -> str:
+        """テンプレートの placeholder を value に置き換えたプロンプトを返す"""
+        template = self._templates[name]
+        self._refresh(template)
+        return value.join(template.parts)
+
+    def is_from_file(self, name: str) -> bool:
+        """ファイルのテンプレートを使っているか（False ならフォールバック）"""
+        return self._templates[name].from_file
+
+    def _refresh(self, template: PromptTemplate):
+        """前回の確認から check_interval_sec 経っていれば mtime を確認し、変わっていれば読み直す"""
+        now = time.monotonic()
+        if now - template.checked_at < self.check_interval_sec:
+            return
+        template.checked_at = now
+        try:
+            mtime = template.path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != template.mtime:
+            self._load(template)
+            self.reloads += 1
+            logger.info(f"プロンプトを再読み込み: {template.path.name}")
+
+    def _load(self, template: PromptTemplate):
+        template.checked_at = time.monotonic()
+        try:
+            template.mtime = template.path.stat().st_mtime_ns
+            with open(template.path, 'r', encoding='utf-8') as f:
+                template.set_text(f.read(), from_file=True)
+        except OSError:
+            template.mtime = None
+            template.set_text(template.fallback, from_file=False)
+            logger.info(f"プロンプトファイルがないためフォールバックを使用: {template.path.name}")
@@ -0,0 +1,78 @@
+"""
+リアクションの事前フィルタ
+Discord APIの呼び出し（fetch_message / fetch_user）やディスク書き込みの前に、
+処理しないリアクションを安い順に段階的に弾き、段階ごとの件数を記録する
+"""
+
+import inspect
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+StageCheck = Callable[[object], Union[bool, Awaitable[bool]]]
+
+
+class DuplicateEventFilter:
+    """同じイベントを一定時間内に2回処理しないためのフィルタ"""
+
+    def __init__(self, ttl_sec: float = 30.0, max_entries: int = 10000):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[Tuple, float]" = OrderedDict()
+
+    def check_and_mark(self, key: Tuple) -> bool:
+        """
+        初めて見たイベントなら記録して True、TTL内に同じイベントを見ていれば False
+        """
+        now = time.monotonic()
+        # 古いものから期限切れを削除（挿入順 = 時刻順）
+        while self._seen:
+            oldest_key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.ttl_sec and len(self._seen) < self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+        if key in self._seen:
+            return False
+        self._seen[key] = now
+        return True
+
+    def unmark(self, key: Tuple):
+        """記録を取り消す（受け付けられなかったイベントを、やり直しの時に重複扱いしないため）"""
+        self._seen.pop(key, None)
+
+
+class ReactionPreFilter:
+    """登録順に段階チェックを実行し、最初に弾いた段階名を返す"""
+
+    def __init__(self):
+        self._stages: List[Tuple[str, StageCheck]] = []
+        self.rejected: Counter = Counter()
+        self.accepted = 0
+
+    def add_stage(self, name: str, check: StageCheck):
+        """段階を追加（check は payload を受け取り、通すなら True を返す。同期・非同期どちらでも可）"""
+        self._stages.append((name, check))
+
+    async def check(self, payload) -> Optional[str]:
+        """
+        全段階を通せば None、弾いた場合はその段階名を返す
+        """
+        for name, check in self._stages:
+            passed = check(payload)
+            if inspect.isawaitable(passed):
+                passed = await passed
+            if not passed:
+                self.rejected[name] += 1
+                return name
+        self.accepted += 1
+        return None
+
+    def snapshot(self) -> Dict[str, int]:
+        """段階ごとの除外件数と通過件数"""
+        counts = {name: self.rejected.get(name, 0) for name, _ in self._stages}
+        counts["accepted"] = self.accepted
+        return counts
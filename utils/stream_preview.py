@@ -0,0 +1,153 @@
+"""
+生成途中のプレビュー
+LLMのストリーミング出力を1通のメッセージに編集で反映し、生成が終わったら最終的な表示（Embedなど）に置き換える
+編集は一定間隔に間引き、送信スケジューラーの列に並べるのでレート制限の残りを超えない
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Optional
+
+from utils.outbound import OutboundScheduler
+
+logger = logging.getLogger(__name__)
+
+# プレビューに表示する本文の最大文字数（見出しと合わせて2000文字以内に収める）
+PREVIEW_MAX_CHARS = 1800
+CURSOR = " ▌"
+
+
+def partial_json_string(text: str, key: str = "content") -> str:
+    """
+    生成途中のJSON（{"content": "…）から key の文字列値を、届いている所まで取り出す
+
+    JSONモードの出力をそのまま見せず、本文だけをプレビューするために使う
+    """
+    start = text.find(f'"{key}"')
+    if start < 0:
+        return ""
+    colon = text.find(":", start + len(key) + 2)
+    quote = text.find('"', colon + 1) if colon >= 0 else -1
+    if quote < 0:
+        return ""
+
+    # 閉じの引用符（エスケープされていないもの）までを値とする
+    body_start = quote + 1
+    index = body_start
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == '"':
+            break
+        index += 1
+    body = text[body_start:min(index, len(text))]
+
+    # 末尾の書きかけのエスケープ（\ や \u00 など）は次の断片を待つ
+    backslash = body.rfind("\\")
+    if backslash >= 0:
+        escape = body[backslash:]
+        run = len(body[:backslash + 1]) - len(body[:backslash + 1].rstrip("\\"))
+        if run % 2 == 1 and (len(escape) == 1 or (escape[1] == "u" and len(escape) < 6)):
+            body = body[:backslash]
+    try:
+        return json.loads(f'"{body}"', strict=False)
+    except json.JSONDecodeError:
+        return body
+
+
+class StreamingPreview:
+    """
+    生成中のテキストを1通のメッセージに編集で反映する
+
+    update は待たずに最新のテキストを覚えるだけで、編集は interval_sec ごとに1回
+    （前の編集が終わるまでに届いた分はまとめて次の編集に反映する）
+    """
+
+    def __init__(self, scheduler: OutboundScheduler, channel, header: str, interval_sec: float = 1.5,
+                 max_chars: int = PREVIEW_MAX_CHARS, transform: Optional[Callable[[str], str]] = None):
+        self.scheduler = scheduler
+        self.channel = channel
+        self.header = header
+        self.interval_sec = interval_sec
+        self.max_chars = max_chars
+        self.transform = transform
+        self.message = None
+        self.edits = 0
+        self._latest: Optional[str] = None
+        self._shown: Optional[str] = None
+        self._last_edit = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._finished = False
+
+    async def start(self, message=None):
+        """プレビュー用のメッセージを送る（message を渡した場合は送信済みのメッセージを編集して使う）"""
+        self.message = message or await self.scheduler.send(self.channel, f"{self.header}{CURSOR}")
+        self._last_edit = time.monotonic()
+
+    def update(self, text: str):
+        """生成途中の全文を受け取る（LLMResponseCache.stream の on_text に渡す）"""
+        if self._closed or self.message is None:
+            return
+        self._latest = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._edit_loop())
+
+    async def finish(self, content: Optional[str] = None, embed=None):
+        """途中経過の編集をやめ、プレビューを最終的な表示に置き換える"""
+        await self._close()
+        self._finished = True
+        if self.message is None:
+            return await self.scheduler.send(self.channel, content, embed=embed)
+        return await self.scheduler.edit(self.message, content=content, embed=embed)
+
+    async def discard(self):
+        """エラー時などにプレビューを削除する（finish 済みなら何もしない）"""
+        await self._close()
+        if self.message is not None and not self._finished:
+            try:
+                await self.message.delete()
+            except Exception as e:
+                logger.warning(f"プレビュー削除エラー: {e}")
+            self.message = None
+
+    async def _close(self):
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _edit_loop(self):
+        while self._latest is not None and not self._closed:
+            wait = self._last_edit + self.interval_sec - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            text, self._latest = self._latest, None
+            rendered = self._render(text)
+            if rendered is None or rendered == self._shown:
+                continue
+            try:
+                await self.scheduler.edit(self.message, content=rendered)
+                self._shown = rendered
+                self.edits += 1
+            except Exception as e:
+                logger.warning(f"プレビュー編集エラー: {e}")
+            self._last_edit = time.monotonic()
+
+    def _render(self, text: str) -> Optional[str]:
+        if self.transform is not None:
+            text = self.transform(text)
+        text = text.strip()
+        if not text:
+            return None
+        # 長くなったら末尾（生成中の箇所）を表示する
+        if len(text) > self.max_chars:
+            text = "…" + text[-self.max_chars:]
+        return f"{self.header}\n{text}{CURSOR}"
@@ -0,0 +1,62 @@
+"""
+文字起こし結果のキャッシュ
+ダウンロードした音声・動画ファイルの内容のハッシュ（＋モデル・言語）をキーに文字起こし結果を保存し、
+同じファイルへの再リアクションや再投稿では音声の変換・分割・Whisper呼び出しをせずに結果を返す
+"""
+
+import hashlib
+import logging
+from typing import Dict, Optional
+
+from utils.disk_cache import DiskCache, hash_key
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptCache:
+    """内容ハッシュ → 文字起こし結果（サイズ上限は DiskCache に任せる）"""
+
+    def __init__(self, disk_cache: Optional[DiskCache], model: str = "whisper-1", language: str = "ja"):
+        self.disk_cache = disk_cache
+        self.model = model
+        self.language = language
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def new_hasher():
+        """ダウンロードしながら内容ハッシュを計算するためのハッシュオブジェクト"""
+        return hashlib.sha256()
+
+    def make_key(self, content_hash: str) -> str:
+        return hash_key("transcript", content_hash, self.model, self.language)
+
+    def get(self, content_hash: str) -> Optional[Dict]:
+        """
+        キャッシュ済みの結果を返す
+
+        Returns:
+            {"text": 文字起こし全文, "audio_length_sec": 音声長, "split_count": 分割数} または None
+        """
+        if self.disk_cache is None:
+            return None
+        entry = self.disk_cache.get(self.make_key(content_hash))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"文字起こしキャッシュヒット: {content_hash[:12]}")
+        return entry
+
+    def set(self, content_hash: str, text: str, audio_length_sec: float, split_count: int):
+        """全パート成功した結果だけを保存する（失敗パートを含む結果は呼び出し側で除く）"""
+        if self.disk_cache is None:
+            return
+        try:
+            self.disk_cache.set(self.make_key(content_hash), {
+                "text": text,
+                "audio_length_sec": audio_length_sec,
+                "split_count": split_count,
+            })
+        except OSError as e:
+            logger.warning(f"文字起こしキャッシュ保存エラー: {e}")
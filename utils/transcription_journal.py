@@ -0,0 +1,193 @@
+"""
+文字起こしジョブのジャーナル
+ジョブごとのディレクトリに元ファイルの情報・分割計画・分割ファイル・完了したパートの文字起こし結果を保存し、
+クラッシュや /restart の後でも未完了のパートから再開できるようにする
+
+    {job_id}/job.json     元の添付ファイル・投稿先・分割計画（書き換えは一時ファイル経由で置き換え）
+    {job_id}/parts.jsonl  完了したパートの結果（1パート1行の追記のみ）
+    {job_id}/parts/       分割ファイル
+    {job_id}/source.*     分割前の元ファイル（分割計画を保存したら削除）
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.audio_segmenter import AudioPart
+from utils.whisper_transcriber import PartResult
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionJob:
+    """1件の文字起こしジョブ"""
+
+    def __init__(self, job_dir: Path, data: Dict, completed: Optional[Dict[int, str]] = None):
+        self.dir = Path(job_dir)
+        self.data = data
+        self.completed: Dict[int, str] = completed or {}
+
+    @property
+    def job_id(self) -> str:
+        return self.dir.name
+
+    @property
+    def parts_dir(self) -> Path:
+        return self.dir / "parts"
+
+    @property
+    def source_path(self) -> Path:
+        return self.dir / f"source.{self.data['file_extension']}"
+
+    @property
+    def channel_id(self) -> int:
+        return self.data["channel_id"]
+
+    @property
+    def user_id(self) -> int:
+        return self.data["user_id"]
+
+    @property
+    def filename(self) -> str:
+        return self.data["filename"]
+
+    @property
+    def is_video(self) -> bool:
+        return self.data["is_video"]
+
+    @property
+    def content_hash(self) -> str:
+        return self.data["content_hash"]
+
+    @property
+    def resume_count(self) -> int:
+        return self.data.get("resume_count", 0)
+
+    @property
+    def has_plan(self) -> bool:
+        return bool(self.data.get("parts"))
+
+    def parts(self) -> List[AudioPart]:
+        """分割計画（すべてのパート）"""
+        return [
+            AudioPart(part["index"], self.parts_dir / part["file"], part["start_sec"], part["end_sec"])
+            for part in self.data.get("parts", [])
+        ]
+
+    def pending_parts(self) -> List[AudioPart]:
+        """まだ文字起こしが終わっていないパート"""
+        return [part for part in self.parts() if part.index not in self.completed]
+
+    def completed_results(self) -> List[PartResult]:
+        """完了済みのパートの結果"""
+        return [
+            PartResult(part.index, part.start_sec, part.end_sec, text=self.completed[part.index])
+            for part in self.parts() if part.index in self.completed
+        ]
+
+    @property
+    def audio_length_sec(self) -> float:
+        parts = self.data.get("parts", [])
+        return parts[-1]["end_sec"] if parts else 0.0
+
+    def set_plan(self, parts: List[AudioPart]):
+        """分割計画を保存し、不要になった元ファイルを削除する"""
+        self.data["parts"] = [
+            {"index": part.index, "file": part.path.name, "start_sec": part.start_sec, "end_sec": part.end_sec}
+            for part in parts
+        ]
+        self.save()
+        self.source_path.unlink(missing_ok=True)
+
+    def record_part(self, index: int, text: str):
+        """完了したパートの結果を追記する（1行ずつ書き込むので途中で止まっても前の行は残る）"""
+        line = json.dumps({"index": index, "text": text}, ensure_ascii=False) + "\n"
+        with open(self.dir / "parts.jsonl", 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed[index] = text
+
+    def mark_resumed(self):
+        self.data["resume_count"] = self.resume_count + 1
+        self.save()
+
+    def save(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.dir / "job.json")
+        except Exception:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+
+class TranscriptionJournal:
+    """文字起こしジョブのディレクトリを管理する"""
+
+    def __init__(self, directory: Path, max_resumes: int = 3):
+        self.directory = Path(directory)
+        # 再開しても失敗し続けるジョブ（元の投稿が削除されたなど）は、この回数で諦める
+        self.max_resumes = max_resumes
+
+    def create(self, channel_id: int, guild_id: int, message_id: int, user_id: int,
+               filename: str, is_video: bool, content_hash: str) -> TranscriptionJob:
+        """新しいジョブを作成（元ファイルは job.source_path に置く）"""
+        job_dir = self.directory / f"{time.strftime('%Y%m%d_%H%M%S')}_{content_hash[:12]}_{message_id}"
+        job_dir.mkdir(parents=True, exist_ok=True)
+        job = TranscriptionJob(job_dir, {
+            "channel_id": channel_id,
+            "guild_id": guild_id,
+            "message_id": message_id,
+            "user_id": user_id,
+            "filename": filename,
+            "file_extension": filename.rsplit('.', 1)[-1].lower(),
+            "is_video": is_video,
+            "content_hash": content_hash,
+            "created_at": time.time(),
+            "parts": [],
+        })
+        job.save()
+        return job
+
+    def unfinished(self) -> List[TranscriptionJob]:
+        """残っているジョブ（作成順）"""
+        if not self.directory.exists():
+            return []
+        jobs = []
+        for job_dir in sorted(path for path in self.directory.iterdir() if path.is_dir()):
+            job = self.load(job_dir)
+            if job is not None:
+                jobs.append(job)
+        return jobs
+
+    def load(self, job_dir: Path) -> Optional[TranscriptionJob]:
+        try:
+            with open(job_dir / "job.json", 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"文字起こしジョブを読み込めないため削除: {job_dir.name} ({e})")
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return None
+
+        completed: Dict[int, str] = {}
+        journal_path = job_dir / "parts.jsonl"
+        if journal_path.exists():
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 書き込み途中で止まった最後の行
+                    completed[entry["index"]] = entry["text"]
+        return TranscriptionJob(job_dir, data, completed)
+
+    def finish(self, job: TranscriptionJob):
+        """ジョブを完了としてディレクトリごと削除する"""
+        shutil.rmtree(job.dir, ignore_errors=True)
@@ -0,0 +1,236 @@
+"""
+翻訳サービス
+GoogleTranslator（同期API）をイベントループの外（スレッド）で呼び、複数のバッチを上限付きで同時に翻訳する
+段落ごとにハッシュでキャッシュするので、同じ記事の段落を何度も翻訳しない
+翻訳結果は元の段落構成（改行）を保ったまま組み立てる
+バッチ翻訳では段落ごとに番号付きの目印を入れ、目印で対応を確かめられた訳だけを使う（キャッシュする）
+"""
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from deep_translator import GoogleTranslator
+
+from utils.disk_cache import DiskCache, hash_key
+
+logger = logging.getLogger(__name__)
+
+# 段落の区切り（改行の連続）を残したまま分割する
+PARAGRAPH_SPLIT_PATTERN = re.compile(r"(\n+)")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+# バッチ内の段落の目印（翻訳APIが空白を足しても読めるようにする）
+SEGMENT_MARKER = "[[{}]]"
+SEGMENT_MARKER_PATTERN = re.compile(r"\[\[\s*(\d+)\s*\]\]")
+
+
+class TranslationService:
+    """キャッシュ付きの非同期翻訳サービス"""
+
+    def __init__(self, source: str = "en", target: str = "ja", max_concurrency: int = 4,
+                 max_batch_chars: int = 2000, cache: Optional[DiskCache] = None, memory_entries: int = 2048,
+                 translator_factory: Optional[Callable] = None):
+        self.source = source
+        self.target = target
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_batch_chars = max_batch_chars
+        self.cache = cache
+        self.memory_entries = memory_entries
+        self.translator_factory = translator_factory or (lambda: GoogleTranslator(source=self.source, target=self.target))
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"cached_segments": 0, "translated_segments": 0, "api_calls": 0, "failed_segments": 0}
+
+    async def translate(self, text: str) -> str:
+        """
+        テキストを翻訳する（段落構成はそのまま、翻訳に失敗した段落は原文のまま）
+        """
+        if not text or not text.strip():
+            return text
+
+        # 段落と区切りの改行を交互に並べたリスト（奇数番目が区切り）
+        pieces = PARAGRAPH_SPLIT_PATTERN.split(text)
+        segments: Dict[int, List[str]] = {}
+        for index in range(0, len(pieces), 2):
+            if pieces[index].strip():
+                segments[index] = self._split_long_paragraph(pieces[index].strip())
+
+        # キャッシュにない文だけを翻訳する（同じ文が複数回出てきても1回だけ）
+        translations: Dict[str, str] = {}
+        pending: List[str] = []
+        seen = set()
+        for parts in segments.values():
+            for part in parts:
+                if part in seen:
+                    continue
+                seen.add(part)
+                cached = self._get_cached(part)
+                if cached is not None:
+                    translations[part] = cached
+                    self.stats["cached_segments"] += 1
+                else:
+                    pending.append(part)
+
+        if pending:
+            batches = self._make_batches(pending)
+            results = await asyncio.gather(*(self._translate_batch(batch) for batch in batches))
+            for batch, translated in zip(batches, results):
+                translations.update(zip(batch, translated))
+
+        for index, parts in segments.items():
+            pieces[index] = " ".join(translations.get(part, part) for part in parts)
+        return "".join(pieces)
+
+    def _split_long_paragraph(self, paragraph: str) -> List[str]:
+        """1回で翻訳できない長さの段落は文単位でまとめ直す"""
+        if len(paragraph) <= self.max_batch_chars:
+            return [paragraph]
+        parts = []
+        current = ""
+        for sentence in SENTENCE_SPLIT_PATTERN.split(paragraph):
+            if current and len(current) + 1 + len(sentence) > self.max_batch_chars:
+                parts.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}".strip()
+        if current:
+            parts.append(current)
+        return parts
+
+    def _make_batches(self, segments: List[str]) -> List[List[str]]:
+        """目印と改行で連結して max_batch_chars 以内に収まるようにまとめる"""
+        batches: List[List[str]] = []
+        current: List[str] = []
+        length = 0
+        for segment in segments:
+            size = len(SEGMENT_MARKER.format(len(current))) + 1 + len(segment)
+            if current and length + 1 + size > self.max_batch_chars:
+                batches.append(current)
+                current, length = [], 0
+                size = len(SEGMENT_MARKER.format(0)) + 1 + len(segment)
+            current.append(segment)
+            length += size + (1 if length else 0)
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _translate_batch(self, batch: List[str]) -> List[str]:
+        """
+        1バッチを翻訳する
+
+        各段落の前に目印の行を入れて送り、目印で対応が確かめられた段落だけ訳を使う
+        目印が欠けた・順番が崩れた段落と、バッチ自体が失敗した場合は1段落ずつ翻訳し直す
+        """
+        if len(batch) == 1:
+            return [await self._translate_single(batch[0])]
+        matched: Dict[int, str] = {}
+        try:
+            text = "\n".join(f"{SEGMENT_MARKER.format(i)}\n{segment}" for i, segment in enumerate(batch))
+            matched = self._match_segments(await self._call_translator(text) or "", len(batch))
+        except Exception as e:
+            logger.warning(f"バッチ翻訳エラー: {e}")
+
+        for i, translated in matched.items():
+            self._set_cached(batch[i], translated)
+        self.stats["translated_segments"] += len(matched)
+        retry = [i for i in range(len(batch)) if i not in matched]
+        if retry and matched:
+            logger.info(f"翻訳結果の目印が合わない段落を個別に翻訳: {len(retry)}/{len(batch)}段落")
+
+        results = await asyncio.gather(*(self._translate_single(batch[i]) for i in retry))
+        matched.update(zip(retry, results))
+        return [matched[i] for i in range(len(batch))]
+
+    @staticmethod
+    def _match_segments(translated: str, count: int) -> Dict[int, str]:
+        """
+        翻訳結果を目印で区切り、段落番号 → 訳 を返す
+
+        目印の番号が直前の目印の次の番号になっていて、次の目印も1つ先の番号（最後の段落なら末尾）の
+        場合だけ、その間の文章をその段落の訳とみなす（それ以外の段落は含めない）
+        """
+        markers = list(SEGMENT_MARKER_PATTERN.finditer(translated))
+        matched: Dict[int, str] = {}
+        for position, marker in enumerate(markers):
+            index = int(marker.group(1))
+            following = markers[position + 1] if position + 1 < len(markers) else None
+            previous = markers[position - 1] if position > 0 else None
+            if previous is not None and int(previous.group(1)) != index - 1:
+                continue
+            if following is None:
+                if index != count - 1:
+                    continue
+                body = translated[marker.end():]
+            else:
+                if int(following.group(1)) != index + 1:
+                    continue
+                body = translated[marker.end():following.start()]
+                # 翻訳APIが次の目印の行の前に付けた文字は、この段落の訳ではないので除く
+                head, _, _ = body.rpartition("\n")
+                if head.strip():
+                    body = head
+            body = body.strip()
+            if 0 <= index < count and body and index not in matched:
+                matched[index] = body
+        return matched
+
+    async def _translate_single(self, segment: str) -> str:
+        try:
+            translated = await self._call_translator(segment)
+        except Exception as e:
+            logger.warning(f"段落翻訳エラー: {e}")
+            translated = None
+        if not translated:
+            self.stats["failed_segments"] += 1
+            return segment  # 翻訳失敗時は原文
+        translated = translated.strip()
+        self._set_cached(segment, translated)
+        self.stats["translated_segments"] += 1
+        return translated
+
+    async def _call_translator(self, text: str) -> str:
+        """同期の翻訳APIをスレッドで呼ぶ（同時実行数は max_concurrency まで）"""
+        async with self._get_semaphore():
+            self.stats["api_calls"] += 1
+            return await asyncio.to_thread(lambda: self.translator_factory().translate(text))
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def _key(self, segment: str) -> str:
+        return hash_key("translation", self.source, self.target, segment)
+
+    def _get_cached(self, segment: str) -> Optional[str]:
+        key = self._key(segment)
+        translated = self._memory.get(key)
+        if translated is not None:
+            self._memory.move_to_end(key)
+            return translated
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                self._remember(key, entry["text"])
+                return entry["text"]
+        return None
+
+    def _set_cached(self, segment: str, translated: str):
+        key = self._key(segment)
+        self._remember(key, translated)
+        if self.cache is not None:
+            try:
+                self.cache.set(key, {"text": translated})
+            except OSError as e:
+                logger.warning(f"翻訳キャッシュ保存エラー: {e}")
+
+    def _remember(self, key: str, translated: str):
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,51 @@
+"""
+TTL付きキャッシュ
+一定時間だけ値を保持するメモリ上のキャッシュ（件数の上限を超えたら古いものから捨てる）
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """TTLと件数上限付きのキャッシュ"""
+
+    def __init__(self, ttl_sec: float, max_entries: int = 10000):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """値を取得（未登録・期限切れの場合は None）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """値を保存（TTLは保存した時点から数える）"""
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic() + self.ttl_sec)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
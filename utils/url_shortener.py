@@ -0,0 +1,141 @@
+"""
+URL短縮
+共有HTTPセッションで非同期に短縮し、元のURL → 短縮URLの対応をディスクに保存して使い回す
+短縮サービスが遅いときは期限（deadline_sec）で元のURLを返し、処理を待たせない
+（期限後も短縮は裏で続け、結果は次回のためにキャッシュする）
+短縮サービスは backend として差し替えられる（テストではローカルのサーバーを使う）
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+import aiohttp
+
+from utils.disk_cache import DiskCache, hash_key
+from utils.http_client import HttpClient, http_client
+
+logger = logging.getLogger(__name__)
+
+
+class IsGdBackend:
+    """is.gd の短縮API"""
+
+    name = "is.gd"
+
+    def __init__(self, client: HttpClient = http_client, api_url: str = "https://is.gd/create.php",
+                 timeout_sec: float = 10):
+        self.client = client
+        self.api_url = api_url
+        self.timeout_sec = timeout_sec
+
+    async def shorten(self, long_url: str) -> Optional[str]:
+        """短縮URLを返す（失敗時は None）"""
+        timeout = aiohttp.ClientTimeout(total=self.timeout_sec)
+        data = {'format': 'simple', 'url': long_url}
+        async with self.client.session.post(self.api_url, data=data, timeout=timeout) as response:
+            text = (await response.text()).strip()
+            if response.status != 200:
+                logger.warning(f"{self.name}短縮失敗 - ステータス: {response.status}")
+                return None
+        # エラーメッセージの場合は失敗扱い
+        if text.startswith('Error:') or not text.startswith('http'):
+            logger.warning(f"{self.name}短縮失敗 - エラー: {text}")
+            return None
+        return text
+
+
+class UrlShortener:
+    """キャッシュ・期限付きのURL短縮"""
+
+    def __init__(self, backend=None, cache: Optional[DiskCache] = None, deadline_sec: float = 2.0,
+                 memory_entries: int = 1024):
+        self.backend = backend or IsGdBackend()
+        self.cache = cache
+        self.deadline_sec = deadline_sec
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        # 同じURLの短縮中のタスク（同時に来ても1回だけ呼ぶ）
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.stats = {"hits": 0, "shortened": 0, "fallbacks": 0}
+
+    async def shorten(self, long_url: str) -> str:
+        """短縮URLを返す（キャッシュになく、期限内に短縮できなければ元のURL）"""
+        key = self._key(long_url)
+        short_url = self._get_cached(key)
+        if short_url is not None:
+            self.stats["hits"] += 1
+            return short_url
+
+        task = self._pending.get(key)
+        if task is None:
+            logger.info(f"URL短縮開始 - 元のURL長: {len(long_url)}文字")
+            task = asyncio.create_task(self._shorten_and_store(key, long_url))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        try:
+            short_url = await asyncio.wait_for(asyncio.shield(task), self.deadline_sec)
+        except asyncio.TimeoutError:
+            logger.warning(f"URL短縮が{self.deadline_sec}秒以内に終わらないため元のURLを使用（短縮は裏で継続）")
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            short_url = None
+
+        if short_url is None:
+            self.stats["fallbacks"] += 1
+            return long_url
+        return short_url
+
+    async def wait_background(self, long_url: str) -> Optional[str]:
+        """
+        期限切れで元のURLを返した後、裏で続けている短縮の結果を待つ
+
+        Returns:
+            短縮URL（キャッシュ済みならそれを返す。短縮中でもなく失敗した場合は None）
+        """
+        key = self._key(long_url)
+        task = self._pending.get(key)
+        if task is not None:
+            return await asyncio.shield(task)
+        return self._get_cached(key)
+
+    def _key(self, long_url: str) -> str:
+        return hash_key("short_url", getattr(self.backend, "name", type(self.backend).__name__), long_url)
+
+    async def _shorten_and_store(self, key: str, long_url: str) -> Optional[str]:
+        try:
+            short_url = await self.backend.shorten(long_url)
+        except Exception as e:
+            logger.warning(f"URL短縮エラー: {e}")
+            return None
+        if short_url:
+            logger.info(f"短縮成功: {short_url}")
+            self.stats["shortened"] += 1
+            self._remember(key, short_url)
+            if self.cache is not None:
+                try:
+                    self.cache.set(key, {"short_url": short_url})
+                except OSError as e:
+                    logger.warning(f"短縮URLキャッシュ保存エラー: {e}")
+        return short_url
+
+    def _get_cached(self, key: str) -> Optional[str]:
+        short_url = self._memory.get(key)
+        if short_url is not None:
+            self._memory.move_to_end(key)
+            return short_url
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                self._remember(key, entry["short_url"])
+                return entry["short_url"]
+        return None
+
+    def _remember(self, key: str, short_url: str):
+        self._memory[key] = short_url
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
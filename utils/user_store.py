@@ -0,0 +1,192 @@
+"""
+ユーザーデータストア
+ユーザーごとのJSONファイルの代わりにSQLite（WALモード）でユーザーデータを管理する
+1日の利用回数は「チェックと加算」を1トランザクションで行い、同時リアクションでも取りこぼさない
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 利用回数の列（プロフィールのJSONとは別に管理し、保存時に上書きしない）
+QUOTA_FIELDS = ("last_used_date", "daily_usage_count")
+
+
+class UserStore:
+    """SQLiteによるユーザーデータストア"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # ユーザーID → (最終利用日, 利用回数)。書き込みは全てこのストア経由なのでプロセス内では常に最新
+        self._quota_cache: Dict[str, Tuple[str, int]] = {}
+        # トランザクションは明示的に管理する（isolation_level=None で自動BEGINを無効化）
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                profile TEXT NOT NULL DEFAULT '{}',
+                last_used_date TEXT NOT NULL DEFAULT '',
+                daily_usage_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, user_id) -> Optional[Dict]:
+        """ユーザーデータを取得（存在しない場合は None）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT profile, last_used_date, daily_usage_count FROM users WHERE user_id = ?",
+                (str(user_id),)
+            ).fetchone()
+        if row is None:
+            return None
+
+        data = json.loads(row[0])
+        data["last_used_date"] = row[1]
+        data["daily_usage_count"] = row[2]
+        return data
+
+    def put(self, user_id, data: Dict):
+        """
+        ユーザーデータを保存
+
+        利用回数の列は新規作成時のみ data の値を使い、既存ユーザーでは consume_quota で
+        更新された値を保持する（古いデータで上書きして加算を取りこぼさないため）
+        """
+        profile = {key: value for key, value in data.items() if key not in QUOTA_FIELDS}
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO users (user_id, profile, last_used_date, daily_usage_count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET profile = excluded.profile
+                """,
+                (
+                    str(user_id),
+                    json.dumps(profile, ensure_ascii=False),
+                    data.get("last_used_date", ""),
+                    int(data.get("daily_usage_count", 0)),
+                )
+            )
+            # 新規作成時は data の回数が入るので、キャッシュは読み込み直す
+            self._quota_cache.pop(str(user_id), None)
+
+    def peek_quota(self, user_id, today: str) -> int:
+        """今日の利用回数を取得（消費はしない。2回目以降はメモリのキャッシュから返す）"""
+        user_id = str(user_id)
+        with self._lock:
+            cached = self._quota_cache.get(user_id)
+            if cached is None:
+                row = self._conn.execute(
+                    "SELECT last_used_date, daily_usage_count FROM users WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                cached = (row[0], row[1]) if row else ("", 0)
+                self._quota_cache[user_id] = cached
+        last_used_date, count = cached
+        return count if last_used_date == today else 0
+
+    def consume_quota(self, user_id, today: str, limit: Optional[int]) -> Tuple[bool, int]:
+        """
+        1日の利用回数を1回分消費
+
+        Args:
+            user_id: ユーザーID
+            today: 今日の日付（この日付が変わるとカウントをリセット）
+            limit: 1日の上限（None の場合は無制限でカウントのみ）
+
+        Returns:
+            (利用可能か, 消費後（拒否時は現在）の利用回数)
+        """
+        user_id = str(user_id)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+                cursor = self._conn.execute(
+                    """
+                    UPDATE users
+                    SET daily_usage_count = CASE WHEN last_used_date = :today THEN daily_usage_count + 1 ELSE 1 END,
+                        last_used_date = :today
+                    WHERE user_id = :user_id
+                      AND (:limit IS NULL OR last_used_date != :today OR daily_usage_count < :limit)
+                    """,
+                    {"user_id": user_id, "today": today, "limit": limit}
+                )
+                allowed = cursor.rowcount > 0
+                count = self._conn.execute(
+                    "SELECT daily_usage_count FROM users WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._quota_cache[user_id] = (today, count)
+        return allowed, count
+
+    def import_json_dir(self, json_dir: Path) -> int:
+        """
+        旧形式のユーザーJSONディレクトリを取り込む（初回のみ実行）
+
+        既にストアにあるユーザーは上書きしない。元のJSONファイルはバックアップとして残す
+
+        Returns:
+            取り込んだユーザー数
+        """
+        json_dir = Path(json_dir)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return 0
+
+            imported = 0
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for file_path in sorted(json_dir.glob("*.json")) if json_dir.exists() else []:
+                    try:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+                    except (json.JSONDecodeError, OSError) as e:
+                        logger.warning(f"ユーザーデータ取り込みスキップ {file_path.name}: {e}")
+                        continue
+
+                    profile = {key: value for key, value in data.items() if key not in QUOTA_FIELDS}
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO users (user_id, profile, last_used_date, daily_usage_count) VALUES (?, ?, ?, ?)",
+                        (
+                            file_path.stem,
+                            json.dumps(profile, ensure_ascii=False),
+                            data.get("last_used_date", ""),
+                            int(data.get("daily_usage_count", 0)),
+                        )
+                    )
+                    imported += cursor.rowcount
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', '1')")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._quota_cache.clear()
+
+        if imported:
+            logger.info(f"ユーザーデータを取り込みました: {imported}件 ({json_dir})")
+        return imported
+
+    def count(self) -> int:
+        """登録ユーザー数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
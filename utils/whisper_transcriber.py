@@ -0,0 +1,156 @@
+"""
+Whisper文字起こしユーティリティ
+分割された音声ファイルを同時実行数の上限付きで並列に文字起こしし、元の順番で結合する
+"""
+
+import asyncio
+import logging
+import random
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+
+def format_timestamp(seconds: float) -> str:
+    """秒数を H:MM:SS / M:SS 形式に変換"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+class PartResult:
+    """分割ファイル1つ分の文字起こし結果"""
+
+    def __init__(self, index: int, start_sec: float, end_sec: float,
+                 text: str = "", error: Optional[str] = None, attempts: int = 0):
+        self.index = index
+        self.start_sec = start_sec
+        self.end_sec = end_sec
+        self.text = text
+        self.error = error
+        self.attempts = attempts
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def is_timeout(self) -> bool:
+        return bool(self.error) and ("timeout" in self.error.lower() or "timed out" in self.error.lower())
+
+
+class WhisperTranscriber:
+    """分割音声をWhisper APIで並列に文字起こしするクラス"""
+
+    def __init__(self, client, model: str = "whisper-1", language: str = "ja",
+                 max_concurrency: int = 4, max_retries: int = 3,
+                 base_delay: float = 2.0, max_delay: float = 30.0):
+        # リトライはこのクラスで一元管理するため、クライアント側の自動リトライは無効化
+        self.client = client.with_options(max_retries=0) if client else None
+        self.model = model
+        self.language = language
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def transcribe_parts(self, parts, on_part_done: Optional[Callable[[PartResult], Awaitable[None]]] = None) -> List[PartResult]:
+        """
+        分割ファイルを並列に文字起こし
+
+        Args:
+            parts: index / path / start_sec / end_sec を持つ分割ファイルのリスト
+            on_part_done: パートが完了（または失敗）するたびに呼ばれるコールバック
+
+        Returns:
+            元の順番に並んだ結果のリスト（失敗したパートも含む）
+
+        Raises:
+            いずれかのパートでリトライしないエラーが起きた場合はそのエラー（他のパートは中止する）
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(part):
+            async with semaphore:
+                result = await self.transcribe_part(part)
+            if on_part_done:
+                await on_part_done(result)
+            return result
+
+        tasks = [asyncio.create_task(run(part)) for part in parts]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            # リトライしないエラーで中断した場合、残りのパートがAPIを呼び続けないよう止める
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return sorted(results, key=lambda r: r.index)
+
+    async def transcribe_part(self, part) -> PartResult:
+        """
+        1パートを文字起こし（一時的なエラーは指数バックオフでリトライ）
+
+        Raises:
+            OpenAI API のエラー以外の、リトライで回復しないエラー（クライアント未設定など）
+        """
+        result = PartResult(part.index, part.start_sec, part.end_sec)
+
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            try:
+                with open(Path(part.path), "rb") as audio_file:
+                    transcription = await self.client.audio.transcriptions.create(
+                        model=self.model,
+                        file=audio_file,
+                        language=self.language
+                    )
+                result.text = transcription.text
+                result.error = None
+                logger.info(f"パート {part.index + 1} の文字起こし完了 (試行 {attempt + 1}回目)")
+                return result
+            except Exception as e:
+                if not isinstance(e, openai.APIError) and not self._is_retryable(e):
+                    # クライアント未設定・引数の誤りなどはリトライせず、すぐに呼び出し元へ伝える
+                    raise
+                result.error = str(e) or type(e).__name__
+                if not self._is_retryable(e) or attempt >= self.max_retries:
+                    break
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                logger.warning(f"Whisper API エラー (パート {part.index + 1}, 試行 {attempt + 1}回目): {e} → {delay:.1f}秒後にリトライ")
+                await asyncio.sleep(delay)
+
+        logger.error(f"Whisper API エラー (パート {part.index + 1}): {result.error}")
+        return result
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """リトライで回復する可能性があるエラーか判定"""
+        if isinstance(error, openai.APIStatusError):
+            # 429（レート制限）と5xxのみリトライ、それ以外の4xxは何度送っても失敗する
+            return error.status_code == 429 or error.status_code >= 500
+        # 接続エラー・タイムアウト（APITimeoutError は APIConnectionError の派生）
+        # クライアント未設定などの AttributeError / TypeError は何度試しても失敗するのでリトライしない
+        return isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError, TimeoutError))
+
+    @staticmethod
+    def join_results(results: List[PartResult]) -> str:
+        """結果を順番に結合（失敗したパートは時間範囲付きで明記）"""
+        lines = []
+        for result in results:
+            if result.ok:
+                lines.append(result.text)
+            else:
+                lines.append(
+                    f"[⚠️ パート{result.index + 1} "
+                    f"({format_timestamp(result.start_sec)}〜{format_timestamp(result.end_sec)}) "
+                    f"の文字起こしに失敗しました]"
+                )
+        return "\n".join(lines) + "\n" if lines else ""